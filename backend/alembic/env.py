@@ -1,7 +1,7 @@
 from logging.config import fileConfig
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config, make_url, pool
 
 from alembic import context
 from miam.infra.db.base import Base
@@ -37,8 +37,22 @@ target_metadata = Base.metadata
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
+# Migrations run synchronously: asyncio drivers are swapped for psycopg 3, which
+# shares their URL format. psycopg2 and psycopg 3 URLs are used as they are.
+_SYNC_DRIVERS = {"asyncpg": "psycopg", "psycopg_async": "psycopg"}
+
+
+def migration_url(url: str) -> str:
+    """Return a synchronous URL for ``url``, escaped for the ini parser."""
+    parsed = make_url(url)
+    driver = _SYNC_DRIVERS.get(parsed.get_driver_name())
+    if driver is not None:
+        parsed = parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}")
+    return parsed.render_as_string(hide_password=False).replace("%", "%%")
+
+
 alembic_config = AlembicConfig()  # ty: ignore[missing-argument]
-config.set_main_option("sqlalchemy.url", alembic_config.database_url)
+config.set_main_option("sqlalchemy.url", migration_url(alembic_config.database_url))
 
 
 def run_migrations_offline() -> None:
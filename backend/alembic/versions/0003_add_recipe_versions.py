@@ -0,0 +1,37 @@
+"""add recipe and library versions
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str]] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add version counters used to compute ETags without loading recipes."""
+    op.add_column(
+        "recipes",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+    op.add_column(
+        "users",
+        sa.Column("library_version", sa.Integer(), nullable=False, server_default="1"),
+    )
+
+
+def downgrade() -> None:
+    """Remove version counters."""
+    op.drop_column("users", "library_version")
+    op.drop_column("recipes", "version")
@@ -0,0 +1,35 @@
+"""add recipe keyset pagination index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str]] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index the newest-first listing order of a user's recipes.
+
+    Keyset pages (``created_at, id`` below the cursor) become index range scans
+    instead of sorting every recipe of the user.
+    """
+    op.create_index(
+        "ix_recipes_owner_id_created_at_id",
+        "recipes",
+        ["owner_id", "created_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    """Drop the keyset pagination index."""
+    op.drop_index("ix_recipes_owner_id_created_at_id", table_name="recipes")
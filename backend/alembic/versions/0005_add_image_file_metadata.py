@@ -0,0 +1,35 @@
+"""add image file metadata
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str]] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Record where each image file is stored, so lookups need no directory scan.
+
+    Existing rows stay NULL until ``scripts/migrate_image_layout.py`` backfills
+    them; storage falls back to searching for their files until then.
+    """
+    op.add_column("images", sa.Column("extension", sa.String(10), nullable=True))
+    op.add_column("images", sa.Column("media_type", sa.String(100), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove image file metadata."""
+    op.drop_column("images", "media_type")
+    op.drop_column("images", "extension")
@@ -0,0 +1,53 @@
+"""add content-addressed image blobs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str]] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Point images at blobs of identical content, with reference counts.
+
+    Existing rows keep a NULL ``content_hash`` and their per-image file until
+    ``scripts/migrate_image_layout.py`` moves them into blobs.
+    """
+    op.create_table(
+        "image_blobs",
+        sa.Column("content_hash", sa.String(64), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("content_hash", name=op.f("pk_image_blobs")),
+    )
+    op.add_column("images", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.create_foreign_key(
+        op.f("fk_images_content_hash_image_blobs"),
+        "images",
+        "image_blobs",
+        ["content_hash"],
+        ["content_hash"],
+    )
+    op.create_index(op.f("ix_images_content_hash"), "images", ["content_hash"])
+
+
+def downgrade() -> None:
+    """Remove image blobs; files stored as blobs are not moved back."""
+    op.drop_index(op.f("ix_images_content_hash"), table_name="images")
+    op.drop_constraint(
+        op.f("fk_images_content_hash_image_blobs"), "images", type_="foreignkey"
+    )
+    op.drop_column("images", "content_hash")
+    op.drop_table("image_blobs")
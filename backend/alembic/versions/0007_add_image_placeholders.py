@@ -0,0 +1,33 @@
+"""add image placeholders
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str]] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Store a tiny preview of each image, returned with recipes.
+
+    Existing rows stay NULL until ``scripts/backfill_image_placeholders.py``
+    computes them; clients show an empty box for those meanwhile.
+    """
+    op.add_column("images", sa.Column("placeholder", sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Remove image placeholders."""
+    op.drop_column("images", "placeholder")
@@ -0,0 +1,69 @@
+"""Compute the placeholders of images stored before they existed.
+
+Recipe responses return a placeholder with each image, a few-pixel preview that
+clients show blurred until the image loads. New uploads get one when they are
+stored; this fills ``images.placeholder`` for the others, reading each file
+once from local storage.
+
+Safe to re-run, and to run while the API is serving: only rows without a
+placeholder are read.
+
+Usage: uv run scripts/backfill_image_placeholders.py [--folder images]
+"""
+
+import argparse
+from uuid import UUID
+
+from sqlalchemy import select, update
+
+from miam.domain.entities import ImageUpload
+from miam.infra.db.base import Image
+from miam.infra.db.session import SessionLocal
+from miam.infra.image_normalizer import PillowImageNormalizer
+from miam.infra.image_storage import LocalImageStorage
+
+_COMMIT_EVERY = 100
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--folder", default="images")
+    args = parser.parse_args()
+
+    storage = LocalImageStorage(args.folder)
+    normalizer = PillowImageNormalizer(reencode=False, workers=4)
+    updated = missing = 0
+    with SessionLocal() as session:
+        images = session.execute(
+            select(Image.id, Image.recipe_id, Image.extension, Image.content_hash)
+            .where(Image.placeholder.is_(None))
+            .order_by(Image.id)
+        ).all()
+        for start in range(0, len(images), _COMMIT_EVERY):
+            uploads: list[tuple[UUID, ImageUpload]] = []
+            for image in images[start : start + _COMMIT_EVERY]:
+                resolved = storage.get_recipe_image_path(
+                    image.id, image.extension, image.content_hash
+                )
+                if resolved is None:
+                    missing += 1
+                    continue
+                path, _ = resolved
+                upload = ImageUpload(image.recipe_id, path.read_bytes(), path.name)
+                uploads.append((image.id, upload))
+            results = normalizer.normalize([upload for _, upload in uploads])
+            for (image_id, _), result in zip(uploads, results, strict=True):
+                if isinstance(result, str) or result.placeholder is None:
+                    continue
+                session.execute(
+                    update(Image)
+                    .where(Image.id == image_id)
+                    .values(placeholder=result.placeholder)
+                )
+                updated += 1
+            session.commit()
+    print(f"Computed {updated} placeholders ({missing} files not found)")
+
+
+if __name__ == "__main__":
+    main()
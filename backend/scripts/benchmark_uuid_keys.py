@@ -0,0 +1,102 @@
+"""Compare random (v4) and time-ordered (v7) UUID primary keys on PostgreSQL.
+
+Inserts the same recipe-like rows into one table per key kind, then reports the
+insert throughput and the size of the primary key index. Random keys split
+pages all over the index, which leaves it larger and less dense, and dirty far
+more pages per insert once the index outgrows shared buffers.
+
+Usage: uv run scripts/benchmark_uuid_keys.py [--rows 1000000] [--batch 10000]
+
+The tables are created in the database of DATABASE_URL and dropped afterwards.
+"""
+
+import argparse
+import time
+import uuid
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    MetaData,
+    String,
+    Table,
+    Uuid,
+    create_engine,
+    func,
+    select,
+)
+
+from miam.infra.db.ids import uuid7
+from miam.infra.db.session import AlembicConfig
+
+KEY_FACTORIES: dict[str, Callable[[], uuid.UUID]] = {
+    "uuid4": uuid.uuid4,
+    "uuid7": uuid7,
+}
+
+
+def _table(metadata: MetaData, name: str) -> Table:
+    return Table(
+        f"bench_recipes_{name}",
+        metadata,
+        Column("id", Uuid, primary_key=True),
+        Column("owner_id", Uuid, nullable=False),
+        Column("title", String(255), nullable=False),
+        Column("created_at", DateTime(timezone=True), nullable=False),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args()
+
+    engine = create_engine(AlembicConfig().database_url)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("This benchmark needs PostgreSQL.")
+    metadata = MetaData()
+    tables = {name: _table(metadata, name) for name in KEY_FACTORIES}
+    owner_id = uuid.uuid4()
+
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+    try:
+        print(f"{'keys':<8}{'rows/s':>12}{'pk index':>12}{'table':>12}")
+        for name, new_key in KEY_FACTORIES.items():
+            table = tables[name]
+            start = time.perf_counter()
+            for offset in range(0, args.rows, args.batch):
+                rows = [
+                    {
+                        "id": new_key(),
+                        "owner_id": owner_id,
+                        "title": f"Recipe {offset + i}",
+                        "created_at": datetime.now(UTC),
+                    }
+                    for i in range(min(args.batch, args.rows - offset))
+                ]
+                with engine.begin() as connection:
+                    connection.execute(table.insert(), rows)
+            elapsed = time.perf_counter() - start
+
+            with engine.connect() as connection:
+                index_size, table_size = connection.execute(
+                    select(
+                        func.pg_size_pretty(
+                            func.pg_relation_size(f"{table.name}_pkey")
+                        ),
+                        func.pg_size_pretty(func.pg_relation_size(table.name)),
+                    )
+                ).one()
+            print(
+                f"{name:<8}{args.rows / elapsed:>12,.0f}{index_size:>12}{table_size:>12}"
+            )
+    finally:
+        metadata.drop_all(engine)
+
+
+if __name__ == "__main__":
+    main()
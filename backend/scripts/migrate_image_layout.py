@@ -0,0 +1,91 @@
+"""Move stored images to the sharded layout and record their file metadata.
+
+1. Moves ``{folder}/{image_id}{ext}`` files of the former flat layout into their
+   ``{folder}/{aa}/{bb}/`` shard directory.
+2. Fills ``images.extension`` and ``images.media_type`` on rows that have none,
+   from the file found in storage. Until then, serving these images needs a
+   directory search.
+3. Stores the files of images without ``content_hash`` as content-addressed
+   blobs, so duplicates share one file, then deletes the per-image files.
+
+Safe to re-run, and to run while the API is serving: the storage finds files in
+every layout, and a per-image file is only deleted once its row points at the
+blob.
+
+Usage: uv run scripts/migrate_image_layout.py [--folder images]
+"""
+
+import argparse
+
+from sqlalchemy import select, update
+
+from miam.infra.db.base import Image
+from miam.infra.db.blobs import acquire_blob_refs
+from miam.infra.db.session import SessionLocal
+from miam.infra.image_storage import LocalImageStorage
+
+_COMMIT_EVERY = 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--folder", default="images")
+    args = parser.parse_args()
+
+    storage = LocalImageStorage(args.folder)
+    moved = sum(1 for _ in storage.relayout())
+    print(f"Moved {moved} files into shard directories")
+
+    updated = missing = 0
+    with SessionLocal() as session:
+        image_ids = (
+            session.execute(select(Image.id).where(Image.extension.is_(None)))
+            .scalars()
+            .all()
+        )
+        for image_id in image_ids:
+            resolved = storage.get_recipe_image_path(image_id)
+            if resolved is None:
+                missing += 1
+                continue
+            path, media_type = resolved
+            session.execute(
+                update(Image)
+                .where(Image.id == image_id)
+                .values(extension=path.suffix.lower(), media_type=media_type)
+            )
+            updated += 1
+            if updated % _COMMIT_EVERY == 0:
+                session.commit()
+        session.commit()
+    print(f"Recorded file metadata on {updated} images ({missing} files not found)")
+
+    adopted = 0
+    with SessionLocal() as session:
+        images = session.execute(
+            select(Image.id, Image.extension).where(
+                Image.content_hash.is_(None), Image.extension.is_not(None)
+            )
+        ).all()
+        for start in range(0, len(images), _COMMIT_EVERY):
+            batch = []
+            for image_id, extension in images[start : start + _COMMIT_EVERY]:
+                content_hash = storage.adopt_legacy_image(image_id, extension)
+                if content_hash is None:
+                    continue
+                acquire_blob_refs(session, {content_hash: 1})
+                session.execute(
+                    update(Image)
+                    .where(Image.id == image_id)
+                    .values(content_hash=content_hash)
+                )
+                batch.append((image_id, extension))
+            session.commit()
+            for image_id, extension in batch:
+                storage.delete_image(image_id, extension)
+            adopted += len(batch)
+    print(f"Stored {adopted} images as content-addressed blobs")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,25 @@
 """Dependency injection for FastAPI routes."""
 
-from collections.abc import Generator
+import hmac
+from collections.abc import AsyncGenerator, Callable, Generator
+from typing import Literal, ParamSpec, TypeVar
 from uuid import UUID
 
-from fastapi import Cookie, Depends, HTTPException, status
+import httpx
+from fastapi import Cookie, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from miam.api.routes.helpers import FileSender
+from miam.domain.entities import ImageGrant
+from miam.domain.ports_secondary import (
+    CachePort,
+    ImageStoragePort,
+    ImageUrlSignerPort,
+)
 from miam.domain.services import (
     AuthService,
     RecipeExportService,
@@ -15,11 +27,26 @@ from miam.domain.services import (
     RecipeManagementService,
     RecipeShareService,
 )
-from miam.infra.db.session import SessionLocal
+from miam.infra.cache.invalidation import CacheInvalidationBus
+from miam.infra.cache.memory import InMemoryCache
+from miam.infra.cache.redis import RedisCache
+from miam.infra.db.routing import pin_to_primary, replica_available
+from miam.infra.db.session import (
+    AsyncBridgeSession,
+    AsyncSessionLocal,
+    SessionLocal,
+    alembic_config,
+    engine,
+)
 from miam.infra.exporter_markdown import MarkdownExporter
 from miam.infra.exporter_word import WordExporter
 from miam.infra.google_auth import GoogleTokenVerifier
+from miam.infra.image_gc import ImageGarbageCollector
+from miam.infra.image_normalizer import PillowImageNormalizer
 from miam.infra.image_storage import LocalImageStorage
+from miam.infra.image_storage_s3 import S3Client, S3ImageStorage
+from miam.infra.image_url_signer import HmacImageUrlSigner
+from miam.infra.image_variants import DiskImageVariantCache
 from miam.infra.importer_instagram import InstagramParser
 from miam.infra.jwt_handler import JwtTokenHandler
 from miam.infra.repositories import (
@@ -27,6 +54,8 @@ from miam.infra.repositories import (
     RecipeShareRepository,
     UserRepository,
 )
+from miam.infra.search_cache import SearchResultCache
+from miam.infra.share_events import ShareEventBroker
 
 
 class AuthSettings(BaseSettings):
@@ -40,10 +69,212 @@ class AuthSettings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
+class CacheSettings(BaseSettings):
+    """Cache configuration loaded from environment variables.
+
+    With an empty ``cache_url`` each worker keeps its own in-memory LRU cache;
+    a ``redis://`` URL shares one cache across workers and nodes.
+    """
+
+    cache_url: str = ""
+    cache_max_entries: int = 1024
+    cache_max_bytes: int = 32 * 1024 * 1024  # 32 MB
+    search_cache_ttl_seconds: float = 600
+    library_version_cache_ttl_seconds: float = 30
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+class ImageSettings(BaseSettings):
+    """Image storage configuration loaded from environment variables.
+
+    Images are stored in ``image_storage_dir`` unless ``image_s3_bucket`` is set:
+    they then go to that bucket of an S3-compatible object storage, shared by
+    every node, and clients download them from presigned URLs.
+
+    Resized and WebP variants are generated on first request and kept in
+    ``image_variant_cache_dir``; the least recently used are deleted once the
+    folder outgrows ``image_variant_cache_max_bytes``.
+
+    With ``image_accel_redirect_prefix``, image files are sent by the nginx in
+    front of the API (``X-Accel-Redirect``): the worker only authorizes the
+    request. nginx must serve the storage folder at ``{prefix}/images/`` and
+    the variant cache at ``{prefix}/image_cache/``, as internal locations.
+
+    Batch downloads from URLs run at most ``image_download_concurrency`` at a
+    time per request.
+
+    Recipe responses link their images with URLs signed for
+    ``image_url_window_seconds`` (and valid for as long again), with a key
+    derived from ``image_url_secret_key``, or from the JWT secret by default.
+
+    Uploads are rotated upright, stripped of their metadata, shrunk to fit
+    ``image_normalize_max_dimension`` and re-encoded to
+    ``image_normalize_format`` at ``image_normalize_quality`` before they are
+    stored, by ``image_normalize_workers`` threads per worker, unless
+    ``image_normalize`` is off. Either way they get a placeholder, a tiny
+    preview returned with recipes, and uploads of more than
+    ``image_normalize_max_pixels`` pixels are rejected before being decoded.
+
+    Every ``image_gc_interval_seconds`` (never when 0), each worker sweeps the
+    storage for files no image uses, ``image_gc_batch_size`` files at a time,
+    and deletes those older than ``image_gc_grace_seconds``.
+    """
+
+    image_storage_dir: str = "images"
+    image_s3_bucket: str = ""
+    image_s3_endpoint_url: str = ""  # default: AWS S3 in image_s3_region
+    image_s3_region: str = "us-east-1"
+    image_s3_access_key_id: str = ""
+    image_s3_secret_access_key: str = ""
+    image_s3_addressing_style: Literal["path", "virtual"] = "path"
+    image_s3_key_prefix: str = ""
+    image_s3_presign_expires_seconds: int = 300
+    image_s3_multipart_part_bytes: int = 8 * 1024 * 1024  # 8 MiB
+    image_s3_local_copy_dir: str = "image_copies"
+    image_s3_local_copy_max_bytes: int = 512 * 1024 * 1024  # 512 MB
+    image_variant_cache_dir: str = "image_cache"
+    image_variant_cache_max_bytes: int = 512 * 1024 * 1024  # 512 MB
+    image_url_secret_key: str = ""
+    image_url_window_seconds: int = 3600
+    image_accel_redirect_prefix: str = ""  # e.g. "/_protected"
+    image_download_concurrency: int = 8
+    image_normalize: bool = True
+    image_normalize_max_dimension: int = 2560
+    image_normalize_format: Literal["jpeg", "webp"] = "jpeg"
+    image_normalize_quality: int = 82
+    image_normalize_workers: int = 2
+    image_normalize_max_pixels: int = 50_000_000
+    image_gc_interval_seconds: float = 6 * 3600
+    image_gc_grace_seconds: float = 24 * 3600
+    image_gc_batch_size: int = 500
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+class InternalSettings(BaseSettings):
+    """Access to the internal operational endpoints (``/internal/*``).
+
+    They answer only requests bearing ``internal_api_token``, and are disabled
+    (404) while it is empty.
+    """
+
+    internal_api_token: str = ""
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+
+def _build_cache(settings: CacheSettings) -> CachePort:
+    if settings.cache_url:
+        return RedisCache(settings.cache_url)
+    return InMemoryCache(
+        max_entries=settings.cache_max_entries,
+        max_bytes=settings.cache_max_bytes,
+    )
+
+
+def _build_image_storage(settings: ImageSettings) -> ImageStoragePort:
+    if not settings.image_s3_bucket:
+        return LocalImageStorage(settings.image_storage_dir)
+    client = S3Client(
+        settings.image_s3_endpoint_url
+        or f"https://s3.{settings.image_s3_region}.amazonaws.com",
+        settings.image_s3_bucket,
+        access_key_id=settings.image_s3_access_key_id,
+        secret_access_key=settings.image_s3_secret_access_key,
+        region=settings.image_s3_region,
+        addressing_style=settings.image_s3_addressing_style,
+    )
+    return S3ImageStorage(
+        client,
+        local_copy_dir=settings.image_s3_local_copy_dir,
+        local_copy_max_bytes=settings.image_s3_local_copy_max_bytes,
+        key_prefix=settings.image_s3_key_prefix,
+        presign_expires_seconds=settings.image_s3_presign_expires_seconds,
+        part_bytes=settings.image_s3_multipart_part_bytes,
+    )
+
+
 _security = HTTPBearer(auto_error=False)
 
+_cache_settings = CacheSettings()
+_cache = _build_cache(_cache_settings)
+# Entries are invalidated by library version, see SearchResultCache.
+_search_cache = SearchResultCache(
+    _cache, ttl_seconds=_cache_settings.search_cache_ttl_seconds
+)
+# Evicts keys staled by a commit from the cache of every worker.
+_invalidation_bus = CacheInvalidationBus(_cache, engine)
+_invalidation_bus.attach(SessionLocal)
+_invalidation_bus.attach(AsyncBridgeSession)
+_share_events = ShareEventBroker()
+_invalidation_bus.subscribe(_share_events.publish_keys)
+_image_settings = ImageSettings()
+_image_storage = _build_image_storage(_image_settings)
+_image_variants = DiskImageVariantCache(
+    _image_settings.image_variant_cache_dir,
+    max_bytes=_image_settings.image_variant_cache_max_bytes,
+)
+_image_normalizer = PillowImageNormalizer(
+    _image_settings.image_normalize_max_dimension,
+    _image_settings.image_normalize_format,
+    _image_settings.image_normalize_quality,
+    _image_settings.image_normalize_workers,
+    reencode=_image_settings.image_normalize,
+    max_pixels=_image_settings.image_normalize_max_pixels,
+)
+_image_gc = ImageGarbageCollector(
+    SessionLocal,
+    _image_storage,
+    grace_seconds=_image_settings.image_gc_grace_seconds,
+    batch_size=_image_settings.image_gc_batch_size,
+    interval_seconds=_image_settings.image_gc_interval_seconds,
+)
+_file_sender = FileSender(
+    _image_settings.image_accel_redirect_prefix,
+    {
+        "images": _image_settings.image_storage_dir,
+        "image_cache": _image_settings.image_variant_cache_dir,
+    },
+)
+
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class ServiceRunner:
+    """Run blocking service calls without stalling the event loop.
 
-def get_db() -> Generator[Session]:
+    By default calls go to Starlette's thread pool. With ``DATABASE_ASYNC`` they
+    run inside ``AsyncSession.run_sync``: the repositories' queries are awaited
+    on the event loop through asyncpg, so concurrency is no longer capped by the
+    size of the thread pool. Adapters doing any other blocking I/O (files, cache
+    server, Google certificates, Pillow) go through
+    :func:`~miam.infra.blocking.run_blocking` to stay off the loop.
+    """
+
+    def __init__(self, session: AsyncSession | None = None) -> None:
+        self.session = session
+
+    async def run(self, fn: Callable[P, T], /, *args: P.args, **kwargs: P.kwargs) -> T:
+        """Call ``fn`` with the given arguments and return its result."""
+        if self.session is None:
+            return await run_in_threadpool(fn, *args, **kwargs)
+        return await self.session.run_sync(lambda _session: fn(*args, **kwargs))
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession | None]:
+    """Yield the request's async session, or None when async mode is disabled."""
+    if AsyncSessionLocal is None:
+        yield None
+        return
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def get_sync_db() -> Generator[Session]:
+    """Yield a thread-bound session, for routes doing heavy non-database work."""
     db = SessionLocal()
     try:
         yield db
@@ -51,10 +282,78 @@ def get_db() -> Generator[Session]:
         db.close()
 
 
+# Set after a write: the client's reads stay on the primary until it expires.
+PRIMARY_PIN_COOKIE = "miam_read_primary"
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _route_reads(db: Session, request: Request, response: Response) -> None:
+    """Pin the session to the primary for writes and shortly after them."""
+    if not replica_available(db):
+        return
+    if request.method not in _SAFE_METHODS:
+        pin_to_primary(db)
+        response.set_cookie(
+            key=PRIMARY_PIN_COOKIE,
+            value="1",
+            max_age=max(1, int(alembic_config.db_read_pin_seconds)),
+            httponly=True,
+            secure=True,
+            samesite="lax",
+            path="/api",
+        )
+    elif PRIMARY_PIN_COOKIE in request.cookies:
+        pin_to_primary(db)
+
+
+def get_db(
+    request: Request,
+    response: Response,
+    async_db: AsyncSession | None = Depends(get_async_db),  # noqa: B008
+) -> Generator[Session]:
+    """Yield the session that services must only use through :class:`ServiceRunner`.
+
+    Read-only queries may go to the read replica, see :mod:`miam.infra.db.routing`.
+    """
+    db = async_db.sync_session if async_db is not None else SessionLocal()
+    _route_reads(db, request, response)
+    try:
+        yield db
+    finally:
+        if async_db is None:
+            db.close()
+
+
+def get_service_runner(
+    async_db: AsyncSession | None = Depends(get_async_db),  # noqa: B008
+) -> ServiceRunner:
+    return ServiceRunner(async_db)
+
+
 def get_auth_settings() -> AuthSettings:
     return AuthSettings()
 
 
+def get_internal_settings() -> InternalSettings:
+    return InternalSettings()
+
+
+def require_internal_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_security),  # noqa: B008
+    settings: InternalSettings = Depends(get_internal_settings),  # noqa: B008
+) -> None:
+    """Reject requests to internal endpoints that lack the internal API token."""
+    if not settings.internal_api_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    token = credentials.credentials if credentials else ""
+    if not hmac.compare_digest(token.encode(), settings.internal_api_token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid internal API token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
 def _get_jwt_handler(settings: AuthSettings) -> JwtTokenHandler:
     return JwtTokenHandler(
         secret_key=settings.jwt_secret_key,
@@ -77,10 +376,11 @@ def get_auth_service(
     )
 
 
-def get_current_user_id(
+async def get_current_user_id(
     credentials: HTTPAuthorizationCredentials | None = Depends(_security),  # noqa: B008
     miam_auth_token: str | None = Cookie(default=None),  # noqa: B008
     auth_service: AuthService = Depends(get_auth_service),  # noqa: B008
+    runner: ServiceRunner = Depends(get_service_runner),  # noqa: B008
 ) -> UUID:
     """Extract and validate the JWT from the HttpOnly cookie or Authorization header."""
     token = miam_auth_token or (credentials.credentials if credentials else None)
@@ -91,7 +391,7 @@ def get_current_user_id(
             headers={"WWW-Authenticate": "Bearer"},
         )
     try:
-        return auth_service.validate_token(token)
+        return await runner.run(auth_service.validate_token, token)
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -100,13 +400,118 @@ def get_current_user_id(
         ) from exc
 
 
+def get_image_url_signer(
+    settings: AuthSettings = Depends(get_auth_settings),  # noqa: B008
+) -> ImageUrlSignerPort:
+    return HmacImageUrlSigner(
+        _image_settings.image_url_secret_key or settings.jwt_secret_key,
+        window_seconds=_image_settings.image_url_window_seconds,
+    )
+
+
+async def get_image_access(
+    image_id: UUID,
+    expires: int | None = Query(default=None),  # noqa: B008
+    signature: str | None = Query(default=None, alias="sig"),  # noqa: B008
+    content_hash: str | None = Query(default=None, alias="hash"),  # noqa: B008
+    extension: str | None = Query(default=None, alias="ext"),  # noqa: B008
+    signer: ImageUrlSignerPort = Depends(get_image_url_signer),  # noqa: B008
+    credentials: HTTPAuthorizationCredentials | None = Depends(_security),  # noqa: B008
+    miam_auth_token: str | None = Cookie(default=None),  # noqa: B008
+    auth_service: AuthService = Depends(get_auth_service),  # noqa: B008
+    runner: ServiceRunner = Depends(get_service_runner),  # noqa: B008
+) -> UUID | ImageGrant:
+    """Return the grant of a signed image URL, else the authenticated user.
+
+    Signed URLs are checked without touching the database: the token is only
+    validated for unsigned requests.
+    """
+    if signature is None or expires is None:
+        return await get_current_user_id(
+            credentials, miam_auth_token, auth_service, runner
+        )
+    grant = ImageGrant(
+        image_id=image_id,
+        extension=extension,
+        content_hash=content_hash,
+        expires=expires,
+        signature=signature,
+    )
+    if not signer.verify(grant):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired image URL",
+        )
+    return grant
+
+
+def get_image_settings() -> ImageSettings:
+    return _image_settings
+
+
+def get_file_sender() -> FileSender:
+    return _file_sender
+
+
+def get_image_garbage_collector() -> ImageGarbageCollector:
+    return _image_gc
+
+
+def get_cache() -> CachePort:
+    return _cache
+
+
+def get_search_cache() -> SearchResultCache:
+    return _search_cache
+
+
+def get_invalidation_bus() -> CacheInvalidationBus:
+    return _invalidation_bus
+
+
+def get_share_event_broker() -> ShareEventBroker:
+    return _share_events
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Create the pooled client of the worker's outgoing requests.
+
+    Opened and closed by the application lifespan, it keeps connections to the
+    Instagram CDN alive from one image download to the next.
+    """
+    return httpx.AsyncClient(
+        timeout=15.0,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=20, max_keepalive_connections=10, keepalive_expiry=60
+        ),
+    )
+
+
+def get_http_client(request: Request) -> httpx.AsyncClient:
+    client: httpx.AsyncClient = request.app.state.http_client
+    return client
+
+
 def get_recipe_management_service(
     db: Session = Depends(get_db),  # noqa: B008
+    search_cache: SearchResultCache = Depends(get_search_cache),  # noqa: B008
+    cache: CachePort = Depends(get_cache),  # noqa: B008
 ) -> RecipeManagementService:
-    repo = RecipeRepository(db)
-    image_storage = LocalImageStorage("images")
+    repo = RecipeRepository(
+        db,
+        search_cache=search_cache,
+        version_cache=cache,
+        version_cache_ttl_seconds=_cache_settings.library_version_cache_ttl_seconds,
+    )
     share_repo = RecipeShareRepository(db)
-    return RecipeManagementService(repo, image_storage, share_repo)
+    return RecipeManagementService(
+        repo,
+        _image_storage,
+        share_repo,
+        image_variants=_image_variants,
+        image_normalizer=_image_normalizer,
+    )
 
 
 def get_recipe_share_service(
@@ -119,17 +524,18 @@ def get_recipe_share_service(
 
 
 def get_recipe_export_service(
-    db: Session = Depends(get_db),  # noqa: B008
+    db: Session = Depends(get_sync_db),  # noqa: B008
 ) -> RecipeExportService:
     repo = RecipeRepository(db)
-    image_storage = LocalImageStorage("images")
-    word_exporter = WordExporter(image_storage=image_storage)
-    markdown_exporter = MarkdownExporter(image_storage=image_storage)
+    word_exporter = WordExporter(
+        image_storage=_image_storage, image_variants=_image_variants
+    )
+    markdown_exporter = MarkdownExporter(image_storage=_image_storage)
     return RecipeExportService(repo, word_exporter, markdown_exporter)
 
 
 def get_recipe_import_service(
-    db: Session = Depends(get_db),  # noqa: B008
+    db: Session = Depends(get_sync_db),  # noqa: B008
 ) -> RecipeImportService:
     return RecipeImportService(
         instagram_parser=InstagramParser(),
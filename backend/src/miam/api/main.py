@@ -1,11 +1,28 @@
 """Entrypoint for the FastAPI application."""
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from miam import __version__
-from miam.api.routes import auth, export, images, import_recipes, recipes, root, shares
+from miam.api.deps import (
+    create_http_client,
+    get_image_garbage_collector,
+    get_invalidation_bus,
+)
+from miam.api.routes import (
+    auth,
+    export,
+    images,
+    import_recipes,
+    internal,
+    recipes,
+    root,
+    shares,
+)
 
 
 class CorsSettings(BaseSettings):
@@ -19,7 +36,26 @@ class CorsSettings(BaseSettings):
     )
 
 
-app = FastAPI(title="Livre Recettes", version=__version__)
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Run the worker's background threads and its HTTP client pool.
+
+    The threads listen for cache invalidations and sweep orphaned image files.
+    """
+    bus = get_invalidation_bus()
+    image_gc = get_image_garbage_collector()
+    bus.start()
+    image_gc.start()
+    try:
+        async with create_http_client() as http_client:
+            app.state.http_client = http_client
+            yield
+    finally:
+        image_gc.stop()
+        bus.stop()
+
+
+app = FastAPI(title="Livre Recettes", version=__version__, lifespan=lifespan)
 
 cors_settings = CorsSettings()
 
@@ -42,3 +78,4 @@ api_router.include_router(shares.router)
 
 app.include_router(api_router)
 app.include_router(root.router)
+app.include_router(internal.router)
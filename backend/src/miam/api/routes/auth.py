@@ -7,9 +7,11 @@ from fastapi import APIRouter, Depends, HTTPException, Response, status
 
 from miam.api.deps import (
     AuthSettings,
+    ServiceRunner,
     get_auth_service,
     get_auth_settings,
     get_current_user_id,
+    get_service_runner,
 )
 from miam.domain.schemas import GoogleLoginRequest, TokenResponse
 from miam.domain.services import AuthService
@@ -34,15 +36,16 @@ def _set_auth_cookie(response: Response, token: str, max_age: int) -> None:
 
 
 @router.post("/google")
-def login_google(
+async def login_google(
     request: GoogleLoginRequest,
     response: Response,
     service: Annotated[AuthService, Depends(get_auth_service)],
     settings: Annotated[AuthSettings, Depends(get_auth_settings)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> TokenResponse:
     """Authenticate with a Google ID token and return a JWT."""
     try:
-        token = service.login_with_google(request.id_token)
+        token = await runner.run(service.login_with_google, request.id_token)
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail=str(exc)
@@ -18,9 +18,8 @@ def export_to_markdown(
     service: Annotated[RecipeExportService, Depends(get_recipe_export_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
 ) -> StreamingResponse:
-    zip_bytes = service.export_recipes_to_markdown(user_id)
     return StreamingResponse(
-        io.BytesIO(zip_bytes),
+        service.export_recipes_to_markdown(user_id),
         media_type="application/zip",
         headers={"Content-Disposition": 'attachment; filename="recipes.zip"'},
     )
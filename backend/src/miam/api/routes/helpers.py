@@ -1,8 +1,24 @@
 """Helpers functions."""
 
+import os
+import tempfile
 import uuid
+from collections.abc import Mapping
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import IO
+from urllib.parse import quote, urlencode
 
-from fastapi import UploadFile
+import httpx
+from fastapi import HTTPException, Response, UploadFile
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+
+from miam.domain.entities import ImageGrant
+
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+_SPOOL_CHUNK_BYTES = 64 * 1024
 
 
 def get_filename(image: UploadFile) -> str:
@@ -22,3 +38,151 @@ def get_filename(image: UploadFile) -> str:
     extension = image.content_type.split("/")[-1]
     # Generate a unique filename
     return f"{uuid.uuid4().hex}.{extension}"
+
+
+def signed_image_url(grant: ImageGrant) -> str:
+    """Return the signed URL of an image, relative to the API root (``images/…``).
+
+    Its query parameters are read back by :func:`miam.api.deps.get_image_access`.
+    Clients may add the variant parameters (``w``, ``format``).
+    """
+    params: dict[str, str | int] = {"expires": grant.expires}
+    if grant.content_hash is not None:
+        params["hash"] = grant.content_hash
+    if grant.extension is not None:
+        params["ext"] = grant.extension
+    params["sig"] = grant.signature
+    return f"images/{grant.image_id}?{urlencode(params)}"
+
+
+class FileSender:
+    """Build the responses that send local files.
+
+    By default the worker streams the bytes itself. With an ``accel_prefix``,
+    it only sends headers, with ``X-Accel-Redirect`` naming the file under an
+    internal nginx location, and nginx sends the bytes: a file of the folder
+    ``accel_folders[name]`` is found at ``{accel_prefix}/{name}/...``. Files
+    outside these folders are still streamed by the worker.
+    """
+
+    def __init__(
+        self, accel_prefix: str = "", accel_folders: Mapping[str, str] | None = None
+    ) -> None:
+        """Stream files, or hand the files of ``accel_folders`` over to nginx."""
+        self.accel_prefix = accel_prefix.rstrip("/")
+        self._roots = [
+            (Path(folder).resolve(), name)
+            for name, folder in (accel_folders or {}).items()
+        ]
+
+    def accel_uri(self, path: Path) -> str | None:
+        """Return the internal nginx URI of a file, or None if nginx cannot send it."""
+        if not self.accel_prefix:
+            return None
+        resolved = path.resolve()
+        for root, name in self._roots:
+            if resolved.is_relative_to(root):
+                relative = resolved.relative_to(root).as_posix()
+                return f"{self.accel_prefix}/{name}/{quote(relative)}"
+        return None
+
+    def response(
+        self, path: Path, media_type: str | None, headers: Mapping[str, str]
+    ) -> Response:
+        """Return a response sending the file at ``path``."""
+        uri = self.accel_uri(path)
+        if uri is None:
+            return FileResponse(path=path, media_type=media_type, headers=headers)
+        # nginx keeps Content-Type and Cache-Control; the internal location
+        # copies the other headers from the upstream response.
+        return Response(
+            media_type=media_type, headers={**headers, "X-Accel-Redirect": uri}
+        )
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check whether an ``If-None-Match`` header matches the given entity tag.
+
+    Uses the weak comparison mandated by RFC 9110 for ``If-None-Match``: the
+    ``W/`` prefix is ignored on both sides, and ``*`` matches any tag.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def not_modified(
+    if_none_match: str | None,
+    if_modified_since: str | None,
+    etag: str | None,
+    last_modified: datetime | None,
+) -> bool:
+    """Check whether a conditional GET can be answered with 304 Not Modified.
+
+    Follows RFC 9110, section 13.2.2: ``If-Modified-Since`` is only evaluated
+    without ``If-None-Match``, and is ignored when its date cannot be parsed.
+    """
+    if if_none_match:
+        return etag is not None and etag_matches(if_none_match, etag)
+    if not if_modified_since or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=UTC)
+    # HTTP dates have a one-second resolution.
+    return last_modified.replace(microsecond=0) <= since
+
+
+async def open_upload(upload: UploadFile, max_bytes: int) -> IO[bytes]:
+    """Return the file of an upload, rewound, once its size is checked.
+
+    Starlette has already spooled the multipart body to a temporary file while
+    parsing the form, so that file goes to storage as is, without a second
+    copy. Raises 413 when it holds more than ``max_bytes``; the request body
+    as a whole is bounded by the reverse proxy.
+    """
+    size = upload.size
+    if size is None:
+        size = await run_in_threadpool(upload.file.seek, 0, os.SEEK_END)
+    if size > max_bytes:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Image too large (max {max_bytes // (1024 * 1024)} MB)",
+        )
+    await upload.seek(0)
+    return upload.file
+
+
+async def spool_download(response: httpx.Response, max_bytes: int) -> IO[bytes]:
+    """Copy a streamed response body to a temporary file, chunk by chunk.
+
+    Raises 413 as soon as the announced or received size exceeds ``max_bytes``:
+    the rest of the body is never downloaded. Writes run in a worker thread.
+    The caller closes the returned file, which deletes it.
+    """
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Image too large (max {max_bytes // (1024 * 1024)} MB)",
+    )
+    content_length = response.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        raise too_large
+    spooled = tempfile.TemporaryFile()
+    try:
+        size = 0
+        async for chunk in response.aiter_bytes(_SPOOL_CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                raise too_large
+            await run_in_threadpool(spooled.write, chunk)
+        await run_in_threadpool(spooled.seek, 0)
+    except BaseException:
+        spooled.close()
+        raise
+    return spooled
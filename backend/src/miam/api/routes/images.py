@@ -1,17 +1,51 @@
 """API routes for managing images."""
 
+import asyncio
 import logging
-from typing import Annotated
+import time
+from contextlib import ExitStack
+from datetime import UTC, datetime
+from email.utils import format_datetime
+from typing import IO, Annotated, Literal
 from urllib.parse import urlparse
 from uuid import UUID
 
 import httpx
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import RedirectResponse
+from pydantic import BaseModel, Field
 
-from miam.api.deps import get_current_user_id, get_recipe_management_service
+from miam.api.deps import (
+    ImageSettings,
+    ServiceRunner,
+    get_current_user_id,
+    get_file_sender,
+    get_http_client,
+    get_image_access,
+    get_image_settings,
+    get_recipe_management_service,
+    get_service_runner,
+)
+from miam.api.routes.helpers import (
+    MAX_IMAGE_BYTES,
+    FileSender,
+    not_modified,
+    open_upload,
+    spool_download,
+)
+from miam.domain.entities import ImageGrant, ImageUpload
 from miam.domain.services import RecipeManagementService
+from miam.infra.db.ids import uuid7_timestamp_ms
 
 logger = logging.getLogger(__name__)
 
@@ -48,21 +82,19 @@ async def upload_image(
     image: Annotated[UploadFile, File()],
     service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> ImageUploadResponse:
     if not image.filename:
         raise HTTPException(
             status_code=400, detail="Uploaded image must have an original filename"
         )
 
-    # Validate file size (max 5 MB)
-    content = await image.read()
-    max_size = 5 * 1024 * 1024  # 5 MB in bytes
-    if len(content) > max_size:
-        raise HTTPException(status_code=413, detail="Image too large (max 5 MB)")
-
-    # Save image via service
+    # Enforce the size limit (max 5 MB), then let the service copy the file
+    # Starlette spooled to storage in chunks.
+    content = await open_upload(image, MAX_IMAGE_BYTES)
     try:
-        image_id = service.add_recipe_image(
+        image_id = await runner.run(
+            service.add_recipe_image,
             recipe_id=recipe_id,
             user_id=user_id,
             content=content,
@@ -76,90 +108,304 @@ async def upload_image(
     )
 
 
+MAX_IMAGES_PER_UPLOAD = 50
+
+
+class ImageUploadResult(BaseModel):
+    title: str
+    image_id: UUID | None = None
+    error: str | None = None
+
+
+class ImageUploadBatchResponse(BaseModel):
+    recipe: UUID
+    results: list[ImageUploadResult]
+
+
+@router.post("/batch")
+async def upload_images(
+    recipe_id: Annotated[UUID, Form()],
+    images: Annotated[list[UploadFile], File()],
+    service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
+) -> ImageUploadBatchResponse:
+    """Attach many uploaded images to a recipe, in one transaction.
+
+    Each file succeeds or fails on its own; the response reports the image ID
+    or the error of every file, in upload order.
+    """
+    if len(images) > MAX_IMAGES_PER_UPLOAD:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many images (max {MAX_IMAGES_PER_UPLOAD} per upload)",
+        )
+    # Checked once, before any file is handed to the service.
+    try:
+        await runner.run(service.check_edit_access, recipe_id, user_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=403, detail=str(exc)) from None
+    results = [
+        ImageUploadResult(title=image.filename or "untitled") for image in images
+    ]
+    uploads: list[tuple[int, ImageUpload]] = []
+    for index, image in enumerate(images):
+        if not image.filename:
+            results[index].error = "Uploaded image must have an original filename"
+            continue
+        try:
+            content = await open_upload(image, MAX_IMAGE_BYTES)
+        except HTTPException as exc:
+            results[index].error = str(exc.detail)
+            continue
+        uploads.append((index, ImageUpload(recipe_id, content, image.filename)))
+    added = await runner.run(
+        service.add_recipe_images, [upload for _, upload in uploads], user_id
+    )
+    for (index, _), outcome in zip(uploads, added, strict=True):
+        if isinstance(outcome, UUID):
+            results[index].image_id = outcome
+        else:
+            results[index].error = outcome
+    return ImageUploadBatchResponse(recipe=recipe_id, results=results)
+
+
 class ImageFromUrlRequest(BaseModel):
     recipe_id: UUID
     url: str
 
 
-@router.post("/from-url", status_code=201)
-async def upload_image_from_url(
-    body: ImageFromUrlRequest,
-    service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
-    user_id: Annotated[UUID, Depends(get_current_user_id)],
-) -> ImageUploadResponse:
-    """Download an image from a URL and attach it to a recipe."""
-    if not _is_allowed_image_url(body.url):
+class ImageFromUrlBatchRequest(BaseModel):
+    items: list[ImageFromUrlRequest] = Field(min_length=1, max_length=500)
+
+
+class ImageFromUrlResult(BaseModel):
+    recipe_id: UUID
+    url: str
+    image_id: UUID | None = None
+    error: str | None = None
+
+
+class ImageFromUrlBatchResponse(BaseModel):
+    results: list[ImageFromUrlResult]
+
+
+async def _download_image(
+    http_client: httpx.AsyncClient, url: str
+) -> tuple[IO[bytes], str]:
+    """Download an image to a temporary file; return it with a filename.
+
+    Raises HTTPException when the URL is not allowed, the download fails or the
+    response is not an image of acceptable size. The caller closes the file.
+    """
+    if not _is_allowed_image_url(url):
         raise HTTPException(
             status_code=400,
             detail="Only Instagram CDN URLs (*.cdninstagram.com) are allowed",
         )
 
-    max_size = 5 * 1024 * 1024
+    # Stream the body to a temporary file, aborting the download as soon as
+    # the size limit is exceeded.
     try:
-        async with httpx.AsyncClient(timeout=15.0, follow_redirects=True) as client:
-            resp = await client.get(body.url)
+        async with http_client.stream("GET", url) as resp:
             resp.raise_for_status()
+            content_type = resp.headers.get("content-type", "")
+            if not content_type.startswith("image/"):
+                raise HTTPException(
+                    status_code=400, detail="URL did not return an image"
+                )
+            content = await spool_download(resp, MAX_IMAGE_BYTES)
     except httpx.HTTPError as exc:
-        logger.warning("Failed to download image from %s: %s", body.url, exc)
+        logger.warning("Failed to download image from %s: %s", url, exc)
         raise HTTPException(
             status_code=400, detail="Failed to download image from the provided URL"
         ) from exc
 
-    content_type = resp.headers.get("content-type", "")
-    if not content_type.startswith("image/"):
-        raise HTTPException(status_code=400, detail="URL did not return an image")
-
-    content = resp.content
-    if len(content) > max_size:
-        raise HTTPException(status_code=413, detail="Image too large (max 5 MB)")
-
     ext = content_type.split("/")[-1].split(";")[0].strip()
-    filename = f"instagram.{ext}" if ext else "instagram.jpg"
+    return content, f"instagram.{ext}" if ext else "instagram.jpg"
 
-    try:
-        image_id = service.add_recipe_image(
-            recipe_id=body.recipe_id,
-            user_id=user_id,
-            content=content,
-            filename=filename,
-        )
-    except ValueError as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from None
+
+@router.post("/from-url", status_code=201)
+async def upload_image_from_url(
+    body: ImageFromUrlRequest,
+    service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
+    http_client: Annotated[httpx.AsyncClient, Depends(get_http_client)],
+) -> ImageUploadResponse:
+    """Download an image from a URL and attach it to a recipe."""
+    content, filename = await _download_image(http_client, body.url)
+    with content:
+        try:
+            image_id = await runner.run(
+                service.add_recipe_image,
+                recipe_id=body.recipe_id,
+                user_id=user_id,
+                content=content,
+                filename=filename,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from None
 
     return ImageUploadResponse(title=filename, recipe=body.recipe_id, image_id=image_id)
 
 
+@router.post("/from-url/batch")
+async def upload_images_from_urls(
+    body: ImageFromUrlBatchRequest,
+    service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
+    http_client: Annotated[httpx.AsyncClient, Depends(get_http_client)],
+    settings: Annotated[ImageSettings, Depends(get_image_settings)],
+) -> ImageFromUrlBatchResponse:
+    """Download images from many URLs and attach them to recipes, in one transaction.
+
+    Downloads run concurrently, at most ``IMAGE_DOWNLOAD_CONCURRENCY`` at a
+    time. Each item succeeds or fails on its own; the response reports the
+    image ID or the error of every item, in request order.
+    """
+    semaphore = asyncio.Semaphore(settings.image_download_concurrency)
+
+    async def download(url: str) -> tuple[IO[bytes], str] | str:
+        async with semaphore:
+            try:
+                return await _download_image(http_client, url)
+            except HTTPException as exc:
+                return str(exc.detail)
+
+    downloads = await asyncio.gather(*(download(item.url) for item in body.items))
+    results = [
+        ImageFromUrlResult(recipe_id=item.recipe_id, url=item.url)
+        for item in body.items
+    ]
+    with ExitStack() as stack:
+        uploads: list[tuple[int, ImageUpload]] = []
+        for index, (item, downloaded) in enumerate(
+            zip(body.items, downloads, strict=True)
+        ):
+            if isinstance(downloaded, str):
+                results[index].error = downloaded
+                continue
+            content, filename = downloaded
+            stack.enter_context(content)
+            uploads.append((index, ImageUpload(item.recipe_id, content, filename)))
+        added = await runner.run(
+            service.add_recipe_images, [upload for _, upload in uploads], user_id
+        )
+    for (index, _), outcome in zip(uploads, added, strict=True):
+        if isinstance(outcome, UUID):
+            results[index].image_id = outcome
+        else:
+            results[index].error = outcome
+    return ImageFromUrlBatchResponse(results=results)
+
+
 @router.delete("/{image_id}", status_code=204)
 async def delete_image(
     image_id: UUID,
     service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> None:
-    deleted = service.delete_recipe_image(image_id, user_id)
+    deleted = await runner.run(service.delete_recipe_image, image_id, user_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Image not found")
 
 
-@router.get("/{image_id}")
+_IMAGE_HEADERS = {
+    "Content-Security-Policy": "script-src 'none'",
+    "X-Content-Type-Options": "nosniff",
+    # `private` because authorization is per-user. Short max-age caps the
+    # staleness window after a share is revoked; ETags make subsequent
+    # revalidations cheap 304s.
+    "Cache-Control": "private, max-age=300, must-revalidate",
+}
+
+
+def _last_modified(image_id: UUID) -> datetime | None:
+    """Return when an image was created, from its UUIDv7 (None for older IDs).
+
+    The content of an image never changes, so this is also its last change.
+    """
+    if image_id.version != 7:
+        return None
+    return datetime.fromtimestamp(uuid7_timestamp_ms(image_id) / 1000, UTC)
+
+
+def _signed_headers(grant: ImageGrant) -> dict[str, str]:
+    """Headers of a response to a signed URL: cacheable by anyone until it expires."""
+    max_age = max(0, grant.expires - int(time.time()))
+    return {
+        **_IMAGE_HEADERS,
+        # The URL names immutable content and carries its own authorization.
+        "Cache-Control": f"public, max-age={max_age}, immutable",
+    }
+
+
+@router.get("/{image_id}", response_model=None)
 async def get_image(
     image_id: UUID,
     service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
-    user_id: Annotated[UUID, Depends(get_current_user_id)],
-) -> FileResponse:
-    resolved = service.get_recipe_image_path(image_id, user_id)
-    if not resolved:
-        raise HTTPException(status_code=404, detail="Image not found")
+    access: Annotated[UUID | ImageGrant, Depends(get_image_access)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
+    files: Annotated[FileSender, Depends(get_file_sender)],
+    w: Annotated[
+        int | None,
+        Query(ge=1, le=4096, description="Maximum width in pixels (never upscaled)"),
+    ] = None,
+    image_format: Annotated[Literal["webp"] | None, Query(alias="format")] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
+    if_modified_since: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Serve an image to its user, or to anyone holding a signed URL of it.
 
-    path, media_type = resolved
-    return FileResponse(
-        path=path,
-        media_type=media_type,
-        headers={
-            "Content-Security-Policy": "script-src 'none'",
-            "X-Content-Type-Options": "nosniff",
-            # `private` because authorization is per-user. Short max-age caps the
-            # staleness window after a share is revoked; FileResponse's ETag/
-            # Last-Modified make subsequent revalidations cheap 304s.
-            "Cache-Control": "private, max-age=300, must-revalidate",
-        },
-    )
+    Revalidations are answered with 304 from the stored content hash, without
+    reading the file or redirecting to the storage. Files sent by the API or by
+    nginx also answer ``Range`` requests with 206, so interrupted downloads can
+    be resumed; object storage does so itself once the client follows the
+    redirect.
+    """
+    base = _signed_headers(access) if isinstance(access, ImageGrant) else _IMAGE_HEADERS
+    if w is not None or image_format is not None:
+        # Resized/re-encoded copy, generated on first request and cached on disk.
+        try:
+            variant = await runner.run(
+                service.get_recipe_image_variant, image_id, access, w, image_format
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from None
+        if variant is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        headers = {**base, "ETag": variant.etag}
+        # No Last-Modified: a variant changes when the encoder settings do.
+        if not_modified(if_none_match, None, variant.etag, None):
+            return Response(status_code=304, headers=headers)
+        return files.response(variant.path, variant.media_type, headers)
+
+    location = await runner.run(service.locate_recipe_image, image_id, access)
+    if location is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    validators: dict[str, str] = {}
+    last_modified = None
+    if location.etag is not None:
+        # Legacy files without a content hash keep the validators derived
+        # from their modification time by whoever sends them.
+        validators["ETag"] = location.etag
+        last_modified = _last_modified(image_id)
+        if last_modified is not None:
+            validators["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    headers = {**base, **validators}
+    if not_modified(if_none_match, if_modified_since, location.etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    if location.url is not None:
+        # Presigned object storage URL: the client downloads the bytes from
+        # there. It expires, so the redirect itself must not be cached.
+        return RedirectResponse(
+            location.url,
+            status_code=307,
+            headers={**validators, "Cache-Control": "no-store"},
+        )
+    if location.path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return files.response(location.path, location.media_type, headers)
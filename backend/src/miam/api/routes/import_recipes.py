@@ -6,6 +6,7 @@ from typing import Annotated
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, ValidationError
 
 from miam.api.deps import get_current_user_id, get_recipe_import_service
@@ -69,5 +70,5 @@ async def parse_instagram(
             detail=exc.errors(),
         ) from exc
 
-    parsed = service.parse_instagram(payload, _user_id)
+    parsed = await run_in_threadpool(service.parse_instagram, payload, _user_id)
     return ParsedInstagramResponse(recipes=parsed)
@@ -0,0 +1,42 @@
+"""Internal operational endpoints.
+
+Mounted outside ``/api``, so the frontend's reverse proxy does not forward
+them. The backend port may still be published, as in ``docker-compose.yml``:
+every request must bear ``INTERNAL_API_TOKEN``, and the endpoints answer 404
+while it is unset.
+"""
+
+from dataclasses import asdict
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends
+
+from miam.api.deps import get_image_garbage_collector, require_internal_token
+from miam.infra.db.pool import pool_stats
+from miam.infra.db.session import async_engine, engine
+from miam.infra.image_gc import ImageGarbageCollector
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+
+
+@router.get("/db-pool")
+def get_db_pool_stats() -> dict[str, dict[str, float | int]]:
+    """Connection pool gauges (occupancy, checkout wait times, timeouts) per engine."""
+    stats = {"sync": pool_stats(engine)}
+    if async_engine is not None:
+        stats["async"] = pool_stats(async_engine.sync_engine)
+    return stats
+
+
+@router.get("/image-gc")
+def get_image_gc_report(
+    image_gc: Annotated[ImageGarbageCollector, Depends(get_image_garbage_collector)],
+) -> dict[str, Any] | None:
+    """Outcome of this worker's last sweep of orphaned image files, if any."""
+    report = image_gc.last_report
+    return asdict(report) if report is not None else None
@@ -4,21 +4,60 @@ from datetime import datetime
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Path,
+    Query,
+    Response,
+    status,
+)
 from pydantic import BaseModel
 
 from miam.api.deps import (
+    ServiceRunner,
     get_current_user_id,
+    get_image_url_signer,
     get_recipe_management_service,
     get_recipe_share_service,
+    get_service_runner,
 )
-from miam.domain.entities import RecipeEntity
+from miam.api.routes.helpers import etag_matches, signed_image_url
+from miam.domain.entities import PaginatedResult, RecipeEntity
+from miam.domain.ports_secondary import ImageUrlSignerPort
 from miam.domain.schemas import BatchRecipeCreate, RecipeCreate, RecipeUpdate
 from miam.domain.services import RecipeManagementService, RecipeShareService
 
 router = APIRouter(prefix="/recipes", tags=["recipes"])
 
 
+# Clients must revalidate every time; unchanged resources cost a cheap 304.
+_REVALIDATE = "private, no-cache"
+
+
+def _check_not_modified(
+    response: Response, etag: str, if_none_match: str | None
+) -> None:
+    """Set validator headers, and short-circuit with 304 if the client copy is fresh."""
+    headers = {"ETag": etag, "Cache-Control": _REVALIDATE}
+    if etag_matches(if_none_match, etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+
+async def _library_etag(
+    runner: ServiceRunner,
+    service: RecipeManagementService,
+    user_id: UUID,
+    signer: ImageUrlSignerPort,
+) -> str:
+    version = await runner.run(service.get_library_version, user_id)
+    # Cached copies embed signed image URLs: renew them with the URLs.
+    return f'W/"{user_id}-{version}-{signer.window()}"'
+
+
 class RecipeResponse(BaseModel):
     id: UUID
 
@@ -28,14 +67,17 @@ class BatchRecipeResponse(BaseModel):
 
 
 @router.post("/batch", status_code=status.HTTP_201_CREATED)
-def create_recipes(
+async def create_recipes(
     batch_in: BatchRecipeCreate,
     service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> BatchRecipeResponse:
     """Create multiple recipes in a single atomic operation."""
     try:
-        recipes = service.create_recipes(batch_in.recipes, owner_id=user_id)
+        recipes = await runner.run(
+            service.create_recipes, batch_in.recipes, owner_id=user_id
+        )
         return BatchRecipeResponse(ids=[r.id for r in recipes])
     except ValueError as exc:
         raise HTTPException(
@@ -44,14 +86,15 @@ def create_recipes(
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
-def create_recipe(
+async def create_recipe(
     recipe_in: RecipeCreate,
     service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> RecipeResponse:
     """Create a new recipe."""
     try:
-        recipe = service.create_recipe(recipe_in, owner_id=user_id)
+        recipe = await runner.run(service.create_recipe, recipe_in, owner_id=user_id)
         return RecipeResponse(id=recipe.id)
     except ValueError as exc:
         raise HTTPException(
@@ -70,6 +113,10 @@ class ImageDetailResponse(BaseModel):
     id: UUID
     caption: str | None = None
     display_order: int = 0
+    # Signed URL relative to the API root, fetched without authentication.
+    url: str | None = None
+    # Data URI of a few-pixel version, to show blurred until the image loads.
+    placeholder: str | None = None
 
 
 class SourceResponse(BaseModel):
@@ -106,9 +153,29 @@ class PaginatedRecipeResponse(BaseModel):
     total: int
     limit: int | None = None
     offset: int = 0
+    # Pass as `after` to fetch the next page; None on the last page.
+    next_after: UUID | None = None
 
 
-def map_recipe_to_response(recipe: RecipeEntity) -> RecipeDetailResponse:
+def _paginated_response(
+    result: PaginatedResult,
+    limit: int | None,
+    offset: int,
+    signer: ImageUrlSignerPort | None = None,
+) -> PaginatedRecipeResponse:
+    has_more = limit is not None and len(result.items) == limit
+    return PaginatedRecipeResponse(
+        items=[map_recipe_to_response(r, signer) for r in result.items],
+        total=result.total,
+        limit=limit,
+        offset=offset,
+        next_after=result.items[-1].id if has_more else None,
+    )
+
+
+def map_recipe_to_response(
+    recipe: RecipeEntity, signer: ImageUrlSignerPort | None = None
+) -> RecipeDetailResponse:
     return RecipeDetailResponse(
         id=recipe.id,
         title=recipe.title,
@@ -139,6 +206,8 @@ def map_recipe_to_response(recipe: RecipeEntity) -> RecipeDetailResponse:
                 id=img.id,
                 caption=img.caption,
                 display_order=img.display_order,
+                url=signed_image_url(signer.sign(img)) if signer else None,
+                placeholder=img.placeholder,
             )
             for img in recipe.images
         ],
@@ -156,9 +225,12 @@ def map_recipe_to_response(recipe: RecipeEntity) -> RecipeDetailResponse:
 
 
 @router.get("/search")
-def search_recipes(
+async def search_recipes(
+    response: Response,
     service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
+    signer: Annotated[ImageUrlSignerPort, Depends(get_image_url_signer)],
     recipe_id: Annotated[UUID | None, Query()] = None,
     title: Annotated[str | None, Query()] = None,
     category: Annotated[str | None, Query()] = None,
@@ -167,52 +239,72 @@ def search_recipes(
     limit: Annotated[int | None, Query(ge=1, le=100)] = None,
     offset: Annotated[int, Query(ge=0)] = 0,
     ownership: Annotated[str | None, Query()] = None,
+    after: Annotated[UUID | None, Query()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
 ) -> PaginatedRecipeResponse:
-    """Search recipes with optional filters and pagination."""
-    result = service.search_recipes(
-        user_id=user_id,
-        recipe_id=recipe_id,
-        title=title,
-        category=category,
-        is_veggie=is_veggie,
-        season=season,
-        limit=limit,
-        offset=offset,
-        ownership=ownership,
-    )
-    return PaginatedRecipeResponse(
-        items=[map_recipe_to_response(r) for r in result.items],
-        total=result.total,
-        limit=limit,
-        offset=offset,
-    )
+    """Search recipes with optional filters and offset or keyset (`after`) pagination."""
+    etag = await _library_etag(runner, service, user_id, signer)
+    _check_not_modified(response, etag, if_none_match)
+    try:
+        result = await runner.run(
+            service.search_recipes,
+            user_id=user_id,
+            recipe_id=recipe_id,
+            title=title,
+            category=category,
+            is_veggie=is_veggie,
+            season=season,
+            limit=limit,
+            offset=offset,
+            ownership=ownership,
+            after=after,
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+    return _paginated_response(result, limit, offset, signer)
 
 
 @router.get("/{recipe_id}")
-def get_recipe(
+async def get_recipe(
     recipe_id: Annotated[UUID, Path(description="The ID of the recipe to retrieve")],
+    response: Response,
     service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
+    signer: Annotated[ImageUrlSignerPort, Depends(get_image_url_signer)],
+    if_none_match: Annotated[str | None, Header()] = None,
 ) -> RecipeDetailResponse:
-    recipe = service.get_recipe_by_id(recipe_id, user_id)
+    version = await runner.run(service.get_recipe_version, recipe_id, user_id)
+    if version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Recipe with id {recipe_id} not found",
+        )
+    etag = f'W/"{recipe_id}-{version}-{signer.window()}"'
+    _check_not_modified(response, etag, if_none_match)
+
+    recipe = await runner.run(service.get_recipe_by_id, recipe_id, user_id)
     if not recipe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Recipe with id {recipe_id} not found",
         )
 
-    return map_recipe_to_response(recipe)
+    return map_recipe_to_response(recipe, signer)
 
 
 @router.delete("/{recipe_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_recipe(
+async def delete_recipe(
     recipe_id: Annotated[UUID, Path(description="The ID of the recipe to delete")],
     service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> None:
     """Delete a recipe by ID. Only the owner can delete."""
     try:
-        deleted = service.delete_recipe(recipe_id, user_id)
+        deleted = await runner.run(service.delete_recipe, recipe_id, user_id)
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)
@@ -225,14 +317,16 @@ def delete_recipe(
 
 
 @router.put("/{recipe_id}")
-def update_recipe(
+async def update_recipe(
     recipe_in: RecipeUpdate,
     recipe_id: Annotated[UUID, Path(description="The ID of the recipe to replace")],
     service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
+    signer: Annotated[ImageUrlSignerPort, Depends(get_image_url_signer)],
 ) -> RecipeDetailResponse:
     try:
-        recipe = service.update_recipe(recipe_id, recipe_in, user_id)
+        recipe = await runner.run(service.update_recipe, recipe_id, recipe_in, user_id)
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
@@ -242,27 +336,39 @@ def update_recipe(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Recipe with id {recipe_id} not found",
         )
-    return map_recipe_to_response(recipe)
+    return map_recipe_to_response(recipe, signer)
 
 
 @router.get("")
-def get_recipes(
+async def get_recipes(
+    response: Response,
     service: Annotated[RecipeManagementService, Depends(get_recipe_management_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
+    signer: Annotated[ImageUrlSignerPort, Depends(get_image_url_signer)],
     limit: Annotated[int | None, Query(ge=1, le=100)] = None,
     offset: Annotated[int, Query(ge=0)] = 0,
     ownership: Annotated[str | None, Query()] = None,
+    after: Annotated[UUID | None, Query()] = None,
+    if_none_match: Annotated[str | None, Header()] = None,
 ) -> PaginatedRecipeResponse:
-    """Retrieve recipes with optional pagination."""
-    result = service.search_recipes(
-        user_id=user_id, limit=limit, offset=offset, ownership=ownership
-    )
-    return PaginatedRecipeResponse(
-        items=[map_recipe_to_response(r) for r in result.items],
-        total=result.total,
-        limit=limit,
-        offset=offset,
-    )
+    """Retrieve recipes with optional offset or keyset (`after`) pagination."""
+    etag = await _library_etag(runner, service, user_id, signer)
+    _check_not_modified(response, etag, if_none_match)
+    try:
+        result = await runner.run(
+            service.search_recipes,
+            user_id=user_id,
+            limit=limit,
+            offset=offset,
+            ownership=ownership,
+            after=after,
+        )
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
+        ) from exc
+    return _paginated_response(result, limit, offset, signer)
 
 
 class CollaboratorResponse(BaseModel):
@@ -274,14 +380,15 @@ class CollaboratorResponse(BaseModel):
 
 
 @router.get("/{recipe_id}/shares")
-def get_recipe_shares(
+async def get_recipe_shares(
     recipe_id: Annotated[UUID, Path()],
     service: Annotated[RecipeShareService, Depends(get_recipe_share_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> list[CollaboratorResponse]:
     """List collaborators for a recipe. Only the owner can view this."""
     try:
-        shares = service.get_recipe_shares(recipe_id, user_id)
+        shares = await runner.run(service.get_recipe_shares, recipe_id, user_id)
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)
@@ -1,18 +1,34 @@
 """API routes for recipe sharing operations."""
 
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
 from datetime import datetime
 from typing import Annotated
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, Path, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 
-from miam.api.deps import get_current_user_id, get_recipe_share_service
+from miam.api.deps import (
+    ServiceRunner,
+    get_current_user_id,
+    get_db,
+    get_recipe_share_service,
+    get_service_runner,
+    get_share_event_broker,
+)
 from miam.domain.schemas import ShareRecipeRequest
 from miam.domain.services import RecipeShareService
+from miam.infra.db.routing import pin_to_primary
+from miam.infra.share_events import ShareEventBroker
 
 router = APIRouter(prefix="/shares", tags=["shares"])
 
+# Comment lines keep proxies from closing idle streams (nginx defaults to 60s).
+_HEARTBEAT_SECONDS = 25.0
+
 
 class ShareResponse(BaseModel):
     id: UUID
@@ -40,14 +56,17 @@ class PendingShareCountResponse(BaseModel):
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
-def share_recipe(
+async def share_recipe(
     data: ShareRecipeRequest,
     service: Annotated[RecipeShareService, Depends(get_recipe_share_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> ShareResponse:
     """Share a recipe with another user by email."""
     try:
-        share = service.share_recipe(data.recipe_id, data.email, data.role, user_id)
+        share = await runner.run(
+            service.share_recipe, data.recipe_id, data.email, data.role, user_id
+        )
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
@@ -66,12 +85,13 @@ def share_recipe(
 
 
 @router.get("/pending")
-def get_pending_shares(
+async def get_pending_shares(
     service: Annotated[RecipeShareService, Depends(get_recipe_share_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> list[PendingShareResponse]:
     """List pending share invitations for the current user."""
-    shares = service.get_pending_shares(user_id)
+    shares = await runner.run(service.get_pending_shares, user_id)
     return [
         PendingShareResponse(
             id=s.id,
@@ -86,22 +106,83 @@ def get_pending_shares(
 
 
 @router.get("/pending/count")
-def get_pending_shares_count(
+async def get_pending_shares_count(
     service: Annotated[RecipeShareService, Depends(get_recipe_share_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> PendingShareCountResponse:
     """Count pending share invitations for the current user."""
-    count = service.get_pending_shares_count(user_id)
+    count = await runner.run(service.get_pending_shares_count, user_id)
     return PendingShareCountResponse(count=count)
 
 
+async def _pending_count_events(
+    changes: asyncio.Event,
+    count: Callable[[], Awaitable[int]],
+    heartbeat_seconds: float = _HEARTBEAT_SECONDS,
+) -> AsyncIterator[str]:
+    """Yield an SSE ``pending_count`` event now and after every change."""
+    last: int | None = None
+    while True:
+        changes.clear()
+        current = await count()
+        if current != last:
+            last = current
+            yield f'event: pending_count\ndata: {{"count": {current}}}\n\n'
+        while not changes.is_set():
+            try:
+                await asyncio.wait_for(changes.wait(), heartbeat_seconds)
+            except TimeoutError:
+                yield ": keepalive\n\n"
+
+
+@router.get("/events")
+async def stream_share_events(
+    service: Annotated[RecipeShareService, Depends(get_recipe_share_service)],
+    user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
+    db: Annotated[Session, Depends(get_db)],
+    broker: Annotated[ShareEventBroker, Depends(get_share_event_broker)],
+) -> StreamingResponse:
+    """Stream the pending share count as Server-Sent Events.
+
+    The count is sent on connect and whenever a share involving the user is
+    created, answered or removed, on any worker. Idle streams hold no database
+    connection and only send a keepalive comment every few seconds.
+    """
+
+    def count() -> int:
+        try:
+            return service.get_pending_shares_count(user_id)
+        finally:
+            # Hand the connection back to the pool between events.
+            db.close()
+
+    async def events() -> AsyncIterator[str]:
+        with broker.subscribe(user_id) as changes:
+            async for event in _pending_count_events(
+                changes, lambda: runner.run(count)
+            ):
+                yield event
+
+    # Counts follow commit notifications: a lagging replica would miss them.
+    pin_to_primary(db)
+    await runner.run(db.close)
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/accept-all")
-def accept_all_shares(
+async def accept_all_shares(
     service: Annotated[RecipeShareService, Depends(get_recipe_share_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> list[ShareResponse]:
     """Accept all pending share invitations."""
-    shares = service.accept_all_shares(user_id)
+    shares = await runner.run(service.accept_all_shares, user_id)
     return [
         ShareResponse(
             id=s.id,
@@ -119,14 +200,15 @@ def accept_all_shares(
 
 
 @router.post("/{share_id}/accept")
-def accept_share(
+async def accept_share(
     share_id: Annotated[UUID, Path()],
     service: Annotated[RecipeShareService, Depends(get_recipe_share_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> ShareResponse:
     """Accept a pending share invitation."""
     try:
-        share = service.accept_share(share_id, user_id)
+        share = await runner.run(service.accept_share, share_id, user_id)
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
@@ -145,14 +227,15 @@ def accept_share(
 
 
 @router.post("/{share_id}/reject")
-def reject_share(
+async def reject_share(
     share_id: Annotated[UUID, Path()],
     service: Annotated[RecipeShareService, Depends(get_recipe_share_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> ShareResponse:
     """Reject a pending share invitation."""
     try:
-        share = service.reject_share(share_id, user_id)
+        share = await runner.run(service.reject_share, share_id, user_id)
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc)
@@ -171,14 +254,15 @@ def reject_share(
 
 
 @router.delete("/{share_id}", status_code=status.HTTP_204_NO_CONTENT)
-def remove_share(
+async def remove_share(
     share_id: Annotated[UUID, Path()],
     service: Annotated[RecipeShareService, Depends(get_recipe_share_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> None:
     """Remove a share (owner revokes or shared user leaves)."""
     try:
-        deleted = service.remove_share(share_id, user_id)
+        deleted = await runner.run(service.remove_share, share_id, user_id)
     except ValueError as exc:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, detail=str(exc)
@@ -190,13 +274,14 @@ def remove_share(
 
 
 @router.delete("/recipe/{recipe_id}", status_code=status.HTTP_204_NO_CONTENT)
-def leave_recipe(
+async def leave_recipe(
     recipe_id: Annotated[UUID, Path()],
     service: Annotated[RecipeShareService, Depends(get_recipe_share_service)],
     user_id: Annotated[UUID, Depends(get_current_user_id)],
+    runner: Annotated[ServiceRunner, Depends(get_service_runner)],
 ) -> None:
     """Remove yourself from a shared recipe."""
-    deleted = service.leave_recipe(recipe_id, user_id)
+    deleted = await runner.run(service.leave_recipe, recipe_id, user_id)
     if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Share not found"
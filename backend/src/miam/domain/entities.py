@@ -3,6 +3,8 @@
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
+from pathlib import Path
+from typing import IO
 from uuid import UUID
 
 
@@ -70,6 +72,81 @@ class ImageEntity:
     id: UUID
     caption: str | None = None
     display_order: int = 0
+    # Locate the stored file without searching for it (None for legacy rows).
+    extension: str | None = None
+    media_type: str | None = None
+    # SHA-256 of the content, shared by images with identical bytes.
+    content_hash: str | None = None
+    # Data URI of a tiny version, shown blurred while the image loads.
+    placeholder: str | None = None
+
+
+@dataclass
+class ImageUpload:
+    """Content to add as an image of a recipe."""
+
+    recipe_id: UUID
+    # Image bytes, or a readable binary file positioned at its start.
+    content: bytes | IO[bytes]
+    filename: str
+    placeholder: str | None = None  # set by normalization
+
+
+@dataclass
+class NewImage:
+    """An image row to create, once its content is in storage."""
+
+    recipe_id: UUID
+    extension: str | None = None
+    media_type: str | None = None
+    content_hash: str | None = None
+    caption: str | None = None
+    display_order: int = 0
+    placeholder: str | None = None
+
+
+@dataclass(frozen=True)
+class ImageGrant:
+    """Access to one stored image until ``expires``, given by a signed URL."""
+
+    image_id: UUID
+    # Where the content is stored, so it is served without a database query.
+    extension: str | None
+    content_hash: str | None
+    expires: int  # Unix time
+    signature: str
+
+
+@dataclass
+class ImageLocation:
+    """Where to serve a stored image from: a URL to redirect to, or a local file."""
+
+    url: str | None = None
+    path: Path | None = None
+    media_type: str | None = None
+    # Strong validator derived from the content hash (None for legacy files).
+    etag: str | None = None
+
+
+@dataclass
+class ImageVariant:
+    """A resized or re-encoded copy of a stored image, ready to be served."""
+
+    path: Path
+    media_type: str
+    # Strong validator: the same value always stands for the same bytes.
+    etag: str
+
+
+@dataclass
+class StoredFile:
+    """A file found in image storage: a blob, or the file of a legacy image."""
+
+    extension: str
+    size: int
+    modified_at: float  # Unix time
+    content_hash: str | None = None  # set for blobs
+    image_id: UUID | None = None  # set for files named after their image
 
 
 @dataclass
@@ -1,10 +1,16 @@
 """Define how services can be used by external consumers (e.g., HTTP API, CLI)."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterator
 from pathlib import Path
+from typing import IO
 from uuid import UUID
 
 from miam.domain.entities import (
+    ImageGrant,
+    ImageLocation,
+    ImageUpload,
+    ImageVariant,
     PaginatedResult,
     RecipeEntity,
     RecipeShareEntity,
@@ -34,6 +40,14 @@ class RecipeServicePort(ABC):
     def get_recipe_by_id(self, recipe_id: UUID, user_id: UUID) -> RecipeEntity | None:
         """Retrieve a recipe by its ID, scoped to the given user."""
 
+    @abstractmethod
+    def get_recipe_version(self, recipe_id: UUID, user_id: UUID) -> str | None:
+        """Return a cheap version token for a recipe visible to the user, or None."""
+
+    @abstractmethod
+    def get_library_version(self, user_id: UUID) -> int:
+        """Return a cheap version counter for all recipes visible to the user."""
+
     @abstractmethod
     def search_recipes(
         self,
@@ -46,8 +60,12 @@ class RecipeServicePort(ABC):
         limit: int | None = None,
         offset: int = 0,
         ownership: str | None = None,
+        after: UUID | None = None,
     ) -> PaginatedResult:
-        """Search for recipes using dynamic filters, visible to the given user."""
+        """Search for recipes using dynamic filters, visible to the given user.
+
+        Raises ValueError if the ``after`` cursor names no visible recipe.
+        """
 
     @abstractmethod
     def update_recipe(
@@ -61,9 +79,27 @@ class RecipeServicePort(ABC):
 
     @abstractmethod
     def add_recipe_image(
-        self, recipe_id: UUID, user_id: UUID, content: bytes, filename: str
+        self, recipe_id: UUID, user_id: UUID, content: bytes | IO[bytes], filename: str
     ) -> UUID:
-        """Add an image to a recipe owned by user_id and return its image ID."""
+        """Add an image to a recipe owned by user_id and return its image ID.
+
+        ``content`` is the image bytes or a readable binary file positioned at
+        its start.
+        """
+
+    @abstractmethod
+    def check_edit_access(self, recipe_id: UUID, user_id: UUID) -> None:
+        """Raise ValueError if user_id may not add images to or edit the recipe."""
+
+    @abstractmethod
+    def add_recipe_images(
+        self, uploads: list[ImageUpload], user_id: UUID
+    ) -> list[UUID | str]:
+        """Add images to recipes editable by user_id, in a single transaction.
+
+        Returns, for each upload in order, the new image ID or the reason it
+        was rejected.
+        """
 
     @abstractmethod
     def get_recipe_image(self, image_id: UUID, user_id: UUID) -> ImageResponse | None:
@@ -75,6 +111,30 @@ class RecipeServicePort(ABC):
     ) -> tuple[Path, str] | None:
         """Resolve image path and media type for streaming, scoped to the given user."""
 
+    @abstractmethod
+    def locate_recipe_image(
+        self, image_id: UUID, access: UUID | ImageGrant
+    ) -> ImageLocation | None:
+        """Find where to serve an image from.
+
+        ``access`` is the requesting user, or a verified grant from a signed URL.
+        Returns ``None`` if the image does not exist or is not accessible.
+        """
+
+    @abstractmethod
+    def get_recipe_image_variant(
+        self,
+        image_id: UUID,
+        access: UUID | ImageGrant,
+        width: int | None = None,
+        image_format: str | None = None,
+    ) -> ImageVariant | None:
+        """Resolve a resized or re-encoded copy of an image.
+
+        ``access`` is the requesting user, or a verified grant from a signed URL.
+        Returns ``None`` if the image does not exist or is not accessible.
+        """
+
     @abstractmethod
     def delete_recipe_image(self, image_id: UUID, user_id: UUID) -> bool:
         """Delete an image from storage and database. Returns True if deleted, False if not found/owned."""
@@ -159,8 +219,8 @@ class AuthServicePort(ABC):
 
 class RecipeExportServicePort(ABC):
     @abstractmethod
-    def export_recipes_to_markdown(self, user_id: UUID) -> bytes:
-        """Export the user's recipes as a ZIP archive containing Markdown and images."""
+    def export_recipes_to_markdown(self, user_id: UUID) -> Iterator[bytes]:
+        """Stream the user's recipes as a ZIP archive containing Markdown and images."""
 
     @abstractmethod
     def export_recipes_to_word(self, user_id: UUID) -> bytes:
@@ -1,18 +1,25 @@
 """Define how the domain interacts with infrastructure."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Callable, Collection, Iterator
 from pathlib import Path
+from typing import IO
 from uuid import UUID
 
 from miam.domain.entities import (
     AuthProvider,
     GoogleUserInfo,
     ImageEntity,
+    ImageGrant,
+    ImageUpload,
+    ImageVariant,
+    NewImage,
     PaginatedResult,
     RecipeEntity,
     RecipeShareEntity,
     ShareRole,
     ShareStatus,
+    StoredFile,
     UserEntity,
 )
 from miam.domain.schemas import (
@@ -45,6 +52,17 @@ class RecipeRepositoryPort(ABC):
     def get_recipe_by_id(self, recipe_id: UUID, user_id: UUID) -> RecipeEntity | None:
         """Retrieve a recipe by ID, scoped to the given user."""
 
+    @abstractmethod
+    def get_recipe_version(self, recipe_id: UUID, user_id: UUID) -> str | None:
+        """Return an opaque token that changes whenever the recipe as seen by the user changes.
+
+        Must not load the recipe relationships. Returns None if not visible.
+        """
+
+    @abstractmethod
+    def get_library_version(self, user_id: UUID) -> int:
+        """Return a counter bumped by any write to a recipe visible to the user."""
+
     @abstractmethod
     def search_recipes(
         self,
@@ -57,8 +75,14 @@ class RecipeRepositoryPort(ABC):
         limit: int | None = None,
         offset: int = 0,
         ownership: str | None = None,
+        after: UUID | None = None,
     ) -> PaginatedResult:
-        """Query recipes with dynamic filtering and pagination, visible to the given user."""
+        """Query recipes with dynamic filtering and pagination, visible to the given user.
+
+        Recipes are listed newest first. ``after`` is a keyset cursor: the id of
+        the last recipe of the previous page. Raises ValueError if it names no
+        recipe visible to the user.
+        """
 
     @abstractmethod
     def update_recipe(
@@ -77,13 +101,40 @@ class RecipeRepositoryPort(ABC):
         user_id: UUID,
         caption: str | None = None,
         display_order: int | None = 0,
+        extension: str | None = None,
+        media_type: str | None = None,
+        content_hash: str | None = None,
+        placeholder: str | None = None,
     ) -> ImageEntity:
-        """Persist an Image record for a recipe owned by user_id."""
+        """Persist an Image record for a recipe owned by user_id.
+
+        With ``content_hash``, the image takes a reference on that stored blob.
+        """
+
+    @abstractmethod
+    def add_images(
+        self, images: list[NewImage], user_id: UUID
+    ) -> list[ImageEntity | None]:
+        """Persist Image records for recipes visible to user_id, in one transaction.
+
+        Returns the created images in order, with None for each image whose
+        recipe is not found or not visible.
+        """
 
     @abstractmethod
     def delete_image(self, image_id: UUID, user_id: UUID) -> bool:
         """Delete an Image record by ID. Returns True if deleted, False if not found/owned."""
 
+    @abstractmethod
+    def delete_unreferenced_blobs(
+        self, content_hashes: Collection[str], delete_file: Callable[[str], object]
+    ) -> list[str]:
+        """Forget the blobs among ``content_hashes`` that no image references any more.
+
+        Calls ``delete_file`` with the hash of each such blob before committing,
+        and returns their hashes.
+        """
+
     @abstractmethod
     def get_existing_source_raw_contents(
         self, raw_contents: set[str], user_id: UUID
@@ -91,8 +142,8 @@ class RecipeRepositoryPort(ABC):
         """Return the subset of raw_contents that already exist in recipes visible to user."""
 
     @abstractmethod
-    def image_belongs_to_user(self, image_id: UUID, user_id: UUID) -> bool:
-        """Check if an image belongs to a recipe owned by the given user."""
+    def get_image(self, image_id: UUID, user_id: UUID) -> ImageEntity | None:
+        """Return an image of a recipe visible to the given user, or None."""
 
 
 class RecipeShareRepositoryPort(ABC):
@@ -150,31 +201,141 @@ class RecipeShareRepositoryPort(ABC):
 
 
 class ImageStoragePort(ABC):
+    """Secondary port for image file storage.
+
+    Images are stored content-addressed: identical bytes are kept once, as a blob
+    named after their SHA-256. Lookups take the ``content_hash`` and ``extension``
+    recorded on the image row. Rows from before content addressing have no hash;
+    their file is named after the image ID, and found by searching when the
+    extension is unknown too.
+    """
+
     @abstractmethod
     def add_recipe_image(
-        self,
-        recipe_id: UUID,
-        image: bytes,
-        filename: str,
-        image_id: UUID,
-    ) -> UUID:
-        """Add an image to storage and return its image ID."""
+        self, recipe_id: UUID, image: bytes | IO[bytes], filename: str
+    ) -> str:
+        """Store an image, given as bytes or a readable binary file.
+
+        Returns the SHA-256 hex digest of the content. Content already stored is
+        not written again.
+        """
 
     @abstractmethod
-    def get_recipe_image(self, image_id: UUID) -> ImageResponse | None:
+    def blob_exists(self, content_hash: str, extension: str) -> bool:
+        """Return whether content with this hash and extension is stored."""
+
+    @abstractmethod
+    def get_recipe_image(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> ImageResponse | None:
         """Retrieve image bytes from storage by image ID."""
 
     @abstractmethod
-    def get_recipe_image_path(self, image_id: UUID) -> tuple[Path, str] | None:
+    def get_recipe_image_path(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> tuple[Path, str] | None:
         """Resolve the on-disk path and media type of an image without loading bytes.
 
         Returns ``(path, media_type)`` for streaming the file directly to clients,
-        or ``None`` if the image does not exist.
+        or ``None`` if the image does not exist. Remote storages return a local
+        copy of the image.
+        """
+
+    @abstractmethod
+    def get_recipe_image_url(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> str | None:
+        """Return a short-lived URL clients can download the image from directly.
+
+        Returns ``None`` when the storage has no such URLs, or the image does not
+        exist: the image is then served from :meth:`get_recipe_image_path`.
+        """
+
+    @abstractmethod
+    def delete_image(self, image_id: UUID, extension: str | None = None) -> bool:
+        """Delete the file of an image stored before content addressing.
+
+        Returns True if deleted, False if not found.
+        """
+
+    @abstractmethod
+    def delete_blob(self, content_hash: str) -> bool:
+        """Delete the stored content with this hash. Returns True if deleted."""
+
+    @abstractmethod
+    def list_files(self) -> Iterator[StoredFile]:
+        """List every stored blob and legacy image file, lazily.
+
+        Files being written and files of unknown names are left out.
         """
 
+
+class ImageUrlSignerPort(ABC):
+    """Secondary port for signed image URLs, checked without database access.
+
+    A signed URL grants access to one image, to whoever holds it, until it
+    expires. Grants are issued per time window: an image keeps the same URL for
+    the whole window, so browsers and proxies can cache it, and the URL stays
+    valid for at least one more window.
+    """
+
     @abstractmethod
-    def delete_image(self, image_id: UUID) -> bool:
-        """Delete an image file from storage. Returns True if deleted, False if not found."""
+    def sign(self, image: ImageEntity) -> ImageGrant:
+        """Grant access to ``image`` for the current window and the next one."""
+
+    @abstractmethod
+    def verify(self, grant: ImageGrant) -> bool:
+        """Return whether ``grant`` was issued by this signer and has not expired."""
+
+    @abstractmethod
+    def window(self) -> int:
+        """Return the number of the current window.
+
+        Responses embedding signed URLs must include it in their validators,
+        so cached copies are not revalidated past the expiry of their URLs.
+        """
+
+
+class ImageNormalizerPort(ABC):
+    """Secondary port preparing uploaded images for storage."""
+
+    @abstractmethod
+    def normalize(self, uploads: list[ImageUpload]) -> list[ImageUpload | str]:
+        """Orient, strip metadata from, shrink and re-encode images, concurrently.
+
+        Returns, for each upload, the upload to store instead, its filename
+        carrying the extension of the new format, or the reason it is rejected.
+        """
+
+
+class ImageVariantPort(ABC):
+    """Secondary port for derived versions of stored images (thumbnails, WebP)."""
+
+    @abstractmethod
+    def get_variant(
+        self, source: Path, width: int | None, image_format: str | None
+    ) -> ImageVariant:
+        """Return a variant of the image file ``source``, generating it on first use.
+
+        Args:
+            source: Path of the original image file.
+            width: Maximum width in pixels, or ``None`` to keep the original size.
+                Images are never upscaled.
+            image_format: ``"jpeg"``, ``"png"`` or ``"webp"``, or ``None`` to keep
+                the original format where possible.
+
+        Raises:
+            ValueError: If the source cannot be decoded as an image.
+        """
 
 
 class WordExporterPort(ABC):
@@ -201,8 +362,8 @@ class MarkdownExporterPort(ABC):
         """Serialize recipes to Markdown string format."""
 
     @abstractmethod
-    def to_zip_bytes(self, recipes: list[RecipeEntity]) -> bytes:
-        """Serialize recipes to a ZIP archive containing the Markdown file and images."""
+    def to_zip_stream(self, recipes: list[RecipeEntity]) -> Iterator[bytes]:
+        """Stream a ZIP archive containing the Markdown file and images, in chunks."""
 
 
 class InstagramParserPort(ABC):
@@ -268,3 +429,53 @@ class JwtTokenPort(ABC):
         Raises:
             ValueError: If the token is invalid or expired.
         """
+
+
+class CachePort(ABC):
+    """Secondary port for a key-value cache shared by services.
+
+    Values are opaque bytes; callers own serialization. Implementations may be
+    local to the process or shared across workers.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        """Return the cached value, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: float | None = None) -> None:
+        """Store a value, optionally expiring after ``ttl_seconds``."""
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Remove a key. Returns True if it existed."""
+
+    @abstractmethod
+    def add(self, key: str, value: bytes, ttl_seconds: float | None = None) -> bool:
+        """Store a value only if the key is missing. Returns True if stored."""
+
+    @abstractmethod
+    def replace(
+        self,
+        key: str,
+        expected: bytes,
+        value: bytes,
+        ttl_seconds: float | None = None,
+    ) -> bool:
+        """Atomically store a value only if the key still holds ``expected``.
+
+        Returns True if stored.
+        """
+
+    @abstractmethod
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], bytes],
+        ttl_seconds: float | None = None,
+    ) -> bytes:
+        """Return the cached value, computing and storing it on a miss.
+
+        Concurrent misses on the same key are single-flighted: only one caller
+        runs ``compute`` while the others wait for its result.
+        """
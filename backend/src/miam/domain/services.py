@@ -1,11 +1,19 @@
 """Orchestrate recipe and authentication operations."""
 
+import mimetypes
+from collections.abc import Iterator
 from pathlib import Path
+from typing import IO
 from uuid import UUID
 
 from miam.domain.entities import (
     AuthProvider,
     ImageEntity,
+    ImageGrant,
+    ImageLocation,
+    ImageUpload,
+    ImageVariant,
+    NewImage,
     PaginatedResult,
     RecipeEntity,
     RecipeShareEntity,
@@ -21,7 +29,9 @@ from miam.domain.ports_primary import (
 )
 from miam.domain.ports_secondary import (
     GoogleTokenVerifierPort,
+    ImageNormalizerPort,
     ImageStoragePort,
+    ImageVariantPort,
     InstagramParserPort,
     JwtTokenPort,
     MarkdownExporterPort,
@@ -47,10 +57,14 @@ class RecipeManagementService(RecipeServicePort):
         repository: RecipeRepositoryPort,
         image_storage: ImageStoragePort,
         share_repo: RecipeShareRepositoryPort | None = None,
+        image_variants: ImageVariantPort | None = None,
+        image_normalizer: ImageNormalizerPort | None = None,
     ):
         self.repository = repository
         self.image_storage = image_storage
         self.share_repo = share_repo
+        self.image_variants = image_variants
+        self.image_normalizer = image_normalizer
 
     def _get_role(self, recipe_id: UUID, user_id: UUID) -> str | None:
         """Get the user's role for a recipe (owner/editor/reader/None)."""
@@ -64,6 +78,12 @@ class RecipeManagementService(RecipeServicePort):
         if role not in ("owner", "editor"):
             raise ValueError("You don't have permission to edit this recipe")
 
+    def _normalize(self, uploads: list[ImageUpload]) -> list[ImageUpload | str]:
+        """Return the uploads to store, as prepared by the normalizer if any."""
+        if self.image_normalizer is None:
+            return list(uploads)
+        return self.image_normalizer.normalize(uploads)
+
     def create_recipe(self, data: RecipeCreate, owner_id: UUID) -> RecipeEntity:
         """Create a new recipe with ingredients, images, and sources."""
         return self.repository.add_recipe(data, owner_id=owner_id)
@@ -92,6 +112,14 @@ class RecipeManagementService(RecipeServicePort):
         """Retrieve a recipe by ID, scoped to the given user."""
         return self.repository.get_recipe_by_id(recipe_id, user_id)
 
+    def get_recipe_version(self, recipe_id: UUID, user_id: UUID) -> str | None:
+        """Return the recipe version token, without loading the full recipe."""
+        return self.repository.get_recipe_version(recipe_id, user_id)
+
+    def get_library_version(self, user_id: UUID) -> int:
+        """Return the version counter of the user's recipe library."""
+        return self.repository.get_library_version(user_id)
+
     def search_recipes(
         self,
         user_id: UUID,
@@ -103,6 +131,7 @@ class RecipeManagementService(RecipeServicePort):
         limit: int | None = None,
         offset: int = 0,
         ownership: str | None = None,
+        after: UUID | None = None,
     ) -> PaginatedResult:
         """Search/filter recipes via the repository abstraction, visible to user."""
         return self.repository.search_recipes(
@@ -115,6 +144,7 @@ class RecipeManagementService(RecipeServicePort):
             limit=limit,
             offset=offset,
             ownership=ownership,
+            after=after,
         )
 
     def update_recipe(
@@ -130,47 +160,240 @@ class RecipeManagementService(RecipeServicePort):
             return False
         if recipe.owner_id != user_id:
             raise ValueError("Only the owner can delete a recipe")
-        for image in recipe.images:
-            self.image_storage.delete_image(image.id)
-        return self.repository.delete_recipe(recipe_id, user_id)
+        deleted = self.repository.delete_recipe(recipe_id, user_id)
+        if deleted:
+            self._delete_files(recipe.images)
+        return deleted
 
     def add_recipe_image(
-        self, recipe_id: UUID, user_id: UUID, content: bytes, filename: str
+        self, recipe_id: UUID, user_id: UUID, content: bytes | IO[bytes], filename: str
     ) -> UUID:
         """Add an image to a recipe. Requires owner or editor role."""
         if self.share_repo is not None:
             self._require_edit_access(recipe_id, user_id)
+        normalized = self._normalize([ImageUpload(recipe_id, content, filename)])[0]
+        if isinstance(normalized, str):
+            raise ValueError(normalized)
+        content, filename = normalized.content, normalized.filename
+        content_hash = self.image_storage.add_recipe_image(recipe_id, content, filename)
         img: ImageEntity = self.repository.add_image(
             recipe_id=recipe_id,
             user_id=user_id,
             caption=None,
             display_order=0,
+            extension=Path(filename).suffix.lower(),
+            media_type=mimetypes.guess_type(filename)[0],
+            content_hash=content_hash,
+            placeholder=normalized.placeholder,
         )
-
-        self.image_storage.add_recipe_image(recipe_id, content, filename, img.id)
+        # The last image sharing this content may have been deleted, with its
+        # file, between the write and the new reference: store it again.
+        if not self.image_storage.blob_exists(content_hash, img.extension or ""):
+            if not isinstance(content, bytes):
+                content.seek(0)
+            self.image_storage.add_recipe_image(recipe_id, content, filename)
         return img.id
 
+    def check_edit_access(self, recipe_id: UUID, user_id: UUID) -> None:
+        """Raise ValueError unless the user is owner or editor of the recipe.
+
+        Lets callers refuse an upload before receiving its files. Without share
+        support, ownership is only enforced by the repository on write.
+        """
+        if self.share_repo is not None:
+            self._require_edit_access(recipe_id, user_id)
+
+    def add_recipe_images(
+        self, uploads: list[ImageUpload], user_id: UUID
+    ) -> list[UUID | str]:
+        """Add images to recipes in a single transaction. Requires owner or editor role.
+
+        Each upload is accepted or rejected on its own: the result holds the
+        new image ID, or the reason of the rejection.
+        """
+        # Access is checked once per recipe, however many images it gets.
+        access_errors: dict[UUID, str] = {}
+        if self.share_repo is not None:
+            for recipe_id in dict.fromkeys(upload.recipe_id for upload in uploads):
+                try:
+                    self._require_edit_access(recipe_id, user_id)
+                except ValueError as exc:
+                    access_errors[recipe_id] = str(exc)
+        # Normalized together, so a normalizer can process them in parallel.
+        prepared = iter(
+            self._normalize([u for u in uploads if u.recipe_id not in access_errors])
+        )
+        candidates = [
+            access_errors[u.recipe_id]
+            if u.recipe_id in access_errors
+            else next(prepared)
+            for u in uploads
+        ]
+        results: list[UUID | str] = [""] * len(uploads)
+        accepted: list[tuple[int, ImageUpload, NewImage]] = []
+        for index, upload in enumerate(candidates):
+            if isinstance(upload, str):
+                results[index] = upload
+                continue
+            try:
+                content_hash = self.image_storage.add_recipe_image(
+                    upload.recipe_id, upload.content, upload.filename
+                )
+            except ValueError as exc:
+                results[index] = str(exc)
+                continue
+            accepted.append(
+                (
+                    index,
+                    upload,
+                    NewImage(
+                        recipe_id=upload.recipe_id,
+                        extension=Path(upload.filename).suffix.lower(),
+                        media_type=mimetypes.guess_type(upload.filename)[0],
+                        content_hash=content_hash,
+                        placeholder=upload.placeholder,
+                    ),
+                )
+            )
+        if not accepted:
+            return results
+        images = self.repository.add_images([new for _, _, new in accepted], user_id)
+        for (index, upload, new), image in zip(accepted, images, strict=True):
+            if image is None:
+                results[index] = (
+                    f"Recipe {new.recipe_id} not found or not accessible by user"
+                )
+                continue
+            results[index] = image.id
+            # Same race as in add_recipe_image: the blob may have been deleted.
+            if not self.image_storage.blob_exists(
+                new.content_hash or "", new.extension or ""
+            ):
+                if not isinstance(upload.content, bytes):
+                    upload.content.seek(0)
+                self.image_storage.add_recipe_image(
+                    upload.recipe_id, upload.content, upload.filename
+                )
+        return results
+
     def get_recipe_image(self, image_id: UUID, user_id: UUID) -> ImageResponse | None:
         """Retrieve image bytes from storage by image ID, only if owned by user."""
-        if not self.repository.image_belongs_to_user(image_id, user_id):
+        image = self.repository.get_image(image_id, user_id)
+        if image is None:
             return None
-        return self.image_storage.get_recipe_image(image_id)
+        return self.image_storage.get_recipe_image(
+            image_id, image.extension, image.content_hash
+        )
 
     def get_recipe_image_path(
         self, image_id: UUID, user_id: UUID
     ) -> tuple[Path, str] | None:
         """Resolve image path and media type for streaming, only if owned by user."""
-        if not self.repository.image_belongs_to_user(image_id, user_id):
+        image = self.repository.get_image(image_id, user_id)
+        if image is None:
             return None
-        return self.image_storage.get_recipe_image_path(image_id)
+        resolved = self.image_storage.get_recipe_image_path(
+            image_id, image.extension, image.content_hash
+        )
+        if resolved is not None and image.media_type:
+            return resolved[0], image.media_type
+        return resolved
+
+    def _accessible_image(
+        self, image_id: UUID, access: UUID | ImageGrant
+    ) -> ImageEntity | None:
+        """Return the image if visible to the user, or covered by the grant.
+
+        A grant has been verified already and carries where the content is
+        stored: the database is not queried.
+        """
+        if isinstance(access, ImageGrant):
+            if access.image_id != image_id:
+                return None
+            return ImageEntity(
+                id=image_id,
+                extension=access.extension,
+                content_hash=access.content_hash,
+            )
+        return self.repository.get_image(image_id, access)
+
+    def locate_recipe_image(
+        self, image_id: UUID, access: UUID | ImageGrant
+    ) -> ImageLocation | None:
+        """Find where to serve an image from, only if visible to user or granted.
+
+        Prefers a URL of the storage, so the bytes do not pass through the API.
+        The content hash names the bytes, so it is the ETag of the image: any
+        storage can be revalidated without reading the file.
+        """
+        image = self._accessible_image(image_id, access)
+        if image is None:
+            return None
+        etag = f'"{image.content_hash}"' if image.content_hash else None
+        url = self.image_storage.get_recipe_image_url(
+            image_id, image.extension, image.content_hash
+        )
+        if url is not None:
+            return ImageLocation(url=url, etag=etag)
+        resolved = self.image_storage.get_recipe_image_path(
+            image_id, image.extension, image.content_hash
+        )
+        if resolved is None:
+            return None
+        path, media_type = resolved
+        return ImageLocation(
+            path=path, media_type=image.media_type or media_type, etag=etag
+        )
+
+    def get_recipe_image_variant(
+        self,
+        image_id: UUID,
+        access: UUID | ImageGrant,
+        width: int | None = None,
+        image_format: str | None = None,
+    ) -> ImageVariant | None:
+        """Resolve a resized or re-encoded copy of an image, only if visible or granted."""
+        if self.image_variants is None:
+            raise ValueError("Image variants are not available")
+        image = self._accessible_image(image_id, access)
+        if image is None:
+            return None
+        # With S3 storage the path is a local copy, which another request may
+        # evict before it is read: it is fetched again once.
+        for _ in range(2):
+            resolved = self.image_storage.get_recipe_image_path(
+                image_id, image.extension, image.content_hash
+            )
+            if resolved is None:
+                return None
+            try:
+                return self.image_variants.get_variant(resolved[0], width, image_format)
+            except FileNotFoundError:
+                continue
+        return None
 
     def delete_recipe_image(self, image_id: UUID, user_id: UUID) -> bool:
         """Delete an image from storage and database."""
+        image = self.repository.get_image(image_id, user_id)
+        if image is None:
+            return False
         deleted = self.repository.delete_image(image_id, user_id)
         if deleted:
-            self.image_storage.delete_image(image_id)
+            self._delete_files([image])
         return deleted
 
+    def _delete_files(self, images: list[ImageEntity]) -> None:
+        """Delete the files of deleted images, keeping content other images share."""
+        content_hashes: set[str] = set()
+        for image in images:
+            if image.content_hash is None:
+                self.image_storage.delete_image(image.id, image.extension)
+            else:
+                content_hashes.add(image.content_hash)
+        self.repository.delete_unreferenced_blobs(
+            content_hashes, self.image_storage.delete_blob
+        )
+
 
 class RecipeShareService(RecipeShareServicePort):
     """Service for sharing recipes between users."""
@@ -343,10 +566,13 @@ class RecipeExportService(RecipeExportServicePort):
         self.word_exporter = word_exporter
         self.markdown_exporter = markdown_exporter
 
-    def export_recipes_to_markdown(self, user_id: UUID) -> bytes:
-        """Export the user's recipes as a ZIP archive containing Markdown and images."""
+    def export_recipes_to_markdown(self, user_id: UUID) -> Iterator[bytes]:
+        """Stream the user's recipes as a ZIP archive containing Markdown and images.
+
+        The recipes are loaded right away; the archive is written as it is read.
+        """
         result = self.repository.search_recipes(user_id=user_id)
-        return self.markdown_exporter.to_zip_bytes(result.items)
+        return self.markdown_exporter.to_zip_stream(result.items)
 
     def export_recipes_to_word(self, user_id: UUID) -> bytes:
         """Export the user's recipes as Word binary format (in-memory)."""
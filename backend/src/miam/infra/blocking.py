@@ -0,0 +1,28 @@
+"""Blocking I/O from code that may run on the event loop.
+
+With ``DATABASE_ASYNC`` the services run inside ``AsyncSession.run_sync``: on
+the event loop thread, in a greenlet that awaits database I/O. Any other
+blocking call made there, such as writing an image file, stalls every request
+of the worker. :func:`run_blocking` moves such calls to a worker thread and
+awaits them through the same greenlet bridge.
+"""
+
+import asyncio
+from collections.abc import Callable
+from typing import TypeVar
+
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+T = TypeVar("T")
+
+
+def run_blocking(fn: Callable[[], T]) -> T:  # noqa: UP047
+    """Call ``fn`` and return its result, in a worker thread if on the event loop.
+
+    Outside the async bridge the caller already runs in a thread of its own,
+    so ``fn`` is called directly.
+    """
+    if in_greenlet():
+        result: T = await_only(asyncio.to_thread(fn))
+        return result
+    return fn()
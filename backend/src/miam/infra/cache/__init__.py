@@ -0,0 +1 @@
+"""Implementations of the cache port (in-process and Redis-protocol backends)."""
@@ -0,0 +1,203 @@
+"""Cross-worker cache invalidation through PostgreSQL LISTEN/NOTIFY.
+
+Repositories queue the cache keys a write makes stale with
+:func:`queue_invalidation`. On commit, :class:`CacheInvalidationBus` evicts them
+from this worker's cache and publishes them with ``pg_notify``; PostgreSQL only
+delivers notifications of committed transactions, and a background listener in
+every worker evicts the same keys from its own cache.
+
+Subscribers registered with :meth:`CacheInvalidationBus.subscribe` are told
+about every invalidated key, which makes the bus a cross-worker change feed.
+"""
+
+import json
+import select
+import threading
+from collections.abc import Callable
+from typing import Any
+
+from loguru import logger
+from sqlalchemy import Engine, event, func
+from sqlalchemy import select as sql_select
+from sqlalchemy.orm import Session, sessionmaker
+
+from miam.domain.ports_secondary import CachePort
+
+CHANNEL = "miam_cache_invalidation"
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more.
+_MAX_PAYLOAD_BYTES = 7900
+_PENDING = "miam_cache_invalidation_pending"
+_COMMITTING = "miam_cache_invalidation_committing"
+
+
+def queue_invalidation(session: Session, *keys: str) -> None:
+    """Schedule cache keys for eviction on every worker once the session commits.
+
+    Keys are dropped if the transaction rolls back. Without an attached bus this
+    is a no-op, so repositories can call it unconditionally.
+    """
+    session.info.setdefault(_PENDING, set()).update(keys)
+
+
+def _chunk_payloads(keys: set[str]) -> list[str]:
+    """Split keys into JSON arrays that each fit in a NOTIFY payload."""
+    payloads: list[str] = []
+    batch: list[str] = []
+    size = 2
+    for key in sorted(keys):
+        key_size = len(json.dumps(key)) + 1
+        if batch and size + key_size > _MAX_PAYLOAD_BYTES:
+            payloads.append(json.dumps(batch, separators=(",", ":")))
+            batch, size = [], 2
+        batch.append(key)
+        size += key_size
+    if batch:
+        payloads.append(json.dumps(batch, separators=(",", ":")))
+    return payloads
+
+
+class CacheInvalidationBus:
+    """Evict cache keys on all workers after the transaction that staled them commits."""
+
+    def __init__(
+        self,
+        cache: CachePort,
+        engine: Engine,
+        channel: str = CHANNEL,
+        reconnect_delay_seconds: float = 5.0,
+    ) -> None:
+        self.cache = cache
+        self.engine = engine
+        self.channel = channel
+        self.reconnect_delay_seconds = reconnect_delay_seconds
+        self._subscribers: list[Callable[[list[str]], None]] = []
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def notifies(self) -> bool:
+        """Whether the database supports LISTEN/NOTIFY."""
+        return self.engine.dialect.name == "postgresql"
+
+    # --- publishing -------------------------------------------------------
+
+    def attach(
+        self, session_factory: sessionmaker[Any] | type[Session] | Session
+    ) -> None:
+        """Publish the keys queued on a session, or on all sessions of a factory or class."""
+        event.listen(session_factory, "before_commit", self._before_commit)
+        event.listen(session_factory, "after_commit", self._after_commit)
+        event.listen(session_factory, "after_soft_rollback", self._after_rollback)
+
+    def _before_commit(self, session: Session) -> None:
+        keys: set[str] | None = session.info.pop(_PENDING, None)
+        if not keys:
+            return
+        session.info[_COMMITTING] = keys
+        if self.notifies:
+            # Sent inside the transaction: delivered only if the commit succeeds.
+            for payload in _chunk_payloads(keys):
+                session.execute(sql_select(func.pg_notify(self.channel, payload)))
+
+    def _after_commit(self, session: Session) -> None:
+        keys: set[str] | None = session.info.pop(_COMMITTING, None)
+        if keys:
+            self.evict(keys)
+
+    def _after_rollback(self, session: Session, previous_transaction: Any) -> None:
+        session.info.pop(_PENDING, None)
+        session.info.pop(_COMMITTING, None)
+
+    def subscribe(self, callback: Callable[[list[str]], None]) -> None:
+        """Call ``callback`` with the keys of every invalidation, local or remote.
+
+        Callbacks run on the committing thread or the listener thread and must
+        not block.
+        """
+        self._subscribers.append(callback)
+
+    def evict(self, keys: set[str] | list[str]) -> None:
+        """Delete keys from this worker's cache and notify subscribers."""
+        keys = list(keys)
+        for key in keys:
+            self.cache.delete(key)
+        for callback in self._subscribers:
+            try:
+                callback(keys)
+            except Exception as exc:
+                logger.warning(f"Cache invalidation subscriber failed: {exc}")
+
+    def handle_payload(self, payload: str) -> None:
+        """Evict the keys of a notification received from any worker."""
+        try:
+            keys = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.warning(f"Ignoring malformed cache invalidation payload {payload!r}")
+            return
+        if isinstance(keys, list):
+            self.evict([str(key) for key in keys])
+
+    # --- listening --------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background listener thread (no-op without PostgreSQL)."""
+        if not self.notifies or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._listen_forever, name="cache-invalidation", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background listener and wait for it to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.reconnect_delay_seconds + 1)
+            self._thread = None
+
+    def _listen_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen()
+            except Exception as exc:
+                logger.warning(f"Cache invalidation listener failed: {exc}")
+            # Notifications may have been missed while disconnected: a local
+            # cache can no longer be trusted. Shared caches were evicted by the
+            # writer itself and are left alone.
+            clear = getattr(self.cache, "clear", None)
+            if callable(clear):
+                clear()
+            self._stop.wait(self.reconnect_delay_seconds)
+
+    def _listen(self) -> None:
+        # Dedicated connection, detached from the pool: it stays in LISTEN mode.
+        raw = self.engine.raw_connection()
+        raw.detach()
+        dbapi_conn: Any = raw.driver_connection
+        try:
+            dbapi_conn.autocommit = True
+            with dbapi_conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            logger.info(f"Listening for cache invalidations on {self.channel}")
+            while not self._stop.is_set():
+                if callable(dbapi_conn.notifies):
+                    # psycopg 3: a generator that returns after the timeout.
+                    for notification in dbapi_conn.notifies(timeout=1.0):
+                        self._handle_notification(notification)
+                    continue
+                readable, _, _ = select.select([dbapi_conn], [], [], 1.0)
+                if readable:
+                    self.drain(dbapi_conn)
+        finally:
+            raw.close()
+
+    def drain(self, dbapi_conn: Any) -> None:
+        """Consume the notifications pending on a psycopg2 connection."""
+        dbapi_conn.poll()
+        while dbapi_conn.notifies:
+            self._handle_notification(dbapi_conn.notifies.pop(0))
+
+    def _handle_notification(self, notification: Any) -> None:
+        if notification.channel == self.channel:
+            self.handle_payload(notification.payload)
@@ -0,0 +1,145 @@
+"""In-process LRU cache, bounded by entry count and bytes."""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+from miam.domain.ports_secondary import CachePort
+from miam.infra.cache.single_flight import SingleFlight
+
+
+class InMemoryCache(CachePort):
+    """Thread-safe LRU implementation of CachePort, local to the worker process.
+
+    Expired entries are dropped lazily on read and as part of LRU eviction.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        default_ttl_seconds: float | None = None,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl_seconds = default_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        # key -> (value, expiry on the monotonic clock or None)
+        self._entries: OrderedDict[str, tuple[bytes, float | None]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of the cached values."""
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> bytes | None:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: float | None = None) -> None:
+        """Store a value, evicting least recently used entries to stay in bounds."""
+        with self._lock:
+            self._store(key, value, ttl_seconds)
+
+    def delete(self, key: str) -> bool:
+        """Remove a key. Returns True if it existed."""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def add(self, key: str, value: bytes, ttl_seconds: float | None = None) -> bool:
+        """Store a value only if the key is missing or expired."""
+        with self._lock:
+            if self._current(key) is not None:
+                return False
+            return self._store(key, value, ttl_seconds)
+
+    def replace(
+        self,
+        key: str,
+        expected: bytes,
+        value: bytes,
+        ttl_seconds: float | None = None,
+    ) -> bool:
+        """Store a value only if the key still holds ``expected``."""
+        with self._lock:
+            if self._current(key) != expected:
+                return False
+            return self._store(key, value, ttl_seconds)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], bytes],
+        ttl_seconds: float | None = None,
+    ) -> bytes:
+        """Return the cached value, computing it once per key on concurrent misses."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._flights.lock(key):
+            value = self.get(key)
+            if value is not None:
+                return value
+            value = compute()
+            self.set(key, value, ttl_seconds)
+            return value
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _current(self, key: str) -> bytes | None:
+        """Return the unexpired value of a key. Caller must hold the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        return value
+
+    def _store(self, key: str, value: bytes, ttl_seconds: float | None) -> bool:
+        """Store a value and evict to stay in bounds. Caller must hold the lock."""
+        if len(value) > self.max_bytes or self.max_entries <= 0:
+            return False
+        ttl = ttl_seconds if ttl_seconds is not None else self.default_ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, expires_at)
+        self._size += len(value)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+        return key in self._entries
+
+    def _remove(self, key: str) -> None:
+        """Remove an entry. Caller must hold the lock."""
+        value, _ = self._entries.pop(key)
+        self._size -= len(value)
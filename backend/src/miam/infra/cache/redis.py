@@ -0,0 +1,294 @@
+"""Cache backed by any server speaking the Redis protocol (RESP2).
+
+Ships its own minimal client (GET/SET/DEL/EVAL plus connection setup) so the
+cache works against Redis, Valkey, KeyDB or a test stand-in without extra
+packages.
+"""
+
+import socket
+import threading
+import time
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+from urllib.parse import unquote, urlparse
+from uuid import uuid4
+
+from loguru import logger
+
+from miam.domain.ports_secondary import CachePort
+from miam.infra.blocking import run_blocking
+from miam.infra.cache.single_flight import SingleFlight
+
+_Arg = bytes | str | int
+
+# Compare-and-set: SET only if the key holds ARGV[1]; ARGV[3] is a TTL in ms, or 0.
+REPLACE_SCRIPT = """\
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+if ARGV[3] == '0' then redis.call('SET', KEYS[1], ARGV[2])
+else redis.call('SET', KEYS[1], ARGV[2], 'PX', ARGV[3]) end
+return 1
+"""
+
+# Compare-and-delete: DEL only if the key still holds ARGV[1].
+UNLOCK_SCRIPT = """\
+if redis.call('GET', KEYS[1]) == ARGV[1] then return redis.call('DEL', KEYS[1]) end
+return 0
+"""
+
+
+class RedisError(Exception):
+    """Error reply returned by the server."""
+
+
+def _encode_command(args: tuple[_Arg, ...]) -> bytes:
+    """Encode a command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+class _Connection:
+    """A single RESP connection, used by one caller at a time."""
+
+    def __init__(self, host: str, port: int, timeout: float) -> None:
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+
+    def execute(self, *args: _Arg) -> Any:
+        self._sock.sendall(_encode_command(args))
+        return self._read_reply()
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by cache server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            raise RedisError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by cache server")
+            return data[:-2]
+        if kind == b"*":
+            count = int(payload)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise ConnectionError(f"Unexpected reply type {kind!r} from cache server")
+
+    def close(self) -> None:
+        self._reader.close()
+        self._sock.close()
+
+
+class RedisCache(CachePort):
+    """CachePort shared by all workers through a Redis-protocol server.
+
+    Connection failures never fail the request: reads degrade to misses and
+    writes are skipped, with a warning. Single-flight spans workers through a
+    short-lived ``SET NX`` lock; callers that lose the race poll for the value
+    and compute it themselves if the lock holder does not deliver in time.
+    """
+
+    def __init__(
+        self,
+        url: str = "redis://localhost:6379/0",
+        key_prefix: str = "miam:",
+        default_ttl_seconds: float | None = None,
+        timeout_seconds: float = 2.0,
+        lock_timeout_seconds: float = 10.0,
+        poll_interval_seconds: float = 0.05,
+        max_idle_connections: int = 16,
+    ) -> None:
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported cache URL scheme '{parsed.scheme}'")
+        self._host = parsed.hostname or "localhost"
+        self._port = parsed.port or 6379
+        self._username = unquote(parsed.username) if parsed.username else None
+        self._password = unquote(parsed.password) if parsed.password else None
+        self._db = int(parsed.path.lstrip("/") or 0)
+        self.key_prefix = key_prefix
+        self.default_ttl_seconds = default_ttl_seconds
+        self.timeout_seconds = timeout_seconds
+        self.lock_timeout_seconds = lock_timeout_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        self.max_idle_connections = max_idle_connections
+        self._idle: list[_Connection] = []
+        self._pool_lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    def _connect(self) -> _Connection:
+        conn = _Connection(self._host, self._port, self.timeout_seconds)
+        try:
+            if self._password:
+                credentials = [self._username] if self._username else []
+                conn.execute("AUTH", *credentials, self._password)
+            if self._db:
+                conn.execute("SELECT", self._db)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def execute(self, *args: _Arg) -> Any:
+        """Run one command on a pooled connection; broken connections are dropped."""
+        return run_blocking(partial(self._execute, *args))
+
+    def _execute(self, *args: _Arg) -> Any:
+        with self._pool_lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            reply = conn.execute(*args)
+        except RedisError:
+            self._release(conn)
+            raise
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn)
+        return reply
+
+    def _release(self, conn: _Connection) -> None:
+        with self._pool_lock:
+            if len(self._idle) < self.max_idle_connections:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._pool_lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+
+    def get(self, key: str) -> bytes | None:
+        """Return the cached value, or None if missing, expired or unreachable."""
+        try:
+            reply = self.execute("GET", self._key(key))
+        except (OSError, RedisError) as exc:
+            logger.warning(f"Cache GET {key} failed: {exc}")
+            return None
+        return reply if isinstance(reply, bytes) else None
+
+    def set(self, key: str, value: bytes, ttl_seconds: float | None = None) -> None:
+        """Store a value, with a millisecond-precision expiry when a TTL applies."""
+        ttl = ttl_seconds if ttl_seconds is not None else self.default_ttl_seconds
+        args: list[_Arg] = ["SET", self._key(key), value]
+        if ttl is not None:
+            args += ["PX", max(1, int(ttl * 1000))]
+        try:
+            self.execute(*args)
+        except (OSError, RedisError) as exc:
+            logger.warning(f"Cache SET {key} failed: {exc}")
+
+    def delete(self, key: str) -> bool:
+        """Remove a key. Returns True if it existed."""
+        try:
+            return bool(self.execute("DEL", self._key(key)))
+        except (OSError, RedisError) as exc:
+            logger.warning(f"Cache DEL {key} failed: {exc}")
+            return False
+
+    def add(self, key: str, value: bytes, ttl_seconds: float | None = None) -> bool:
+        """Store a value only if the key is missing (``SET NX``)."""
+        ttl = ttl_seconds if ttl_seconds is not None else self.default_ttl_seconds
+        args: list[_Arg] = ["SET", self._key(key), value, "NX"]
+        if ttl is not None:
+            args += ["PX", max(1, int(ttl * 1000))]
+        try:
+            return bool(self.execute(*args) == "OK")
+        except (OSError, RedisError) as exc:
+            logger.warning(f"Cache SET NX {key} failed: {exc}")
+            return False
+
+    def replace(
+        self,
+        key: str,
+        expected: bytes,
+        value: bytes,
+        ttl_seconds: float | None = None,
+    ) -> bool:
+        """Store a value only if the key still holds ``expected``, in a script."""
+        ttl = ttl_seconds if ttl_seconds is not None else self.default_ttl_seconds
+        ttl_ms = max(1, int(ttl * 1000)) if ttl is not None else 0
+        try:
+            reply = self.execute(
+                "EVAL", REPLACE_SCRIPT, 1, self._key(key), expected, value, ttl_ms
+            )
+        except (OSError, RedisError) as exc:
+            logger.warning(f"Cache compare-and-set {key} failed: {exc}")
+            return False
+        return bool(reply == 1)
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], bytes],
+        ttl_seconds: float | None = None,
+    ) -> bytes:
+        """Return the cached value, computing it once across workers on a miss."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._flights.lock(key):
+            value = self.get(key)
+            if value is not None:
+                return value
+            token = uuid4().hex
+            lock_key = self._key(f"{key}:lock")
+            if self._try_lock(lock_key, token):
+                try:
+                    value = compute()
+                    self.set(key, value, ttl_seconds)
+                    return value
+                finally:
+                    self._unlock(lock_key, token)
+
+            deadline = time.monotonic() + self.lock_timeout_seconds
+            while time.monotonic() < deadline:
+                run_blocking(partial(time.sleep, self.poll_interval_seconds))
+                value = self.get(key)
+                if value is not None:
+                    return value
+            logger.warning(f"Timed out waiting for cache key {key}, computing locally")
+            return compute()
+
+    def _try_lock(self, lock_key: str, token: str) -> bool:
+        """Acquire the cross-worker compute lock. Fails open if unreachable."""
+        ttl_ms = int(self.lock_timeout_seconds * 1000)
+        try:
+            reply = self.execute("SET", lock_key, token, "NX", "PX", ttl_ms)
+            return bool(reply == "OK")
+        except (OSError, RedisError) as exc:
+            logger.warning(f"Cache lock {lock_key} failed: {exc}")
+            return True
+
+    def _unlock(self, lock_key: str, token: str) -> None:
+        """Release the lock if still ours (it may have expired and been re-taken).
+
+        Compared and deleted in one script, so a lock that expires in between
+        and is taken by another worker is never deleted.
+        """
+        try:
+            self.execute("EVAL", UNLOCK_SCRIPT, 1, lock_key, token)
+        except (OSError, RedisError) as exc:
+            logger.warning(f"Cache unlock {lock_key} failed: {exc}")
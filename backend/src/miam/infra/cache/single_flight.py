@@ -0,0 +1,41 @@
+"""Per-key locks so that concurrent cache misses compute a value only once."""
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from miam.infra.blocking import run_blocking
+
+
+class SingleFlight:
+    """Serialize concurrent computations of the same key within this process.
+
+    Locks are reference-counted and dropped once no caller holds or waits on
+    them, so memory stays proportional to the number of in-flight keys.
+    """
+
+    def __init__(self) -> None:
+        self._locks: dict[str, tuple[threading.Lock, int]] = {}
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        """Hold the lock of ``key`` for the duration of the block."""
+        with self._guard:
+            lock, users = self._locks.get(key, (threading.Lock(), 0))
+            self._locks[key] = (lock, users + 1)
+        try:
+            # Acquired off the event loop: another request of the same worker
+            # may hold it while it awaits the database on that loop.
+            run_blocking(lock.acquire)
+            try:
+                yield
+            finally:
+                lock.release()
+        finally:
+            with self._guard:
+                lock, users = self._locks[key]
+                if users == 1:
+                    del self._locks[key]
+                else:
+                    self._locks[key] = (lock, users - 1)
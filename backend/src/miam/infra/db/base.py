@@ -35,6 +35,7 @@ from miam.domain.entities import (
     ShareStatus,
     SourceType,
 )
+from miam.infra.db.ids import uuid7
 
 # Naming convention helps Alembic migrations
 convention = {
@@ -57,7 +58,7 @@ class User(Base):
 
     __tablename__ = "users"
 
-    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid7)
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
     display_name: Mapped[str] = mapped_column(String(200), nullable=False)
     avatar_url: Mapped[str | None] = mapped_column(String(500))
@@ -76,6 +77,8 @@ class User(Base):
         onupdate=lambda: datetime.now(UTC),
         nullable=False,
     )
+    # Bumped whenever a recipe visible to this user (owned or shared) changes.
+    library_version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
 
     recipes = relationship("Recipe", back_populates="owner")
 
@@ -87,23 +90,50 @@ class Image(Base):
 
     __tablename__ = "images"
 
-    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid7)
     recipe_id: Mapped[uuid.UUID] = mapped_column(
         ForeignKey("recipes.id", ondelete="CASCADE")
     )
 
     caption: Mapped[str | None] = mapped_column(String(200))
     display_order: Mapped[int] = mapped_column(Integer, default=0)
+    # File extension (".jpg") and media type of the stored file.
+    extension: Mapped[str | None] = mapped_column(String(10))
+    media_type: Mapped[str | None] = mapped_column(String(100))
+    # SHA-256 of the content; NULL for files stored before content addressing.
+    content_hash: Mapped[str | None] = mapped_column(
+        ForeignKey("image_blobs.content_hash"), index=True
+    )
+    # Data URI of a few-pixel JPEG, shown blurred while the image loads.
+    placeholder: Mapped[str | None] = mapped_column(Text)
 
     recipe = relationship("Recipe", back_populates="images")
 
 
+class ImageBlob(Base):
+    """Stores one row per distinct image content, counting the images using it.
+
+    Images with identical bytes share one stored file, named after the SHA-256
+    of the content. The file is deleted when ``ref_count`` drops to zero.
+    """
+
+    __tablename__ = "image_blobs"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    ref_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(UTC),
+        nullable=False,
+    )
+
+
 class Ingredient(Base):
     """Stores ingredient names."""
 
     __tablename__ = "ingredients"
 
-    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid7)
     name: Mapped[str] = mapped_column(String(100), unique=True, nullable=False)
 
     recipes = relationship(
@@ -140,7 +170,7 @@ class Recipe(Base):
 
     __tablename__ = "recipes"
 
-    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid7)
     owner_id: Mapped[uuid.UUID] = mapped_column(
         ForeignKey("users.id", ondelete="CASCADE"), nullable=False
     )
@@ -168,6 +198,8 @@ class Recipe(Base):
         default=lambda: datetime.now(UTC),
         nullable=False,
     )
+    # Bumped by every write to the recipe or its children (ingredients, images...).
+    version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
 
     owner = relationship("User", back_populates="recipes")
 
@@ -194,7 +226,7 @@ class Source(Base):
 
     __tablename__ = "sources"
 
-    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid7)
 
     type: Mapped[SourceType] = mapped_column(
         Enum(SourceType, name="sourcetype"), nullable=False
@@ -213,7 +245,7 @@ class RecipeShare(Base):
 
     __tablename__ = "recipe_shares"
 
-    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid7)
     recipe_id: Mapped[uuid.UUID] = mapped_column(
         ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False
     )
@@ -0,0 +1,193 @@
+"""Reference counts of content-addressed image blobs.
+
+Each ``image_blobs`` row counts the images whose ``content_hash`` points at it.
+Counts change in the transaction that adds or deletes the images, through an
+upsert for additions, so concurrent uploads of the same content never lose a
+reference. Deletions the repositories do not see, such as database cascades,
+leave counts too high: :func:`recount_blob_refs` corrects them.
+"""
+
+from collections.abc import Callable, Collection, Mapping
+from datetime import datetime
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from miam.infra.db.base import Image, ImageBlob
+
+
+def _insert(session: Session) -> Callable[..., postgresql.Insert | sqlite.Insert]:
+    dialect = session.connection().dialect.name
+    return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+
+def acquire_blob_refs(session: Session, refs: Mapping[str, int]) -> None:
+    """Add ``refs[content_hash]`` references to each blob, creating missing rows.
+
+    Part of the caller's transaction. Rows are upserted in hash order, so
+    concurrent transactions lock them in the same order.
+    """
+    if not refs:
+        return
+    stmt = _insert(session)(ImageBlob).values(
+        [
+            {"content_hash": content_hash, "ref_count": refs[content_hash]}
+            for content_hash in sorted(refs)
+        ]
+    )
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ImageBlob.content_hash],
+            set_={"ref_count": ImageBlob.ref_count + stmt.excluded.ref_count},
+        )
+    )
+
+
+def release_blob_refs(session: Session, refs: Mapping[str, int]) -> None:
+    """Remove ``refs[content_hash]`` references from each blob (caller's transaction).
+
+    Blobs left without references are deleted by :func:`delete_unreferenced_blobs`
+    once this transaction has committed.
+    """
+    for content_hash in sorted(refs):
+        session.execute(
+            update(ImageBlob)
+            .where(ImageBlob.content_hash == content_hash)
+            .values(ref_count=ImageBlob.ref_count - refs[content_hash])
+            .execution_options(synchronize_session=False)
+        )
+
+
+def delete_unreferenced_blobs(
+    session: Session,
+    content_hashes: Collection[str],
+    delete_file: Callable[[str], object],
+) -> list[str]:
+    """Delete the rows and files of the given blobs that have no reference left.
+
+    ``delete_file`` runs while the deleted rows are still locked, before the
+    commit. An upload of the same content meanwhile blocks on its upsert until
+    that commit, so when it then checks for the file it finds it gone and
+    writes it again: a file is never deleted under a new reference.
+    Commits the session.
+    """
+    if not content_hashes:
+        return []
+    deleted = list(
+        session.scalars(
+            delete(ImageBlob)
+            .where(
+                ImageBlob.content_hash.in_(sorted(content_hashes)),
+                ImageBlob.ref_count <= 0,
+            )
+            .returning(ImageBlob.content_hash)
+            .execution_options(synchronize_session=False)
+        ).all()
+    )
+    for content_hash in deleted:
+        delete_file(content_hash)
+    session.commit()
+    return deleted
+
+
+def recount_blob_refs(
+    session: Session, after: str, limit: int
+) -> tuple[int, str | None]:
+    """Set the count of drifted blobs back to the number of images using them.
+
+    Checks up to ``limit`` blobs, in hash order from the one after ``after``.
+    Drifted rows are locked before they are recounted, so the count sees every
+    image committed by transactions that held them. Commits the session.
+
+    Returns:
+        The number of corrected blobs, and the hash to resume from, or ``None``
+        once every blob was checked.
+    """
+    page = list(
+        session.scalars(
+            select(ImageBlob.content_hash)
+            .where(ImageBlob.content_hash > after)
+            .order_by(ImageBlob.content_hash)
+            .limit(limit)
+        ).all()
+    )
+    if not page:
+        session.commit()
+        return 0, None
+    image_count = (
+        select(func.count(Image.id))
+        .where(Image.content_hash == ImageBlob.content_hash)
+        .scalar_subquery()
+    )
+    drifted = sorted(
+        session.scalars(
+            select(ImageBlob.content_hash).where(
+                ImageBlob.content_hash.in_(page), ImageBlob.ref_count != image_count
+            )
+        ).all()
+    )
+    if drifted:
+        session.execute(
+            select(ImageBlob.content_hash)
+            .where(ImageBlob.content_hash.in_(drifted))
+            .order_by(ImageBlob.content_hash)
+            .with_for_update()
+        )
+        # A separate statement: under READ COMMITTED it counts from a snapshot
+        # taken once the locks are held.
+        session.execute(
+            update(ImageBlob)
+            .where(ImageBlob.content_hash.in_(drifted))
+            .values(ref_count=image_count)
+            .execution_options(synchronize_session=False)
+        )
+    session.commit()
+    return len(drifted), page[-1] if len(page) == limit else None
+
+
+def blob_ref_counts(
+    session: Session, content_hashes: Collection[str]
+) -> dict[str, int]:
+    """Return the reference count of each of the given blobs that has a row."""
+    rows = session.execute(
+        select(ImageBlob.content_hash, ImageBlob.ref_count).where(
+            ImageBlob.content_hash.in_(sorted(content_hashes))
+        )
+    )
+    return dict(rows.tuples().all())
+
+
+def track_orphan_blobs(session: Session, content_hashes: Collection[str]) -> None:
+    """Create rows without references for blob files that have none. Commits.
+
+    The rows let :func:`delete_unreferenced_blobs` delete the files under the
+    same locking as blobs whose last image was deleted.
+    """
+    if not content_hashes:
+        return
+    session.execute(
+        _insert(session)(ImageBlob)
+        .values(
+            [
+                {"content_hash": content_hash, "ref_count": 0}
+                for content_hash in sorted(content_hashes)
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=[ImageBlob.content_hash])
+    )
+    session.commit()
+
+
+def unreferenced_blobs(
+    session: Session, created_before: datetime, limit: int
+) -> list[str]:
+    """Return up to ``limit`` blobs without references created before a time."""
+    return list(
+        session.scalars(
+            select(ImageBlob.content_hash)
+            .where(ImageBlob.ref_count <= 0, ImageBlob.created_at < created_before)
+            .order_by(ImageBlob.content_hash)
+            .limit(limit)
+        ).all()
+    )
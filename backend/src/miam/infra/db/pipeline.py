@@ -0,0 +1,34 @@
+"""Batched writes through psycopg 3 pipeline mode.
+
+In pipeline mode psycopg sends statements without waiting for each result and
+only syncs with the server when a result is needed (``RETURNING``, ``SELECT``)
+or the pipeline ends. Write paths that flush many independent ``INSERT``,
+``UPDATE`` and ``DELETE`` statements then pay one round trip per batch instead
+of one per statement. Other drivers, and psycopg's asyncio dialect (whose
+``pipeline()`` must be awaited), run the block unchanged.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+PIPELINE_DRIVER = "psycopg"
+
+
+@contextmanager
+def pipelined(session: Session) -> Iterator[None]:
+    """Run the block's statements in a psycopg 3 pipeline on the primary.
+
+    Flush inside the block so the queued statements are sent in the pipeline;
+    commit after it.
+    """
+    connection = session.connection()
+    dialect = connection.dialect
+    if dialect.driver != PIPELINE_DRIVER or dialect.is_async:
+        yield
+        return
+    driver_connection: Any = connection.connection.driver_connection
+    with driver_connection.pipeline():
+        yield
@@ -0,0 +1,113 @@
+"""Connection pool instrumentation.
+
+Both engines use a queue pool that records how long each checkout waited for a
+connection and how many checkouts timed out. :func:`pool_stats` combines these
+counters with the pool's own occupancy into gauges for the internal metrics
+endpoint, so ``QueuePool limit`` stalls can be diagnosed.
+"""
+
+import threading
+import time
+from typing import Any
+
+from sqlalchemy import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import (
+    AsyncAdaptedQueuePool,
+    ConnectionPoolEntry,
+    Pool,
+    PoolProxiedConnection,
+    QueuePool,
+)
+
+
+class PoolCounters:
+    """Cumulative checkout counters of one pool, updated from any thread."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_checkout(self, wait_seconds: float, *, timed_out: bool) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += wait_seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+    def record_connect(self) -> None:
+        with self._lock:
+            self.connects += 1
+
+
+class _InstrumentedPool(Pool):
+    """Times every checkout, including waits for a free slot and pre-ping."""
+
+    counters: PoolCounters
+
+    def connect(self) -> PoolProxiedConnection:
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except PoolTimeoutError:
+            self.counters.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        self.counters.record_checkout(time.perf_counter() - start, timed_out=False)
+        return conn
+
+    def _create_connection(self) -> ConnectionPoolEntry:
+        entry = super()._create_connection()
+        self.counters.record_connect()
+        return entry
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    """QueuePool with checkout counters."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.counters = PoolCounters()
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool with checkout counters."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.counters = PoolCounters()
+
+
+def pool_stats(engine: Engine) -> dict[str, float | int]:
+    """Snapshot the occupancy gauges and checkout counters of an engine's pool."""
+    pool = engine.pool
+    stats: dict[str, float | int] = {}
+    if isinstance(pool, QueuePool):
+        stats |= {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            # Negative while the pool has not yet opened `size` connections.
+            "overflow": max(pool.overflow(), 0),
+            "timeout_seconds": pool.timeout(),
+        }
+    counters = getattr(pool, "counters", None)
+    if isinstance(counters, PoolCounters):
+        with counters._lock:
+            total = counters.checkouts + counters.timeouts
+            stats |= {
+                "checkouts": counters.checkouts,
+                "timeouts": counters.timeouts,
+                "connects": counters.connects,
+                "wait_seconds_total": counters.wait_seconds_total,
+                "wait_seconds_max": counters.wait_seconds_max,
+                "wait_seconds_avg": counters.wait_seconds_total / total
+                if total
+                else 0.0,
+            }
+    return stats
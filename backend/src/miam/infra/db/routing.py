@@ -0,0 +1,63 @@
+"""Read-replica routing for repository sessions.
+
+Repository methods run their queries inside :func:`replica_reads` to send them
+to the replica engine; everything else, and every flush, goes to the primary. A
+session pinned with :func:`pin_to_primary` ignores the replica altogether: the
+API pins users for a few seconds after their own writes, so they always read
+what they just wrote.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+_REPLICA = "miam_replica_reads"
+_PINNED = "miam_pinned_to_primary"
+
+
+class RoutingSession(Session):
+    """Session that can route the reads of read-only repository methods to a replica."""
+
+    def __init__(self, *args: Any, replica: Engine | None = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.replica = replica
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kw: Any) -> Any:
+        if (
+            self.replica is not None
+            and self.info.get(_REPLICA)
+            and not self.info.get(_PINNED)
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+        ):
+            return self.replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def replica_available(session: Session) -> bool:
+    """Whether :func:`replica_reads` would actually reach a replica."""
+    return (
+        isinstance(session, RoutingSession)
+        and session.replica is not None
+        and not session.info.get(_PINNED)
+    )
+
+
+def pin_to_primary(session: Session) -> None:
+    """Send every query of this session to the primary."""
+    session.info[_PINNED] = True
+
+
+@contextmanager
+def replica_reads(session: Session) -> Iterator[None]:
+    """Route the session's reads to the replica, if any, for the block."""
+    previous = session.info.get(_REPLICA, False)
+    session.info[_REPLICA] = True
+    try:
+        yield
+    finally:
+        session.info[_REPLICA] = previous
@@ -0,0 +1,78 @@
+"""Disk folders kept within a size budget by deleting least recently used files.
+
+Files live one level below the folder, in shard directories. Every use
+refreshes a file's modification time; when the folder outgrows its budget the
+files with the oldest modification times are deleted. Each worker keeps its
+own running total of the folder size and rescans the folder when it evicts, so
+workers sharing the folder stay close to the budget without coordinating.
+Names starting with a dot are temporary files being written, and left alone.
+"""
+
+import os
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+from loguru import logger
+
+# Eviction frees a little more than needed so it does not run on every miss.
+_EVICT_TO_RATIO = 0.9
+
+
+class LruFolder:
+    """Size accounting and eviction for a folder of cached files."""
+
+    def __init__(self, folder: Path, max_bytes: int, description: str) -> None:
+        """Manage ``folder``, holding at most about ``max_bytes``.
+
+        ``description`` names the cached files in log messages.
+        """
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.description = description
+        self._lock = threading.Lock()
+        self._total_bytes: int | None = None  # scanned on first write
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def touch(path: Path) -> bool:
+        """Mark a cached file as recently used. Returns False if it does not exist."""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _entries(self) -> Iterator[tuple[Path, os.stat_result]]:
+        for shard in os.scandir(self.folder):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.is_file() and not entry.name.startswith("."):
+                    yield Path(entry.path), entry.stat()
+
+    def record(self, size: int) -> None:
+        """Account for a new file of ``size`` bytes, evicting if over budget."""
+        with self._lock:
+            if self._total_bytes is None:
+                # The scan already includes the new file.
+                self._total_bytes = sum(st.st_size for _, st in self._entries())
+            else:
+                self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._total_bytes = self._evict()
+
+    def _evict(self) -> int:
+        """Delete least recently used files down to the target size; return the total."""
+        entries = sorted(self._entries(), key=lambda e: e[1].st_mtime_ns)
+        total = sum(st.st_size for _, st in entries)
+        target = self.max_bytes * _EVICT_TO_RATIO
+        evicted = 0
+        for path, st in entries:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= st.st_size
+            evicted += 1
+        logger.info(f"Evicted {evicted} {self.description}, cache now {total} bytes")
+        return total
@@ -1,8 +1,9 @@
 """Handles exporting recipes to Markdown format."""
 
-import io
 import mimetypes
+import time
 import zipfile
+from collections.abc import Iterator
 from pathlib import Path
 
 from loguru import logger
@@ -10,6 +11,37 @@ from loguru import logger
 from miam.domain.entities import RecipeEntity
 from miam.domain.ports_secondary import ImageStoragePort, MarkdownExporterPort
 
+# Formats compressed already: deflating them again costs CPU for a few bytes.
+_COMPRESSED_MEDIA_TYPES = frozenset(
+    {"image/jpeg", "image/png", "image/webp", "image/gif"}
+)
+_CHUNK_BYTES = 64 * 1024
+
+
+class _ChunkSink:
+    """Unseekable file collecting what a ZipFile writes, until drained.
+
+    ZipFile then writes each entry in one pass, followed by its size and CRC.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
 
 class MarkdownExporter(MarkdownExporterPort):
     """Secondary adapter that implements MarkdownExporterPort."""
@@ -28,7 +60,8 @@ class MarkdownExporter(MarkdownExporterPort):
             recipe: the recipe entity to render.
             image_filenames: mapping of image ID -> filename in the ZIP
                              (e.g. "uuid.png"). When provided, image references
-                             use ``images/{filename}``; otherwise bare UUIDs.
+                             use ``images/{filename}`` and images missing from
+                             it are left out; otherwise bare UUIDs.
         """
 
         def _table(headers: list[str], values: list[str]) -> list[str]:
@@ -84,16 +117,16 @@ class MarkdownExporter(MarkdownExporterPort):
             for i, step in enumerate(recipe.preparation, 1):
                 lines.append(f"{i}. {step}")
 
-        if recipe.images:
+        image_lines = []
+        for img in sorted(recipe.images, key=lambda img: img.display_order):
+            caption = img.caption or "Image"
+            if image_filenames is None:
+                image_lines.append(f"![{caption}]({img.id})")
+            elif (filename := image_filenames.get(str(img.id))) is not None:
+                image_lines.append(f"![{caption}](images/{filename})")
+        if image_lines:
             lines.append("\n## Images")
-            sorted_images = sorted(recipe.images, key=lambda img: img.display_order)
-            for img in sorted_images:
-                caption = img.caption or "Image"
-                img_id_str = str(img.id)
-                if image_filenames and img_id_str in image_filenames:
-                    lines.append(f"![{caption}](images/{image_filenames[img_id_str]})")
-                else:
-                    lines.append(f"![{caption}]({img.id})")
+            lines.extend(image_lines)
 
         if recipe.sources:
             lines.append("\n## Sources")
@@ -107,45 +140,80 @@ class MarkdownExporter(MarkdownExporterPort):
         """Convert a list of RecipeEntity objects to a Markdown string."""
         return "\n".join(self._recipe_md(r) for r in recipes)
 
-    def to_zip_bytes(self, recipes: list[RecipeEntity]) -> bytes:
-        """Create a ZIP archive containing the Markdown file and image files."""
-        # First pass: collect image bytes and resolve filenames (id + extension)
-        image_filenames: dict[str, str] = {}  # image_id -> "uuid.ext"
-        image_data: dict[str, bytes] = {}  # "uuid.ext" -> raw bytes
-
-        if self.image_storage:
-            seen_ids: set[str] = set()
-            for recipe in recipes:
-                for img in recipe.images:
-                    img_id_str = str(img.id)
-                    if img_id_str in seen_ids:
-                        continue
-                    seen_ids.add(img_id_str)
+    def to_zip_stream(self, recipes: list[RecipeEntity]) -> Iterator[bytes]:
+        """Stream a ZIP archive containing the image files and the Markdown file.
+
+        The archive is produced chunk by chunk as it is written, and each image
+        is located and copied from storage in chunks just before its entry is
+        written, so memory use does not grow with the library. The Markdown
+        file comes last and links only the images actually included.
+        """
+        sink = _ChunkSink()
+        image_filenames: dict[str, str] | None = None
+        with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as zf:
+            if self.image_storage is not None:
+                image_filenames = {}
+                yield from self._write_images(
+                    zf, sink, self.image_storage, recipes, image_filenames
+                )
+            md_content = "\n".join(
+                self._recipe_md(r, image_filenames=image_filenames) for r in recipes
+            )
+            zf.writestr("recipes.md", md_content)
+        yield sink.drain()
+
+    @staticmethod
+    def _write_images(
+        zf: zipfile.ZipFile,
+        sink: _ChunkSink,
+        image_storage: ImageStoragePort,
+        recipes: list[RecipeEntity],
+        image_filenames: dict[str, str],
+    ) -> Iterator[bytes]:
+        """Write the file of every image to ``zf``, yielding what ``sink`` gets.
+
+        Fills ``image_filenames`` with the filename in the archive of each
+        included image ID. Images sharing their content (same hash) share one
+        entry of the archive.
+        """
+        # content hash or image_id -> "sha256.ext" / "uuid.ext", None if skipped
+        stored_as: dict[str, str | None] = {}
+        for recipe in recipes:
+            for img in recipe.images:
+                img_id_str = str(img.id)
+                stem = img.content_hash or img_id_str
+                if stem not in stored_as:
+                    stored_as[stem] = None
                     try:
-                        resp = self.image_storage.get_recipe_image(img.id)
-                        if resp is None:
+                        resolved = image_storage.get_recipe_image_path(
+                            img.id, img.extension, img.content_hash
+                        )
+                        if resolved is None:
                             continue
-                        ext = mimetypes.guess_extension(resp.media_type) or ""
-                        filename = f"{img.id}{ext}"
-                        image_filenames[img_id_str] = filename
-                        image_data[filename] = resp.content
+                        path, media_type = resolved
+                        source = path.open("rb")
                     except Exception:
                         logger.warning(
                             f"Failed to include image {img.id} in ZIP, skipping"
                         )
-
-        # Second pass: build the ZIP with correct image references in markdown
-        buf = io.BytesIO()
-        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
-            md_content = "\n".join(
-                self._recipe_md(r, image_filenames=image_filenames) for r in recipes
-            )
-            zf.writestr("recipes.md", md_content)
-
-            for filename, content in image_data.items():
-                zf.writestr(f"images/{filename}", content)
-
-        return buf.getvalue()
+                        continue
+                    media_type = img.media_type or media_type
+                    filename = f"{stem}{mimetypes.guess_extension(media_type) or ''}"
+                    info = zipfile.ZipInfo(
+                        f"images/{filename}", date_time=time.localtime()[:6]
+                    )
+                    if media_type in _COMPRESSED_MEDIA_TYPES:
+                        info.compress_type = zipfile.ZIP_STORED
+                    else:
+                        info.compress_type = zipfile.ZIP_DEFLATED
+                    with source, zf.open(info, "w") as entry:
+                        while chunk := source.read(_CHUNK_BYTES):
+                            entry.write(chunk)
+                            if data := sink.drain():
+                                yield data
+                    stored_as[stem] = filename
+                if (included := stored_as[stem]) is not None:
+                    image_filenames[img_id_str] = included
 
     def save(self, recipes: list[RecipeEntity], output_file: str) -> None:
         """Export a list of RecipeEntity objects to a Markdown file."""
@@ -1,7 +1,7 @@
 """Handles exporting recipes to Word format."""
 
 import io
-from typing import Any
+from typing import IO, Any
 
 from docx import Document
 from docx.document import Document as DocxDocument  # actual type
@@ -9,8 +9,17 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.shared import Inches, Pt
 from loguru import logger
 
-from miam.domain.entities import RecipeEntity
-from miam.domain.ports_secondary import ImageStoragePort, WordExporterPort
+from miam.domain.entities import ImageEntity, RecipeEntity
+from miam.domain.ports_secondary import (
+    ImageStoragePort,
+    ImageVariantPort,
+    WordExporterPort,
+)
+
+# Pictures are 5 inches wide: 1280 px prints at about 250 dpi.
+_PICTURE_WIDTH_PX = 1280
+# Formats Word can embed; others (WebP) are converted to JPEG.
+_EMBEDDABLE_MEDIA_TYPES = {"image/jpeg", "image/png", "image/gif"}
 
 
 class WordExporter(WordExporterPort):
@@ -20,9 +29,11 @@ class WordExporter(WordExporterPort):
         self,
         title: str = "My Recipe Book",
         image_storage: ImageStoragePort | None = None,
+        image_variants: ImageVariantPort | None = None,
     ):
         self.title = title  # Store title, not document
         self.image_storage = image_storage
+        self.image_variants = image_variants
 
     def _create_fresh_document(self) -> DocxDocument:
         """Create a fresh document with title and styles."""
@@ -72,10 +83,9 @@ class WordExporter(WordExporterPort):
             sorted_images = sorted(recipe.images, key=lambda img: img.display_order)
             for image in sorted_images:
                 try:
-                    resp = self.image_storage.get_recipe_image(image.id)
-                    if resp is None:
+                    image_stream = self._picture(self.image_storage, image)
+                    if image_stream is None:
                         continue
-                    image_stream = io.BytesIO(resp.content)
                     self.document.add_picture(image_stream, width=Inches(5))
                     if image.caption:
                         caption_p = self.document.add_paragraph(image.caption)
@@ -123,6 +133,34 @@ class WordExporter(WordExporterPort):
             for i, step in enumerate(recipe.preparation, 1):
                 self.document.add_paragraph(f"{i}. {step}")
 
+    def _picture(
+        self, storage: ImageStoragePort, image: ImageEntity
+    ) -> IO[bytes] | None:
+        """Load an image to embed, downsized to the printed size when possible."""
+        if self.image_variants is None:
+            resp = storage.get_recipe_image(
+                image.id, image.extension, image.content_hash
+            )
+            return None if resp is None else io.BytesIO(resp.content)
+        # A local copy of an S3 image may be evicted before it is read: it is
+        # fetched again once.
+        for _ in range(2):
+            resolved = storage.get_recipe_image_path(
+                image.id, image.extension, image.content_hash
+            )
+            if resolved is None:
+                return None
+            path, media_type = resolved
+            image_format = None if media_type in _EMBEDDABLE_MEDIA_TYPES else "jpeg"
+            try:
+                variant = self.image_variants.get_variant(
+                    path, _PICTURE_WIDTH_PX, image_format
+                )
+                return io.BytesIO(variant.path.read_bytes())
+            except FileNotFoundError:
+                continue
+        return None
+
     def _add_times_table(self, recipe: RecipeEntity) -> None:
         table = self.document.add_table(rows=1, cols=3)
         table.style = "Light Grid Accent 1"
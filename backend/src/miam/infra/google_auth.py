@@ -5,6 +5,7 @@ from google.oauth2 import id_token
 
 from miam.domain.entities import GoogleUserInfo
 from miam.domain.ports_secondary import GoogleTokenVerifierPort
+from miam.infra.blocking import run_blocking
 
 
 class GoogleTokenVerifier(GoogleTokenVerifierPort):
@@ -14,10 +15,15 @@ class GoogleTokenVerifier(GoogleTokenVerifierPort):
         self._client_id = client_id
 
     def verify(self, token: str) -> GoogleUserInfo:
-        """Verify a Google ID token and return user info."""
+        """Verify a Google ID token and return user info.
+
+        Fetching Google's certificates is network I/O, done off the event loop.
+        """
         try:
-            idinfo = id_token.verify_oauth2_token(  # type: ignore[no-untyped-call]
-                token, requests.Request(), self._client_id
+            idinfo = run_blocking(
+                lambda: id_token.verify_oauth2_token(  # type: ignore[no-untyped-call]
+                    token, requests.Request(), self._client_id
+                )
             )
         except ValueError as exc:
             raise ValueError(f"Invalid Google token: {exc}") from exc
@@ -0,0 +1,218 @@
+"""Background reconciliation of stored image files with the database.
+
+Requests delete image files as they delete images, but some files still leak:
+a worker dying between the commit and the file deletion, a failed storage
+call, or database cascades (deleting a user deletes their recipes and images
+without releasing blob references). :class:`ImageGarbageCollector` sweeps
+storage periodically, in a thread of its own, and:
+
+1. Recounts the references of blobs, whose count cascades leave too high.
+2. Deletes blob files that no image uses, through
+   :func:`~miam.infra.db.blobs.delete_unreferenced_blobs`, which upload
+   requests already synchronize with.
+3. Deletes files named after an image ID whose image no longer exists.
+
+Files are only deleted once older than the grace period, so that a file
+written by an upload whose transaction has not committed yet is left alone.
+Every step works in batches and commits between them, keeping locks short.
+Sweeping concurrently from several workers is safe, only redundant.
+"""
+
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from itertools import islice
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from miam.domain.entities import StoredFile
+from miam.domain.ports_secondary import ImageStoragePort
+from miam.infra.db.base import Image
+from miam.infra.db.blobs import (
+    blob_ref_counts,
+    delete_unreferenced_blobs,
+    recount_blob_refs,
+    track_orphan_blobs,
+    unreferenced_blobs,
+)
+
+
+@dataclass
+class ImageGcReport:
+    """Outcome of a sweep.
+
+    ``reclaimable_bytes`` is the size of every orphaned file found, including
+    those still in their grace period; ``freed_bytes`` the part deleted.
+    ``deleted_blob_rows`` counts blob rows without references whose file was
+    not found by the listing.
+    """
+
+    started_at: datetime
+    finished_at: datetime | None = None
+    scanned_files: int = 0
+    orphaned_files: int = 0
+    reclaimable_bytes: int = 0
+    deleted_files: int = 0
+    freed_bytes: int = 0
+    recounted_blobs: int = 0
+    deleted_blob_rows: int = 0
+
+
+def _batches(files: Iterable[StoredFile], size: int) -> Iterator[list[StoredFile]]:
+    iterator = iter(files)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class ImageGarbageCollector:
+    """Deletes stored image files that no image references anymore."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        storage: ImageStoragePort,
+        grace_seconds: float = 24 * 3600,
+        batch_size: int = 500,
+        interval_seconds: float = 0,
+    ) -> None:
+        """Sweep ``storage`` against the database of ``session_factory``.
+
+        Orphaned files are deleted once older than ``grace_seconds``. The
+        background thread sweeps every ``interval_seconds`` (never when 0).
+        """
+        if batch_size <= 0:
+            raise ValueError("The batch size must be positive")
+        self.session_factory = session_factory
+        self.storage = storage
+        self.grace_seconds = grace_seconds
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.last_report: ImageGcReport | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # --- sweeping ---------------------------------------------------------
+
+    def sweep(self, now: float | None = None) -> ImageGcReport:
+        """Reconcile storage with the database once, and return what was done."""
+        now = time.time() if now is None else now
+        cutoff = now - self.grace_seconds
+        report = ImageGcReport(started_at=datetime.fromtimestamp(now, UTC))
+        with self.session_factory() as session:
+            after: str | None = ""
+            while after is not None:
+                recounted, after = recount_blob_refs(session, after, self.batch_size)
+                report.recounted_blobs += recounted
+            for batch in _batches(self.storage.list_files(), self.batch_size):
+                if self._stop.is_set():
+                    logger.info("Image sweep interrupted")
+                    return report
+                report.scanned_files += len(batch)
+                blobs = [(f.content_hash, f) for f in batch if f.content_hash]
+                self._sweep_blobs(session, blobs, cutoff, report)
+                image_files = [(f.image_id, f) for f in batch if f.image_id]
+                self._sweep_image_files(session, image_files, cutoff, report)
+            created_before = datetime.fromtimestamp(cutoff, UTC)
+            while hashes := unreferenced_blobs(
+                session, created_before, self.batch_size
+            ):
+                deleted = delete_unreferenced_blobs(
+                    session, hashes, self.storage.delete_blob
+                )
+                report.deleted_blob_rows += len(deleted)
+                if len(hashes) < self.batch_size:
+                    break
+        report.finished_at = datetime.now(UTC)
+        self.last_report = report
+        logger.info(
+            f"Image sweep: {report.orphaned_files} orphaned files "
+            f"({report.reclaimable_bytes} bytes), {report.deleted_files} deleted "
+            f"({report.freed_bytes} bytes), {report.recounted_blobs} blobs recounted"
+        )
+        return report
+
+    def _sweep_blobs(
+        self,
+        session: Session,
+        files: list[tuple[str, StoredFile]],
+        cutoff: float,
+        report: ImageGcReport,
+    ) -> None:
+        if not files:
+            return
+        ref_counts = blob_ref_counts(session, {h for h, _ in files})
+        session.commit()
+        expired: dict[str, int] = {}  # content hash -> bytes of its files
+        for content_hash, file in files:
+            if ref_counts.get(content_hash, 0) > 0:
+                continue
+            report.orphaned_files += 1
+            report.reclaimable_bytes += file.size
+            if file.modified_at < cutoff:
+                expired[content_hash] = expired.get(content_hash, 0) + file.size
+        if not expired:
+            return
+        track_orphan_blobs(session, expired.keys() - ref_counts.keys())
+        for content_hash in delete_unreferenced_blobs(
+            session, expired, self.storage.delete_blob
+        ):
+            report.deleted_files += 1
+            report.freed_bytes += expired[content_hash]
+
+    def _sweep_image_files(
+        self,
+        session: Session,
+        files: list[tuple[UUID, StoredFile]],
+        cutoff: float,
+        report: ImageGcReport,
+    ) -> None:
+        if not files:
+            return
+        existing = set(
+            session.scalars(
+                select(Image.id).where(Image.id.in_({i for i, _ in files}))
+            ).all()
+        )
+        session.commit()
+        for image_id, file in files:
+            if image_id in existing:
+                continue
+            report.orphaned_files += 1
+            report.reclaimable_bytes += file.size
+            if file.modified_at < cutoff and self.storage.delete_image(
+                image_id, file.extension
+            ):
+                report.deleted_files += 1
+                report.freed_bytes += file.size
+
+    # --- background thread --------------------------------------------------
+
+    def start(self) -> None:
+        """Start sweeping in a background thread (no-op without an interval)."""
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._sweep_forever, name="image-gc", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread, waiting for the current batch at most."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _sweep_forever(self) -> None:
+        # The first sweep waits an interval too: workers start together.
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.sweep()
+            except Exception as exc:
+                logger.warning(f"Image sweep failed: {exc}")
@@ -0,0 +1,195 @@
+"""Normalization of uploaded images before they are stored.
+
+Phone photos arrive as 4-5 MB JPEGs of 12+ megapixels, carrying EXIF metadata
+(GPS position, camera serial number) and often a rotation flag instead of
+rotated pixels. Each upload is decoded, rotated upright, shrunk to fit
+``max_dimension`` and re-encoded without metadata, which divides its size
+several-fold for storage, serving and exports alike.
+
+Images with transparency stay PNG (or become WebP), animated GIFs are kept as
+they are, and an image already upright, small enough and free of metadata is
+kept when re-encoding would not make it smaller. Encoding is deterministic, so
+identical uploads still share one stored blob.
+
+Each upload also gets a placeholder: a JPEG of a few pixels, as a data URI,
+that clients stretch and blur while the image loads.
+
+Decoding and encoding run in a thread pool: Pillow releases the GIL while it
+works, so the images of a batch upload are processed in parallel. Originals
+are read from their file and re-encoded images are spooled to temporary files,
+so memory use does not grow with the batch.
+"""
+
+import base64
+import io
+import tempfile
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import replace
+from pathlib import Path
+from typing import IO
+
+from loguru import logger
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from miam.domain.entities import ImageUpload
+from miam.domain.ports_secondary import ImageNormalizerPort
+from miam.infra.blocking import run_blocking
+from miam.infra.image_storage import check_image_extension
+
+# format -> (Pillow format, extension, encoder options besides the quality)
+_FORMATS: dict[str, tuple[str, str, dict[str, object]]] = {
+    "jpeg": ("JPEG", ".jpg", {"progressive": True, "optimize": True}),
+    "webp": ("WEBP", ".webp", {"method": 4}),
+    "png": ("PNG", ".png", {"optimize": True}),
+}
+_ORIENTATION_TAG = 0x0112
+# Longest side and quality of placeholders: about 500 bytes once encoded.
+_PLACEHOLDER_SIZE = 16
+_PLACEHOLDER_QUALITY = 60
+# Re-encoded images larger than this are spooled to disk, so a batch of uploads
+# is never held in memory as a whole.
+_SPOOL_MAX_BYTES = 1024 * 1024
+
+
+class _TooManyPixelsError(Exception):
+    pass
+
+
+def _open(content: bytes | IO[bytes]) -> IO[bytes]:
+    return io.BytesIO(content) if isinstance(content, bytes) else content
+
+
+def _placeholder(image: Image.Image) -> str:
+    """Return a data URI of ``image`` shrunk to a few pixels, for a blurred preview."""
+    scale = _PLACEHOLDER_SIZE / max(image.size)
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    small = image.resize(size, Image.Resampling.BOX)
+    if small.mode != "RGB":
+        rgba = small.convert("RGBA")
+        small = Image.new("RGB", rgba.size, "white")
+        small.paste(rgba, mask=rgba.getchannel("A"))
+    buffer = io.BytesIO()
+    small.save(buffer, "JPEG", quality=_PLACEHOLDER_QUALITY, optimize=True)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+
+class PillowImageNormalizer(ImageNormalizerPort):
+    """Secondary adapter that implements ImageNormalizerPort with Pillow."""
+
+    def __init__(
+        self,
+        max_dimension: int = 2560,
+        image_format: str = "jpeg",
+        quality: int = 82,
+        workers: int = 2,
+        reencode: bool = True,
+        max_pixels: int = 50_000_000,
+    ) -> None:
+        """Encode to ``image_format`` (``"jpeg"`` or ``"webp"``) at ``quality``.
+
+        Images are shrunk to fit ``max_dimension`` pixels on their longest side,
+        by ``workers`` threads at most. Without ``reencode``, uploads are kept
+        as they are and only get their placeholder. Images of more than
+        ``max_pixels`` pixels are rejected before they are decoded: a few MB of
+        PNG or GIF can expand to gigabytes of pixels.
+        """
+        if image_format not in ("jpeg", "webp"):
+            raise ValueError(f"Unsupported image format '{image_format}'")
+        self.max_dimension = max_dimension
+        self.image_format = image_format
+        self.quality = quality
+        self.reencode = reencode
+        self.max_pixels = max_pixels
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="image-normalize")
+
+    def normalize(self, uploads: list[ImageUpload]) -> list[ImageUpload | str]:
+        """Normalize the uploads in the pool, waiting off the event loop."""
+        futures: list[Future[ImageUpload | str]] = [
+            self._pool.submit(self._normalize_one, upload) for upload in uploads
+        ]
+        run_blocking(lambda: wait(futures))
+        return [future.result() for future in futures]
+
+    def _normalize_one(self, upload: ImageUpload) -> ImageUpload | str:
+        try:
+            check_image_extension(upload.filename)
+        except ValueError as exc:
+            return str(exc)
+        # Pillow reads the original from its file: an image kept as is is
+        # never loaded in memory as a whole, and goes on to storage as a file.
+        source = _open(upload.content)
+        original_size = source.seek(0, io.SEEK_END)
+        source.seek(0)
+        try:
+            encoded, placeholder = self._process(source, original_size)
+        except _TooManyPixelsError as exc:
+            return str(exc)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+            logger.warning(f"Cannot decode uploaded image {upload.filename}: {exc}")
+            if self.reencode:
+                return "Image cannot be decoded"
+            return upload
+        finally:
+            source.seek(0)
+        if encoded is None:
+            return replace(upload, placeholder=placeholder)
+        content, size, extension = encoded
+        logger.debug(f"Normalized {upload.filename}: {original_size} -> {size} bytes")
+        return replace(
+            upload,
+            content=content,
+            filename=Path(upload.filename).stem + extension,
+            placeholder=placeholder,
+        )
+
+    def _process(
+        self, source: IO[bytes], original_size: int
+    ) -> tuple[tuple[IO[bytes], int, str] | None, str]:
+        """Return the normalized file, its size and extension, and the placeholder.
+
+        The file, rewound, is held in memory up to ``_SPOOL_MAX_BYTES`` and on
+        disk beyond. It is None when the original should be kept.
+        """
+        with Image.open(source) as img:
+            # Only the header is read so far.
+            if img.width * img.height > self.max_pixels:
+                raise _TooManyPixelsError(
+                    f"Image too large ({img.width}x{img.height} pixels, max "
+                    f"{self.max_pixels / 1_000_000:g} megapixels)"
+                )
+            reencode = self.reencode and not getattr(img, "is_animated", False)
+            source_format = (img.format or "").lower()
+            has_metadata = bool(img.info.get("exif")) or any(
+                key in img.info for key in ("xmp", "XML:com.adobe.xmp", "comment")
+            )
+            upright = img.getexif().get(_ORIENTATION_TAG, 1) == 1
+            icc_profile = img.info.get("icc_profile")
+            oversized = max(img.size) > self.max_dimension
+            target = self.max_dimension if reencode else _PLACEHOLDER_SIZE
+            # JPEG only: decode at the smallest 1/2, 1/4 or 1/8 scale that
+            # keeps both sides above the target.
+            img.draft(img.mode, (target, target))
+            image = ImageOps.exif_transpose(img)
+            image.thumbnail((target, target))
+            placeholder = _placeholder(image)
+            if not reencode:
+                return None, placeholder
+            image_format = self.image_format
+            if image.has_transparency_data and image_format == "jpeg":
+                image_format = "png"
+            if image.mode not in ("RGB", "RGBA", "L", "LA"):
+                image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+            if image_format == "jpeg" and image.mode == "LA":
+                image = image.convert("L")
+            pil_format, extension, options = _FORMATS[image_format]
+            if image_format != "png":
+                options = {**options, "quality": self.quality}
+            output = tempfile.SpooledTemporaryFile(max_size=_SPOOL_MAX_BYTES)
+            image.save(output, pil_format, icc_profile=icc_profile, **options)
+        size = output.tell()
+        unchanged = upright and not oversized and not has_metadata
+        if unchanged and size >= original_size and source_format in _FORMATS:
+            output.close()
+            return None, placeholder
+        output.seek(0)
+        return (output, size, extension), placeholder
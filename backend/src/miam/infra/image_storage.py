@@ -1,15 +1,116 @@
-"""Handles storing images (local or remote file storage)."""
+"""Handles storing images (local or remote file storage).
 
+Images are content-addressed: their bytes are stored once, at
+``{base}/blobs/{aa}/{bb}/{sha256}{ext}`` where ``aabb`` are the first hex digits
+of the SHA-256 of the content. Uploading the same photo to several recipes, or
+importing the same post again, costs no extra disk; the ``image_blobs`` table
+counts the references and the last one deletes the file.
+
+Files stored before content addressing are named after the image ID, at
+``{base}/{aa}/{bb}/{image_id}{ext}`` (``aabb`` from the SHA-256 of the ID), or
+directly in ``{base}`` for the former flat layout, which is searched until
+:meth:`LocalImageStorage.relayout` moves them. A file whose extension is known
+is found with a single ``stat``.
+"""
+
+import hashlib
 import mimetypes
+import os
+import shutil
+from collections.abc import Iterator
+from functools import partial
 from pathlib import Path
-from uuid import UUID
+from typing import IO, Any
+from uuid import UUID, uuid4
 
 from loguru import logger
 
+from miam.domain.entities import StoredFile
 from miam.domain.ports_secondary import ImageStoragePort
 from miam.domain.schemas import ImageResponse
+from miam.infra.blocking import run_blocking
 
 ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif"}
+_COPY_CHUNK_BYTES = 64 * 1024
+
+
+def check_image_extension(filename: str) -> str:
+    """Return the lowercased extension of ``filename`` if it is an allowed image type.
+
+    Raises:
+        ValueError: If the extension is not an allowed image type.
+    """
+    ext = Path(filename).suffix.lower()
+    if ext not in ALLOWED_IMAGE_EXTENSIONS:
+        raise ValueError(
+            f"Unsupported image type '{ext}'. Allowed: {', '.join(sorted(ALLOWED_IMAGE_EXTENSIONS))}"
+        )
+    return ext
+
+
+def blob_key(content_hash: str, extension: str) -> str:
+    """Return the path of a blob relative to the storage root."""
+    return f"blobs/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{extension}"
+
+
+def image_shard(image_id: UUID) -> str:
+    """Return the shard directory of a file named after an image ID."""
+    digest = hashlib.sha256(image_id.bytes).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}"
+
+
+def parse_storage_key(key: str) -> tuple[str | None, UUID | None, str] | None:
+    """Parse a storage key into ``(content_hash, image_id, extension)``.
+
+    Exactly one of ``content_hash`` (blobs) and ``image_id`` (files named after
+    their image) is set. Returns None for keys of any other layout.
+    """
+    parts = key.split("/")
+    is_blob = parts[0] == "blobs"
+    if is_blob:
+        parts = parts[1:]
+    if len(parts) != 3 or parts[2].startswith("."):
+        return None
+    stem, extension = os.path.splitext(parts[2])
+    if is_blob:
+        if len(stem) != 64 or stem[:4] != parts[0] + parts[1]:
+            return None
+        return stem, None, extension
+    try:
+        return None, UUID(stem), extension
+    except ValueError:
+        return None
+
+
+def _write_hashed(path: Path, image: bytes | IO[bytes], hasher: Any) -> None:
+    """Write ``image`` to ``path``, feeding every chunk to ``hasher`` as it goes."""
+    with open(path, "wb") as f:
+        if isinstance(image, bytes):
+            hasher.update(image)
+            f.write(image)
+            return
+        while chunk := image.read(_COPY_CHUNK_BYTES):
+            hasher.update(chunk)
+            f.write(chunk)
+
+
+def _scan_depth(folder: Path, depth: int) -> Iterator[os.DirEntry[str]]:
+    """Yield the files exactly ``depth`` levels below ``folder`` (1: its own files)."""
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if depth == 1:
+            if entry.is_file():
+                yield entry
+        elif entry.is_dir() and entry.name != "blobs":
+            yield from _scan_depth(Path(entry.path), depth - 1)
+
+
+def _hash_file(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
 
 
 class LocalImageStorage(ImageStoragePort):
@@ -26,54 +127,141 @@ class LocalImageStorage(ImageStoragePort):
             raise
 
     def add_recipe_image(
-        self,
-        recipe_id: UUID,
-        image: bytes,
-        filename: str,
-        image_id: UUID,
-    ) -> UUID:
-        """Save image to local filesystem using predictable path {image_id}{ext}."""
+        self, recipe_id: UUID, image: bytes | IO[bytes], filename: str
+    ) -> str:
+        """Save image content under its SHA-256, unless already stored.
+
+        The content goes to a temporary file first, hashed in chunks as it is
+        written, off the event loop when called from it; the file then becomes
+        the blob, or is dropped if the blob exists.
+        """
+        ext = check_image_extension(filename)
+        tmp_path = self.base_folder / f".upload-{uuid4().hex}.tmp"
+        hasher = hashlib.sha256()
         try:
-            self.base_folder.mkdir(parents=True, exist_ok=True)
-            ext = Path(filename).suffix.lower()
-            if ext not in ALLOWED_IMAGE_EXTENSIONS:
-                raise ValueError(
-                    f"Unsupported image type '{ext}'. Allowed: {', '.join(sorted(ALLOWED_IMAGE_EXTENSIONS))}"
+            run_blocking(partial(_write_hashed, tmp_path, image, hasher))
+            content_hash = hasher.hexdigest()
+            blob_path = self.blob_path(content_hash, ext)
+            if blob_path.is_file():
+                tmp_path.unlink()
+                logger.info(
+                    f"Image for recipe {recipe_id} already stored at {blob_path}"
                 )
-            image_path = self.base_folder / f"{image_id}{ext}"
-            with open(image_path, "wb") as f:
-                f.write(image)
-            logger.info(f"Saved image for recipe {recipe_id} at {image_path}")
-            return image_id
+            else:
+                blob_path.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, blob_path)
+                logger.info(f"Saved image for recipe {recipe_id} at {blob_path}")
+            return content_hash
         except Exception as exc:  # pragma: no cover - defensive logging
-            logger.error(
-                f"Failed to save image for recipe {recipe_id} at {image_path}: {exc}"
-            )
+            tmp_path.unlink(missing_ok=True)
+            logger.error(f"Failed to save image for recipe {recipe_id}: {exc}")
             raise
 
-    def _find_image(self, image_id: UUID) -> Path | None:
-        """Find image file by ID using glob instead of full directory scan."""
-        matches = list(self.base_folder.glob(f"{image_id}.*"))
-        if matches:
-            return matches[0]
+    def blob_path(self, content_hash: str, extension: str) -> Path:
+        """Return where content with this hash and extension is stored."""
+        return self.base_folder / blob_key(content_hash, extension)
+
+    def blob_exists(self, content_hash: str, extension: str) -> bool:
+        """Return whether content with this hash and extension is stored."""
+        return self.blob_path(content_hash, extension).is_file()
+
+    def _shard(self, image_id: UUID) -> Path:
+        return self.base_folder / image_shard(image_id)
+
+    def image_path(self, image_id: UUID, extension: str) -> Path:
+        """Return where the file of an image with this extension is stored."""
+        return self._shard(image_id) / f"{image_id}{extension}"
+
+    def _find_image(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> Path | None:
+        """Find an image file: a single stat when the extension is known."""
+        if content_hash is not None:
+            if extension is not None:
+                path = self.blob_path(content_hash, extension)
+                return path if path.is_file() else None
+            matches = list(
+                self.blob_path(content_hash, "").parent.glob(f"{content_hash}.*")
+            )
+            return matches[0] if matches else None
+        if extension is not None:
+            path = self.image_path(image_id, extension)
+            if path.is_file():
+                return path
+        # Legacy rows without an extension, or files not yet moved by relayout().
+        for folder in (self._shard(image_id), self.base_folder):
+            matches = list(folder.glob(f"{image_id}.*"))
+            if matches:
+                return matches[0]
         # Fallback: file with no extension
         exact = self.base_folder / str(image_id)
         if exact.is_file():
             return exact
         return None
 
-    def get_recipe_image(self, image_id: UUID) -> ImageResponse | None:
+    def relayout(self) -> Iterator[tuple[UUID, str]]:
+        """Move files of the flat layout into their shard directory.
+
+        Yields the ID and extension of every moved image, so callers can record
+        them on the image rows. Files not named after an image ID are left alone.
+        """
+        for entry in os.scandir(self.base_folder):
+            if not entry.is_file():
+                continue
+            stem, ext = os.path.splitext(entry.name)
+            try:
+                image_id = UUID(stem)
+            except ValueError:
+                continue
+            target = self.image_path(image_id, ext.lower())
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(entry.path, target)
+            yield image_id, ext.lower()
+
+    def adopt_legacy_image(self, image_id: UUID, extension: str | None) -> str | None:
+        """Store the file of an image named after its ID as a blob too.
+
+        Returns the content hash, or ``None`` if there is no such file. The file
+        itself is left in place: delete it with :meth:`delete_image` once the
+        image row points at the blob.
+        """
+        file = self._find_image(image_id, extension)
+        if file is None:
+            return None
+        content_hash = _hash_file(file)
+        blob_path = self.blob_path(content_hash, file.suffix.lower())
+        if not blob_path.is_file():
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob_path.with_name(f".{blob_path.name}.tmp")
+            shutil.copyfile(file, tmp_path)
+            os.replace(tmp_path, blob_path)
+        return content_hash
+
+    def get_recipe_image(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> ImageResponse | None:
         """Retrieve image bytes from storage by image ID."""
-        resolved = self.get_recipe_image_path(image_id)
+        resolved = self.get_recipe_image_path(image_id, extension, content_hash)
         if resolved is None:
             return None
         file, media_type = resolved
         with open(file, "rb") as f:
             return ImageResponse(content=f.read(), media_type=media_type)
 
-    def get_recipe_image_path(self, image_id: UUID) -> tuple[Path, str] | None:
+    def get_recipe_image_path(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> tuple[Path, str] | None:
         """Resolve the on-disk path and media type of an image without loading bytes."""
-        file = self._find_image(image_id)
+        file = self._find_image(image_id, extension, content_hash)
         if file is None:
             logger.warning(f"Image with ID {image_id} not found in storage")
             return None
@@ -85,12 +273,48 @@ class LocalImageStorage(ImageStoragePort):
             media_type = "application/octet-stream"
         return file, media_type
 
-    def delete_image(self, image_id: UUID) -> bool:
-        """Delete an image file from local storage by image ID."""
-        file = self._find_image(image_id)
+    def get_recipe_image_url(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> str | None:
+        """Local files have no URL of their own: they are served by the API."""
+        return None
+
+    def delete_image(self, image_id: UUID, extension: str | None = None) -> bool:
+        """Delete the file of an image stored before content addressing."""
+        file = self._find_image(image_id, extension)
         if file is None:
             logger.warning(f"Image file with ID {image_id} not found for deletion")
             return False
-        file.unlink()
+        run_blocking(file.unlink)
         logger.info(f"Deleted image file {file.name}")
         return True
+
+    def delete_blob(self, content_hash: str) -> bool:
+        """Delete the stored content with this hash, whatever its extension."""
+        folder = self.blob_path(content_hash, "").parent
+        files = list(folder.glob(f"{content_hash}.*"))
+        for file in files:
+            run_blocking(file.unlink)
+            logger.info(f"Deleted image blob {file.name}")
+        return bool(files)
+
+    def list_files(self) -> Iterator[StoredFile]:
+        """List the blobs and the sharded files of legacy images, lazily."""
+        for top in (self.base_folder, self.base_folder / "blobs"):
+            for entry in _scan_depth(top, 3):
+                key = Path(entry.path).relative_to(self.base_folder).as_posix()
+                parsed = parse_storage_key(key)
+                if parsed is None:
+                    continue
+                content_hash, image_id, extension = parsed
+                stat = entry.stat()
+                yield StoredFile(
+                    extension=extension,
+                    size=stat.st_size,
+                    modified_at=stat.st_mtime,
+                    content_hash=content_hash,
+                    image_id=image_id,
+                )
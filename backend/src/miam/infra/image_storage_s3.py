@@ -0,0 +1,569 @@
+"""Image storage on S3-compatible object storage (AWS S3, MinIO, R2, Garage...).
+
+Ships its own minimal S3 client (Signature Version 4 over httpx) so the backend
+talks to any S3-compatible service without extra packages.
+
+Objects use the keys of the local layout (see :mod:`miam.infra.image_storage`)
+under an optional prefix, so an existing ``images`` folder moves to a bucket
+with ``aws s3 sync images/ s3://bucket/prefix/`` once
+``scripts/migrate_image_layout.py`` has run.
+
+Image bytes do not pass through the API: clients are redirected to presigned
+GET URLs, and uploads go to the bucket in one request, or in parts with a
+multipart upload when larger than ``part_bytes``. Only the code that needs a
+file on disk (image variants, Word export) reads the objects, through a local
+copy kept in a size-bounded folder.
+"""
+
+import hashlib
+import hmac
+import mimetypes
+import os
+import xml.etree.ElementTree as ET
+from collections.abc import Iterator
+from contextlib import closing
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import IO
+from urllib.parse import quote, urlencode, urlparse
+from uuid import UUID, uuid4
+
+import httpx
+from loguru import logger
+
+from miam.domain.entities import StoredFile
+from miam.domain.ports_secondary import ImageStoragePort
+from miam.domain.schemas import ImageResponse
+from miam.infra.blocking import run_blocking
+from miam.infra.disk_lru import LruFolder
+from miam.infra.image_storage import (
+    blob_key,
+    check_image_extension,
+    image_shard,
+    parse_storage_key,
+)
+
+_ALGORITHM = "AWS4-HMAC-SHA256"
+_UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+_EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+_STREAM_CHUNK_BYTES = 64 * 1024
+# S3 rejects parts smaller than 5 MiB, except the last one.
+MIN_PART_BYTES = 5 * 1024 * 1024
+
+
+class S3Error(Exception):
+    """Error response returned by the object storage."""
+
+    def __init__(self, status_code: int, code: str, message: str = "") -> None:
+        super().__init__(f"{status_code} {code}: {message}".rstrip(": "))
+        self.status_code = status_code
+        self.code = code
+
+
+def _error_from(response: httpx.Response) -> S3Error:
+    code, message = response.reason_phrase, ""
+    try:
+        root = ET.fromstring(response.content)
+        code = root.findtext("Code") or code
+        message = root.findtext("Message") or ""
+    except ET.ParseError:
+        pass
+    return S3Error(response.status_code, code, message)
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+def _canonical_query(params: dict[str, str]) -> str:
+    return "&".join(
+        f"{quote(k, safe='')}={quote(v, safe='')}" for k, v in sorted(params.items())
+    )
+
+
+class S3Client:
+    """Minimal S3 client signing its requests with Signature Version 4."""
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key_id: str,
+        secret_access_key: str,
+        region: str = "us-east-1",
+        addressing_style: str = "path",
+        timeout_seconds: float = 30.0,
+    ) -> None:
+        """Create a client for ``bucket``.
+
+        With the ``path`` addressing style (MinIO and most self-hosted services)
+        objects are at ``{endpoint}/{bucket}/{key}``; with ``virtual`` they are at
+        ``{bucket}.{endpoint host}/{key}``.
+        """
+        parsed = urlparse(endpoint_url)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            raise ValueError(f"Invalid object storage endpoint '{endpoint_url}'")
+        if addressing_style == "virtual":
+            self._host = f"{bucket}.{parsed.netloc}"
+            self._bucket_path = ""
+        elif addressing_style == "path":
+            self._host = parsed.netloc
+            self._bucket_path = f"/{bucket}"
+        else:
+            raise ValueError(f"Unknown addressing style '{addressing_style}'")
+        self._origin = f"{parsed.scheme}://{self._host}"
+        self.bucket = bucket
+        self.region = region
+        self._access_key_id = access_key_id
+        self._secret_access_key = secret_access_key
+        # One pool for the process; httpx clients are thread-safe.
+        self._http = httpx.Client(timeout=timeout_seconds)
+
+    def _path(self, key: str) -> str:
+        if not key:  # the bucket itself
+            return quote(self._bucket_path or "/", safe="/")
+        return quote(f"{self._bucket_path}/{key}", safe="/")
+
+    def _signature(
+        self,
+        method: str,
+        path: str,
+        query: str,
+        headers: dict[str, str],
+        payload_hash: str,
+        timestamp: str,
+    ) -> tuple[str, str, str]:
+        """Return ``(signature, credential scope, signed headers)`` of a request."""
+        names = sorted(headers)
+        signed_headers = ";".join(names)
+        canonical_request = "\n".join(
+            [
+                method,
+                path,
+                query,
+                "".join(f"{name}:{headers[name].strip()}\n" for name in names),
+                signed_headers,
+                payload_hash,
+            ]
+        )
+        date = timestamp[:8]
+        scope = f"{date}/{self.region}/s3/aws4_request"
+        string_to_sign = "\n".join(
+            [
+                _ALGORITHM,
+                timestamp,
+                scope,
+                hashlib.sha256(canonical_request.encode()).hexdigest(),
+            ]
+        )
+        key = _hmac(f"AWS4{self._secret_access_key}".encode(), date)
+        for part in (self.region, "s3", "aws4_request"):
+            key = _hmac(key, part)
+        return _hmac(key, string_to_sign).hex(), scope, signed_headers
+
+    def _build(
+        self,
+        method: str,
+        key: str,
+        params: dict[str, str] | None = None,
+        headers: dict[str, str] | None = None,
+        content: bytes | Iterator[bytes] | None = None,
+        payload_hash: str = _EMPTY_SHA256,
+    ) -> httpx.Request:
+        timestamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%SZ")
+        path = self._path(key)
+        query = _canonical_query(params or {})
+        signed = {
+            "host": self._host,
+            "x-amz-content-sha256": payload_hash,
+            "x-amz-date": timestamp,
+        }
+        signature, scope, signed_headers = self._signature(
+            method, path, query, signed, payload_hash, timestamp
+        )
+        all_headers = {
+            **(headers or {}),
+            **signed,
+            "authorization": (
+                f"{_ALGORITHM} Credential={self._access_key_id}/{scope}, "
+                f"SignedHeaders={signed_headers}, Signature={signature}"
+            ),
+        }
+        url = f"{self._origin}{path}" + (f"?{query}" if query else "")
+        return self._http.build_request(
+            method, url, headers=all_headers, content=content
+        )
+
+    def request(
+        self,
+        method: str,
+        key: str,
+        params: dict[str, str] | None = None,
+        headers: dict[str, str] | None = None,
+        content: bytes | Iterator[bytes] | None = None,
+        payload_hash: str = _EMPTY_SHA256,
+        stream: bool = False,
+    ) -> httpx.Response:
+        """Send a signed request about ``key``.
+
+        Raises:
+            S3Error: If the storage answers with an error status.
+        """
+        request = self._build(method, key, params, headers, content, payload_hash)
+        response = self._http.send(request, stream=stream)
+        if response.is_error:
+            if stream:
+                response.read()
+                response.close()
+            raise _error_from(response)
+        return response
+
+    def exists(self, key: str) -> bool:
+        """Return whether an object exists."""
+        try:
+            self.request("HEAD", key)
+        except S3Error as exc:
+            if exc.status_code == 404:
+                return False
+            raise
+        return True
+
+    def list_objects(
+        self, prefix: str, page_size: int = 1000
+    ) -> Iterator[tuple[str, int, float]]:
+        """Yield the key, size and modification time of objects starting with ``prefix``.
+
+        Pages of ``page_size`` keys are requested as the iteration goes.
+        """
+        params = {"list-type": "2", "prefix": prefix, "max-keys": str(page_size)}
+        while True:
+            response = self.request("GET", "", params=params)
+            root = ET.fromstring(response.content)
+            for element in root.iterfind("{*}Contents"):
+                key = element.findtext("{*}Key")
+                if key is None:
+                    continue
+                modified_at = datetime.fromisoformat(
+                    element.findtext("{*}LastModified") or "1970-01-01T00:00:00Z"
+                )
+                yield (
+                    key,
+                    int(element.findtext("{*}Size") or 0),
+                    modified_at.timestamp(),
+                )
+            token = root.findtext("{*}NextContinuationToken")
+            if root.findtext("{*}IsTruncated") != "true" or not token:
+                return
+            params["continuation-token"] = token
+
+    def list_keys(self, prefix: str) -> list[str]:
+        """Return the keys starting with ``prefix``."""
+        return [key for key, _, _ in self.list_objects(prefix)]
+
+    def create_multipart_upload(self, key: str, content_type: str) -> str:
+        """Start a multipart upload and return its ID."""
+        response = self.request(
+            "POST", key, params={"uploads": ""}, headers={"content-type": content_type}
+        )
+        upload_id = ET.fromstring(response.content).findtext("{*}UploadId")
+        if not upload_id:
+            raise S3Error(response.status_code, "InvalidResponse", "No UploadId")
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        """Upload one part of a multipart upload and return its ETag."""
+        response = self.request(
+            "PUT",
+            key,
+            params={"partNumber": str(number), "uploadId": upload_id},
+            content=data,
+            payload_hash=hashlib.sha256(data).hexdigest(),
+        )
+        return response.headers["etag"]
+
+    def complete_multipart_upload(
+        self, key: str, upload_id: str, etags: list[str]
+    ) -> None:
+        """Assemble the uploaded parts into the object."""
+        body = "".join(
+            f"<Part><PartNumber>{number}</PartNumber><ETag>{etag}</ETag></Part>"
+            for number, etag in enumerate(etags, start=1)
+        )
+        data = f"<CompleteMultipartUpload>{body}</CompleteMultipartUpload>".encode()
+        response = self.request(
+            "POST",
+            key,
+            params={"uploadId": upload_id},
+            content=data,
+            payload_hash=hashlib.sha256(data).hexdigest(),
+        )
+        # Errors found while assembling come with a 200 status.
+        root = ET.fromstring(response.content)
+        if root.tag.rpartition("}")[2] == "Error":
+            raise S3Error(
+                response.status_code,
+                root.findtext("Code") or "InternalError",
+                root.findtext("Message") or "",
+            )
+
+    def abort_multipart_upload(self, key: str, upload_id: str) -> None:
+        """Discard a multipart upload and the parts uploaded so far."""
+        self.request("DELETE", key, params={"uploadId": upload_id})
+
+    def presign_get(
+        self, key: str, expires_seconds: int, now: datetime | None = None
+    ) -> str:
+        """Return a URL granting GET access to ``key`` for ``expires_seconds``."""
+        timestamp = (now or datetime.now(UTC)).strftime("%Y%m%dT%H%M%SZ")
+        path = self._path(key)
+        scope = f"{timestamp[:8]}/{self.region}/s3/aws4_request"
+        params = {
+            "X-Amz-Algorithm": _ALGORITHM,
+            "X-Amz-Credential": f"{self._access_key_id}/{scope}",
+            "X-Amz-Date": timestamp,
+            "X-Amz-Expires": str(expires_seconds),
+            "X-Amz-SignedHeaders": "host",
+        }
+        query = _canonical_query(params)
+        signature, _, _ = self._signature(
+            "GET", path, query, {"host": self._host}, _UNSIGNED_PAYLOAD, timestamp
+        )
+        return (
+            f"{self._origin}{path}?{query}&{urlencode({'X-Amz-Signature': signature})}"
+        )
+
+
+def _hash_content(image: bytes | IO[bytes]) -> tuple[str, int]:
+    """Return the SHA-256 and size of ``image``, rewinding files after reading."""
+    if isinstance(image, bytes):
+        return hashlib.sha256(image).hexdigest(), len(image)
+    hasher = hashlib.sha256()
+    size = 0
+    while chunk := image.read(_STREAM_CHUNK_BYTES):
+        hasher.update(chunk)
+        size += len(chunk)
+    image.seek(0)
+    return hasher.hexdigest(), size
+
+
+def _chunks(image: bytes | IO[bytes], size: int) -> Iterator[bytes]:
+    """Yield successive chunks of at most ``size`` bytes of ``image``."""
+    if isinstance(image, bytes):
+        for start in range(0, len(image), size):
+            yield image[start : start + size]
+        return
+    while chunk := image.read(size):
+        yield chunk
+
+
+def _media_type(name: str) -> str:
+    return mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+class S3ImageStorage(ImageStoragePort):
+    """Secondary adapter that implements ImageStoragePort on an S3 bucket."""
+
+    def __init__(
+        self,
+        client: S3Client,
+        local_copy_dir: str,
+        local_copy_max_bytes: int,
+        key_prefix: str = "",
+        presign_expires_seconds: int = 300,
+        part_bytes: int = 8 * 1024 * 1024,
+    ) -> None:
+        """Store images through ``client``, under ``key_prefix`` in its bucket.
+
+        Local copies of objects, for code that needs a file, are kept in
+        ``local_copy_dir``; the oldest are deleted beyond ``local_copy_max_bytes``.
+        Uploads larger than ``part_bytes`` use a multipart upload.
+        """
+        if part_bytes < MIN_PART_BYTES:
+            raise ValueError(f"Multipart parts must be at least {MIN_PART_BYTES} bytes")
+        self.client = client
+        self.key_prefix = key_prefix.strip("/") + "/" if key_prefix.strip("/") else ""
+        self.presign_expires_seconds = presign_expires_seconds
+        self.part_bytes = part_bytes
+        self.local_copy_dir = Path(local_copy_dir)
+        self._local_copies = LruFolder(
+            self.local_copy_dir, local_copy_max_bytes, "local copies of images"
+        )
+
+    def _blob_key(self, content_hash: str, extension: str) -> str:
+        return self.key_prefix + blob_key(content_hash, extension)
+
+    def _legacy_key(self, image_id: UUID, extension: str) -> str:
+        return f"{self.key_prefix}{image_shard(image_id)}/{image_id}{extension}"
+
+    def add_recipe_image(
+        self, recipe_id: UUID, image: bytes | IO[bytes], filename: str
+    ) -> str:
+        """Upload image content under its SHA-256, unless already stored."""
+        ext = check_image_extension(filename)
+        return run_blocking(lambda: self._upload(recipe_id, image, ext))
+
+    def _upload(self, recipe_id: UUID, image: bytes | IO[bytes], ext: str) -> str:
+        content_hash, size = _hash_content(image)
+        key = self._blob_key(content_hash, ext)
+        if self.client.exists(key):
+            logger.info(f"Image for recipe {recipe_id} already stored at {key}")
+            return content_hash
+        content_type = _media_type(key)
+        if size <= self.part_bytes:
+            self.client.request(
+                "PUT",
+                key,
+                headers={"content-type": content_type, "content-length": str(size)},
+                content=_chunks(image, _STREAM_CHUNK_BYTES),
+                payload_hash=content_hash,
+            )
+        else:
+            upload_id = self.client.create_multipart_upload(key, content_type)
+            try:
+                etags = [
+                    self.client.upload_part(key, upload_id, number, part)
+                    for number, part in enumerate(
+                        _chunks(image, self.part_bytes), start=1
+                    )
+                ]
+                self.client.complete_multipart_upload(key, upload_id, etags)
+            except BaseException:
+                self.client.abort_multipart_upload(key, upload_id)
+                raise
+        logger.info(f"Uploaded image for recipe {recipe_id} to {key}")
+        return content_hash
+
+    def blob_exists(self, content_hash: str, extension: str) -> bool:
+        """Return whether content with this hash and extension is stored."""
+        key = self._blob_key(content_hash, extension)
+        return run_blocking(lambda: self.client.exists(key))
+
+    def _find_key(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> str | None:
+        """Return the key of an image, listing keys only when the extension is unknown."""
+        if content_hash is not None:
+            if extension is not None:
+                return self._blob_key(content_hash, extension)
+            prefix = self._blob_key(content_hash, ".")
+        elif extension is not None:
+            return self._legacy_key(image_id, extension)
+        else:
+            prefix = self._legacy_key(image_id, ".")
+        keys = run_blocking(lambda: self.client.list_keys(prefix))
+        return keys[0] if keys else None
+
+    def get_recipe_image(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> ImageResponse | None:
+        """Download image bytes from the bucket."""
+        key = self._find_key(image_id, extension, content_hash)
+        if key is None:
+            return None
+        try:
+            response = run_blocking(lambda: self.client.request("GET", key))
+        except S3Error as exc:
+            if exc.status_code == 404:
+                logger.warning(f"Image with ID {image_id} not found in storage")
+                return None
+            raise
+        media_type = response.headers.get("content-type") or _media_type(key)
+        return ImageResponse(content=response.content, media_type=media_type)
+
+    def get_recipe_image_path(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> tuple[Path, str] | None:
+        """Return a local copy of an image, downloading it if not kept already."""
+        key = self._find_key(image_id, extension, content_hash)
+        if key is None:
+            return None
+        name = key.rpartition("/")[2]
+        path = self.local_copy_dir / name[:2] / name
+        if not path.is_file():
+            try:
+                run_blocking(lambda: self._download(key, path))
+            except S3Error as exc:
+                if exc.status_code == 404:
+                    logger.warning(f"Image with ID {image_id} not found in storage")
+                    return None
+                raise
+        return path, _media_type(name)
+
+    def _download(self, key: str, path: Path) -> None:
+        """Stream an object to ``path``, atomically."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid4().hex}.tmp")
+        try:
+            with (
+                closing(self.client.request("GET", key, stream=True)) as response,
+                open(tmp_path, "wb") as f,
+            ):
+                for chunk in response.iter_bytes(_STREAM_CHUNK_BYTES):
+                    f.write(chunk)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        # Local copies are never touched on reads: their modification time is
+        # part of the identity of the image variants generated from them.
+        self._local_copies.record(path.stat().st_size)
+
+    def get_recipe_image_url(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> str | None:
+        """Return a presigned GET URL of the image."""
+        key = self._find_key(image_id, extension, content_hash)
+        if key is None:
+            return None
+        return self.client.presign_get(key, self.presign_expires_seconds)
+
+    def _delete_key(self, key: str) -> None:
+        run_blocking(lambda: self.client.request("DELETE", key))
+        name = key.rpartition("/")[2]
+        (self.local_copy_dir / name[:2] / name).unlink(missing_ok=True)
+
+    def delete_image(self, image_id: UUID, extension: str | None = None) -> bool:
+        """Delete the object of an image stored before content addressing."""
+        key = self._find_key(image_id, extension)
+        if key is None or not run_blocking(lambda: self.client.exists(key)):
+            logger.warning(f"Image file with ID {image_id} not found for deletion")
+            return False
+        self._delete_key(key)
+        logger.info(f"Deleted image object {key}")
+        return True
+
+    def delete_blob(self, content_hash: str) -> bool:
+        """Delete the stored content with this hash, whatever its extension."""
+        prefix = self._blob_key(content_hash, ".")
+        keys = run_blocking(lambda: self.client.list_keys(prefix))
+        for key in keys:
+            self._delete_key(key)
+            logger.info(f"Deleted image blob {key}")
+        return bool(keys)
+
+    def list_files(self) -> Iterator[StoredFile]:
+        """List the blobs and legacy image objects under the key prefix, lazily."""
+        for key, size, modified_at in self.client.list_objects(self.key_prefix):
+            parsed = parse_storage_key(key.removeprefix(self.key_prefix))
+            if parsed is None:
+                continue
+            content_hash, image_id, extension = parsed
+            yield StoredFile(
+                extension=extension,
+                size=size,
+                modified_at=modified_at,
+                content_hash=content_hash,
+                image_id=image_id,
+            )
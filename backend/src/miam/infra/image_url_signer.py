@@ -0,0 +1,72 @@
+"""HMAC-SHA256 signed image URLs.
+
+The signature covers the image ID, where its content is stored and the expiry
+time. Checking it needs only the key, so the image route serves signed URLs
+without decoding a JWT or querying the database. Expiry times are rounded to
+the end of the next window, which makes the URL of an image identical for
+every response of a window, and cacheable.
+
+Images are never modified in place, so a signed URL always stands for the same
+bytes. A URL keeps working until it expires even if access to the recipe is
+revoked meanwhile: the window length bounds that delay.
+"""
+
+import base64
+import hashlib
+import hmac
+import time
+from uuid import UUID
+
+from miam.domain.entities import ImageEntity, ImageGrant
+from miam.domain.ports_secondary import ImageUrlSignerPort
+
+
+class HmacImageUrlSigner(ImageUrlSignerPort):
+    """Secondary adapter that implements ImageUrlSignerPort with HMAC-SHA256."""
+
+    def __init__(self, secret_key: str, window_seconds: int = 3600) -> None:
+        """Sign with a key derived from ``secret_key``, renewing URLs every window."""
+        if window_seconds <= 0:
+            raise ValueError("The signing window must be positive")
+        # Derived, so a secret shared with other uses never signs URLs directly.
+        self._key = hmac.new(
+            secret_key.encode(), b"miam image urls", hashlib.sha256
+        ).digest()
+        self.window_seconds = window_seconds
+
+    def window(self, now: float | None = None) -> int:
+        """Return the number of the current window."""
+        return int((time.time() if now is None else now) // self.window_seconds)
+
+    def _signature(
+        self,
+        image_id: UUID,
+        extension: str | None,
+        content_hash: str | None,
+        expires: int,
+    ) -> str:
+        message = f"{image_id}\n{content_hash or ''}\n{extension or ''}\n{expires}"
+        digest = hmac.new(self._key, message.encode(), hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+    def sign(self, image: ImageEntity, now: float | None = None) -> ImageGrant:
+        """Grant access to ``image`` until the end of the next window."""
+        expires = (self.window(now) + 2) * self.window_seconds
+        return ImageGrant(
+            image_id=image.id,
+            extension=image.extension,
+            content_hash=image.content_hash,
+            expires=expires,
+            signature=self._signature(
+                image.id, image.extension, image.content_hash, expires
+            ),
+        )
+
+    def verify(self, grant: ImageGrant, now: float | None = None) -> bool:
+        """Return whether ``grant`` was signed with this key and has not expired."""
+        if grant.expires <= (time.time() if now is None else now):
+            return False
+        expected = self._signature(
+            grant.image_id, grant.extension, grant.content_hash, grant.expires
+        )
+        return hmac.compare_digest(grant.signature, expected)
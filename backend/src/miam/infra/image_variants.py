@@ -0,0 +1,123 @@
+"""Resized and re-encoded image variants, cached on disk with LRU eviction.
+
+A variant is generated the first time it is requested and kept under
+``{folder}/{kk}/{key}{ext}``. The key hashes the identity of the source file
+(name, size, modification time), the requested width and format, and the
+encoder version, so replacing a source or upgrading Pillow produces new keys
+instead of serving stale files. The same key therefore always stands for the
+same bytes, which makes it a strong ETag.
+
+The folder is kept within its budget by deleting the least recently used
+variants, see :class:`~miam.infra.disk_lru.LruFolder`.
+"""
+
+import hashlib
+import os
+from functools import partial
+from pathlib import Path
+from uuid import uuid4
+
+import PIL
+from loguru import logger
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from miam.domain.entities import ImageVariant
+from miam.domain.ports_secondary import ImageVariantPort
+from miam.infra.blocking import run_blocking
+from miam.infra.disk_lru import LruFolder
+
+# Requested widths are rounded up to one of these, so clients asking for
+# arbitrary sizes cannot fill the cache with near-duplicates.
+VARIANT_WIDTHS = (160, 320, 480, 640, 960, 1280, 1920)
+
+# format -> (Pillow format, extension, media type, encoder options)
+_FORMATS: dict[str, tuple[str, str, str, dict[str, object]]] = {
+    "jpeg": ("JPEG", ".jpg", "image/jpeg", {"quality": 85, "progressive": True}),
+    "png": ("PNG", ".png", "image/png", {"optimize": True}),
+    "webp": ("WEBP", ".webp", "image/webp", {"quality": 80, "method": 4}),
+}
+_SOURCE_FORMATS = {".jpg": "jpeg", ".jpeg": "jpeg", ".png": "png", ".webp": "webp"}
+_DEFAULT_FORMAT = "png"  # for sources no variant format matches (GIF)
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """Composite an image with transparency onto white, for formats without alpha."""
+    rgba = img.convert("RGBA")
+    background = Image.new("RGB", rgba.size, "white")
+    background.paste(rgba, mask=rgba.getchannel("A"))
+    return background
+
+
+def _render(source: Path, target: Path, width: int | None, image_format: str) -> None:
+    """Decode ``source``, shrink it to ``width`` and encode it to ``target`` atomically.
+
+    Animated images keep their first frame only.
+    """
+    pil_format, _, _, options = _FORMATS[image_format]
+    with Image.open(source) as original:
+        if width is not None:
+            # JPEG only: decode at the smallest 1/2, 1/4 or 1/8 scale that keeps
+            # both sides above ``width``, whichever way EXIF rotates the image.
+            original.draft(original.mode, (width, width))
+        img = ImageOps.exif_transpose(original)
+        if width is not None and img.width > width:
+            img.thumbnail((width, img.height))  # keeps the aspect ratio
+        if img.mode not in ("RGB", "RGBA", "L", "LA"):
+            img = img.convert("RGBA" if img.has_transparency_data else "RGB")
+        if pil_format == "JPEG" and img.mode in ("RGBA", "LA"):
+            img = _flatten(img)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Unique per call: concurrent misses on one variant render side by side
+        # and the last rename wins, with identical bytes.
+        tmp_path = target.with_name(f".{target.name}.{uuid4().hex}.tmp")
+        try:
+            img.save(tmp_path, pil_format, **options)
+            os.replace(tmp_path, target)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+
+class DiskImageVariantCache(ImageVariantPort):
+    """Secondary adapter that implements ImageVariantPort on a local folder."""
+
+    def __init__(self, folder: str, max_bytes: int) -> None:
+        """Initialize the cache in ``folder``, holding at most about ``max_bytes``."""
+        self.folder = Path(folder)
+        self._lru = LruFolder(self.folder, max_bytes, "image variants")
+
+    @staticmethod
+    def _snap_width(width: int | None) -> int | None:
+        if width is None:
+            return None
+        return next((w for w in VARIANT_WIDTHS if w >= width), VARIANT_WIDTHS[-1])
+
+    def get_variant(
+        self, source: Path, width: int | None, image_format: str | None
+    ) -> ImageVariant:
+        """Return the cached variant of ``source``, generating it on a miss."""
+        if image_format is None:
+            image_format = _SOURCE_FORMATS.get(source.suffix.lower(), _DEFAULT_FORMAT)
+        if image_format not in _FORMATS:
+            raise ValueError(f"Unsupported image format '{image_format}'")
+        width = self._snap_width(width)
+        _, extension, media_type, _ = _FORMATS[image_format]
+
+        stat = source.stat()
+        identity = f"{PIL.__version__}:{source.name}:{stat.st_size}:{stat.st_mtime_ns}:{width}:{image_format}"
+        key = hashlib.sha256(identity.encode()).hexdigest()[:32]
+        path = self.folder / key[:2] / f"{key}{extension}"
+
+        if not self._lru.touch(path):
+            run_blocking(partial(self._generate, source, path, width, image_format))
+        return ImageVariant(path=path, media_type=media_type, etag=f'"{key}"')
+
+    def _generate(
+        self, source: Path, path: Path, width: int | None, image_format: str
+    ) -> None:
+        try:
+            _render(source, path, width, image_format)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+            logger.warning(f"Failed to generate image variant of {source.name}: {exc}")
+            raise ValueError("Image cannot be converted") from exc
+        self._lru.record(path.stat().st_size)
@@ -1,16 +1,29 @@
 """Handles all database-specific logic using SQLAlchemy."""
 
+from collections import Counter
+from collections.abc import Callable, Collection
 from datetime import UTC, datetime
+from functools import partial
 from typing import Any
-from uuid import UUID
-
-from sqlalchemy import ColumnElement, func, or_, select
+from uuid import UUID, uuid4
+
+from sqlalchemy import (
+    ColumnElement,
+    CompoundSelect,
+    and_,
+    func,
+    or_,
+    select,
+    union,
+    update,
+)
 from sqlalchemy.orm import Session, joinedload
 
 from miam.domain.entities import (
     AuthProvider,
     ImageEntity,
     IngredientEntity,
+    NewImage,
     PaginatedResult,
     RecipeEntity,
     RecipeShareEntity,
@@ -20,6 +33,7 @@ from miam.domain.entities import (
     UserEntity,
 )
 from miam.domain.ports_secondary import (
+    CachePort,
     RecipeRepositoryPort,
     RecipeShareRepositoryPort,
     UserRepositoryPort,
@@ -30,6 +44,7 @@ from miam.domain.schemas import (
     RecipeUpdate,
     SourceCreate,
 )
+from miam.infra.cache.invalidation import queue_invalidation
 from miam.infra.db.base import (
     Image,
     Ingredient,
@@ -39,14 +54,91 @@ from miam.infra.db.base import (
     Source,
     User,
 )
+from miam.infra.db.blobs import (
+    acquire_blob_refs,
+    delete_unreferenced_blobs,
+    release_blob_refs,
+)
+from miam.infra.db.pipeline import pipelined
+from miam.infra.db.routing import replica_available, replica_reads
+from miam.infra.search_cache import SearchResultCache
+from miam.infra.share_events import pending_shares_key
+
+
+def _recipe_audience(recipe_id: UUID) -> CompoundSelect[tuple[UUID]]:
+    """SQL subquery: users whose library contains the recipe (owner + accepted shares)."""
+    return union(
+        select(Recipe.owner_id).where(Recipe.id == recipe_id),
+        select(RecipeShare.shared_with_user_id).where(
+            RecipeShare.recipe_id == recipe_id,
+            RecipeShare.status == ShareStatus.accepted,
+        ),
+    )
+
+
+# Placeholder of a library version being read; readers meanwhile query the
+# database. It expires quickly in case its reader never replaces it.
+_FILL_TOKEN_PREFIX = b"filling:"
+_FILL_TOKEN_TTL_SECONDS = 10
+
+
+def _library_version_key(user_id: UUID) -> str:
+    return f"library:{user_id}"
+
+
+def _bump_library_versions(
+    session: Session, user_ids: CompoundSelect[tuple[UUID]] | list[UUID]
+) -> None:
+    """Increment the library version of the given users (part of the caller's transaction).
+
+    Their cached versions are invalidated on every worker once the transaction commits.
+    """
+    bumped = session.scalars(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(library_version=User.library_version + 1)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    queue_invalidation(session, *(_library_version_key(uid) for uid in bumped))
+
+
+def _image_entity(image: Image) -> ImageEntity:
+    return ImageEntity(
+        id=image.id,
+        caption=image.caption,
+        display_order=image.display_order,
+        extension=image.extension,
+        media_type=image.media_type,
+        content_hash=image.content_hash,
+        placeholder=image.placeholder,
+    )
 
 
 class RecipeRepository(RecipeRepositoryPort):
     """Concrete implementation of RecipeRepositoryPort using SQLAlchemy."""
 
-    def __init__(self, session: Session):
-        """Initialize with a database session."""
+    def __init__(
+        self,
+        session: Session,
+        search_cache: SearchResultCache | None = None,
+        version_cache: CachePort | None = None,
+        version_cache_ttl_seconds: float | None = 30,
+    ):
+        """Initialize with a database session and optional caches.
+
+        Args:
+            session: SQLAlchemy session.
+            search_cache: Cache of search results, keyed by library version.
+            version_cache: Cache of library versions. Entries are evicted on
+                every worker when a write commits; the TTL bounds staleness if
+                an invalidation is missed.
+            version_cache_ttl_seconds: Lifetime of cached library versions.
+        """
         self.session = session
+        self.search_cache = search_cache
+        self.version_cache = version_cache
+        self.version_cache_ttl_seconds = version_cache_ttl_seconds
 
     def _visible_recipe_filter(self, user_id: UUID) -> ColumnElement[bool]:
         """SQL filter: owned OR has an accepted share."""
@@ -72,6 +164,16 @@ class RecipeRepository(RecipeRepositoryPort):
                 return str(share.role.value)
         return "reader"
 
+    def _touch_recipe(self, recipe_id: UUID) -> None:
+        """Bump the recipe version and the library version of everyone who sees it."""
+        self.session.execute(
+            update(Recipe)
+            .where(Recipe.id == recipe_id)
+            .values(version=Recipe.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        _bump_library_versions(self.session, _recipe_audience(recipe_id))
+
     def _to_entity(self, recipe: Recipe, user_role: str | None = None) -> RecipeEntity:
         """Convert a SQLAlchemy Recipe ORM model to a domain RecipeEntity."""
         return RecipeEntity(
@@ -100,14 +202,7 @@ class RecipeRepository(RecipeRepositoryPort):
                 )
                 for ri in sorted(recipe.ingredients, key=lambda ri: ri.display_order)
             ],
-            images=[
-                ImageEntity(
-                    id=img.id,
-                    caption=img.caption,
-                    display_order=img.display_order,
-                )
-                for img in recipe.images
-            ],
+            images=[_image_entity(img) for img in recipe.images],
             sources=[
                 SourceEntity(
                     type=src.type.value,
@@ -171,6 +266,9 @@ class RecipeRepository(RecipeRepositoryPort):
             recipe.sources.append(source)
 
         self.session.add(recipe)
+        with pipelined(self.session):
+            self.session.flush()
+            _bump_library_versions(self.session, [owner_id])
         self.session.commit()
         self.session.refresh(recipe)
         return self._to_entity(recipe)
@@ -228,6 +326,10 @@ class RecipeRepository(RecipeRepositoryPort):
             self.session.add(recipe)
             recipes.append(recipe)
 
+        # One pipeline for the INSERTs of every recipe and its children.
+        with pipelined(self.session):
+            self.session.flush()
+            _bump_library_versions(self.session, [owner_id])
         self.session.commit()
         for recipe in recipes:
             self.session.refresh(recipe)
@@ -314,9 +416,14 @@ class RecipeRepository(RecipeRepositoryPort):
         recipe.tested = data.tested
         recipe.tags = data.tags
         recipe.preparation = data.preparation
+        recipe.version = Recipe.version + 1
 
-        self._replace_ingredients(recipe, data.ingredients)
-        self._replace_sources(recipe, data.sources)
+        # The child replacement flushes a DELETE and an INSERT per row: pipeline them.
+        with pipelined(self.session):
+            self._replace_ingredients(recipe, data.ingredients)
+            self._replace_sources(recipe, data.sources)
+            self.session.flush()
+            _bump_library_versions(self.session, _recipe_audience(recipe_id))
 
         self.session.commit()
         self.session.refresh(recipe)
@@ -335,11 +442,85 @@ class RecipeRepository(RecipeRepositoryPort):
             .where(Recipe.id == recipe_id, self._visible_recipe_filter(user_id))
         )
 
-        recipe = self.session.execute(stmt).scalars().first()
-        if recipe is None:
+        with replica_reads(self.session):
+            recipe = self.session.execute(stmt).scalars().first()
+            if recipe is None:
+                return None
+            role = self._resolve_user_role(recipe, user_id)
+            return self._to_entity(recipe, user_role=role)
+
+    def get_recipe_version(self, recipe_id: UUID, user_id: UUID) -> str | None:
+        """Return the recipe version and user's role, without loading relationships."""
+        stmt = (
+            select(Recipe.version, Recipe.owner_id, RecipeShare.role)
+            .outerjoin(
+                RecipeShare,
+                and_(
+                    RecipeShare.recipe_id == Recipe.id,
+                    RecipeShare.shared_with_user_id == user_id,
+                    RecipeShare.status == ShareStatus.accepted,
+                ),
+            )
+            .where(
+                Recipe.id == recipe_id,
+                or_(Recipe.owner_id == user_id, RecipeShare.id.is_not(None)),
+            )
+        )
+        with replica_reads(self.session):
+            row = self.session.execute(stmt).first()
+        if row is None:
             return None
-        role = self._resolve_user_role(recipe, user_id)
-        return self._to_entity(recipe, user_role=role)
+        role = "owner" if row.owner_id == user_id else row.role.value
+        return f"{row.version}-{role}"
+
+    def get_library_version(self, user_id: UUID) -> int:
+        """Return the version counter of all recipes visible to the user."""
+        if self.version_cache is None:
+            return self._get_library_version(user_id)
+        # Not get_or_compute: its per-key thread lock would be held across the
+        # query, which deadlocks when sessions run as coroutines on a single
+        # event loop thread (DATABASE_ASYNC). Instead a miss claims the key
+        # with a token before querying, and the version replaces the token
+        # only if no commit evicted it meanwhile: a version read before a
+        # write is never cached after the write's eviction.
+        key = _library_version_key(user_id)
+        cached = self.version_cache.get(key)
+        if cached is not None and not cached.startswith(_FILL_TOKEN_PREFIX):
+            return int(cached)
+        token = _FILL_TOKEN_PREFIX + uuid4().hex.encode()
+        claimed = cached is None and self.version_cache.add(
+            key, token, _FILL_TOKEN_TTL_SECONDS
+        )
+        version = self._get_library_version(user_id)
+        if claimed:
+            self.version_cache.replace(
+                key, token, str(version).encode(), self.version_cache_ttl_seconds
+            )
+        return version
+
+    def _get_library_version(self, user_id: UUID) -> int:
+        stmt = select(User.library_version).where(User.id == user_id)
+        return self.session.execute(stmt).scalar_one_or_none() or 0
+
+    def _after_filter(self, after: UUID, user_id: UUID) -> ColumnElement[bool]:
+        """Keyset condition: recipes listed after ``after``, newest first.
+
+        Keys created before UUIDv7 are random, so ``created_at`` leads the
+        ordering and the id only breaks ties. Raises ValueError if the cursor
+        recipe was deleted or is not visible: comparing to a missing row would
+        end the listing with an empty page.
+        """
+        cursor_created_at = self.session.execute(
+            select(Recipe.created_at).where(
+                Recipe.id == after, self._visible_recipe_filter(user_id)
+            )
+        ).scalar_one_or_none()
+        if cursor_created_at is None:
+            raise ValueError(f"Unknown pagination cursor {after}")
+        return or_(
+            Recipe.created_at < cursor_created_at,
+            and_(Recipe.created_at == cursor_created_at, Recipe.id < after),
+        )
 
     def _apply_filters(
         self,
@@ -390,8 +571,75 @@ class RecipeRepository(RecipeRepositoryPort):
         limit: int | None = None,
         offset: int = 0,
         ownership: str | None = None,
+        after: UUID | None = None,
     ) -> PaginatedResult:
-        """Search recipes with dynamic filtering and pagination, visible to user."""
+        """Search recipes with dynamic filtering and pagination, visible to user.
+
+        When a search cache is configured, results are cached per user and library
+        version, so any write visible to the user invalidates them.
+        """
+        search = partial(
+            self._search_recipes,
+            user_id,
+            recipe_id,
+            title,
+            category,
+            is_veggie,
+            season,
+            limit,
+            offset,
+            ownership,
+            after,
+        )
+        if self.search_cache is None:
+            with replica_reads(self.session):
+                return search()
+
+        filters = (
+            recipe_id,
+            title.lower() if title else None,  # ILIKE is case-insensitive
+            category or None,
+            is_veggie,
+            season or None,
+            limit,
+            offset,
+            ownership if ownership in ("owned", "shared") else "all",
+            after,
+        )
+        generation = self.get_library_version(user_id)
+        cached = self.search_cache.get(user_id, generation, filters)
+        if cached is not None:
+            return cached
+        if self._replica_has_generation(user_id, generation):
+            with replica_reads(self.session):
+                result = search()
+        else:
+            # A lagging replica's result would be cached under the new generation.
+            result = search()
+        self.search_cache.put(user_id, generation, filters, result)
+        return result
+
+    def _replica_has_generation(self, user_id: UUID, generation: int) -> bool:
+        """Whether the replica has replayed every write up to this library version."""
+        if not replica_available(self.session):
+            return False
+        with replica_reads(self.session):
+            return self._get_library_version(user_id) >= generation
+
+    def _search_recipes(
+        self,
+        user_id: UUID,
+        recipe_id: UUID | None,
+        title: str | None,
+        category: str | None,
+        is_veggie: bool | None,
+        season: str | None,
+        limit: int | None,
+        offset: int,
+        ownership: str | None,
+        after: UUID | None,
+    ) -> PaginatedResult:
+        """Run the search queries against the database."""
         visibility = self._ownership_filter(user_id, ownership)
 
         # Count total matching recipes
@@ -413,7 +661,10 @@ class RecipeRepository(RecipeRepositoryPort):
             .where(visibility)
         )
         stmt = self._apply_filters(stmt, recipe_id, title, category, is_veggie, season)
-        stmt = stmt.order_by(Recipe.created_at.desc())
+        if after is not None:
+            stmt = stmt.where(self._after_filter(after, user_id))
+        # UUIDv7 keys break created_at ties in creation order too.
+        stmt = stmt.order_by(Recipe.created_at.desc(), Recipe.id.desc())
         if offset:
             stmt = stmt.offset(offset)
         if limit is not None:
@@ -434,8 +685,15 @@ class RecipeRepository(RecipeRepositoryPort):
         user_id: UUID,
         caption: str | None = None,
         display_order: int | None = 0,
+        extension: str | None = None,
+        media_type: str | None = None,
+        content_hash: str | None = None,
+        placeholder: str | None = None,
     ) -> ImageEntity:
-        """Create and persist an Image linked to a recipe visible to user_id."""
+        """Create and persist an Image linked to a recipe visible to user_id.
+
+        With ``content_hash``, the image takes a reference on that blob.
+        """
         recipe = (
             self.session.execute(
                 select(Recipe).where(
@@ -453,16 +711,66 @@ class RecipeRepository(RecipeRepositoryPort):
             recipe_id=recipe_id,
             caption=caption,
             display_order=display_order if display_order is not None else 0,
+            extension=extension,
+            media_type=media_type,
+            content_hash=content_hash,
+            placeholder=placeholder,
         )
 
+        if content_hash is not None:
+            acquire_blob_refs(self.session, {content_hash: 1})
         self.session.add(image)
+        self._touch_recipe(recipe_id)
         self.session.commit()
         self.session.refresh(image)
-        return ImageEntity(
-            id=image.id,
-            caption=image.caption,
-            display_order=image.display_order,
+        return _image_entity(image)
+
+    def add_images(
+        self, images: list[NewImage], user_id: UUID
+    ) -> list[ImageEntity | None]:
+        """Create Images linked to recipes visible to user_id, in one transaction.
+
+        Returns None in place of each image whose recipe is not visible.
+        """
+        recipe_ids = {new.recipe_id for new in images}
+        visible = set(
+            self.session.execute(
+                select(Recipe.id).where(
+                    Recipe.id.in_(recipe_ids), self._visible_recipe_filter(user_id)
+                )
+            )
+            .scalars()
+            .all()
         )
+        refs: dict[str, int] = {}
+        for new in images:
+            if new.recipe_id in visible and new.content_hash is not None:
+                refs[new.content_hash] = refs.get(new.content_hash, 0) + 1
+        # Blob rows first: images reference them.
+        acquire_blob_refs(self.session, refs)
+        created: list[Image | None] = []
+        for new in images:
+            if new.recipe_id not in visible:
+                created.append(None)
+                continue
+            image = Image(
+                recipe_id=new.recipe_id,
+                caption=new.caption,
+                display_order=new.display_order,
+                extension=new.extension,
+                media_type=new.media_type,
+                content_hash=new.content_hash,
+                placeholder=new.placeholder,
+            )
+            self.session.add(image)
+            created.append(image)
+        for recipe_id in sorted({i.recipe_id for i in created if i is not None}):
+            self._touch_recipe(recipe_id)
+        self.session.flush()
+        # Built before the commit, which would expire every image.
+        entities = [_image_entity(image) if image else None for image in created]
+        self.session.commit()
+        return entities
 
     def delete_image(self, image_id: UUID, user_id: UUID) -> bool:
         """Delete an Image record by ID, only if its recipe is visible to user_id."""
@@ -474,18 +782,29 @@ class RecipeRepository(RecipeRepositoryPort):
         image = self.session.execute(stmt).scalars().first()
         if image is None:
             return False
+        self._touch_recipe(image.recipe_id)
+        if image.content_hash is not None:
+            release_blob_refs(self.session, {image.content_hash: 1})
         self.session.delete(image)
         self.session.commit()
         return True
 
-    def image_belongs_to_user(self, image_id: UUID, user_id: UUID) -> bool:
-        """Check if an image belongs to a recipe visible to the given user."""
+    def delete_unreferenced_blobs(
+        self, content_hashes: Collection[str], delete_file: Callable[[str], object]
+    ) -> list[str]:
+        """Delete the blobs among ``content_hashes`` that no image references any more."""
+        return delete_unreferenced_blobs(self.session, content_hashes, delete_file)
+
+    def get_image(self, image_id: UUID, user_id: UUID) -> ImageEntity | None:
+        """Return an image of a recipe visible to the given user, or None."""
         stmt = (
             select(Image)
             .join(Recipe, Image.recipe_id == Recipe.id)
             .where(Image.id == image_id, self._visible_recipe_filter(user_id))
         )
-        return self.session.execute(stmt).scalars().first() is not None
+        with replica_reads(self.session):
+            image = self.session.execute(stmt).scalars().first()
+            return _image_entity(image) if image is not None else None
 
     def get_existing_source_raw_contents(
         self, raw_contents: set[str], user_id: UUID
@@ -508,6 +827,11 @@ class RecipeRepository(RecipeRepositoryPort):
         recipe = self._load_recipe(recipe_id, user_id)
         if recipe is None:
             return False
+        _bump_library_versions(self.session, _recipe_audience(recipe_id))
+        release_blob_refs(
+            self.session,
+            Counter(img.content_hash for img in recipe.images if img.content_hash),
+        )
         self.session.delete(recipe)
         self.session.commit()
         return True
@@ -552,7 +876,8 @@ class UserRepository(UserRepositoryPort):
         return self._to_entity(user)
 
     def get_user_by_id(self, user_id: UUID) -> UserEntity | None:
-        user = self.session.get(User, user_id)
+        with replica_reads(self.session):
+            user = self.session.get(User, user_id)
         if user is None:
             return None
         return self._to_entity(user)
@@ -627,6 +952,7 @@ class RecipeShareRepository(RecipeShareRepositoryPort):
             role=role,
         )
         self.session.add(share)
+        queue_invalidation(self.session, pending_shares_key(shared_with_user_id))
         self.session.commit()
         self.session.refresh(share)
         loaded = self._load_share(share.id)
@@ -652,7 +978,8 @@ class RecipeShareRepository(RecipeShareRepositoryPort):
             )
             .order_by(RecipeShare.created_at.desc())
         )
-        shares = self.session.execute(stmt).unique().scalars().all()
+        with replica_reads(self.session):
+            shares = self.session.execute(stmt).unique().scalars().all()
         return [self._to_entity(s) for s in shares]
 
     def get_pending_shares_count(self, user_id: UUID) -> int:
@@ -660,7 +987,8 @@ class RecipeShareRepository(RecipeShareRepositoryPort):
             RecipeShare.shared_with_user_id == user_id,
             RecipeShare.status == ShareStatus.pending,
         )
-        return self.session.execute(stmt).scalar_one()
+        with replica_reads(self.session):
+            return self.session.execute(stmt).scalar_one()
 
     def get_shares_for_recipe(self, recipe_id: UUID) -> list[RecipeShareEntity]:
         stmt = (
@@ -673,7 +1001,8 @@ class RecipeShareRepository(RecipeShareRepositoryPort):
             .where(RecipeShare.recipe_id == recipe_id)
             .order_by(RecipeShare.created_at.desc())
         )
-        shares = self.session.execute(stmt).unique().scalars().all()
+        with replica_reads(self.session):
+            shares = self.session.execute(stmt).unique().scalars().all()
         return [self._to_entity(s) for s in shares]
 
     def get_share_for_recipe_and_user(
@@ -704,6 +1033,8 @@ class RecipeShareRepository(RecipeShareRepositoryPort):
             return None
         share.status = status
         share.updated_at = datetime.now(UTC)
+        _bump_library_versions(self.session, [share.shared_with_user_id])
+        queue_invalidation(self.session, pending_shares_key(share.shared_with_user_id))
         self.session.commit()
         self.session.refresh(share)
         loaded = self._load_share(share.id)
@@ -727,6 +1058,11 @@ class RecipeShareRepository(RecipeShareRepositoryPort):
         for share in shares:
             share.status = ShareStatus.accepted
             share.updated_at = now
+        if shares:
+            with pipelined(self.session):
+                self.session.flush()
+                _bump_library_versions(self.session, [user_id])
+            queue_invalidation(self.session, pending_shares_key(user_id))
         self.session.commit()
         for share in shares:
             self.session.refresh(share)
@@ -736,6 +1072,11 @@ class RecipeShareRepository(RecipeShareRepositoryPort):
         share = self.session.get(RecipeShare, share_id)
         if share is None:
             return False
+        _bump_library_versions(self.session, [share.shared_with_user_id])
+        if share.status == ShareStatus.pending:
+            queue_invalidation(
+                self.session, pending_shares_key(share.shared_with_user_id)
+            )
         self.session.delete(share)
         self.session.commit()
         return True
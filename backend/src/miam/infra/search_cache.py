@@ -0,0 +1,58 @@
+"""Read-through cache of recipe search results on top of the cache port."""
+
+import hashlib
+from collections.abc import Hashable
+from uuid import UUID
+
+from pydantic import TypeAdapter
+
+from miam.domain.entities import PaginatedResult
+from miam.domain.ports_secondary import CachePort
+
+_codec = TypeAdapter(PaginatedResult)
+
+
+class SearchResultCache:
+    """Cache search results keyed by user, library generation and normalized filters.
+
+    Any write visible to a user bumps their generation, so stale entries are
+    never read again; they age out through the backend's LRU eviction or TTL.
+    Results are stored as JSON so any backend can hold them and every reader
+    gets its own copy.
+    """
+
+    def __init__(self, cache: CachePort, ttl_seconds: float | None = 600) -> None:
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(user_id: UUID, generation: int, filters: Hashable) -> str:
+        digest = hashlib.sha256(repr(filters).encode()).hexdigest()[:32]
+        return f"search:{user_id}:{generation}:{digest}"
+
+    def get(
+        self, user_id: UUID, generation: int, filters: Hashable
+    ) -> PaginatedResult | None:
+        """Return the cached result, or None on a miss."""
+        payload = self.cache.get(self._key(user_id, generation, filters))
+        if payload is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return _codec.validate_json(payload)
+
+    def put(
+        self,
+        user_id: UUID,
+        generation: int,
+        filters: Hashable,
+        result: PaginatedResult,
+    ) -> None:
+        """Store a result for the given generation."""
+        self.cache.set(
+            self._key(user_id, generation, filters),
+            _codec.dump_json(result),
+            self.ttl_seconds,
+        )
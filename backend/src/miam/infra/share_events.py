@@ -0,0 +1,80 @@
+"""In-process pub/sub of pending share count changes.
+
+Share writes queue a ``pending-shares:<user id>`` key on the session (see
+:mod:`miam.infra.cache.invalidation`); the invalidation bus delivers it to every
+worker after commit, where :class:`ShareEventBroker` wakes the event streams
+of that user.
+"""
+
+import asyncio
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from uuid import UUID
+
+PENDING_SHARES_PREFIX = "pending-shares:"
+
+_Stream = tuple[asyncio.AbstractEventLoop, asyncio.Event]
+
+
+def pending_shares_key(user_id: UUID) -> str:
+    """Invalidation key published when a user's pending share count may change."""
+    return f"{PENDING_SHARES_PREFIX}{user_id}"
+
+
+class ShareEventBroker:
+    """Fan pending share changes out to the open event streams of this worker.
+
+    Each stream waits on its own :class:`asyncio.Event`: bursts of changes
+    coalesce into a single wake-up, and idle streams cost no work at all.
+    """
+
+    def __init__(self) -> None:
+        self._streams: dict[UUID, set[_Stream]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def subscribe(self, user_id: UUID) -> Iterator[asyncio.Event]:
+        """Yield an event set whenever the user's pending shares change.
+
+        Must be entered from the event loop the stream runs on.
+        """
+        stream: _Stream = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._streams.setdefault(user_id, set()).add(stream)
+        try:
+            yield stream[1]
+        finally:
+            with self._lock:
+                streams = self._streams.get(user_id)
+                if streams is not None:
+                    streams.discard(stream)
+                    if not streams:
+                        del self._streams[user_id]
+
+    def subscriber_count(self, user_id: UUID) -> int:
+        """Number of open streams of a user on this worker."""
+        with self._lock:
+            return len(self._streams.get(user_id, ()))
+
+    def notify(self, user_id: UUID) -> None:
+        """Wake the user's streams. Safe to call from any thread."""
+        with self._lock:
+            streams = list(self._streams.get(user_id, ()))
+        for loop, changed in streams:
+            try:
+                loop.call_soon_threadsafe(changed.set)
+            except RuntimeError:
+                # Loop already closed: the stream is being torn down.
+                continue
+
+    def publish_keys(self, keys: list[str]) -> None:
+        """Invalidation bus subscriber: notify users whose pending shares changed."""
+        for key in keys:
+            if not key.startswith(PENDING_SHARES_PREFIX):
+                continue
+            try:
+                user_id = UUID(key.removeprefix(PENDING_SHARES_PREFIX))
+            except ValueError:
+                continue
+            self.notify(user_id)
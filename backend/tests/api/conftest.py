@@ -6,11 +6,15 @@ from typing import Any
 from unittest.mock import MagicMock, create_autospec
 from uuid import UUID, uuid4
 
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 
 from miam.api.deps import (
     get_current_user_id,
+    get_http_client,
+    get_image_access,
+    get_image_url_signer,
     get_recipe_export_service,
     get_recipe_management_service,
 )
@@ -23,8 +27,10 @@ from miam.domain.entities import (
     SourceEntity,
 )
 from miam.domain.services import RecipeExportService, RecipeManagementService
+from miam.infra.image_url_signer import HmacImageUrlSigner
 
 TEST_USER_ID = UUID("00000000-0000-0000-0000-000000000001")
+TEST_SIGNER = HmacImageUrlSigner("test-secret")
 
 
 @pytest.fixture
@@ -39,6 +45,10 @@ def mock_export_service() -> MagicMock:
     return mock
 
 
+def _no_network(request: httpx.Request) -> httpx.Response:
+    raise httpx.ConnectError("Tests do not download", request=request)
+
+
 @pytest.fixture
 def client(
     mock_recipe_service: MagicMock,
@@ -49,6 +59,11 @@ def client(
     )
     app.dependency_overrides[get_recipe_export_service] = lambda: mock_export_service
     app.dependency_overrides[get_current_user_id] = lambda: TEST_USER_ID
+    app.dependency_overrides[get_image_access] = lambda: TEST_USER_ID
+    app.dependency_overrides[get_image_url_signer] = lambda: TEST_SIGNER
+    app.dependency_overrides[get_http_client] = lambda: httpx.AsyncClient(
+        transport=httpx.MockTransport(_no_network)
+    )
     yield TestClient(app)
     app.dependency_overrides.clear()
 
@@ -0,0 +1,89 @@
+"""Tests for API dependencies."""
+
+import asyncio
+import threading
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from sqlalchemy import create_engine
+from starlette.requests import Request
+from starlette.responses import Response
+
+from miam.api.deps import PRIMARY_PIN_COOKIE, ServiceRunner, _route_reads
+from miam.infra.db.routing import RoutingSession, replica_available
+
+
+class FakeAsyncSession:
+    """Records run_sync calls the way AsyncSession would dispatch them."""
+
+    def __init__(self) -> None:
+        self.sync_session = object()
+        self.calls = 0
+
+    async def run_sync(self, fn: Callable[..., Any]) -> Any:
+        self.calls += 1
+        return fn(self.sync_session)
+
+
+class TestServiceRunner:
+    def test_runs_in_thread_pool_without_async_session(self) -> None:
+        caller = threading.get_ident()
+
+        result = asyncio.run(ServiceRunner().run(threading.get_ident))
+
+        assert result != caller
+
+    def test_runs_through_async_session(self) -> None:
+        session = FakeAsyncSession()
+        runner = ServiceRunner(session)  # type: ignore[arg-type]
+
+        def add(a: int, *, b: int) -> int:
+            return a + b
+
+        result = asyncio.run(runner.run(add, 1, b=2))
+
+        assert result == 3
+        assert session.calls == 1
+
+    def test_propagates_exceptions(self) -> None:
+        def fail() -> None:
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            asyncio.run(ServiceRunner().run(fail))
+
+
+def _request(method: str, cookie: str = "") -> Request:
+    headers = [(b"cookie", cookie.encode())] if cookie else []
+    return Request({"type": "http", "method": method, "headers": headers})
+
+
+class TestRouteReads:
+    @staticmethod
+    def _session() -> RoutingSession:
+        return RoutingSession(
+            bind=create_engine("sqlite://"), replica=create_engine("sqlite://")
+        )
+
+    def test_get_may_use_replica(self) -> None:
+        db = self._session()
+
+        _route_reads(db, _request("GET"), Response())
+
+        assert replica_available(db)
+
+    def test_write_pins_to_primary_and_sets_cookie(self) -> None:
+        db, response = self._session(), Response()
+
+        _route_reads(db, _request("POST"), response)
+
+        assert not replica_available(db)
+        assert PRIMARY_PIN_COOKIE in response.headers["set-cookie"]
+
+    def test_pin_cookie_keeps_reads_on_primary(self) -> None:
+        db = self._session()
+
+        _route_reads(db, _request("GET", f"{PRIMARY_PIN_COOKIE}=1"), Response())
+
+        assert not replica_available(db)
@@ -9,7 +9,9 @@ class TestExportMarkdown:
     def test_returns_zip(
         self, client: TestClient, mock_export_service: MagicMock
     ) -> None:
-        mock_export_service.export_recipes_to_markdown.return_value = b"PK-zip-content"
+        mock_export_service.export_recipes_to_markdown.return_value = iter(
+            [b"PK-zip", b"-content"]
+        )
 
         response = client.post("/api/export/markdown")
 
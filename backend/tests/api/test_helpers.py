@@ -1,12 +1,19 @@
 """Tests for API route helpers."""
 
+import asyncio
 import io
+from datetime import UTC, datetime
 
 import pytest
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile
 from starlette.datastructures import Headers
 
-from miam.api.routes.helpers import get_filename
+from miam.api.routes.helpers import (
+    etag_matches,
+    get_filename,
+    not_modified,
+    open_upload,
+)
 
 
 def _upload(filename: str | None = "", content_type: str | None = None) -> UploadFile:
@@ -39,3 +46,74 @@ class TestGetFilename:
     def test_generated_names_are_unique(self) -> None:
         names = {get_filename(_upload("", "image/png")) for _ in range(10)}
         assert len(names) == 10
+
+
+class TestEtagMatches:
+    def test_no_header(self) -> None:
+        assert etag_matches(None, '"v1"') is False
+
+    def test_exact_match(self) -> None:
+        assert etag_matches('"v1"', '"v1"') is True
+
+    def test_mismatch(self) -> None:
+        assert etag_matches('"v2"', '"v1"') is False
+
+    def test_weak_comparison(self) -> None:
+        assert etag_matches('W/"v1"', '"v1"') is True
+        assert etag_matches('"v1"', 'W/"v1"') is True
+
+    def test_list_of_tags(self) -> None:
+        assert etag_matches('"v0", W/"v1"', 'W/"v1"') is True
+
+    def test_wildcard(self) -> None:
+        assert etag_matches("*", '"anything"') is True
+
+
+class TestNotModified:
+    _LAST_MODIFIED = datetime(2024, 1, 1, 12, 0, 0, 500_000, tzinfo=UTC)
+
+    def test_matching_etag(self) -> None:
+        assert not_modified('"v1"', None, '"v1"', None) is True
+        assert not_modified('"v2"', None, '"v1"', None) is False
+        assert not_modified('"v1"', None, None, self._LAST_MODIFIED) is False
+
+    def test_date_at_or_after_last_modification(self) -> None:
+        since = "Mon, 01 Jan 2024 12:00:00 GMT"
+        before = "Mon, 01 Jan 2024 11:59:59 GMT"
+        assert not_modified(None, since, None, self._LAST_MODIFIED) is True
+        assert not_modified(None, before, None, self._LAST_MODIFIED) is False
+        assert not_modified(None, since, None, None) is False
+
+    def test_etag_takes_precedence_over_date(self) -> None:
+        since = "Mon, 01 Jan 2024 12:00:00 GMT"
+        assert not_modified('"v2"', since, '"v1"', self._LAST_MODIFIED) is False
+
+    def test_ignores_invalid_dates(self) -> None:
+        assert not_modified(None, "yesterday", None, self._LAST_MODIFIED) is False
+
+
+class TestOpenUpload:
+    def test_returns_the_upload_file_rewound(self) -> None:
+        upload = UploadFile(file=io.BytesIO(b"x" * 200_000), filename="a.jpg")
+        upload.file.seek(123)
+
+        content = asyncio.run(open_upload(upload, max_bytes=200_000))
+
+        assert content is upload.file
+        assert content.read() == b"x" * 200_000
+
+    def test_rejects_oversized_upload_of_unknown_size(self) -> None:
+        upload = UploadFile(file=io.BytesIO(b"x" * 1_000_000), filename="a.jpg")
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(open_upload(upload, max_bytes=200_000))
+
+        assert exc_info.value.status_code == 413
+
+    def test_rejects_declared_oversized_upload(self) -> None:
+        upload = UploadFile(file=io.BytesIO(b"x" * 10), filename="a.jpg", size=10)
+
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(open_upload(upload, max_bytes=5))
+
+        assert exc_info.value.status_code == 413
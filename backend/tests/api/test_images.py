@@ -1,13 +1,40 @@
 """Tests for image API routes."""
 
+import asyncio
+from collections.abc import AsyncIterator, Callable
 from pathlib import Path
-from unittest.mock import MagicMock, patch
-from uuid import uuid4
+from typing import Any
+from unittest.mock import ANY, MagicMock, create_autospec, patch
+from uuid import UUID, uuid4
 
 import httpx
+import pytest
 from fastapi.testclient import TestClient
 
+from miam.api.deps import (
+    ImageSettings,
+    get_auth_service,
+    get_file_sender,
+    get_http_client,
+    get_image_access,
+    get_image_settings,
+)
+from miam.api.main import app
+from miam.api.routes.helpers import FileSender, signed_image_url
 from miam.api.routes.images import _is_allowed_image_url
+from miam.domain.entities import (
+    ImageEntity,
+    ImageGrant,
+    ImageLocation,
+    ImageUpload,
+    ImageVariant,
+)
+from miam.domain.services import AuthService
+from tests.api.conftest import TEST_SIGNER, TEST_USER_ID
+
+# A UUIDv7 created at 2024-01-01 00:00:00 UTC.
+_IMAGE_ID = UUID("018cc251-f400-7000-8000-000000000000")
+_CREATED = "Mon, 01 Jan 2024 00:00:00 GMT"
 
 
 class TestUploadImage:
@@ -30,6 +57,26 @@ class TestUploadImage:
         assert data["recipe"] == str(recipe_id)
         assert data["title"] == "photo.jpg"
 
+    def test_passes_upload_as_a_file(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        received: list[bytes] = []
+
+        def add_recipe_image(**kwargs: Any) -> UUID:
+            received.append(kwargs["content"].read())
+            return uuid4()
+
+        mock_recipe_service.add_recipe_image.side_effect = add_recipe_image
+
+        response = client.post(
+            "/api/images",
+            data={"recipe_id": str(uuid4())},
+            files={"image": ("photo.jpg", b"fake-jpeg-bytes", "image/jpeg")},
+        )
+
+        assert response.status_code == 201
+        assert received == [b"fake-jpeg-bytes"]
+
     def test_returns_error_when_no_filename(
         self, client: TestClient, mock_recipe_service: MagicMock
     ) -> None:
@@ -65,9 +112,8 @@ class TestGetImage:
     ) -> None:
         image_path = tmp_path / "fake.png"
         image_path.write_bytes(b"\x89PNG-data")
-        mock_recipe_service.get_recipe_image_path.return_value = (
-            image_path,
-            "image/png",
+        mock_recipe_service.locate_recipe_image.return_value = ImageLocation(
+            path=image_path, media_type="image/png"
         )
 
         response = client.get(f"/api/images/{uuid4()}")
@@ -80,15 +126,341 @@ class TestGetImage:
         assert "max-age=300" in cache_control
         assert "must-revalidate" in cache_control
 
+    def test_hands_file_over_to_nginx(
+        self,
+        client: TestClient,
+        mock_recipe_service: MagicMock,
+        tmp_path: Path,
+    ) -> None:
+        app.dependency_overrides[get_file_sender] = lambda: FileSender(
+            "/_protected/", {"images": str(tmp_path)}
+        )
+        image_path = tmp_path / "ab" / "cd" / "abcd.png"
+        mock_recipe_service.locate_recipe_image.return_value = ImageLocation(
+            path=image_path, media_type="image/png"
+        )
+
+        response = client.get(f"/api/images/{uuid4()}")
+
+        assert response.status_code == 200
+        assert (
+            response.headers["x-accel-redirect"] == "/_protected/images/ab/cd/abcd.png"
+        )
+        assert response.headers["content-type"] == "image/png"
+        assert "private" in response.headers["cache-control"]
+        assert response.content == b""
+
+    def test_streams_files_outside_nginx_folders(
+        self,
+        client: TestClient,
+        mock_recipe_service: MagicMock,
+        tmp_path: Path,
+    ) -> None:
+        app.dependency_overrides[get_file_sender] = lambda: FileSender(
+            "/_protected", {"images": str(tmp_path / "images")}
+        )
+        image_path = tmp_path / "elsewhere.png"
+        image_path.write_bytes(b"\x89PNG-data")
+        mock_recipe_service.locate_recipe_image.return_value = ImageLocation(
+            path=image_path, media_type="image/png"
+        )
+
+        response = client.get(f"/api/images/{uuid4()}")
+
+        assert "x-accel-redirect" not in response.headers
+        assert response.content == b"\x89PNG-data"
+
     def test_returns_404_when_not_found(
         self, client: TestClient, mock_recipe_service: MagicMock
     ) -> None:
-        mock_recipe_service.get_recipe_image_path.return_value = None
+        mock_recipe_service.locate_recipe_image.return_value = None
 
         response = client.get(f"/api/images/{uuid4()}")
 
         assert response.status_code == 404
 
+    def test_redirects_to_storage_url(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        url = "https://bucket.s3.example.com/blobs/ab/cd/abcd.png?X-Amz-Signature=sig"
+        mock_recipe_service.locate_recipe_image.return_value = ImageLocation(url=url)
+
+        response = client.get(f"/api/images/{uuid4()}", follow_redirects=False)
+
+        assert response.status_code == 307
+        assert response.headers["location"] == url
+        assert response.headers["cache-control"] == "no-store"
+
+    def test_sends_validators_of_the_content_hash(
+        self,
+        client: TestClient,
+        mock_recipe_service: MagicMock,
+        tmp_path: Path,
+    ) -> None:
+        image_path = tmp_path / "fake.png"
+        image_path.write_bytes(b"\x89PNG-data")
+        mock_recipe_service.locate_recipe_image.return_value = ImageLocation(
+            path=image_path, media_type="image/png", etag='"abcd"'
+        )
+
+        response = client.get(f"/api/images/{_IMAGE_ID}")
+
+        assert response.headers["etag"] == '"abcd"'
+        assert response.headers["last-modified"] == _CREATED
+
+    def test_revalidation_returns_304_without_the_file(
+        self,
+        client: TestClient,
+        mock_recipe_service: MagicMock,
+        tmp_path: Path,
+    ) -> None:
+        mock_recipe_service.locate_recipe_image.return_value = ImageLocation(
+            path=tmp_path / "missing.png", media_type="image/png", etag='"abcd"'
+        )
+
+        by_etag = client.get(
+            f"/api/images/{_IMAGE_ID}", headers={"If-None-Match": '"abcd"'}
+        )
+        by_date = client.get(
+            f"/api/images/{_IMAGE_ID}", headers={"If-Modified-Since": _CREATED}
+        )
+
+        for response in (by_etag, by_date):
+            assert response.status_code == 304
+            assert response.headers["etag"] == '"abcd"'
+            assert "private" in response.headers["cache-control"]
+
+    def test_changed_validators_return_the_image(
+        self,
+        client: TestClient,
+        mock_recipe_service: MagicMock,
+        tmp_path: Path,
+    ) -> None:
+        image_path = tmp_path / "fake.png"
+        image_path.write_bytes(b"\x89PNG-data")
+        mock_recipe_service.locate_recipe_image.return_value = ImageLocation(
+            path=image_path, media_type="image/png", etag='"abcd"'
+        )
+
+        response = client.get(
+            f"/api/images/{_IMAGE_ID}",
+            # If-Modified-Since is ignored along with If-None-Match.
+            headers={"If-None-Match": '"other"', "If-Modified-Since": _CREATED},
+        )
+
+        assert response.status_code == 200
+        assert response.content == b"\x89PNG-data"
+
+    def test_serves_byte_ranges(
+        self,
+        client: TestClient,
+        mock_recipe_service: MagicMock,
+        tmp_path: Path,
+    ) -> None:
+        image_path = tmp_path / "fake.png"
+        image_path.write_bytes(b"\x89PNG-data")
+        mock_recipe_service.locate_recipe_image.return_value = ImageLocation(
+            path=image_path, media_type="image/png", etag='"abcd"'
+        )
+
+        resumed = client.get(
+            f"/api/images/{_IMAGE_ID}",
+            headers={"Range": "bytes=5-", "If-Range": '"abcd"'},
+        )
+        changed = client.get(
+            f"/api/images/{_IMAGE_ID}",
+            headers={"Range": "bytes=5-", "If-Range": '"other"'},
+        )
+
+        assert resumed.status_code == 206
+        assert resumed.headers["content-range"] == "bytes 5-8/9"
+        assert resumed.content == b"data"
+        assert changed.status_code == 200
+        assert changed.content == b"\x89PNG-data"
+
+    def test_redirect_is_revalidated_before_redirecting(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        url = "https://bucket.s3.example.com/blobs/ab/cd/abcd.png?X-Amz-Signature=sig"
+        mock_recipe_service.locate_recipe_image.return_value = ImageLocation(
+            url=url, etag='"abcd"'
+        )
+
+        redirect = client.get(f"/api/images/{_IMAGE_ID}", follow_redirects=False)
+        revalidated = client.get(
+            f"/api/images/{_IMAGE_ID}", headers={"If-None-Match": '"abcd"'}
+        )
+
+        assert redirect.status_code == 307
+        assert redirect.headers["etag"] == '"abcd"'
+        assert revalidated.status_code == 304
+
+    def test_serves_variant_with_strong_etag(
+        self,
+        client: TestClient,
+        mock_recipe_service: MagicMock,
+        tmp_path: Path,
+    ) -> None:
+        image_id = uuid4()
+        variant_path = tmp_path / "variant.webp"
+        variant_path.write_bytes(b"RIFF-webp")
+        mock_recipe_service.get_recipe_image_variant.return_value = ImageVariant(
+            path=variant_path, media_type="image/webp", etag='"abc123"'
+        )
+
+        response = client.get(f"/api/images/{image_id}?w=320&format=webp")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/webp"
+        assert response.headers["etag"] == '"abc123"'
+        assert "private" in response.headers["cache-control"]
+        assert response.content == b"RIFF-webp"
+        mock_recipe_service.get_recipe_image_variant.assert_called_once_with(
+            image_id, ANY, 320, "webp"
+        )
+        mock_recipe_service.locate_recipe_image.assert_not_called()
+
+    def test_variant_is_handed_over_to_nginx_with_its_etag(
+        self,
+        client: TestClient,
+        mock_recipe_service: MagicMock,
+        tmp_path: Path,
+    ) -> None:
+        app.dependency_overrides[get_file_sender] = lambda: FileSender(
+            "/_protected", {"image_cache": str(tmp_path)}
+        )
+        mock_recipe_service.get_recipe_image_variant.return_value = ImageVariant(
+            path=tmp_path / "ab" / "abc123.webp",
+            media_type="image/webp",
+            etag='"abc123"',
+        )
+
+        response = client.get(f"/api/images/{uuid4()}?w=320&format=webp")
+
+        assert response.headers["x-accel-redirect"] == (
+            "/_protected/image_cache/ab/abc123.webp"
+        )
+        assert response.headers["etag"] == '"abc123"'
+        assert response.content == b""
+
+    def test_variant_revalidation_returns_304(
+        self,
+        client: TestClient,
+        mock_recipe_service: MagicMock,
+        tmp_path: Path,
+    ) -> None:
+        variant_path = tmp_path / "variant.webp"
+        variant_path.write_bytes(b"RIFF-webp")
+        mock_recipe_service.get_recipe_image_variant.return_value = ImageVariant(
+            path=variant_path, media_type="image/webp", etag='"abc123"'
+        )
+
+        response = client.get(
+            f"/api/images/{uuid4()}?format=webp",
+            headers={"If-None-Match": 'W/"other", "abc123"'},
+        )
+
+        assert response.status_code == 304
+        assert response.headers["etag"] == '"abc123"'
+        assert response.content == b""
+
+    def test_variant_returns_404_when_not_found(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        mock_recipe_service.get_recipe_image_variant.return_value = None
+
+        response = client.get(f"/api/images/{uuid4()}?w=320")
+
+        assert response.status_code == 404
+
+    def test_variant_returns_400_when_image_cannot_be_converted(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        mock_recipe_service.get_recipe_image_variant.side_effect = ValueError(
+            "Image cannot be converted"
+        )
+
+        response = client.get(f"/api/images/{uuid4()}?w=320")
+
+        assert response.status_code == 400
+
+    def test_rejects_unsupported_variant_parameters(self, client: TestClient) -> None:
+        assert client.get(f"/api/images/{uuid4()}?format=tiff").status_code == 422
+        assert client.get(f"/api/images/{uuid4()}?w=0").status_code == 422
+
+
+class TestGetSignedImage:
+    """Signed URLs are served without authentication (no override of the access)."""
+
+    @pytest.fixture(autouse=True)
+    def _real_access(self, client: TestClient) -> None:
+        app.dependency_overrides.pop(get_image_access)
+        app.dependency_overrides[get_auth_service] = lambda: create_autospec(
+            AuthService, instance=True
+        )
+
+    def _signed_url(self) -> tuple[str, ImageGrant]:
+        image = ImageEntity(
+            id=uuid4(), extension=".png", content_hash="ab" * 32, media_type="image/png"
+        )
+        grant = TEST_SIGNER.sign(image)
+        return f"/api/{signed_image_url(grant)}", grant
+
+    def test_serves_signed_url_as_public_immutable(
+        self, client: TestClient, mock_recipe_service: MagicMock, tmp_path: Path
+    ) -> None:
+        image_path = tmp_path / "fake.png"
+        image_path.write_bytes(b"\x89PNG-data")
+        mock_recipe_service.locate_recipe_image.return_value = ImageLocation(
+            path=image_path, media_type="image/png"
+        )
+        url, grant = self._signed_url()
+
+        response = client.get(url)
+
+        assert response.status_code == 200
+        assert response.content == b"\x89PNG-data"
+        cache_control = response.headers["cache-control"]
+        assert cache_control.startswith("public, max-age=")
+        assert "immutable" in cache_control
+        mock_recipe_service.locate_recipe_image.assert_called_once_with(
+            grant.image_id, grant
+        )
+
+    def test_signed_variant_is_public(
+        self, client: TestClient, mock_recipe_service: MagicMock, tmp_path: Path
+    ) -> None:
+        variant_path = tmp_path / "variant.webp"
+        variant_path.write_bytes(b"RIFF-webp")
+        mock_recipe_service.get_recipe_image_variant.return_value = ImageVariant(
+            path=variant_path, media_type="image/webp", etag='"abc123"'
+        )
+        url, grant = self._signed_url()
+
+        response = client.get(f"{url}&w=320&format=webp")
+
+        assert response.status_code == 200
+        assert response.headers["cache-control"].startswith("public")
+        mock_recipe_service.get_recipe_image_variant.assert_called_once_with(
+            grant.image_id, grant, 320, "webp"
+        )
+
+    def test_rejects_tampered_signature(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        url, grant = self._signed_url()
+
+        response = client.get(url.replace(grant.content_hash or "", "cd" * 32))
+
+        assert response.status_code == 403
+        mock_recipe_service.locate_recipe_image.assert_not_called()
+
+    def test_unsigned_request_requires_authentication(self, client: TestClient) -> None:
+
+        response = client.get(f"/api/images/{uuid4()}")
+
+        assert response.status_code == 401
+
 
 class TestDeleteImage:
     def test_returns_204_on_success(
@@ -138,51 +510,58 @@ class TestIsAllowedImageUrl:
 
 
 class TestUploadImageFromUrl:
+    _URL = "https://scontent.cdninstagram.com/img.jpg"
+
     @staticmethod
-    def _mock_httpx_response(
+    def _serve(handler: Callable[[httpx.Request], httpx.Response]) -> None:
+        """Answer the route's downloads with ``handler``."""
+        app.dependency_overrides[get_http_client] = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+
+    @staticmethod
+    def _image_response(
         *,
         content: bytes = b"fake-image",
         content_type: str = "image/jpeg",
         status_code: int = 200,
-    ) -> httpx.Response:
-        return httpx.Response(
+    ) -> Callable[[httpx.Request], httpx.Response]:
+        return lambda request: httpx.Response(
             status_code=status_code,
             headers={"content-type": content_type},
             content=content,
-            request=httpx.Request("GET", "https://scontent.cdninstagram.com/img.jpg"),
+        )
+
+    def _post(self, client: TestClient, url: str = _URL) -> httpx.Response:
+        return client.post(
+            "/api/images/from-url", json={"recipe_id": str(uuid4()), "url": url}
         )
 
     def test_returns_201_on_success(
         self, client: TestClient, mock_recipe_service: MagicMock
     ) -> None:
         image_id = uuid4()
-        recipe_id = uuid4()
-        mock_recipe_service.add_recipe_image.return_value = image_id
+        received: list[bytes] = []
 
-        with patch("miam.api.routes.images.httpx.AsyncClient") as mock_httpx:
-            mock_httpx.return_value.__aenter__.return_value.get.return_value = (
-                self._mock_httpx_response()
-            )
-            response = client.post(
-                "/api/images/from-url",
-                json={
-                    "recipe_id": str(recipe_id),
-                    "url": "https://scontent.cdninstagram.com/img.jpg",
-                },
-            )
+        def add_recipe_image(**kwargs: Any) -> UUID:
+            received.append(kwargs["content"].read())
+            return image_id
+
+        mock_recipe_service.add_recipe_image.side_effect = add_recipe_image
+        self._serve(self._image_response())
+
+        response = self._post(client)
 
         assert response.status_code == 201
         data = response.json()
         assert data["image_id"] == str(image_id)
         assert data["title"] == "instagram.jpeg"
+        assert received == [b"fake-image"]
 
     def test_returns_400_for_disallowed_url(
         self, client: TestClient, mock_recipe_service: MagicMock
     ) -> None:
-        response = client.post(
-            "/api/images/from-url",
-            json={"recipe_id": str(uuid4()), "url": "https://evil.com/img.jpg"},
-        )
+        response = self._post(client, "https://evil.com/img.jpg")
 
         assert response.status_code == 400
         assert "Instagram CDN" in response.json()["detail"]
@@ -190,17 +569,22 @@ class TestUploadImageFromUrl:
     def test_returns_400_on_download_failure(
         self, client: TestClient, mock_recipe_service: MagicMock
     ) -> None:
-        with patch("miam.api.routes.images.httpx.AsyncClient") as mock_httpx:
-            mock_httpx.return_value.__aenter__.return_value.get.side_effect = (
-                httpx.HTTPError("connection failed")
-            )
-            response = client.post(
-                "/api/images/from-url",
-                json={
-                    "recipe_id": str(uuid4()),
-                    "url": "https://scontent.cdninstagram.com/img.jpg",
-                },
-            )
+        def fail(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("connection failed", request=request)
+
+        self._serve(fail)
+
+        response = self._post(client)
+
+        assert response.status_code == 400
+        assert "Failed to download" in response.json()["detail"]
+
+    def test_returns_400_on_error_status(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        self._serve(self._image_response(status_code=404))
+
+        response = self._post(client)
 
         assert response.status_code == 400
         assert "Failed to download" in response.json()["detail"]
@@ -208,56 +592,218 @@ class TestUploadImageFromUrl:
     def test_returns_400_for_non_image_content_type(
         self, client: TestClient, mock_recipe_service: MagicMock
     ) -> None:
-        with patch("miam.api.routes.images.httpx.AsyncClient") as mock_httpx:
-            mock_httpx.return_value.__aenter__.return_value.get.return_value = (
-                self._mock_httpx_response(content_type="text/html")
-            )
-            response = client.post(
-                "/api/images/from-url",
-                json={
-                    "recipe_id": str(uuid4()),
-                    "url": "https://scontent.cdninstagram.com/page",
-                },
-            )
+        self._serve(self._image_response(content_type="text/html"))
+
+        response = self._post(client, "https://scontent.cdninstagram.com/page")
 
         assert response.status_code == 400
         assert "did not return an image" in response.json()["detail"]
 
-    def test_returns_413_when_too_large(
+    def test_returns_413_when_announced_size_is_too_large(
         self, client: TestClient, mock_recipe_service: MagicMock
     ) -> None:
-        large_content = b"x" * (5 * 1024 * 1024 + 1)
+        self._serve(self._image_response(content=b"x" * (5 * 1024 * 1024 + 1)))
 
-        with patch("miam.api.routes.images.httpx.AsyncClient") as mock_httpx:
-            mock_httpx.return_value.__aenter__.return_value.get.return_value = (
-                self._mock_httpx_response(content=large_content)
-            )
-            response = client.post(
-                "/api/images/from-url",
-                json={
-                    "recipe_id": str(uuid4()),
-                    "url": "https://scontent.cdninstagram.com/big.jpg",
-                },
+        response = self._post(client)
+
+        assert response.status_code == 413
+        mock_recipe_service.add_recipe_image.assert_not_called()
+
+    def test_stops_downloading_once_too_large(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        sent: list[int] = []
+
+        async def endless_body() -> AsyncIterator[bytes]:
+            # No Content-Length: the size is only known while reading.
+            for _ in range(100):
+                sent.append(1)
+                yield b"x" * (1024 * 1024)
+
+        self._serve(
+            lambda request: httpx.Response(
+                200, headers={"content-type": "image/jpeg"}, content=endless_body()
             )
+        )
+
+        response = self._post(client)
 
         assert response.status_code == 413
+        assert len(sent) <= 7
+        mock_recipe_service.add_recipe_image.assert_not_called()
 
     def test_returns_400_on_service_error(
         self, client: TestClient, mock_recipe_service: MagicMock
     ) -> None:
         mock_recipe_service.add_recipe_image.side_effect = ValueError("not your recipe")
+        self._serve(self._image_response())
+
+        response = self._post(client)
+
+        assert response.status_code == 400
+        assert "not your recipe" in response.json()["detail"]
+
+
+class TestUploadImagesFromUrls:
+    @staticmethod
+    def _items(*urls: str) -> list[dict[str, str]]:
+        return [{"recipe_id": str(uuid4()), "url": url} for url in urls]
 
-        with patch("miam.api.routes.images.httpx.AsyncClient") as mock_httpx:
-            mock_httpx.return_value.__aenter__.return_value.get.return_value = (
-                self._mock_httpx_response()
+    def test_reports_each_item(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.path == "/missing.jpg":
+                return httpx.Response(404)
+            return httpx.Response(
+                200, headers={"content-type": "image/jpeg"}, content=b"img"
+            )
+
+        app.dependency_overrides[get_http_client] = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        image_id = uuid4()
+        mock_recipe_service.add_recipe_images.return_value = [image_id, "not yours"]
+        items = self._items(
+            "https://scontent.cdninstagram.com/a.jpg",
+            "https://evil.com/b.jpg",
+            "https://scontent.cdninstagram.com/missing.jpg",
+            "https://scontent.cdninstagram.com/c.jpg",
+        )
+
+        response = client.post("/api/images/from-url/batch", json={"items": items})
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["recipe_id"] for r in results] == [i["recipe_id"] for i in items]
+        assert results[0]["image_id"] == str(image_id)
+        assert "Instagram CDN" in results[1]["error"]
+        assert "Failed to download" in results[2]["error"]
+        assert results[3] == {**items[3], "image_id": None, "error": "not yours"}
+        # Every downloaded image is added by one service call.
+        mock_recipe_service.add_recipe_images.assert_called_once()
+        uploads, user_id = mock_recipe_service.add_recipe_images.call_args.args
+        assert [str(u.recipe_id) for u in uploads] == [
+            items[0]["recipe_id"],
+            items[3]["recipe_id"],
+        ]
+        assert all(u.content.closed for u in uploads)
+        assert user_id == TEST_USER_ID
+
+    def test_bounds_concurrent_downloads(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        active: list[int] = [0]
+        peak: list[int] = [0]
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.01)
+            active[0] -= 1
+            return httpx.Response(
+                200, headers={"content-type": "image/jpeg"}, content=b"img"
             )
+
+        app.dependency_overrides[get_http_client] = lambda: httpx.AsyncClient(
+            transport=httpx.MockTransport(handler)
+        )
+        app.dependency_overrides[get_image_settings] = lambda: ImageSettings(
+            image_download_concurrency=2
+        )
+        mock_recipe_service.add_recipe_images.side_effect = lambda uploads, _: [
+            uuid4() for _ in uploads
+        ]
+        urls = [f"https://scontent.cdninstagram.com/{n}.jpg" for n in range(6)]
+
+        response = client.post(
+            "/api/images/from-url/batch", json={"items": self._items(*urls)}
+        )
+
+        assert response.status_code == 200
+        assert all(r["image_id"] for r in response.json()["results"])
+        assert peak[0] == 2
+
+    def test_rejects_empty_batch(self, client: TestClient) -> None:
+        response = client.post("/api/images/from-url/batch", json={"items": []})
+
+        assert response.status_code == 422
+
+
+class TestUploadImages:
+    def test_reports_each_file(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        recipe_id = uuid4()
+        image_id = uuid4()
+        received: list[tuple[bytes, str]] = []
+
+        def add_images(uploads: list[ImageUpload], _user_id: UUID) -> list[UUID | str]:
+            received.extend((u.content.read(), u.filename) for u in uploads)  # type: ignore[union-attr]
+            return [image_id, "Unsupported image type: .txt"]
+
+        mock_recipe_service.add_recipe_images.side_effect = add_images
+
+        response = client.post(
+            "/api/images/batch",
+            data={"recipe_id": str(recipe_id)},
+            files=[
+                ("images", ("a.jpg", b"jpeg-bytes", "image/jpeg")),
+                ("images", ("big.jpg", b"x" * (5 * 1024 * 1024 + 1), "image/jpeg")),
+                ("images", ("notes.txt", b"text", "text/plain")),
+            ],
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["recipe"] == str(recipe_id)
+        assert data["results"] == [
+            {"title": "a.jpg", "image_id": str(image_id), "error": None},
+            {
+                "title": "big.jpg",
+                "image_id": None,
+                "error": "Image too large (max 5 MB)",
+            },
+            {
+                "title": "notes.txt",
+                "image_id": None,
+                "error": "Unsupported image type: .txt",
+            },
+        ]
+        # One service call for all the files that fit.
+        assert received == [(b"jpeg-bytes", "a.jpg"), (b"text", "notes.txt")]
+        mock_recipe_service.add_recipe_images.assert_called_once()
+
+    def test_checks_access_before_reading_files(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        recipe_id = uuid4()
+        mock_recipe_service.check_edit_access.side_effect = ValueError(
+            "You don't have permission to edit this recipe"
+        )
+
+        with patch("miam.api.routes.images.open_upload") as open_file:
             response = client.post(
-                "/api/images/from-url",
-                json={
-                    "recipe_id": str(uuid4()),
-                    "url": "https://scontent.cdninstagram.com/img.jpg",
-                },
+                "/api/images/batch",
+                data={"recipe_id": str(recipe_id)},
+                files=[("images", ("a.jpg", b"jpeg-bytes", "image/jpeg"))],
             )
 
+        assert response.status_code == 403
+        mock_recipe_service.check_edit_access.assert_called_once_with(
+            recipe_id, TEST_USER_ID
+        )
+        open_file.assert_not_called()
+        mock_recipe_service.add_recipe_images.assert_not_called()
+
+    def test_rejects_too_many_files(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        response = client.post(
+            "/api/images/batch",
+            data={"recipe_id": str(uuid4())},
+            files=[("images", (f"{n}.jpg", b"x", "image/jpeg")) for n in range(51)],
+        )
+
         assert response.status_code == 400
-        assert "not your recipe" in response.json()["detail"]
+        mock_recipe_service.add_recipe_images.assert_not_called()
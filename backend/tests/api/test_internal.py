@@ -0,0 +1,94 @@
+"""Tests for internal operational endpoints."""
+
+from collections.abc import Generator
+from datetime import UTC, datetime
+from unittest.mock import create_autospec
+
+import pytest
+from fastapi.testclient import TestClient
+
+from miam.api.deps import (
+    InternalSettings,
+    get_image_garbage_collector,
+    get_internal_settings,
+)
+from miam.api.main import app
+from miam.infra.image_gc import ImageGarbageCollector, ImageGcReport
+
+client = TestClient(app)
+TOKEN = "internal-test-token"
+AUTH = {"Authorization": f"Bearer {TOKEN}"}
+
+
+@pytest.fixture(autouse=True)
+def internal_token() -> Generator[None]:
+    app.dependency_overrides[get_internal_settings] = lambda: InternalSettings(
+        internal_api_token=TOKEN
+    )
+    yield
+    app.dependency_overrides.pop(get_internal_settings)
+
+
+class TestInternalToken:
+    def test_rejects_requests_without_the_token(self) -> None:
+        response = client.get("/internal/db-pool")
+
+        assert response.status_code == 401
+
+    def test_rejects_a_wrong_token(self) -> None:
+        response = client.get(
+            "/internal/db-pool", headers={"Authorization": "Bearer wrong"}
+        )
+
+        assert response.status_code == 401
+
+    def test_disabled_without_a_configured_token(self) -> None:
+        app.dependency_overrides[get_internal_settings] = lambda: InternalSettings(
+            internal_api_token=""
+        )
+
+        assert client.get("/internal/db-pool", headers=AUTH).status_code == 404
+        assert client.get("/internal/image-gc", headers=AUTH).status_code == 404
+
+
+class TestDbPoolStats:
+    def test_reports_sync_pool_gauges(self) -> None:
+        response = client.get("/internal/db-pool", headers=AUTH)
+
+        assert response.status_code == 200
+        stats = response.json()["sync"]
+        assert {"checked_out", "idle", "overflow", "wait_seconds_max"} <= set(stats)
+
+    def test_not_under_api_prefix(self) -> None:
+        assert client.get("/api/internal/db-pool", headers=AUTH).status_code == 404
+
+
+class TestImageGcReport:
+    @pytest.fixture
+    def collector(self) -> Generator[ImageGarbageCollector]:
+        collector = create_autospec(ImageGarbageCollector, instance=True)
+        collector.last_report = None
+        app.dependency_overrides[get_image_garbage_collector] = lambda: collector
+        yield collector
+        app.dependency_overrides.pop(get_image_garbage_collector)
+
+    def test_null_before_the_first_sweep(
+        self, collector: ImageGarbageCollector
+    ) -> None:
+        response = client.get("/internal/image-gc", headers=AUTH)
+
+        assert response.status_code == 200
+        assert response.json() is None
+
+    def test_reports_the_last_sweep(self, collector: ImageGarbageCollector) -> None:
+        collector.last_report = ImageGcReport(
+            started_at=datetime(2026, 1, 1, tzinfo=UTC),
+            orphaned_files=3,
+            reclaimable_bytes=4096,
+        )
+
+        body = client.get("/internal/image-gc", headers=AUTH).json()
+
+        assert body["orphaned_files"] == 3
+        assert body["reclaimable_bytes"] == 4096
+        assert body["started_at"] == "2026-01-01T00:00:00Z"
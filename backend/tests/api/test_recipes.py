@@ -10,7 +10,12 @@ from miam.domain.entities import (
     IngredientEntity,
     SourceEntity,
 )
-from tests.api.conftest import TEST_USER_ID, make_paginated_result, make_recipe
+from tests.api.conftest import (
+    TEST_SIGNER,
+    TEST_USER_ID,
+    make_paginated_result,
+    make_recipe,
+)
 
 
 class TestCreateRecipe:
@@ -118,6 +123,7 @@ class TestSearchRecipes:
             limit=None,
             offset=0,
             ownership=None,
+            after=None,
         )
 
     def test_passes_pagination(
@@ -158,7 +164,7 @@ class TestGetRecipe:
             tags=["italian"],
             preparation=["Boil water", "Cook pasta"],
             ingredients=[IngredientEntity(name="Pasta", quantity=200.0, unit="g")],
-            images=[ImageEntity(id=uuid4(), caption="Photo")],
+            images=[ImageEntity(id=uuid4(), caption="Photo", placeholder="data:,tiny")],
             sources=[SourceEntity(type="manual", raw_content="Family recipe")],
         )
         mock_recipe_service.get_recipe_by_id.return_value = recipe
@@ -177,6 +183,10 @@ class TestGetRecipe:
         assert data["ingredients"][0]["quantity"] == 200.0
         assert len(data["images"]) == 1
         assert data["images"][0]["caption"] == "Photo"
+        url = data["images"][0]["url"]
+        assert url.startswith(f"images/{recipe.images[0].id}?expires=")
+        assert "&sig=" in url
+        assert data["images"][0]["placeholder"] == "data:,tiny"
         assert len(data["sources"]) == 1
         assert data["sources"][0]["type"] == "manual"
 
@@ -189,6 +199,48 @@ class TestGetRecipe:
 
         assert response.status_code == 404
 
+    def test_returns_404_without_loading_when_not_visible(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        mock_recipe_service.get_recipe_version.return_value = None
+
+        response = client.get(f"/api/recipes/{uuid4()}")
+
+        assert response.status_code == 404
+        mock_recipe_service.get_recipe_by_id.assert_not_called()
+
+    def test_sets_etag(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        recipe_id = uuid4()
+        mock_recipe_service.get_recipe_version.return_value = "3-owner"
+        mock_recipe_service.get_recipe_by_id.return_value = make_recipe(
+            recipe_id=recipe_id
+        )
+
+        response = client.get(f"/api/recipes/{recipe_id}")
+
+        assert response.status_code == 200
+        window = TEST_SIGNER.window()
+        assert response.headers["etag"] == f'W/"{recipe_id}-3-owner-{window}"'
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    def test_returns_304_when_etag_matches(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        recipe_id = uuid4()
+        mock_recipe_service.get_recipe_version.return_value = "3-owner"
+        etag = f'W/"{recipe_id}-3-owner-{TEST_SIGNER.window()}"'
+
+        response = client.get(
+            f"/api/recipes/{recipe_id}", headers={"If-None-Match": etag}
+        )
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        mock_recipe_service.get_recipe_by_id.assert_not_called()
+
 
 class TestGetRecipes:
     def test_returns_paginated_list(
@@ -216,6 +268,46 @@ class TestGetRecipes:
         assert data["limit"] == 5
         assert data["offset"] == 10
 
+    def test_passes_keyset_cursor(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        r1, r2 = make_recipe(title="A"), make_recipe(title="B")
+        mock_recipe_service.search_recipes.return_value = make_paginated_result(
+            [r1, r2]
+        )
+        cursor = uuid4()
+
+        response = client.get(f"/api/recipes?limit=2&after={cursor}")
+
+        assert response.status_code == 200
+        assert response.json()["next_after"] == str(r2.id)
+        kwargs = mock_recipe_service.search_recipes.call_args.kwargs
+        assert kwargs["after"] == cursor
+
+    def test_unknown_cursor_is_a_bad_request(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        cursor = uuid4()
+        mock_recipe_service.search_recipes.side_effect = ValueError(
+            f"Unknown pagination cursor {cursor}"
+        )
+
+        response = client.get(f"/api/recipes?limit=2&after={cursor}")
+
+        assert response.status_code == 400
+        assert response.json()["detail"] == f"Unknown pagination cursor {cursor}"
+
+    def test_last_page_has_no_cursor(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        mock_recipe_service.search_recipes.return_value = make_paginated_result(
+            [make_recipe()]
+        )
+
+        response = client.get("/api/recipes?limit=2")
+
+        assert response.json()["next_after"] is None
+
     def test_returns_empty_list(
         self, client: TestClient, mock_recipe_service: MagicMock
     ) -> None:
@@ -225,6 +317,32 @@ class TestGetRecipes:
 
         assert response.json()["items"] == []
 
+    def test_returns_304_when_library_unchanged(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        mock_recipe_service.get_library_version.return_value = 7
+        mock_recipe_service.search_recipes.return_value = make_paginated_result()
+
+        first = client.get("/api/recipes")
+        etag = first.headers["etag"]
+        second = client.get("/api/recipes", headers={"If-None-Match": etag})
+
+        assert second.status_code == 304
+        mock_recipe_service.search_recipes.assert_called_once()
+
+    def test_returns_200_when_library_changed(
+        self, client: TestClient, mock_recipe_service: MagicMock
+    ) -> None:
+        mock_recipe_service.get_library_version.return_value = 7
+        mock_recipe_service.search_recipes.return_value = make_paginated_result()
+        etag = client.get("/api/recipes").headers["etag"]
+
+        mock_recipe_service.get_library_version.return_value = 8
+        response = client.get("/api/recipes", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
 
 class TestUpdateRecipe:
     def test_returns_updated_recipe(
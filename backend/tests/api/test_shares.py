@@ -0,0 +1,49 @@
+"""Tests for share API routes."""
+
+import asyncio
+
+from miam.api.routes.shares import _pending_count_events
+
+
+def _collect(
+    counts: list[int], changes_after: int, limit: int, heartbeat: float = 1
+) -> list[str]:
+    """Run the event stream, signalling a change after each of the first counts."""
+
+    async def scenario() -> list[str]:
+        changes = asyncio.Event()
+        calls = 0
+
+        async def count() -> int:
+            nonlocal calls
+            value = counts[min(calls, len(counts) - 1)]
+            calls += 1
+            if calls <= changes_after:
+                asyncio.get_running_loop().call_soon(changes.set)
+            return value
+
+        events: list[str] = []
+        async for event in _pending_count_events(changes, count, heartbeat):
+            events.append(event)
+            if len(events) == limit:
+                break
+        return events
+
+    return asyncio.run(scenario())
+
+
+class TestPendingCountEvents:
+    def test_sends_count_on_connect(self) -> None:
+        events = _collect([3], changes_after=0, limit=1)
+
+        assert events == ['event: pending_count\ndata: {"count": 3}\n\n']
+
+    def test_sends_count_after_change(self) -> None:
+        events = _collect([1, 2], changes_after=1, limit=2)
+
+        assert events[1] == 'event: pending_count\ndata: {"count": 2}\n\n'
+
+    def test_skips_unchanged_count_and_sends_keepalive(self) -> None:
+        events = _collect([1, 1], changes_after=1, limit=2, heartbeat=0.01)
+
+        assert events[1] == ": keepalive\n\n"
@@ -1,19 +1,34 @@
 """Tests for domain services using stub implementations of ports."""
 
+import hashlib
+import io
+from collections.abc import Callable, Collection, Iterator
 from pathlib import Path
+from typing import IO
+from unittest.mock import create_autospec
 from uuid import UUID, uuid4
 
+import pytest
+
 from miam.domain.entities import (
     ImageEntity,
+    ImageGrant,
+    ImageUpload,
+    ImageVariant,
+    NewImage,
     PaginatedResult,
     RecipeEntity,
     SourceEntity,
+    StoredFile,
 )
 from miam.domain.ports_secondary import (
+    ImageNormalizerPort,
     ImageStoragePort,
+    ImageVariantPort,
     InstagramParserPort,
     MarkdownExporterPort,
     RecipeRepositoryPort,
+    RecipeShareRepositoryPort,
     WordExporterPort,
 )
 from miam.domain.schemas import (
@@ -42,6 +57,7 @@ class StubRecipeRepository(RecipeRepositoryPort):
         self.recipes: dict[UUID, RecipeEntity] = {}
         self.images: dict[UUID, ImageEntity] = {}
         self._recipe_images: dict[UUID, list[UUID]] = {}
+        self.blob_refs: dict[str, int] = {}
 
     def add_recipe(self, data: RecipeCreate, owner_id: UUID) -> RecipeEntity:
         uid = uuid4()
@@ -67,6 +83,14 @@ class StubRecipeRepository(RecipeRepositoryPort):
             return None
         return recipe
 
+    def get_recipe_version(self, recipe_id: UUID, user_id: UUID) -> str | None:
+        if self.get_recipe_by_id(recipe_id, user_id) is None:
+            return None
+        return "1-owner"
+
+    def get_library_version(self, user_id: UUID) -> int:
+        return 1
+
     def search_recipes(
         self,
         user_id: UUID,
@@ -78,6 +102,7 @@ class StubRecipeRepository(RecipeRepositoryPort):
         limit: int | None = None,
         offset: int = 0,
         ownership: str | None = None,
+        after: UUID | None = None,
     ) -> PaginatedResult:
         items = [r for r in self.recipes.values() if r.owner_id == user_id]
         if title:
@@ -85,6 +110,9 @@ class StubRecipeRepository(RecipeRepositoryPort):
         if category:
             items = [r for r in items if r.category == category]
         total = len(items)
+        if after is not None:
+            ids = [r.id for r in items]
+            items = items[ids.index(after) + 1 :] if after in ids else []
         items = items[offset:]
         if limit is not None:
             items = items[:limit]
@@ -113,6 +141,9 @@ class StubRecipeRepository(RecipeRepositoryPort):
         recipe = self.recipes.get(recipe_id)
         if recipe is None or recipe.owner_id != user_id:
             return False
+        for img in recipe.images:
+            if img.content_hash is not None:
+                self.blob_refs[img.content_hash] -= 1
         self.recipes.pop(recipe_id)
         return True
 
@@ -122,24 +153,68 @@ class StubRecipeRepository(RecipeRepositoryPort):
         user_id: UUID,
         caption: str | None = None,
         display_order: int | None = 0,
+        extension: str | None = None,
+        media_type: str | None = None,
+        content_hash: str | None = None,
+        placeholder: str | None = None,
     ) -> ImageEntity:
         img_id = uuid4()
-        img = ImageEntity(id=img_id, caption=caption, display_order=display_order or 0)
+        img = ImageEntity(
+            id=img_id,
+            caption=caption,
+            display_order=display_order or 0,
+            extension=extension,
+            media_type=media_type,
+            content_hash=content_hash,
+            placeholder=placeholder,
+        )
+        if content_hash is not None:
+            self.blob_refs[content_hash] = self.blob_refs.get(content_hash, 0) + 1
         self.images[img_id] = img
         if recipe_id in self.recipes:
             self.recipes[recipe_id].images.append(img)
         return img
 
+    def add_images(
+        self, images: list[NewImage], user_id: UUID
+    ) -> list[ImageEntity | None]:
+        return [
+            self.add_image(
+                new.recipe_id,
+                user_id,
+                new.caption,
+                new.display_order,
+                new.extension,
+                new.media_type,
+                new.content_hash,
+                new.placeholder,
+            )
+            if new.recipe_id in self.recipes
+            else None
+            for new in images
+        ]
+
     def delete_image(self, image_id: UUID, user_id: UUID) -> bool:
-        if not self.image_belongs_to_user(image_id, user_id):
+        if self.get_image(image_id, user_id) is None:
             return False
         if image_id not in self.images:
             return False
-        self.images.pop(image_id)
+        image = self.images.pop(image_id)
+        if image.content_hash is not None:
+            self.blob_refs[image.content_hash] -= 1
         for recipe in self.recipes.values():
             recipe.images = [img for img in recipe.images if img.id != image_id]
         return True
 
+    def delete_unreferenced_blobs(
+        self, content_hashes: Collection[str], delete_file: Callable[[str], object]
+    ) -> list[str]:
+        deleted = [h for h in content_hashes if self.blob_refs.get(h) == 0]
+        for content_hash in deleted:
+            del self.blob_refs[content_hash]
+            delete_file(content_hash)
+        return deleted
+
     def get_existing_source_raw_contents(
         self, raw_contents: set[str], user_id: UUID
     ) -> set[str]:
@@ -151,45 +226,130 @@ class StubRecipeRepository(RecipeRepositoryPort):
                         existing.add(src.raw_content)
         return existing
 
-    def image_belongs_to_user(self, image_id: UUID, user_id: UUID) -> bool:
+    def get_image(self, image_id: UUID, user_id: UUID) -> ImageEntity | None:
         for recipe in self.recipes.values():
             if recipe.owner_id == user_id:
-                if any(img.id == image_id for img in recipe.images):
-                    return True
-        return False
+                for img in recipe.images:
+                    if img.id == image_id:
+                        return img
+        return None
 
 
 class StubImageStorage(ImageStoragePort):
-    """In-memory image storage for testing."""
+    """In-memory content-addressed image storage for testing."""
 
-    def __init__(self) -> None:
-        self.stored: dict[UUID, tuple[bytes, str]] = {}
-        self.delete_calls: list[UUID] = []
+    def __init__(self, url_base: str | None = None) -> None:
+        self.stored: dict[str, bytes] = {}  # content hash -> bytes
+        self.delete_calls: list[str] = []
+        self.url_base = url_base
 
     def add_recipe_image(
-        self, recipe_id: UUID, image: bytes, filename: str, image_id: UUID
-    ) -> UUID:
-        self.stored[image_id] = (image, filename)
-        return image_id
-
-    def get_recipe_image(self, image_id: UUID) -> ImageResponse | None:
-        if image_id in self.stored:
-            content, _ = self.stored[image_id]
-            return ImageResponse(media_type="image/jpeg", content=content)
+        self, recipe_id: UUID, image: bytes | IO[bytes], filename: str
+    ) -> str:
+        content = image if isinstance(image, bytes) else image.read()
+        content_hash = hashlib.sha256(content).hexdigest()
+        self.stored[content_hash] = content
+        return content_hash
+
+    def blob_exists(self, content_hash: str, extension: str) -> bool:
+        return content_hash in self.stored
+
+    def get_recipe_image(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> ImageResponse | None:
+        if content_hash in self.stored:
+            return ImageResponse(
+                media_type="image/jpeg", content=self.stored[content_hash]
+            )
         return None
 
-    def get_recipe_image_path(self, image_id: UUID) -> tuple[Path, str] | None:
-        if image_id in self.stored:
-            return Path(f"/tmp/{image_id}.jpg"), "image/jpeg"
+    def get_recipe_image_path(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> tuple[Path, str] | None:
+        if content_hash in self.stored:
+            return Path(f"/tmp/{content_hash}.jpg"), "image/jpeg"
         return None
 
-    def delete_image(self, image_id: UUID) -> bool:
-        self.delete_calls.append(image_id)
-        if image_id in self.stored:
-            self.stored.pop(image_id)
-            return True
+    def get_recipe_image_url(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> str | None:
+        if self.url_base is not None and content_hash in self.stored:
+            return f"{self.url_base}/{content_hash}{extension}"
+        return None
+
+    def delete_image(self, image_id: UUID, extension: str | None = None) -> bool:
         return False
 
+    def delete_blob(self, content_hash: str) -> bool:
+        self.delete_calls.append(content_hash)
+        return self.stored.pop(content_hash, None) is not None
+
+    def list_files(self) -> Iterator[StoredFile]:
+        for content_hash, content in self.stored.items():
+            yield StoredFile(".png", len(content), 0.0, content_hash=content_hash)
+
+
+class _ConcurrentlyDeletedStorage(StubImageStorage):
+    """Loses the first write, as if the last image sharing it was deleted meanwhile."""
+
+    def add_recipe_image(
+        self, recipe_id: UUID, image: bytes | IO[bytes], filename: str
+    ) -> str:
+        content_hash = super().add_recipe_image(recipe_id, image, filename)
+        if len(self.delete_calls) == 0:
+            self.delete_blob(content_hash)
+        return content_hash
+
+
+class StubImageNormalizer(ImageNormalizerPort):
+    """Re-encodes to "WebP" by upper-casing the content; rejects empty content."""
+
+    def __init__(self) -> None:
+        self.batches: list[int] = []
+
+    def normalize(self, uploads: list[ImageUpload]) -> list[ImageUpload | str]:
+        self.batches.append(len(uploads))
+        results: list[ImageUpload | str] = []
+        for upload in uploads:
+            content = (
+                upload.content
+                if isinstance(upload.content, bytes)
+                else upload.content.read()
+            )
+            if not content:
+                results.append("Image cannot be decoded")
+                continue
+            name = Path(upload.filename).with_suffix(".webp").name
+            placeholder = f"data:,{content.decode()}"
+            results.append(
+                ImageUpload(upload.recipe_id, content.upper(), name, placeholder)
+            )
+        return results
+
+
+class StubImageVariants(ImageVariantPort):
+    """Records variant requests instead of generating files."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[Path, int | None, str | None]] = []
+
+    def get_variant(
+        self, source: Path, width: int | None, image_format: str | None
+    ) -> ImageVariant:
+        self.calls.append((source, width, image_format))
+        return ImageVariant(
+            path=source.with_suffix(".webp"), media_type="image/webp", etag='"v1"'
+        )
+
 
 class StubWordExporter(WordExporterPort):
     def __init__(self) -> None:
@@ -214,9 +374,9 @@ class StubMarkdownExporter(MarkdownExporterPort):
         self.last_recipes = recipes
         return "markdown"
 
-    def to_zip_bytes(self, recipes: list[RecipeEntity]) -> bytes:
+    def to_zip_stream(self, recipes: list[RecipeEntity]) -> Iterator[bytes]:
         self.last_recipes = recipes
-        return b"zip-content"
+        return iter([b"zip-", b"content"])
 
 
 # ---------------------------------------------------------------------------
@@ -423,8 +583,10 @@ class TestRecipeManagementServiceDelete:
         img_id = self.service.add_recipe_image(
             created.id, _TEST_USER, b"img1", "photo.jpg"
         )
+        content_hash = self.repo.images[img_id].content_hash
         assert self.service.delete_recipe(created.id, _TEST_USER) is True
-        assert img_id in self.storage.delete_calls
+        assert content_hash in self.storage.delete_calls
+        assert content_hash not in self.storage.stored
 
 
 class TestRecipeManagementServiceImages:
@@ -443,7 +605,19 @@ class TestRecipeManagementServiceImages:
             created.id, _TEST_USER, b"jpeg-bytes", "pic.jpg"
         )
         assert isinstance(img_id, UUID)
-        assert img_id in self.storage.stored
+        assert self.repo.images[img_id].content_hash in self.storage.stored
+
+    def test_add_image_records_file_metadata(self) -> None:
+        from miam.domain.entities import Category
+
+        created = self.service.create_recipe(
+            RecipeCreate(title="WithImg", category=Category.plat), owner_id=_TEST_USER
+        )
+        img_id = self.service.add_recipe_image(
+            created.id, _TEST_USER, b"png-bytes", "Pic.PNG"
+        )
+        image = self.repo.images[img_id]
+        assert (image.extension, image.media_type) == (".png", "image/png")
 
     def test_get_image(self) -> None:
         from miam.domain.entities import Category
@@ -500,10 +674,342 @@ class TestRecipeManagementServiceImages:
         other_user = uuid4()
         assert self.service.delete_recipe_image(img_id, other_user) is False
         # Storage should NOT have been called for deletion
-        assert img_id not in self.storage.delete_calls
+        assert self.storage.delete_calls == []
         # Image should still be accessible by the real owner
         assert self.service.get_recipe_image(img_id, _TEST_USER) is not None
 
+    def test_identical_content_is_stored_once(self) -> None:
+        from miam.domain.entities import Category
+
+        first = self.service.create_recipe(
+            RecipeCreate(title="A", category=Category.plat), owner_id=_TEST_USER
+        )
+        second = self.service.create_recipe(
+            RecipeCreate(title="B", category=Category.plat), owner_id=_TEST_USER
+        )
+        img_a = self.service.add_recipe_image(first.id, _TEST_USER, b"same", "a.jpg")
+        img_b = self.service.add_recipe_image(second.id, _TEST_USER, b"same", "b.jpg")
+
+        content_hash = self.repo.images[img_a].content_hash
+        assert content_hash == self.repo.images[img_b].content_hash
+        assert list(self.storage.stored) == [content_hash]
+        assert self.repo.blob_refs == {content_hash: 2}
+
+    def test_shared_content_is_deleted_with_its_last_image(self) -> None:
+        from miam.domain.entities import Category
+
+        created = self.service.create_recipe(
+            RecipeCreate(title="A", category=Category.plat), owner_id=_TEST_USER
+        )
+        img_a = self.service.add_recipe_image(created.id, _TEST_USER, b"same", "a.jpg")
+        img_b = self.service.add_recipe_image(created.id, _TEST_USER, b"same", "b.jpg")
+        content_hash = self.repo.images[img_a].content_hash
+
+        assert self.service.delete_recipe_image(img_a, _TEST_USER) is True
+        assert content_hash in self.storage.stored
+        assert self.service.get_recipe_image(img_b, _TEST_USER) is not None
+
+        assert self.service.delete_recipe_image(img_b, _TEST_USER) is True
+        assert content_hash not in self.storage.stored
+
+    def test_add_image_rewrites_content_deleted_concurrently(self) -> None:
+        from miam.domain.entities import Category
+
+        storage = _ConcurrentlyDeletedStorage()
+        service = RecipeManagementService(self.repo, storage)
+        created = service.create_recipe(
+            RecipeCreate(title="A", category=Category.plat), owner_id=_TEST_USER
+        )
+
+        img_id = service.add_recipe_image(created.id, _TEST_USER, b"data", "a.jpg")
+
+        response = service.get_recipe_image(img_id, _TEST_USER)
+        assert response is not None
+        assert response.content == b"data"
+
+    def test_add_images_reports_each_upload(self) -> None:
+        from miam.domain.entities import Category
+
+        service = RecipeManagementService(self.repo, self.storage)
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+        missing = uuid4()
+
+        results = service.add_recipe_images(
+            [
+                ImageUpload(created.id, b"one", "a.jpg"),
+                ImageUpload(created.id, io.BytesIO(b"two"), "b.png"),
+                ImageUpload(missing, b"three", "c.jpg"),
+            ],
+            _TEST_USER,
+        )
+
+        assert isinstance(results[0], UUID)
+        assert isinstance(results[1], UUID)
+        assert results[2] == f"Recipe {missing} not found or not accessible by user"
+        recipe = self.repo.get_recipe_by_id(created.id, _TEST_USER)
+        assert recipe is not None
+        assert [img.extension for img in recipe.images] == [".jpg", ".png"]
+
+    def test_add_images_checks_access_once_per_recipe(self) -> None:
+        from miam.domain.entities import Category
+
+        created: RecipeEntity  # read by the side effect once created below
+        share_repo = create_autospec(RecipeShareRepositoryPort, instance=True)
+        share_repo.get_user_role_for_recipe.side_effect = lambda recipe_id, _user_id: (
+            "editor" if recipe_id == created.id else None
+        )
+        service = RecipeManagementService(self.repo, self.storage, share_repo)
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+        shared = uuid4()
+
+        results = service.add_recipe_images(
+            [ImageUpload(created.id, bytes([n]), f"{n}.jpg") for n in range(3)]
+            + [ImageUpload(shared, b"x", "x.jpg"), ImageUpload(shared, b"y", "y.jpg")],
+            _TEST_USER,
+        )
+
+        assert all(isinstance(result, UUID) for result in results[:3])
+        assert results[3:] == ["You don't have permission to edit this recipe"] * 2
+        assert share_repo.get_user_role_for_recipe.call_count == 2
+        assert len(self.storage.stored) == 3
+
+    def test_check_edit_access(self) -> None:
+        share_repo = create_autospec(RecipeShareRepositoryPort, instance=True)
+        share_repo.get_user_role_for_recipe.side_effect = ["editor", "reader"]
+        service = RecipeManagementService(self.repo, self.storage, share_repo)
+
+        service.check_edit_access(uuid4(), _TEST_USER)
+        with pytest.raises(ValueError, match="permission"):
+            service.check_edit_access(uuid4(), _TEST_USER)
+
+    def test_add_images_rejects_unsupported_files(self) -> None:
+        from miam.domain.entities import Category
+
+        class RejectingStorage(StubImageStorage):
+            def add_recipe_image(
+                self, recipe_id: UUID, image: bytes | IO[bytes], filename: str
+            ) -> str:
+                raise ValueError("Unsupported image type: .txt")
+
+        service = RecipeManagementService(self.repo, RejectingStorage())
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+
+        results = service.add_recipe_images(
+            [ImageUpload(created.id, b"data", "notes.txt")], _TEST_USER
+        )
+
+        assert results == ["Unsupported image type: .txt"]
+        assert self.repo.images == {}
+
+    def test_add_image_stores_the_normalized_image(self) -> None:
+        from miam.domain.entities import Category
+
+        service = RecipeManagementService(
+            self.repo, self.storage, image_normalizer=StubImageNormalizer()
+        )
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+
+        img_id = service.add_recipe_image(created.id, _TEST_USER, b"raw", "pic.jpg")
+
+        image = self.repo.images[img_id]
+        assert (image.extension, image.media_type) == (".webp", "image/webp")
+        assert image.placeholder == "data:,raw"
+        assert self.storage.stored[image.content_hash or ""] == b"RAW"
+
+    def test_add_image_rejected_by_normalizer(self) -> None:
+        from miam.domain.entities import Category
+
+        service = RecipeManagementService(
+            self.repo, self.storage, image_normalizer=StubImageNormalizer()
+        )
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+
+        with pytest.raises(ValueError, match="cannot be decoded"):
+            service.add_recipe_image(created.id, _TEST_USER, b"", "pic.jpg")
+        assert self.storage.stored == {}
+
+    def test_add_images_normalizes_accessible_uploads_together(self) -> None:
+        from miam.domain.entities import Category
+
+        created: RecipeEntity  # read by the side effect once created below
+        share_repo = create_autospec(RecipeShareRepositoryPort, instance=True)
+        share_repo.get_user_role_for_recipe.side_effect = lambda recipe_id, _user_id: (
+            "owner" if recipe_id == created.id else None
+        )
+        normalizer = StubImageNormalizer()
+        service = RecipeManagementService(
+            self.repo, self.storage, share_repo, image_normalizer=normalizer
+        )
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+
+        results = service.add_recipe_images(
+            [
+                ImageUpload(created.id, b"one", "a.jpg"),
+                ImageUpload(uuid4(), b"two", "b.jpg"),
+                ImageUpload(created.id, b"", "c.jpg"),
+                ImageUpload(created.id, io.BytesIO(b"four"), "d.png"),
+            ],
+            _TEST_USER,
+        )
+
+        assert normalizer.batches == [3]
+        assert isinstance(results[0], UUID)
+        assert results[1:3] == [
+            "You don't have permission to edit this recipe",
+            "Image cannot be decoded",
+        ]
+        assert isinstance(results[3], UUID)
+        assert sorted(self.storage.stored.values()) == [b"FOUR", b"ONE"]
+        recipe = self.repo.get_recipe_by_id(created.id, _TEST_USER)
+        assert recipe is not None
+        assert [img.extension for img in recipe.images] == [".webp", ".webp"]
+        assert [img.placeholder for img in recipe.images] == ["data:,one", "data:,four"]
+
+    def test_get_image_variant(self) -> None:
+        from miam.domain.entities import Category
+
+        variants = StubImageVariants()
+        service = RecipeManagementService(
+            self.repo, self.storage, image_variants=variants
+        )
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+        img_id = service.add_recipe_image(created.id, _TEST_USER, b"data", "pic.jpg")
+
+        variant = service.get_recipe_image_variant(img_id, _TEST_USER, 320, "webp")
+
+        assert variant is not None
+        assert variant.media_type == "image/webp"
+        content_hash = hashlib.sha256(b"data").hexdigest()
+        assert variants.calls == [(Path(f"/tmp/{content_hash}.jpg"), 320, "webp")]
+
+    def test_get_image_variant_refetches_an_evicted_copy(self) -> None:
+        from miam.domain.entities import Category
+
+        class EvictedOnceVariants(StubImageVariants):
+            def get_variant(
+                self, source: Path, width: int | None, image_format: str | None
+            ) -> ImageVariant:
+                if not self.calls:
+                    self.calls.append((source, width, image_format))
+                    raise FileNotFoundError(source)
+                return super().get_variant(source, width, image_format)
+
+        variants = EvictedOnceVariants()
+        service = RecipeManagementService(
+            self.repo, self.storage, image_variants=variants
+        )
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+        img_id = service.add_recipe_image(created.id, _TEST_USER, b"data", "pic.jpg")
+
+        variant = service.get_recipe_image_variant(img_id, _TEST_USER, 320, "webp")
+
+        assert variant is not None
+        assert len(variants.calls) == 2
+
+    def test_get_image_variant_of_a_vanishing_copy(self) -> None:
+        from miam.domain.entities import Category
+
+        class EvictedVariants(StubImageVariants):
+            def get_variant(
+                self, source: Path, width: int | None, image_format: str | None
+            ) -> ImageVariant:
+                raise FileNotFoundError(source)
+
+        service = RecipeManagementService(
+            self.repo, self.storage, image_variants=EvictedVariants()
+        )
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+        img_id = service.add_recipe_image(created.id, _TEST_USER, b"data", "pic.jpg")
+
+        assert service.get_recipe_image_variant(img_id, _TEST_USER, 320) is None
+
+    def test_get_image_variant_wrong_user(self) -> None:
+        from miam.domain.entities import Category
+
+        variants = StubImageVariants()
+        service = RecipeManagementService(
+            self.repo, self.storage, image_variants=variants
+        )
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+        img_id = service.add_recipe_image(created.id, _TEST_USER, b"data", "pic.jpg")
+
+        assert service.get_recipe_image_variant(img_id, uuid4(), 320) is None
+        assert variants.calls == []
+
+    def test_locate_image_serves_local_file(self) -> None:
+        from miam.domain.entities import Category
+
+        service = RecipeManagementService(self.repo, self.storage)
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+        img_id = service.add_recipe_image(created.id, _TEST_USER, b"data", "pic.png")
+
+        location = service.locate_recipe_image(img_id, _TEST_USER)
+
+        assert location is not None
+        assert location.url is None
+        content_hash = hashlib.sha256(b"data").hexdigest()
+        assert location.path == Path(f"/tmp/{content_hash}.jpg")
+        assert location.media_type == "image/png"  # recorded on the image
+        assert location.etag == f'"{content_hash}"'
+
+    def test_locate_image_prefers_storage_url(self) -> None:
+        from miam.domain.entities import Category
+
+        storage = StubImageStorage(url_base="https://bucket.example.com")
+        service = RecipeManagementService(self.repo, storage)
+        created = service.create_recipe(
+            RecipeCreate(title="Img", category=Category.plat), owner_id=_TEST_USER
+        )
+        img_id = service.add_recipe_image(created.id, _TEST_USER, b"data", "pic.png")
+
+        location = service.locate_recipe_image(img_id, _TEST_USER)
+
+        content_hash = hashlib.sha256(b"data").hexdigest()
+        assert location is not None
+        assert location.url == f"https://bucket.example.com/{content_hash}.png"
+        assert location.etag == f'"{content_hash}"'
+        assert service.locate_recipe_image(img_id, uuid4()) is None
+
+    def test_locate_image_with_grant_skips_repository(self) -> None:
+        service = RecipeManagementService(self.repo, self.storage)
+        image_id = uuid4()  # not in the repository: only the grant is used
+        content_hash = self.storage.add_recipe_image(image_id, b"data", "pic.png")
+        grant = ImageGrant(
+            image_id=image_id,
+            extension=".png",
+            content_hash=content_hash,
+            expires=0,
+            signature="sig",
+        )
+
+        location = service.locate_recipe_image(image_id, grant)
+
+        assert location is not None
+        assert location.path == Path(f"/tmp/{content_hash}.jpg")
+        assert service.locate_recipe_image(uuid4(), grant) is None
+
 
 # ---------------------------------------------------------------------------
 # Tests for RecipeExportService
@@ -532,7 +1038,7 @@ class TestRecipeExportService:
     def test_export_markdown(self) -> None:
         self._seed_recipes(3)
         result = self.service.export_recipes_to_markdown(_TEST_USER)
-        assert result == b"zip-content"
+        assert b"".join(result) == b"zip-content"
         assert len(self.md_exporter.last_recipes) == 3
 
     def test_export_word(self) -> None:
@@ -543,7 +1049,7 @@ class TestRecipeExportService:
 
     def test_export_empty(self) -> None:
         result = self.service.export_recipes_to_markdown(_TEST_USER)
-        assert result == b"zip-content"
+        assert b"".join(result) == b"zip-content"
         assert self.md_exporter.last_recipes == []
 
 
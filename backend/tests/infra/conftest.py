@@ -1,8 +1,16 @@
 """Shared fixtures for infra layer tests."""
 
+import hashlib
+import socketserver
+import threading
+import time
+import xml.etree.ElementTree as ET
 from collections.abc import Generator
+from datetime import UTC, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Any
-from uuid import UUID
+from urllib.parse import parse_qs, unquote, urlsplit
+from uuid import UUID, uuid4
 
 import pytest
 from sqlalchemy import Engine, create_engine, event, text
@@ -14,10 +22,274 @@ from miam.domain.schemas import (
     RecipeCreate,
     SourceCreate,
 )
+from miam.infra.cache.redis import REPLACE_SCRIPT, UNLOCK_SCRIPT
 from miam.infra.db.base import Base
 from miam.infra.repositories import RecipeRepository, UserRepository
 
 
+class _RespStandInHandler(socketserver.StreamRequestHandler):
+    """Serve the subset of the Redis protocol used by RedisCache."""
+
+    server: "RespStandInServer"
+
+    def _read_command(self) -> list[bytes] | None:
+        header = self.rfile.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self) -> None:
+        while (args := self._read_command()) is not None:
+            self.server.commands.append([a.decode(errors="replace") for a in args])
+            self.wfile.write(self.server.dispatch(args))
+
+
+class RespStandInServer(socketserver.ThreadingTCPServer):
+    """In-process stand-in for a Redis server (GET/SET NX PX/DEL/EVAL/AUTH/SELECT)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _RespStandInHandler)
+        self.data: dict[bytes, tuple[bytes, float | None]] = {}
+        self.commands: list[list[str]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def address(self) -> str:
+        host, port = self.server_address[:2]
+        if isinstance(host, bytes):
+            host = host.decode()
+        return f"{host}:{port}"
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.address}/0"
+
+    def dispatch(self, args: list[bytes]) -> bytes:
+        name = args[0].upper()
+        with self._lock:
+            if name in (b"PING", b"AUTH", b"SELECT"):
+                return b"+OK\r\n"
+            if name == b"GET":
+                entry = self.data.get(args[1])
+                if entry is None or (entry[1] is not None and entry[1] <= time.time()):
+                    self.data.pop(args[1], None)
+                    return b"$-1\r\n"
+                return b"$%d\r\n%s\r\n" % (len(entry[0]), entry[0])
+            if name == b"SET":
+                options = [a.upper() for a in args[3:]]
+                if b"NX" in options and args[1] in self.data:
+                    return b"$-1\r\n"
+                expires_at = None
+                if b"PX" in options:
+                    expires_at = (
+                        time.time() + int(args[3 + options.index(b"PX") + 1]) / 1000
+                    )
+                self.data[args[1]] = (args[2], expires_at)
+                return b"+OK\r\n"
+            if name == b"EVAL" and args[1].decode() == UNLOCK_SCRIPT:
+                key, expected = args[3:5]
+                entry = self.data.get(key)
+                if entry is None or entry[0] != expected:
+                    return b":0\r\n"
+                del self.data[key]
+                return b":1\r\n"
+            if name == b"EVAL" and args[1].decode() == REPLACE_SCRIPT:
+                key, expected, value, ttl_ms = args[3:7]
+                entry = self.data.get(key)
+                if entry is None or entry[0] != expected:
+                    return b":0\r\n"
+                ttl = int(ttl_ms) / 1000
+                self.data[key] = (value, time.time() + ttl if ttl else None)
+                return b":1\r\n"
+            if name == b"DEL":
+                removed = sum(self.data.pop(key, None) is not None for key in args[1:])
+                return b":%d\r\n" % removed
+        return b"-ERR unknown command\r\n"
+
+
+@pytest.fixture
+def resp_server() -> Generator[RespStandInServer]:
+    """Run a Redis-protocol stand-in server on a random local port."""
+    server = RespStandInServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+_S3_MIN_PART_BYTES = 5 * 1024 * 1024
+
+
+class _S3StandInHandler(BaseHTTPRequestHandler):
+    """Serve the subset of the S3 API used by S3ImageStorage (path-style only)."""
+
+    server: "S3StandInServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _reply(
+        self,
+        status: int,
+        body: bytes = b"",
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _error(self, status: int, code: str) -> None:
+        self._reply(status, f"<Error><Code>{code}</Code></Error>".encode())
+
+    def _handle(self) -> None:
+        url = urlsplit(self.path)
+        params = {
+            k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()
+        }
+        bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+        self.server.requests.append((self.command, key, sorted(params)))
+        if "authorization" not in self.headers and "X-Amz-Signature" not in params:
+            return self._error(403, "AccessDenied")
+        if bucket != self.server.bucket:
+            return self._error(404, "NoSuchBucket")
+        if "chunked" in self.headers.get("transfer-encoding", ""):
+            return self._error(411, "MissingContentLength")
+        body = self.rfile.read(int(self.headers.get("content-length", 0)))
+        payload_hash = self.headers.get("x-amz-content-sha256")
+        if payload_hash not in (None, "UNSIGNED-PAYLOAD") and (
+            payload_hash != hashlib.sha256(body).hexdigest()
+        ):
+            return self._error(400, "XAmzContentSHA256Mismatch")
+        with self.server.lock:
+            self._dispatch(key, params, body)
+
+    def _last_modified(self, key: str) -> str:
+        modified_at = self.server.modified.get(key, time.time())
+        return (
+            datetime.fromtimestamp(modified_at, UTC)
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "Z")
+        )
+
+    def _dispatch(self, key: str, params: dict[str, str], body: bytes) -> None:
+        server = self.server
+        if self.command == "GET" and not key and params.get("list-type") == "2":
+            keys = sorted(
+                k
+                for k in server.objects
+                if k.startswith(params.get("prefix", ""))
+                and k > params.get("continuation-token", "")
+            )
+            page = keys[: int(params.get("max-keys", 1000))]
+            contents = "".join(
+                f"<Contents><Key>{k}</Key><Size>{len(server.objects[k][0])}</Size>"
+                f"<LastModified>{self._last_modified(k)}</LastModified></Contents>"
+                for k in page
+            )
+            if len(page) < len(keys):
+                contents += (
+                    "<IsTruncated>true</IsTruncated>"
+                    f"<NextContinuationToken>{page[-1]}</NextContinuationToken>"
+                )
+            return self._reply(
+                200, f"<ListBucketResult>{contents}</ListBucketResult>".encode()
+            )
+        if self.command == "POST" and "uploads" in params:
+            upload_id = uuid4().hex
+            content_type = self.headers.get("content-type", "binary/octet-stream")
+            server.uploads[upload_id] = (key, content_type, {})
+            result = f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+            return self._reply(200, result.encode())
+        if "uploadId" in params:
+            if params["uploadId"] not in server.uploads:
+                return self._error(404, "NoSuchUpload")
+            _, content_type, parts = server.uploads[params["uploadId"]]
+            if self.command == "PUT":
+                etag = f'"{hashlib.md5(body).hexdigest()}"'
+                parts[int(params["partNumber"])] = (body, etag)
+                return self._reply(200, headers={"ETag": etag})
+            if self.command == "DELETE":
+                del server.uploads[params["uploadId"]]
+                return self._reply(204)
+            if server.fail_completions:
+                return self._reply(200, b"<Error><Code>InternalError</Code></Error>")
+            listed = [
+                (int(part.findtext("PartNumber") or 0), part.findtext("ETag"))
+                for part in ET.fromstring(body).iter("Part")
+            ]
+            if [(n, parts[n][1]) for n in sorted(parts)] != listed:
+                return self._error(400, "InvalidPart")
+            if any(len(parts[n][0]) < _S3_MIN_PART_BYTES for n, _ in listed[:-1]):
+                return self._error(400, "EntityTooSmall")
+            del server.uploads[params["uploadId"]]
+            server.objects[key] = (
+                b"".join(parts[n][0] for n, _ in listed),
+                content_type,
+            )
+            return self._reply(200, b"<CompleteMultipartUploadResult/>")
+        if self.command == "PUT":
+            content_type = self.headers.get("content-type", "binary/octet-stream")
+            server.objects[key] = (body, content_type)
+            return self._reply(200)
+        if self.command == "DELETE":
+            server.objects.pop(key, None)
+            return self._reply(204)
+        if key not in server.objects:
+            return self._error(404, "NoSuchKey")
+        data, content_type = server.objects[key]
+        return self._reply(200, data, {"Content-Type": content_type})
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_DELETE = _handle
+
+
+class S3StandInServer(ThreadingHTTPServer):
+    """In-process stand-in for an S3-compatible object storage, with one bucket."""
+
+    daemon_threads = True
+
+    def __init__(self, bucket: str = "miam-test") -> None:
+        super().__init__(("127.0.0.1", 0), _S3StandInHandler)
+        self.bucket = bucket
+        self.objects: dict[str, tuple[bytes, str]] = {}  # key -> (data, type)
+        self.modified: dict[str, float] = {}  # key -> Unix time, default now
+        # upload ID -> (key, content type, part number -> (data, ETag))
+        self.uploads: dict[str, tuple[str, str, dict[int, tuple[bytes, str]]]] = {}
+        self.requests: list[tuple[str, str, list[str]]] = []  # method, key, params
+        self.fail_completions = False
+        self.lock = threading.Lock()
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+
+@pytest.fixture
+def s3_server() -> Generator[S3StandInServer]:
+    """Run an S3 stand-in server on a random local port."""
+    server = S3StandInServer()
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
 @pytest.fixture(scope="session")
 def db_engine() -> Generator[Engine]:
     """Create an in-memory SQLite engine with all tables."""
@@ -46,6 +318,7 @@ def db_session(db_engine: Engine) -> Generator[Session]:
     for table in [
         "recipe_ingredients",
         "images",
+        "image_blobs",
         "sources",
         "recipes",
         "ingredients",
@@ -0,0 +1,65 @@
+"""Tests for offloading blocking calls from the async bridge."""
+
+import asyncio
+import threading
+
+from sqlalchemy.util.concurrency import await_only, greenlet_spawn
+
+from miam.infra.blocking import run_blocking
+from miam.infra.cache.single_flight import SingleFlight
+
+
+def _record_thread(threads: list[threading.Thread]) -> None:
+    run_blocking(lambda: threads.append(threading.current_thread()))
+
+
+def _hold_flight(flights: SingleFlight, events: list[str]) -> None:
+    with flights.lock("key"):
+        events.append("enter")
+        await_only(asyncio.sleep(0.01))  # e.g. a query awaited on the loop
+        events.append("exit")
+
+
+class TestRunBlocking:
+    def test_runs_inline_outside_the_async_bridge(self) -> None:
+        threads: list[threading.Thread] = []
+
+        _record_thread(threads)
+
+        assert threads == [threading.current_thread()]
+
+    def test_runs_in_a_worker_thread_inside_the_async_bridge(self) -> None:
+        threads: list[threading.Thread] = []
+
+        async def main() -> threading.Thread:
+            await greenlet_spawn(_record_thread, threads)
+            return threading.current_thread()
+
+        loop_thread = asyncio.run(main())
+
+        assert len(threads) == 1
+        assert threads[0] is not loop_thread
+
+    def test_returns_the_result(self) -> None:
+        async def main() -> int:
+            return await greenlet_spawn(run_blocking, lambda: 42)
+
+        assert run_blocking(lambda: 42) == 42
+        assert asyncio.run(main()) == 42
+
+    def test_single_flight_waits_without_blocking_the_loop(self) -> None:
+        flights = SingleFlight()
+        events: list[str] = []
+
+        async def main() -> None:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    greenlet_spawn(_hold_flight, flights, events),
+                    greenlet_spawn(_hold_flight, flights, events),
+                ),
+                timeout=5,
+            )
+
+        asyncio.run(main())
+
+        assert events == ["enter", "exit", "enter", "exit"]
@@ -0,0 +1,182 @@
+"""Tests for cross-worker cache invalidation."""
+
+import json
+from types import SimpleNamespace
+from typing import Any
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from miam.infra.cache.invalidation import (
+    CHANNEL,
+    CacheInvalidationBus,
+    _chunk_payloads,
+    queue_invalidation,
+)
+from miam.infra.cache.memory import InMemoryCache
+from miam.infra.repositories import RecipeRepository
+from tests.infra.conftest import make_recipe_create
+
+
+class FakeListenConnection:
+    """Stands in for a psycopg2 connection in LISTEN mode."""
+
+    def __init__(self, *payloads: tuple[str, str]) -> None:
+        self.pending = [SimpleNamespace(channel=c, payload=p) for c, p in payloads]
+        self.notifies: list[Any] = []
+
+    def poll(self) -> None:
+        self.notifies.extend(self.pending)
+        self.pending = []
+
+
+class FakePsycopg3Connection:
+    """Stands in for a psycopg 3 connection in LISTEN mode."""
+
+    def __init__(self, bus: CacheInvalidationBus, *payloads: tuple[str, str]) -> None:
+        self.bus = bus
+        self.pending = [SimpleNamespace(channel=c, payload=p) for c, p in payloads]
+        self.executed: list[str] = []
+        self.autocommit = False
+
+    def cursor(self) -> "FakePsycopg3Connection":
+        return self
+
+    def __enter__(self) -> "FakePsycopg3Connection":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+    def execute(self, statement: str) -> None:
+        self.executed.append(statement)
+
+    def notifies(self, timeout: float) -> Any:
+        yield from self.pending
+        self.pending = []
+        self.bus._stop.set()
+
+
+def _bus(db_session: Session) -> tuple[CacheInvalidationBus, InMemoryCache]:
+    cache = InMemoryCache()
+    bus = CacheInvalidationBus(cache, db_session.get_bind().engine)
+    bus.attach(db_session)
+    return bus, cache
+
+
+class TestCacheInvalidationBus:
+    def test_evicts_queued_keys_on_commit(self, db_session: Session) -> None:
+        _, cache = _bus(db_session)
+        cache.set("a", b"1")
+        cache.set("b", b"2")
+
+        queue_invalidation(db_session, "a")
+        assert cache.get("a") == b"1"
+        db_session.commit()
+
+        assert cache.get("a") is None
+        assert cache.get("b") == b"2"
+
+    def test_rollback_discards_queued_keys(self, db_session: Session) -> None:
+        _, cache = _bus(db_session)
+        cache.set("a", b"1")
+
+        db_session.execute(text("SELECT 1"))
+        queue_invalidation(db_session, "a")
+        db_session.rollback()
+        db_session.commit()
+
+        assert cache.get("a") == b"1"
+
+    def test_repository_write_evicts_library_version(
+        self, db_session: Session, default_owner_id: UUID
+    ) -> None:
+        _, cache = _bus(db_session)
+        repository = RecipeRepository(db_session, version_cache=cache)
+        assert repository.get_library_version(default_owner_id) == 1
+        assert cache.get(f"library:{default_owner_id}") == b"1"
+
+        repository.add_recipe(make_recipe_create(), default_owner_id)
+
+        assert cache.get(f"library:{default_owner_id}") is None
+        assert repository.get_library_version(default_owner_id) == 2
+
+    def test_version_read_before_a_write_is_not_cached_after_it(
+        self, db_session: Session, default_owner_id: UUID
+    ) -> None:
+        _, cache = _bus(db_session)
+        repository = RecipeRepository(db_session, version_cache=cache)
+        read_version = repository._get_library_version
+
+        def read_then_write(user_id: UUID) -> int:
+            # The write commits, and evicts the key, while the old version is
+            # on its way back to the cache.
+            version = read_version(user_id)
+            repository.add_recipe(make_recipe_create(), default_owner_id)
+            return version
+
+        repository._get_library_version = read_then_write  # type: ignore[method-assign]
+        assert repository.get_library_version(default_owner_id) == 1
+        repository._get_library_version = read_version  # type: ignore[method-assign]
+
+        assert cache.get(f"library:{default_owner_id}") is None
+        assert repository.get_library_version(default_owner_id) == 2
+
+    def test_does_not_listen_without_postgres(self, db_session: Session) -> None:
+        bus, _ = _bus(db_session)
+        bus.start()
+        assert bus._thread is None
+        bus.stop()
+
+    def test_drain_evicts_keys_from_notifications(self, db_session: Session) -> None:
+        bus, cache = _bus(db_session)
+        cache.set("a", b"1")
+        cache.set("b", b"2")
+        conn = FakeListenConnection(
+            (CHANNEL, json.dumps(["a"])), ("other", json.dumps(["b"]))
+        )
+
+        bus.drain(conn)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == b"2"
+        assert conn.notifies == []
+
+    def test_listens_on_psycopg3_connections(self, db_session: Session) -> None:
+        bus, cache = _bus(db_session)
+        cache.set("a", b"1")
+        cache.set("b", b"2")
+        conn = FakePsycopg3Connection(
+            bus, (CHANNEL, json.dumps(["a"])), ("other", json.dumps(["b"]))
+        )
+        raw = SimpleNamespace(
+            driver_connection=conn, detach=lambda: None, close=lambda: None
+        )
+        bus.engine = SimpleNamespace(raw_connection=lambda: raw)  # type: ignore[assignment]
+
+        bus._listen()
+
+        assert conn.autocommit is True
+        assert conn.executed == [f'LISTEN "{CHANNEL}"']
+        assert cache.get("a") is None
+        assert cache.get("b") == b"2"
+
+    def test_malformed_payload_is_ignored(self, db_session: Session) -> None:
+        bus, cache = _bus(db_session)
+        cache.set("a", b"1")
+
+        bus.handle_payload("not json")
+
+        assert cache.get("a") == b"1"
+
+
+class TestChunkPayloads:
+    def test_payloads_stay_under_notify_limit(self) -> None:
+        keys = {f"library:{i:036d}" for i in range(1000)}
+
+        payloads = _chunk_payloads(keys)
+
+        assert len(payloads) > 1
+        assert all(len(p.encode()) < 8000 for p in payloads)
+        assert {k for p in payloads for k in json.loads(p)} == keys
@@ -0,0 +1,131 @@
+"""Tests for the in-process LRU cache."""
+
+import threading
+import time
+
+from miam.infra.cache.memory import InMemoryCache
+
+
+class TestGetSetDelete:
+    def test_miss_then_hit(self) -> None:
+        cache = InMemoryCache()
+        assert cache.get("k") is None
+        cache.set("k", b"v")
+        assert cache.get("k") == b"v"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_overwrite_updates_size(self) -> None:
+        cache = InMemoryCache()
+        cache.set("k", b"1234")
+        cache.set("k", b"12")
+        assert cache.get("k") == b"12"
+        assert cache.size_bytes == 2
+
+    def test_delete(self) -> None:
+        cache = InMemoryCache()
+        cache.set("k", b"v")
+        assert cache.delete("k") is True
+        assert cache.delete("k") is False
+        assert cache.get("k") is None
+        assert cache.size_bytes == 0
+
+    def test_add_only_when_missing(self) -> None:
+        cache = InMemoryCache()
+        assert cache.add("k", b"v1") is True
+        assert cache.add("k", b"v2") is False
+        assert cache.get("k") == b"v1"
+
+    def test_replace_only_the_expected_value(self) -> None:
+        cache = InMemoryCache()
+        assert cache.replace("k", b"v1", b"v2") is False
+        cache.set("k", b"v1")
+        assert cache.replace("k", b"other", b"v2") is False
+        assert cache.replace("k", b"v1", b"v2") is True
+        assert cache.get("k") == b"v2"
+        assert cache.size_bytes == 2
+
+    def test_ttl_expires(self) -> None:
+        cache = InMemoryCache()
+        cache.set("k", b"v", ttl_seconds=0.01)
+        time.sleep(0.02)
+        assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_default_ttl(self) -> None:
+        cache = InMemoryCache(default_ttl_seconds=0)
+        cache.set("k", b"v")
+        assert cache.get("k") is None
+
+
+class TestEviction:
+    def test_bounded_by_entry_count(self) -> None:
+        cache = InMemoryCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, b"v")
+
+        assert len(cache) == 2
+        assert cache.get("a") is None
+        assert cache.get("c") == b"v"
+
+    def test_lru_order_refreshed_on_hit(self) -> None:
+        cache = InMemoryCache(max_entries=2)
+        cache.set("a", b"v")
+        cache.set("b", b"v")
+        cache.get("a")
+
+        cache.set("c", b"v")
+
+        assert cache.get("a") == b"v"
+        assert cache.get("b") is None
+
+    def test_bounded_by_bytes(self) -> None:
+        cache = InMemoryCache(max_bytes=25)
+        for key in "abcde":
+            cache.set(key, b"x" * 10)
+
+        assert len(cache) == 2
+        assert cache.size_bytes == 20
+
+    def test_oversized_value_is_skipped(self) -> None:
+        cache = InMemoryCache(max_bytes=10)
+        cache.set("k", b"x" * 11)
+        assert len(cache) == 0
+
+
+class TestGetOrCompute:
+    def test_computes_once_then_hits(self) -> None:
+        cache = InMemoryCache()
+        calls: list[int] = []
+
+        def compute() -> bytes:
+            calls.append(1)
+            return b"value"
+
+        assert cache.get_or_compute("k", compute) == b"value"
+        assert cache.get_or_compute("k", compute) == b"value"
+        assert len(calls) == 1
+
+    def test_concurrent_misses_are_single_flighted(self) -> None:
+        cache = InMemoryCache()
+        calls: list[int] = []
+        start = threading.Barrier(8)
+
+        def compute() -> bytes:
+            calls.append(1)
+            time.sleep(0.05)
+            return b"value"
+
+        results: list[bytes] = []
+
+        def worker() -> None:
+            start.wait()
+            results.append(cache.get_or_compute("k", compute))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert results == [b"value"] * 8
+        assert len(calls) == 1
@@ -0,0 +1,153 @@
+"""Tests for RedisCache against an in-process Redis-protocol stand-in."""
+
+import threading
+import time
+
+import pytest
+
+from miam.infra.cache.redis import RedisCache
+from tests.infra.conftest import RespStandInServer
+
+
+class TestInit:
+    def test_rejects_unknown_scheme(self) -> None:
+        with pytest.raises(ValueError, match="Unsupported cache URL scheme"):
+            RedisCache("memcached://localhost")
+
+    def test_authenticates_and_selects_db(self, resp_server: RespStandInServer) -> None:
+        cache = RedisCache(f"redis://user:secret@{resp_server.address}/3")
+        cache.set("k", b"v")
+        assert ["AUTH", "user", "secret"] in resp_server.commands
+        assert ["SELECT", "3"] in resp_server.commands
+
+
+class TestGetSetDelete:
+    def test_round_trip(self, resp_server: RespStandInServer) -> None:
+        cache = RedisCache(resp_server.url)
+        assert cache.get("k") is None
+        cache.set("k", b"\x00binary\r\n")
+        assert cache.get("k") == b"\x00binary\r\n"
+
+    def test_keys_are_prefixed(self, resp_server: RespStandInServer) -> None:
+        cache = RedisCache(resp_server.url, key_prefix="test:")
+        cache.set("k", b"v")
+        assert b"test:k" in resp_server.data
+
+    def test_ttl_sent_in_milliseconds(self, resp_server: RespStandInServer) -> None:
+        cache = RedisCache(resp_server.url)
+        cache.set("k", b"v", ttl_seconds=1.5)
+        assert ["SET", "miam:k", "v", "PX", "1500"] in resp_server.commands
+
+    def test_ttl_expires(self, resp_server: RespStandInServer) -> None:
+        cache = RedisCache(resp_server.url)
+        cache.set("k", b"v", ttl_seconds=0.01)
+        time.sleep(0.02)
+        assert cache.get("k") is None
+
+    def test_add_only_when_missing(self, resp_server: RespStandInServer) -> None:
+        cache = RedisCache(resp_server.url)
+        assert cache.add("k", b"v1", ttl_seconds=10) is True
+        assert cache.add("k", b"v2") is False
+        assert cache.get("k") == b"v1"
+
+    def test_replace_only_the_expected_value(
+        self, resp_server: RespStandInServer
+    ) -> None:
+        cache = RedisCache(resp_server.url)
+        assert cache.replace("k", b"v1", b"v2") is False
+        cache.set("k", b"v1")
+        assert cache.replace("k", b"other", b"v2") is False
+        assert cache.replace("k", b"v1", b"v2", ttl_seconds=10) is True
+        assert cache.get("k") == b"v2"
+        assert resp_server.data[b"miam:k"][1] is not None
+
+    def test_delete(self, resp_server: RespStandInServer) -> None:
+        cache = RedisCache(resp_server.url)
+        cache.set("k", b"v")
+        assert cache.delete("k") is True
+        assert cache.delete("k") is False
+
+    def test_reuses_connections(self, resp_server: RespStandInServer) -> None:
+        cache = RedisCache(resp_server.url)
+        for _ in range(5):
+            cache.get("k")
+        assert len(cache._idle) == 1
+
+
+class TestUnreachableServer:
+    def test_degrades_to_misses(self) -> None:
+        cache = RedisCache("redis://127.0.0.1:1/0", timeout_seconds=0.2)
+        cache.set("k", b"v")
+        assert cache.get("k") is None
+        assert cache.delete("k") is False
+        assert cache.get_or_compute("k", lambda: b"computed") == b"computed"
+
+
+class TestGetOrCompute:
+    def test_computes_once_then_hits(self, resp_server: RespStandInServer) -> None:
+        cache = RedisCache(resp_server.url)
+        calls: list[int] = []
+
+        def compute() -> bytes:
+            calls.append(1)
+            return b"value"
+
+        assert cache.get_or_compute("k", compute) == b"value"
+        assert cache.get_or_compute("k", compute) == b"value"
+        assert len(calls) == 1
+        assert b"miam:k:lock" not in resp_server.data
+
+    def test_single_flight_across_instances(
+        self, resp_server: RespStandInServer
+    ) -> None:
+        # Two instances stand for two workers sharing the same server.
+        workers = [
+            RedisCache(resp_server.url, poll_interval_seconds=0.01) for _ in range(2)
+        ]
+        calls: list[int] = []
+        start = threading.Barrier(6)
+
+        def compute() -> bytes:
+            calls.append(1)
+            time.sleep(0.1)
+            return b"value"
+
+        results: list[bytes] = []
+
+        def worker(cache: RedisCache) -> None:
+            start.wait()
+            results.append(cache.get_or_compute("k", compute))
+
+        threads = [
+            threading.Thread(target=worker, args=(workers[i % 2],)) for i in range(6)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert results == [b"value"] * 6
+        assert len(calls) == 1
+
+    def test_leaves_a_lock_taken_over_by_another_worker(
+        self, resp_server: RespStandInServer
+    ) -> None:
+        cache = RedisCache(resp_server.url)
+
+        def compute() -> bytes:
+            # Our lock expired and another worker took it meanwhile.
+            resp_server.data[b"miam:k:lock"] = (b"other-worker", None)
+            return b"value"
+
+        assert cache.get_or_compute("k", compute) == b"value"
+        assert resp_server.data[b"miam:k:lock"][0] == b"other-worker"
+        assert ["GET", "miam:k:lock"] not in resp_server.commands
+
+    def test_computes_locally_when_lock_holder_stalls(
+        self, resp_server: RespStandInServer
+    ) -> None:
+        cache = RedisCache(
+            resp_server.url, lock_timeout_seconds=0.05, poll_interval_seconds=0.01
+        )
+        resp_server.data[b"miam:k:lock"] = (b"other-worker", None)
+        assert cache.get_or_compute("k", lambda: b"value") == b"value"
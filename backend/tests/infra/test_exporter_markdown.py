@@ -1,4 +1,5 @@
 import io
+import os
 import pathlib
 import uuid
 import zipfile
@@ -12,7 +13,6 @@ from miam.domain.entities import (
     RecipeEntity,
     SourceEntity,
 )
-from miam.domain.schemas import ImageResponse
 from miam.infra.exporter_markdown import MarkdownExporter
 
 
@@ -103,21 +103,23 @@ def test_exporter_to_markdown(
     assert content.startswith("# Test Cake")
 
 
-def test_exporter_to_zip_bytes(sample_recipes: list[RecipeEntity]) -> None:
+def _zip(exporter: MarkdownExporter, recipes: list[RecipeEntity]) -> zipfile.ZipFile:
+    return zipfile.ZipFile(io.BytesIO(b"".join(exporter.to_zip_stream(recipes))))
+
+
+def test_exporter_to_zip_stream(
+    sample_recipes: list[RecipeEntity], tmp_path: pathlib.Path
+) -> None:
     image_id = sample_recipes[0].images[0].id
     fake_png = b"\x89PNG\r\n\x1a\nfake-image-data"
+    image_path = tmp_path / "image.png"
+    image_path.write_bytes(fake_png)
 
     mock_storage = MagicMock()
-    mock_storage.get_recipe_image.return_value = ImageResponse(
-        content=fake_png, media_type="image/png"
-    )
+    mock_storage.get_recipe_image_path.return_value = (image_path, "image/png")
 
     exporter = MarkdownExporter(image_storage=mock_storage)
-    zip_bytes = exporter.to_zip_bytes(sample_recipes)
-
-    assert isinstance(zip_bytes, bytes)
-
-    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+    with _zip(exporter, sample_recipes) as zf:
         names = zf.namelist()
         assert "recipes.md" in names
 
@@ -126,22 +128,130 @@ def test_exporter_to_zip_bytes(sample_recipes: list[RecipeEntity]) -> None:
         assert len(image_files) == 1
         assert image_files[0] == f"images/{image_id}.png"
 
-        # Verify image content
+        # Verify image content, stored as is: PNG is compressed already
         assert zf.read(image_files[0]) == fake_png
+        assert zf.getinfo(image_files[0]).compress_type == zipfile.ZIP_STORED
+        assert zf.getinfo("recipes.md").compress_type == zipfile.ZIP_DEFLATED
 
         # Verify markdown references images/ folder with correct extension
         md_content = zf.read("recipes.md").decode("utf-8")
         assert f"![Yummy](images/{image_id}.png)" in md_content
         assert "Test Cake" in md_content
+    mock_storage.get_recipe_image.assert_not_called()
 
 
-def test_exporter_to_zip_bytes_without_storage(
-    sample_recipes: list[RecipeEntity],
+def test_exporter_to_zip_stream_sends_large_images_in_chunks(
+    sample_recipes: list[RecipeEntity], tmp_path: pathlib.Path
 ) -> None:
-    exporter = MarkdownExporter()
-    zip_bytes = exporter.to_zip_bytes(sample_recipes)
+    content = os.urandom(300_000)
+    image_path = tmp_path / "image.jpg"
+    image_path.write_bytes(content)
+    mock_storage = MagicMock()
+    mock_storage.get_recipe_image_path.return_value = (image_path, "image/jpeg")
+
+    chunks = list(
+        MarkdownExporter(image_storage=mock_storage).to_zip_stream(sample_recipes)
+    )
+
+    assert len(chunks) > 4
+    assert max(len(chunk) for chunk in chunks) < 100_000
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        image_files = [n for n in zf.namelist() if n.startswith("images/")]
+        assert zf.read(image_files[0]) == content
+
+
+def test_exporter_to_zip_stream_deflates_other_files(
+    sample_recipes: list[RecipeEntity], tmp_path: pathlib.Path
+) -> None:
+    image_path = tmp_path / "image.bmp"
+    image_path.write_bytes(b"BM" + bytes(1000))
+    sample_recipes[0].images[0].media_type = "image/bmp"
+    mock_storage = MagicMock()
+    mock_storage.get_recipe_image_path.return_value = (image_path, "image/bmp")
+
+    with _zip(MarkdownExporter(image_storage=mock_storage), sample_recipes) as zf:
+        image_files = [n for n in zf.namelist() if n.startswith("images/")]
+        assert zf.getinfo(image_files[0]).compress_type == zipfile.ZIP_DEFLATED
+        assert zf.read(image_files[0]) == b"BM" + bytes(1000)
+
+
+def test_exporter_to_zip_stream_skips_missing_images(
+    sample_recipes: list[RecipeEntity], tmp_path: pathlib.Path
+) -> None:
+    mock_storage = MagicMock()
+    mock_storage.get_recipe_image_path.return_value = (
+        tmp_path / "gone.png",
+        "image/png",
+    )
+
+    with _zip(MarkdownExporter(image_storage=mock_storage), sample_recipes) as zf:
+        assert zf.namelist() == ["recipes.md"]
+        md_content = zf.read("recipes.md").decode("utf-8")
+    # No dangling link to a file missing from the archive
+    assert "Yummy" not in md_content
+    assert "## Images" not in md_content
+
+
+def test_exporter_to_zip_stream_reads_each_image_once_located(
+    sample_recipes: list[RecipeEntity], tmp_path: pathlib.Path
+) -> None:
+    recipe = sample_recipes[0]
+    recipe.images = [
+        ImageEntity(id=uuid.uuid4(), caption=f"Photo {n}", display_order=n)
+        for n in range(3)
+    ]
+    located: list[pathlib.Path] = []
+
+    def locate(
+        image_id: uuid.UUID, _extension: str | None, _content_hash: str | None
+    ) -> tuple[pathlib.Path, str]:
+        # Like a bounded cache of local copies: fetching a file evicts the last.
+        if located:
+            located[-1].unlink()
+        path = tmp_path / f"{image_id}.png"
+        path.write_bytes(b"\x89PNG-" + image_id.bytes)
+        located.append(path)
+        return path, "image/png"
+
+    mock_storage = MagicMock()
+    mock_storage.get_recipe_image_path.side_effect = locate
+
+    with _zip(MarkdownExporter(image_storage=mock_storage), [recipe]) as zf:
+        for img in recipe.images:
+            assert zf.read(f"images/{img.id}.png") == b"\x89PNG-" + img.id.bytes
+        md_content = zf.read("recipes.md").decode("utf-8")
+    for img in recipe.images:
+        assert f"![{img.caption}](images/{img.id}.png)" in md_content
 
-    with zipfile.ZipFile(io.BytesIO(zip_bytes)) as zf:
+
+def test_exporter_to_zip_stream_stores_shared_content_once(
+    sample_recipes: list[RecipeEntity], tmp_path: pathlib.Path
+) -> None:
+    content_hash = "ab" * 32
+    recipe = sample_recipes[0]
+    recipe.images = [
+        ImageEntity(id=uuid.uuid4(), caption="First", content_hash=content_hash),
+        ImageEntity(id=uuid.uuid4(), caption="Second", content_hash=content_hash),
+    ]
+    image_path = tmp_path / "shared.png"
+    image_path.write_bytes(b"\x89PNG-shared")
+    mock_storage = MagicMock()
+    mock_storage.get_recipe_image_path.return_value = (image_path, "image/png")
+
+    exporter = MarkdownExporter(image_storage=mock_storage)
+    with _zip(exporter, [recipe]) as zf:
+        image_files = [n for n in zf.namelist() if n.startswith("images/")]
+        assert image_files == [f"images/{content_hash}.png"]
+        md_content = zf.read("recipes.md").decode("utf-8")
+    assert f"![First](images/{content_hash}.png)" in md_content
+    assert f"![Second](images/{content_hash}.png)" in md_content
+    mock_storage.get_recipe_image_path.assert_called_once()
+
+
+def test_exporter_to_zip_stream_without_storage(
+    sample_recipes: list[RecipeEntity],
+) -> None:
+    with _zip(MarkdownExporter(), sample_recipes) as zf:
         names = zf.namelist()
         assert "recipes.md" in names
         # No images folder when no storage provided
@@ -3,20 +3,27 @@
 import io
 import struct
 import zlib
+from collections.abc import Iterator
 from pathlib import Path
+from typing import IO
 from uuid import UUID, uuid4
 
 from docx import Document
+from PIL import Image
 
 from miam.domain.entities import (
     ImageEntity,
+    ImageVariant,
     IngredientEntity,
     RecipeEntity,
     SourceEntity,
+    StoredFile,
 )
 from miam.domain.ports_secondary import ImageStoragePort
 from miam.domain.schemas import ImageResponse
 from miam.infra.exporter_word import WordExporter
+from miam.infra.image_storage import LocalImageStorage
+from miam.infra.image_variants import DiskImageVariantCache
 
 
 def _make_recipe(
@@ -188,21 +195,48 @@ class _StubImageStorage(ImageStoragePort):
         self.images = images or {}
 
     def add_recipe_image(
-        self, recipe_id: UUID, image: bytes, filename: str, image_id: UUID
-    ) -> UUID:
-        return image_id
-
-    def get_recipe_image(self, image_id: UUID) -> ImageResponse | None:
+        self, recipe_id: UUID, image: bytes | IO[bytes], filename: str
+    ) -> str:
+        return "0" * 64
+
+    def blob_exists(self, content_hash: str, extension: str) -> bool:
+        return False
+
+    def get_recipe_image(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> ImageResponse | None:
         return self.images.get(image_id)
 
-    def get_recipe_image_path(self, image_id: UUID) -> tuple[Path, str] | None:
+    def get_recipe_image_path(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> tuple[Path, str] | None:
         if image_id in self.images:
             return Path(f"/tmp/{image_id}"), self.images[image_id].media_type
         return None
 
-    def delete_image(self, image_id: UUID) -> bool:
+    def get_recipe_image_url(
+        self,
+        image_id: UUID,
+        extension: str | None = None,
+        content_hash: str | None = None,
+    ) -> str | None:
+        return None
+
+    def delete_image(self, image_id: UUID, extension: str | None = None) -> bool:
         return image_id in self.images
 
+    def delete_blob(self, content_hash: str) -> bool:
+        return False
+
+    def list_files(self) -> Iterator[StoredFile]:
+        return iter([])
+
 
 class TestWithImages:
     def test_with_image_storage(self) -> None:
@@ -254,3 +288,71 @@ class TestEdgeCases:
         text = _read_docx_text(data)
         # Should not contain "Preparation" heading
         assert "Preparation" not in text
+
+
+class TestWithImageVariants:
+    def _export(
+        self,
+        tmp_path: Path,
+        filename: str,
+        size: tuple[int, int],
+        variants: DiskImageVariantCache | None = None,
+    ) -> bytes:
+        storage = LocalImageStorage(str(tmp_path / "images"))
+        source = tmp_path / filename
+        Image.new("RGB", size, (200, 80, 40)).save(source)
+        content_hash = storage.add_recipe_image(uuid4(), source.read_bytes(), filename)
+        if variants is None:
+            variants = DiskImageVariantCache(str(tmp_path / "cache"), max_bytes=1 << 30)
+        exporter = WordExporter(image_storage=storage, image_variants=variants)
+        recipe = _make_recipe(
+            images=[
+                ImageEntity(
+                    id=uuid4(),
+                    extension=Path(filename).suffix,
+                    content_hash=content_hash,
+                )
+            ]
+        )
+        return exporter.to_bytes([recipe])
+
+    @staticmethod
+    def _embedded_images(data: bytes) -> list[Image.Image]:
+        doc = Document(io.BytesIO(data))
+        return [
+            Image.open(io.BytesIO(part.blob))
+            for part in doc.part.package.iter_parts()
+            if part.partname.startswith("/word/media/")
+        ]
+
+    def test_embeds_downsized_image(self, tmp_path: Path) -> None:
+        data = self._export(tmp_path, "photo.jpg", (4000, 3000))
+
+        [embedded] = self._embedded_images(data)
+        assert embedded.format == "JPEG"
+        assert embedded.size == (1280, 960)
+
+    def test_refetches_a_copy_evicted_before_it_is_read(self, tmp_path: Path) -> None:
+        class EvictedOnceVariants(DiskImageVariantCache):
+            evictions = 1
+
+            def get_variant(
+                self, source: Path, width: int | None, image_format: str | None
+            ) -> ImageVariant:
+                if self.evictions:
+                    self.evictions -= 1
+                    raise FileNotFoundError(source)
+                return super().get_variant(source, width, image_format)
+
+        variants = EvictedOnceVariants(str(tmp_path / "cache"), max_bytes=1 << 30)
+
+        data = self._export(tmp_path, "photo.jpg", (800, 600), variants)
+
+        assert len(self._embedded_images(data)) == 1
+        assert variants.evictions == 0
+
+    def test_converts_webp_to_an_embeddable_format(self, tmp_path: Path) -> None:
+        data = self._export(tmp_path, "photo.webp", (800, 600))
+
+        [embedded] = self._embedded_images(data)
+        assert embedded.format == "JPEG"
@@ -0,0 +1,28 @@
+"""Tests for UUIDv7 key generation."""
+
+import time
+import uuid
+
+from miam.infra.db.ids import uuid7, uuid7_timestamp_ms
+
+
+class TestUuid7:
+    def test_is_an_rfc_9562_version_7_uuid(self) -> None:
+        value = uuid7()
+
+        assert value.version == 7
+        assert value.variant == uuid.RFC_4122
+
+    def test_embeds_the_current_time(self) -> None:
+        before = time.time_ns() // 1_000_000
+        value = uuid7()
+        after = time.time_ns() // 1_000_000
+
+        # The counter may borrow a millisecond or two under a burst of calls.
+        assert before <= uuid7_timestamp_ms(value) <= after + 2
+
+    def test_is_strictly_increasing(self) -> None:
+        values = [uuid7() for _ in range(10_000)]
+
+        assert values == sorted(values)
+        assert len(set(values)) == len(values)
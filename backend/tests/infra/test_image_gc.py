@@ -0,0 +1,197 @@
+"""Tests for ImageGarbageCollector against SQLite and a real image folder."""
+
+import os
+import time
+from pathlib import Path
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import Engine, create_engine, select, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from miam.infra.db.base import Base, ImageBlob
+from miam.infra.image_gc import ImageGarbageCollector
+from miam.infra.image_storage import LocalImageStorage
+from miam.infra.repositories import RecipeRepository
+from tests.infra.conftest import make_recipe_create
+
+_GRACE = 3600
+_LATER = time.time() + 2 * _GRACE
+
+
+@pytest.fixture
+def storage(tmp_path: Path) -> LocalImageStorage:
+    return LocalImageStorage(str(tmp_path))
+
+
+@pytest.fixture
+def collector(
+    db_engine: Engine, db_session: Session, storage: LocalImageStorage
+) -> ImageGarbageCollector:
+    return ImageGarbageCollector(
+        sessionmaker(bind=db_engine), storage, grace_seconds=_GRACE, batch_size=2
+    )
+
+
+def _add_image(
+    repository: RecipeRepository,
+    storage: LocalImageStorage,
+    owner_id: UUID,
+    content: bytes,
+) -> str:
+    recipe = repository.add_recipe(make_recipe_create(), owner_id=owner_id)
+    content_hash = storage.add_recipe_image(recipe.id, content, "photo.jpg")
+    repository.add_image(
+        recipe.id, owner_id, extension=".jpg", content_hash=content_hash
+    )
+    return content_hash
+
+
+def _ref_count(db_session: Session, content_hash: str) -> int | None:
+    return db_session.scalar(
+        select(ImageBlob.ref_count).where(ImageBlob.content_hash == content_hash)
+    )
+
+
+class TestSweep:
+    def test_deletes_expired_orphan_blobs_only(
+        self,
+        collector: ImageGarbageCollector,
+        storage: LocalImageStorage,
+        repository: RecipeRepository,
+        default_owner_id: UUID,
+    ) -> None:
+        used = _add_image(repository, storage, default_owner_id, b"used")
+        orphan = storage.add_recipe_image(uuid4(), b"orphan", "a.jpg")
+
+        report = collector.sweep(now=_LATER)
+
+        assert storage.blob_path(used, ".jpg").exists()
+        assert not storage.blob_path(orphan, ".jpg").exists()
+        assert report.scanned_files == 2
+        assert (report.orphaned_files, report.reclaimable_bytes) == (1, 6)
+        assert (report.deleted_files, report.freed_bytes) == (1, 6)
+        assert collector.last_report is report
+
+    def test_keeps_recent_orphans_but_reports_them(
+        self, collector: ImageGarbageCollector, storage: LocalImageStorage
+    ) -> None:
+        recent = storage.add_recipe_image(uuid4(), b"recent", "a.jpg")
+        old = storage.add_recipe_image(uuid4(), b"old", "a.png")
+        old_path = storage.blob_path(old, ".png")
+        os.utime(old_path, (time.time() - 2 * _GRACE,) * 2)
+
+        report = collector.sweep()
+
+        assert storage.blob_path(recent, ".jpg").exists()
+        assert not old_path.exists()
+        assert (report.orphaned_files, report.reclaimable_bytes) == (2, 9)
+        assert report.freed_bytes == 3
+
+    def test_recounts_references_left_by_cascades(
+        self,
+        collector: ImageGarbageCollector,
+        storage: LocalImageStorage,
+        repository: RecipeRepository,
+        db_session: Session,
+        default_owner_id: UUID,
+    ) -> None:
+        content_hash = _add_image(repository, storage, default_owner_id, b"photo")
+        db_session.execute(text("DELETE FROM recipes"))
+        db_session.commit()
+        assert _ref_count(db_session, content_hash) == 1
+
+        report = collector.sweep(now=_LATER)
+
+        assert report.recounted_blobs == 1
+        assert report.deleted_files == 1
+        assert not storage.blob_path(content_hash, ".jpg").exists()
+        assert _ref_count(db_session, content_hash) is None
+
+    def test_corrects_counts_in_both_directions(
+        self,
+        collector: ImageGarbageCollector,
+        storage: LocalImageStorage,
+        repository: RecipeRepository,
+        db_session: Session,
+        default_owner_id: UUID,
+    ) -> None:
+        hashes = [
+            _add_image(repository, storage, default_owner_id, bytes([i]))
+            for i in range(3)
+        ]
+        db_session.execute(text("UPDATE image_blobs SET ref_count = 5"))
+        db_session.commit()
+
+        report = collector.sweep(now=_LATER)
+
+        assert report.recounted_blobs == 3
+        assert [_ref_count(db_session, h) for h in hashes] == [1, 1, 1]
+        assert report.deleted_files == 0
+
+    def test_deletes_files_of_deleted_legacy_images(
+        self,
+        collector: ImageGarbageCollector,
+        storage: LocalImageStorage,
+        repository: RecipeRepository,
+        default_owner_id: UUID,
+    ) -> None:
+        recipe = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        image = repository.add_image(recipe.id, default_owner_id, extension=".jpg")
+        kept = storage.image_path(image.id, ".jpg")
+        deleted = storage.image_path(uuid4(), ".png")
+        for path in (kept, deleted):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b"legacy")
+
+        report = collector.sweep(now=_LATER)
+
+        assert kept.exists()
+        assert not deleted.exists()
+        assert (report.deleted_files, report.freed_bytes) == (1, 6)
+
+    def test_deletes_unreferenced_rows_without_file(
+        self, collector: ImageGarbageCollector, db_session: Session
+    ) -> None:
+        db_session.add(ImageBlob(content_hash="0" * 64, ref_count=0))
+        db_session.commit()
+
+        assert collector.sweep().deleted_blob_rows == 0  # still in grace period
+        assert collector.sweep(now=_LATER).deleted_blob_rows == 1
+        assert _ref_count(db_session, "0" * 64) is None
+
+
+class TestBackgroundThread:
+    def test_sweeps_periodically_until_stopped(
+        self, tmp_path: Path, storage: LocalImageStorage
+    ) -> None:
+        # A file database: the in-memory one is private to the test thread.
+        engine = create_engine(f"sqlite:///{tmp_path / 'gc.db'}")
+        Base.metadata.create_all(engine)
+        collector = ImageGarbageCollector(
+            sessionmaker(bind=engine), storage, interval_seconds=0.01
+        )
+
+        collector.start()
+        deadline = time.monotonic() + 5
+        while collector.last_report is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        collector.stop()
+        engine.dispose()
+
+        assert collector.last_report is not None
+
+    def test_disabled_without_interval(
+        self, db_engine: Engine, storage: LocalImageStorage
+    ) -> None:
+        collector = ImageGarbageCollector(sessionmaker(bind=db_engine), storage)
+
+        collector.start()
+
+        assert collector._thread is None
+
+    def test_rejects_empty_batches(
+        self, db_engine: Engine, storage: LocalImageStorage
+    ) -> None:
+        with pytest.raises(ValueError, match="batch size"):
+            ImageGarbageCollector(sessionmaker(bind=db_engine), storage, batch_size=0)
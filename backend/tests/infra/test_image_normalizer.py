@@ -0,0 +1,230 @@
+"""Tests for PillowImageNormalizer re-encoding uploads with Pillow."""
+
+import base64
+import io
+import os
+import tempfile
+from uuid import uuid4
+
+import pytest
+from PIL import Image
+
+from miam.domain.entities import ImageUpload
+from miam.infra.image_normalizer import PillowImageNormalizer
+
+_ORIENTATION = 0x0112
+
+
+def _encode(img: Image.Image, image_format: str, **options: object) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def _noise(size: tuple[int, int]) -> Image.Image:
+    return Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3))
+
+
+def _photo(size: tuple[int, int], orientation: int = 1) -> bytes:
+    """A JPEG as phones write them: full quality, with EXIF metadata."""
+    exif = Image.Exif()
+    exif[_ORIENTATION] = orientation
+    exif[0x010F] = "PhoneMaker"  # camera make
+    return _encode(_noise(size), "JPEG", quality=98, exif=exif)
+
+
+def _normalize(
+    normalizer: PillowImageNormalizer, content: bytes, filename: str
+) -> ImageUpload | str:
+    return normalizer.normalize([ImageUpload(uuid4(), content, filename)])[0]
+
+
+def _bytes(upload: ImageUpload) -> bytes:
+    if isinstance(upload.content, bytes):
+        return upload.content
+    upload.content.seek(0)
+    return upload.content.read()
+
+
+@pytest.fixture
+def normalizer() -> PillowImageNormalizer:
+    return PillowImageNormalizer(max_dimension=200, quality=80)
+
+
+class TestNormalize:
+    def test_shrinks_and_strips_metadata(
+        self, normalizer: PillowImageNormalizer
+    ) -> None:
+        original = _photo((800, 400))
+
+        result = _normalize(normalizer, original, "IMG_0001.JPEG")
+
+        assert isinstance(result, ImageUpload)
+        assert result.filename == "IMG_0001.jpg"
+        assert len(_bytes(result)) < len(original) / 4
+        with Image.open(io.BytesIO(_bytes(result))) as img:
+            assert img.format == "JPEG"
+            assert img.size == (200, 100)
+            assert "exif" not in img.info
+
+    def test_rotates_upright(self, normalizer: PillowImageNormalizer) -> None:
+        result = _normalize(normalizer, _photo((80, 40), orientation=6), "a.jpg")
+
+        assert isinstance(result, ImageUpload)
+        with Image.open(io.BytesIO(_bytes(result))) as img:
+            assert img.size == (40, 80)
+            assert img.getexif().get(_ORIENTATION) is None
+
+    def test_is_deterministic(self, normalizer: PillowImageNormalizer) -> None:
+        original = _photo((300, 300))
+
+        first, second = normalizer.normalize(
+            [ImageUpload(uuid4(), original, "a.jpg") for _ in range(2)]
+        )
+
+        assert isinstance(first, ImageUpload)
+        assert isinstance(second, ImageUpload)
+        assert _bytes(first) == _bytes(second)
+
+    def test_reads_files_from_their_start(
+        self, normalizer: PillowImageNormalizer
+    ) -> None:
+        upload = io.BytesIO(_photo((300, 100)))
+        upload.seek(0, io.SEEK_END)
+
+        result = _normalize(normalizer, upload.getvalue(), "a.jpg")
+        from_file = normalizer.normalize([ImageUpload(uuid4(), upload, "a.jpg")])[0]
+
+        assert isinstance(result, ImageUpload)
+        assert isinstance(from_file, ImageUpload)
+        assert _bytes(from_file) == _bytes(result)
+
+    def test_spools_large_outputs_to_disk(self) -> None:
+        normalizer = PillowImageNormalizer(max_dimension=2000, quality=95)
+
+        result = _normalize(normalizer, _photo((2000, 1000)), "a.jpg")
+
+        assert isinstance(result, ImageUpload)
+        assert isinstance(result.content, tempfile.SpooledTemporaryFile)
+        assert result.content.tell() == 0
+        # Over the in-memory threshold, so the file is on disk
+        assert len(_bytes(result)) > 1024 * 1024
+
+    def test_keeps_transparency_as_png(self, normalizer: PillowImageNormalizer) -> None:
+        logo = Image.new("RGBA", (400, 400), (200, 80, 40, 128))
+
+        result = _normalize(normalizer, _encode(logo, "PNG"), "logo.png")
+
+        assert isinstance(result, ImageUpload)
+        assert result.filename == "logo.png"
+        with Image.open(io.BytesIO(_bytes(result))) as img:
+            assert (img.format, img.mode, img.size) == ("PNG", "RGBA", (200, 200))
+
+    def test_webp_output(self) -> None:
+        normalizer = PillowImageNormalizer(max_dimension=200, image_format="webp")
+
+        result = _normalize(normalizer, _photo((400, 400)), "a.jpg")
+
+        assert isinstance(result, ImageUpload)
+        assert result.filename == "a.webp"
+        with Image.open(io.BytesIO(_bytes(result))) as img:
+            assert img.format == "WEBP"
+
+    def test_keeps_small_clean_images_that_would_grow(self) -> None:
+        normalizer = PillowImageNormalizer(max_dimension=200, quality=95)
+        original = _encode(_noise((100, 100)), "JPEG", quality=30)
+
+        result = _normalize(normalizer, original, "small.jpg")
+
+        assert isinstance(result, ImageUpload)
+        assert (result.content, result.filename) == (original, "small.jpg")
+
+    def test_keeps_animated_gifs(self, normalizer: PillowImageNormalizer) -> None:
+        frames = [Image.new("RGB", (400, 400), color) for color in ("red", "blue")]
+        buffer = io.BytesIO()
+        frames[0].save(buffer, "GIF", save_all=True, append_images=frames[1:])
+
+        result = _normalize(normalizer, buffer.getvalue(), "anim.gif")
+
+        assert isinstance(result, ImageUpload)
+        assert (result.content, result.filename) == (buffer.getvalue(), "anim.gif")
+
+    def test_rejects_undecodable_content(
+        self, normalizer: PillowImageNormalizer
+    ) -> None:
+        assert _normalize(normalizer, b"not an image", "a.jpg") == (
+            "Image cannot be decoded"
+        )
+
+    def test_rejects_images_over_the_pixel_cap(self) -> None:
+        # 81 megapixels of one color: a PNG of a few kB.
+        bomb = _encode(Image.new("1", (9_000, 9_000)), "PNG")
+        assert len(bomb) < 100_000
+
+        result = _normalize(PillowImageNormalizer(), bomb, "bomb.png")
+
+        assert result == "Image too large (9000x9000 pixels, max 50 megapixels)"
+
+    def test_pixel_cap_applies_without_reencoding(self) -> None:
+        normalizer = PillowImageNormalizer(reencode=False, max_pixels=10_000)
+
+        assert _normalize(normalizer, _photo((200, 100)), "a.jpg") == (
+            "Image too large (200x100 pixels, max 0.01 megapixels)"
+        )
+        assert isinstance(
+            _normalize(normalizer, _photo((100, 100)), "a.jpg"), ImageUpload
+        )
+
+    def test_rejects_unsupported_extensions(
+        self, normalizer: PillowImageNormalizer
+    ) -> None:
+        result = _normalize(normalizer, _photo((10, 10)), "notes.txt")
+
+        assert isinstance(result, str)
+        assert result.startswith("Unsupported image type")
+
+    def test_computes_an_upright_placeholder(
+        self, normalizer: PillowImageNormalizer
+    ) -> None:
+        result = _normalize(normalizer, _photo((800, 400), orientation=6), "a.jpg")
+
+        assert isinstance(result, ImageUpload)
+        assert result.placeholder is not None
+        prefix, _, data = result.placeholder.partition(",")
+        assert prefix == "data:image/jpeg;base64"
+        assert len(result.placeholder) < 1000
+        with Image.open(io.BytesIO(base64.b64decode(data))) as img:
+            assert img.size == (8, 16)
+
+    def test_placeholder_only_without_reencoding(self) -> None:
+        normalizer = PillowImageNormalizer(max_dimension=200, reencode=False)
+        original = _photo((800, 400))
+
+        result = _normalize(normalizer, original, "a.jpg")
+
+        assert isinstance(result, ImageUpload)
+        assert (result.content, result.filename) == (original, "a.jpg")
+        assert result.placeholder is not None
+
+    def test_keeps_files_as_files_without_reencoding(self) -> None:
+        normalizer = PillowImageNormalizer(max_dimension=200, reencode=False)
+        original = io.BytesIO(_photo((800, 400)))
+
+        result = normalizer.normalize([ImageUpload(uuid4(), original, "a.jpg")])[0]
+
+        assert isinstance(result, ImageUpload)
+        assert result.content is original
+        assert original.tell() == 0
+        assert result.placeholder is not None
+
+    def test_keeps_undecodable_content_without_reencoding(self) -> None:
+        normalizer = PillowImageNormalizer(reencode=False)
+
+        result = _normalize(normalizer, b"not an image", "a.jpg")
+
+        assert isinstance(result, ImageUpload)
+        assert (result.content, result.placeholder) == (b"not an image", None)
+
+    def test_rejects_unknown_formats(self) -> None:
+        with pytest.raises(ValueError, match="Unsupported image format"):
+            PillowImageNormalizer(image_format="avif")
@@ -1,7 +1,12 @@
 """Tests for LocalImageStorage against real filesystem using tmp_path."""
 
+import hashlib
+import io
 from pathlib import Path
-from uuid import uuid4
+from unittest.mock import patch
+from uuid import UUID, uuid4
+
+import pytest
 
 from miam.infra.image_storage import LocalImageStorage
 
@@ -29,31 +34,71 @@ class TestInit:
 # ---------------------------------------------------------------------------
 
 
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_legacy(
+    storage: LocalImageStorage, image_id: UUID, ext: str, data: bytes
+) -> Path:
+    """Write a file named after its image ID, as stored before content addressing."""
+    path = storage.image_path(image_id, ext)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
 class TestAddImage:
-    def test_creates_file(self, tmp_path: Path) -> None:
+    def test_stores_content_under_its_hash(self, tmp_path: Path) -> None:
         storage = LocalImageStorage(str(tmp_path))
-        recipe_id = uuid4()
-        image_id = uuid4()
-        storage.add_recipe_image(recipe_id, b"jpeg-data", "photo.jpg", image_id)
 
-        expected = tmp_path / f"{image_id}.jpg"
-        assert expected.is_file()
+        content_hash = storage.add_recipe_image(uuid4(), b"jpeg-data", "photo.jpg")
 
-    def test_correct_content(self, tmp_path: Path) -> None:
+        assert content_hash == _sha256(b"jpeg-data")
+        expected = storage.blob_path(content_hash, ".jpg")
+        assert expected.read_bytes() == b"jpeg-data"
+        assert expected.relative_to(tmp_path).parts[:3] == (
+            "blobs",
+            content_hash[:2],
+            content_hash[2:4],
+        )
+
+    def test_preserves_extension(self, tmp_path: Path) -> None:
         storage = LocalImageStorage(str(tmp_path))
-        image_id = uuid4()
-        content = b"\x89PNG-fake-image-data"
-        storage.add_recipe_image(uuid4(), content, "pic.png", image_id)
 
-        saved = tmp_path / f"{image_id}.png"
+        content_hash = storage.add_recipe_image(uuid4(), b"data", "image.WEBP")
+
+        assert storage.blob_path(content_hash, ".webp").is_file()
+
+    def test_copies_file_objects(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        content = bytes(range(256)) * 1000
+
+        content_hash = storage.add_recipe_image(uuid4(), io.BytesIO(content), "pic.png")
+
+        saved = storage.blob_path(content_hash, ".png")
+        assert content_hash == _sha256(content)
         assert saved.read_bytes() == content
+        assert [p.name for p in saved.parent.iterdir()] == [saved.name]
+        # No temporary file left behind.
+        assert [p.name for p in tmp_path.iterdir()] == ["blobs"]
 
-    def test_preserves_extension(self, tmp_path: Path) -> None:
+    def test_identical_content_is_stored_once(self, tmp_path: Path) -> None:
         storage = LocalImageStorage(str(tmp_path))
-        image_id = uuid4()
-        storage.add_recipe_image(uuid4(), b"data", "image.webp", image_id)
 
-        assert (tmp_path / f"{image_id}.webp").is_file()
+        first = storage.add_recipe_image(uuid4(), b"same", "a.jpg")
+        second = storage.add_recipe_image(uuid4(), io.BytesIO(b"same"), "b.jpg")
+
+        assert first == second
+        assert len(list((tmp_path / "blobs").rglob("*.jpg"))) == 1
+
+    def test_rejects_unsupported_extension(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+
+        with pytest.raises(ValueError, match="Unsupported image type"):
+            storage.add_recipe_image(uuid4(), b"data", "notes.txt")
+
+        assert list(tmp_path.iterdir()) == []
 
 
 # ---------------------------------------------------------------------------
@@ -64,10 +109,9 @@ class TestAddImage:
 class TestGetImage:
     def test_existing_jpeg(self, tmp_path: Path) -> None:
         storage = LocalImageStorage(str(tmp_path))
-        image_id = uuid4()
-        storage.add_recipe_image(uuid4(), b"jpeg-bytes", "photo.jpg", image_id)
+        content_hash = storage.add_recipe_image(uuid4(), b"jpeg-bytes", "photo.jpg")
 
-        response = storage.get_recipe_image(image_id)
+        response = storage.get_recipe_image(uuid4(), ".jpg", content_hash)
 
         assert response is not None
         assert response.content == b"jpeg-bytes"
@@ -75,17 +119,36 @@ class TestGetImage:
 
     def test_existing_png(self, tmp_path: Path) -> None:
         storage = LocalImageStorage(str(tmp_path))
-        image_id = uuid4()
-        storage.add_recipe_image(uuid4(), b"png-bytes", "photo.png", image_id)
+        content_hash = storage.add_recipe_image(uuid4(), b"png-bytes", "photo.png")
 
-        response = storage.get_recipe_image(image_id)
+        response = storage.get_recipe_image(uuid4(), ".png", content_hash)
 
         assert response is not None
         assert response.media_type == "image/png"
 
+    def test_blob_without_known_extension(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        content_hash = storage.add_recipe_image(uuid4(), b"png-bytes", "photo.png")
+
+        resolved = storage.get_recipe_image_path(uuid4(), None, content_hash)
+
+        assert resolved == (storage.blob_path(content_hash, ".png"), "image/png")
+
     def test_not_found(self, tmp_path: Path) -> None:
         storage = LocalImageStorage(str(tmp_path))
         assert storage.get_recipe_image(uuid4()) is None
+        assert storage.get_recipe_image(uuid4(), ".jpg", _sha256(b"gone")) is None
+
+    def test_legacy_file(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        image_id = uuid4()
+        _write_legacy(storage, image_id, ".jpg", b"legacy")
+
+        response = storage.get_recipe_image(image_id)
+
+        assert response is not None
+        assert response.content == b"legacy"
+        assert response.media_type == "image/jpeg"
 
     def test_no_extension_fallback(self, tmp_path: Path) -> None:
         storage = LocalImageStorage(str(tmp_path))
@@ -99,6 +162,59 @@ class TestGetImage:
         assert response.content == b"raw-data"
         assert response.media_type == "application/octet-stream"
 
+    def test_known_extension_skips_the_search(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        image_id = uuid4()
+        legacy = _write_legacy(storage, image_id, ".jpg", b"jpeg-bytes")
+        content_hash = storage.add_recipe_image(uuid4(), b"jpeg-bytes", "photo.jpg")
+
+        with patch.object(Path, "glob", side_effect=AssertionError("searched")):
+            assert storage.get_recipe_image_path(image_id, ".jpg") == (
+                legacy,
+                "image/jpeg",
+            )
+            assert storage.get_recipe_image_path(image_id, ".jpg", content_hash) == (
+                storage.blob_path(content_hash, ".jpg"),
+                "image/jpeg",
+            )
+
+    def test_finds_files_of_the_flat_layout(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        image_id = uuid4()
+        (tmp_path / f"{image_id}.png").write_bytes(b"legacy")
+
+        response = storage.get_recipe_image(image_id, ".png")
+
+        assert response is not None
+        assert response.content == b"legacy"
+
+
+# ---------------------------------------------------------------------------
+# Relayout
+# ---------------------------------------------------------------------------
+
+
+class TestRelayout:
+    def test_moves_flat_files_into_shards(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        image_id = uuid4()
+        (tmp_path / f"{image_id}.JPG").write_bytes(b"legacy")
+        (tmp_path / "notes.txt").write_bytes(b"not an image")
+
+        moved = list(storage.relayout())
+
+        assert moved == [(image_id, ".jpg")]
+        assert storage.image_path(image_id, ".jpg").read_bytes() == b"legacy"
+        assert not (tmp_path / f"{image_id}.JPG").exists()
+        assert (tmp_path / "notes.txt").exists()
+
+    def test_is_idempotent(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        _write_legacy(storage, uuid4(), ".jpg", b"data")
+        storage.add_recipe_image(uuid4(), b"data", "photo.jpg")
+
+        assert list(storage.relayout()) == []
+
 
 # ---------------------------------------------------------------------------
 # Delete image
@@ -109,10 +225,10 @@ class TestDeleteImage:
     def test_existing(self, tmp_path: Path) -> None:
         storage = LocalImageStorage(str(tmp_path))
         image_id = uuid4()
-        storage.add_recipe_image(uuid4(), b"data", "photo.jpg", image_id)
+        _write_legacy(storage, image_id, ".jpg", b"data")
 
-        assert storage.delete_image(image_id) is True
-        assert not (tmp_path / f"{image_id}.jpg").exists()
+        assert storage.delete_image(image_id, ".jpg") is True
+        assert not storage.image_path(image_id, ".jpg").exists()
 
     def test_not_found(self, tmp_path: Path) -> None:
         storage = LocalImageStorage(str(tmp_path))
@@ -121,7 +237,85 @@ class TestDeleteImage:
     def test_delete_then_get_returns_none(self, tmp_path: Path) -> None:
         storage = LocalImageStorage(str(tmp_path))
         image_id = uuid4()
-        storage.add_recipe_image(uuid4(), b"data", "pic.jpg", image_id)
+        _write_legacy(storage, image_id, ".jpg", b"data")
 
         storage.delete_image(image_id)
         assert storage.get_recipe_image(image_id) is None
+
+
+class TestDeleteBlob:
+    def test_existing(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        content_hash = storage.add_recipe_image(uuid4(), b"data", "photo.jpg")
+
+        assert storage.delete_blob(content_hash) is True
+        assert not storage.blob_path(content_hash, ".jpg").exists()
+        assert storage.get_recipe_image(uuid4(), ".jpg", content_hash) is None
+
+    def test_deletes_every_extension(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        content_hash = storage.add_recipe_image(uuid4(), b"data", "photo.jpg")
+        storage.add_recipe_image(uuid4(), b"data", "photo.png")
+
+        assert storage.delete_blob(content_hash) is True
+        assert list((tmp_path / "blobs").rglob(f"{content_hash}.*")) == []
+
+    def test_not_found(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        assert storage.delete_blob(_sha256(b"missing")) is False
+
+
+class TestAdoptLegacyImage:
+    def test_copies_the_file_into_a_blob(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        image_id = uuid4()
+        legacy = _write_legacy(storage, image_id, ".png", b"legacy")
+
+        content_hash = storage.adopt_legacy_image(image_id, ".png")
+
+        assert content_hash == _sha256(b"legacy")
+        assert storage.blob_path(content_hash, ".png").read_bytes() == b"legacy"
+        assert legacy.exists()
+
+    def test_reuses_an_existing_blob(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        image_id = uuid4()
+        _write_legacy(storage, image_id, ".jpg", b"same")
+        content_hash = storage.add_recipe_image(uuid4(), b"same", "photo.jpg")
+
+        assert storage.adopt_legacy_image(image_id, ".jpg") == content_hash
+        assert len(list((tmp_path / "blobs").rglob("*"))) == 3  # 2 dirs + 1 file
+
+    def test_missing_file(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        assert storage.adopt_legacy_image(uuid4(), ".jpg") is None
+
+
+class TestListFiles:
+    def test_lists_blobs_and_legacy_files(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        content_hash = storage.add_recipe_image(uuid4(), b"blob", "photo.jpg")
+        image_id = uuid4()
+        _write_legacy(storage, image_id, ".png", b"legacy!")
+
+        files = sorted(storage.list_files(), key=lambda f: f.extension)
+
+        assert [(f.content_hash, f.image_id, f.extension, f.size) for f in files] == [
+            (content_hash, None, ".jpg", 4),
+            (None, image_id, ".png", 7),
+        ]
+        assert (
+            files[0].modified_at
+            == storage.blob_path(content_hash, ".jpg").stat().st_mtime
+        )
+
+    def test_skips_temporary_and_unknown_files(self, tmp_path: Path) -> None:
+        storage = LocalImageStorage(str(tmp_path))
+        content_hash = _sha256(b"data")
+        blob = storage.blob_path(content_hash, ".jpg")
+        blob.parent.mkdir(parents=True)
+        (blob.parent / f".{blob.name}.tmp").write_bytes(b"partial")
+        (blob.parent / "notes.txt").write_bytes(b"")
+        (tmp_path / "README").write_bytes(b"")
+
+        assert list(storage.list_files()) == []
@@ -0,0 +1,69 @@
+"""Tests for HmacImageUrlSigner."""
+
+from dataclasses import replace
+from uuid import uuid4
+
+import pytest
+
+from miam.domain.entities import ImageEntity
+from miam.infra.image_url_signer import HmacImageUrlSigner
+
+_IMAGE = ImageEntity(id=uuid4(), extension=".png", content_hash="ab" * 32)
+_NOW = 1_000_000.0
+
+
+@pytest.fixture
+def signer() -> HmacImageUrlSigner:
+    return HmacImageUrlSigner("secret", window_seconds=3600)
+
+
+def test_signed_grant_verifies(signer: HmacImageUrlSigner) -> None:
+    grant = signer.sign(_IMAGE, now=_NOW)
+
+    assert grant.image_id == _IMAGE.id
+    assert grant.content_hash == _IMAGE.content_hash
+    assert signer.verify(grant, now=_NOW)
+
+
+def test_grant_is_stable_within_a_window(signer: HmacImageUrlSigner) -> None:
+    start = signer.window(_NOW) * 3600
+
+    assert signer.sign(_IMAGE, now=start) == signer.sign(_IMAGE, now=start + 3599)
+    assert signer.sign(_IMAGE, now=start) != signer.sign(_IMAGE, now=start + 3600)
+
+
+def test_grant_stays_valid_for_a_full_window(signer: HmacImageUrlSigner) -> None:
+    start = signer.window(_NOW) * 3600
+    grant = signer.sign(_IMAGE, now=start + 3599)
+
+    assert signer.verify(grant, now=start + 3599 + 3600)
+    assert not signer.verify(grant, now=grant.expires)
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"image_id": uuid4()},
+        {"content_hash": "cd" * 32},
+        {"extension": ".jpg"},
+        {"expires": 10**12},
+        {"signature": "forged"},
+    ],
+)
+def test_rejects_tampered_grant(
+    signer: HmacImageUrlSigner, changes: dict[str, object]
+) -> None:
+    grant = signer.sign(_IMAGE, now=_NOW)
+
+    assert not signer.verify(replace(grant, **changes), now=_NOW)  # type: ignore[arg-type]
+
+
+def test_rejects_grant_of_another_key(signer: HmacImageUrlSigner) -> None:
+    grant = HmacImageUrlSigner("other").sign(_IMAGE, now=_NOW)
+
+    assert not signer.verify(grant, now=_NOW)
+
+
+def test_rejects_non_positive_window() -> None:
+    with pytest.raises(ValueError, match="positive"):
+        HmacImageUrlSigner("secret", window_seconds=0)
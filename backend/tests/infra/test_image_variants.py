@@ -0,0 +1,181 @@
+"""Tests for DiskImageVariantCache generating variants with Pillow."""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from miam.infra.image_variants import DiskImageVariantCache
+
+
+def _write_image(path: Path, size: tuple[int, int], mode: str = "RGB") -> Path:
+    color = (200, 80, 40, 128) if mode == "RGBA" else (200, 80, 40)
+    Image.new(mode, size, color).save(path)
+    return path
+
+
+def _write_noise(path: Path, size: tuple[int, int]) -> Path:
+    """Write an incompressible image, so variant sizes grow with their area."""
+    Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)).save(path)
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> DiskImageVariantCache:
+    return DiskImageVariantCache(str(tmp_path / "cache"), max_bytes=10 * 1024 * 1024)
+
+
+class TestGetVariant:
+    def test_resizes_to_width_keeping_aspect_ratio(
+        self, tmp_path: Path, cache: DiskImageVariantCache
+    ) -> None:
+        source = _write_image(tmp_path / "photo.jpg", (2000, 1000))
+
+        variant = cache.get_variant(source, 640, None)
+
+        assert variant.media_type == "image/jpeg"
+        with Image.open(variant.path) as img:
+            assert img.format == "JPEG"
+            assert img.size == (640, 320)
+
+    def test_rounds_width_up_to_a_cached_size(
+        self, tmp_path: Path, cache: DiskImageVariantCache
+    ) -> None:
+        source = _write_image(tmp_path / "photo.png", (2000, 1000))
+
+        variant = cache.get_variant(source, 300, None)
+
+        assert variant == cache.get_variant(source, 320, None)
+        with Image.open(variant.path) as img:
+            assert img.width == 320
+
+    def test_never_upscales(self, tmp_path: Path, cache: DiskImageVariantCache) -> None:
+        source = _write_image(tmp_path / "small.png", (100, 50))
+
+        variant = cache.get_variant(source, 640, None)
+
+        with Image.open(variant.path) as img:
+            assert img.size == (100, 50)
+
+    def test_converts_to_webp(
+        self, tmp_path: Path, cache: DiskImageVariantCache
+    ) -> None:
+        source = _write_image(tmp_path / "photo.png", (400, 300))
+
+        variant = cache.get_variant(source, None, "webp")
+
+        assert variant.media_type == "image/webp"
+        assert variant.path.suffix == ".webp"
+        with Image.open(variant.path) as img:
+            assert img.format == "WEBP"
+            assert img.size == (400, 300)
+
+    def test_flattens_transparency_for_jpeg(
+        self, tmp_path: Path, cache: DiskImageVariantCache
+    ) -> None:
+        source = _write_image(tmp_path / "logo.png", (64, 64), mode="RGBA")
+
+        variant = cache.get_variant(source, None, "jpeg")
+
+        with Image.open(variant.path) as img:
+            assert img.mode == "RGB"
+
+    def test_gif_variants_are_png(
+        self, tmp_path: Path, cache: DiskImageVariantCache
+    ) -> None:
+        source = _write_image(tmp_path / "anim.gif", (400, 300))
+
+        variant = cache.get_variant(source, 160, None)
+
+        assert variant.media_type == "image/png"
+
+    def test_hit_reuses_the_file_and_etag(
+        self, tmp_path: Path, cache: DiskImageVariantCache
+    ) -> None:
+        source = _write_image(tmp_path / "photo.jpg", (800, 600))
+        first = cache.get_variant(source, 320, "webp")
+        os.utime(first.path, ns=(0, 0))
+
+        second = cache.get_variant(source, 320, "webp")
+
+        assert second == first
+        assert second.etag.startswith('"')
+        assert second.etag.endswith('"')
+        # The hit marked the file as recently used.
+        assert second.path.stat().st_mtime_ns > 0
+
+    def test_concurrent_misses_on_one_variant(
+        self, tmp_path: Path, cache: DiskImageVariantCache
+    ) -> None:
+        source = _write_image(tmp_path / "photo.jpg", (1600, 1200))
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            variants = list(
+                pool.map(lambda _: cache.get_variant(source, 640, "webp"), range(8))
+            )
+
+        assert all(variant == variants[0] for variant in variants)
+        with Image.open(variants[0].path) as img:
+            assert img.size == (640, 480)
+        assert list(cache.folder.rglob("*.tmp")) == []
+
+    def test_changed_source_gets_a_new_etag(
+        self, tmp_path: Path, cache: DiskImageVariantCache
+    ) -> None:
+        source = _write_image(tmp_path / "photo.jpg", (800, 600))
+        before = cache.get_variant(source, 320, None)
+
+        _write_image(source, (900, 600))
+
+        assert cache.get_variant(source, 320, None).etag != before.etag
+
+    def test_rejects_undecodable_source(
+        self, tmp_path: Path, cache: DiskImageVariantCache
+    ) -> None:
+        source = tmp_path / "broken.jpg"
+        source.write_bytes(b"not an image")
+
+        with pytest.raises(ValueError, match="cannot be converted"):
+            cache.get_variant(source, 320, None)
+
+    def test_rejects_unknown_format(
+        self, tmp_path: Path, cache: DiskImageVariantCache
+    ) -> None:
+        source = _write_image(tmp_path / "photo.jpg", (80, 60))
+
+        with pytest.raises(ValueError, match="Unsupported image format"):
+            cache.get_variant(source, None, "tiff")
+
+
+class TestEviction:
+    def test_evicts_least_recently_used_variants(self, tmp_path: Path) -> None:
+        source = _write_noise(tmp_path / "photo.png", (960, 540))
+        probe = DiskImageVariantCache(str(tmp_path / "probe"), max_bytes=1 << 30)
+        total = sum(
+            probe.get_variant(source, w, "png").path.stat().st_size
+            for w in (160, 320, 480)
+        )
+        # One byte short of holding all three variants.
+        cache = DiskImageVariantCache(str(tmp_path / "cache"), max_bytes=total - 1)
+
+        least_recent = cache.get_variant(source, 480, "png")
+        os.utime(least_recent.path, ns=(1, 1))
+        kept = [cache.get_variant(source, w, "png") for w in (160, 320)]
+
+        assert not least_recent.path.exists()
+        assert all(variant.path.exists() for variant in kept)
+
+    def test_counts_existing_files_after_restart(self, tmp_path: Path) -> None:
+        source = _write_noise(tmp_path / "photo.png", (1000, 800))
+        folder = str(tmp_path / "cache")
+        previous = DiskImageVariantCache(folder, max_bytes=1 << 30)
+        stale = previous.get_variant(source, 640, "png")
+        os.utime(stale.path, ns=(1, 1))
+
+        cache = DiskImageVariantCache(folder, max_bytes=stale.path.stat().st_size)
+        fresh = cache.get_variant(source, 320, "png")
+
+        assert not stale.path.exists()
+        assert fresh.path.exists()
@@ -0,0 +1,79 @@
+"""Tests for psycopg 3 pipeline batching."""
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, cast
+from uuid import UUID
+
+from sqlalchemy.dialects.postgresql.psycopg import (
+    PGDialect_psycopg,
+    PGDialectAsync_psycopg,
+)
+from sqlalchemy.dialects.postgresql.psycopg2 import PGDialect_psycopg2
+from sqlalchemy.engine import Dialect
+from sqlalchemy.orm import Session
+
+from miam.infra.db.pipeline import pipelined
+from miam.infra.repositories import RecipeRepository
+from tests.infra.conftest import make_recipe_create
+
+
+class FakePipelineConnection:
+    """Records when psycopg 3 pipeline mode is entered and left."""
+
+    def __init__(self) -> None:
+        self.events: list[str] = []
+
+    @contextmanager
+    def pipeline(self) -> Any:
+        self.events.append("enter")
+        yield
+        self.events.append("exit")
+
+
+def _fake_session(dialect: type[Dialect], conn: FakePipelineConnection) -> Session:
+    connection = SimpleNamespace(
+        dialect=dialect(),
+        connection=SimpleNamespace(driver_connection=conn),
+    )
+    return cast(Session, SimpleNamespace(connection=lambda: connection))
+
+
+class TestPipelined:
+    def test_enters_pipeline_mode_with_psycopg3(self) -> None:
+        conn = FakePipelineConnection()
+
+        with pipelined(_fake_session(PGDialect_psycopg, conn)):
+            conn.events.append("body")
+
+        assert conn.events == ["enter", "body", "exit"]
+
+    def test_is_a_no_op_with_other_drivers(self) -> None:
+        conn = FakePipelineConnection()
+
+        with pipelined(_fake_session(PGDialect_psycopg2, conn)):
+            conn.events.append("body")
+
+        assert conn.events == ["body"]
+
+    def test_is_a_no_op_with_the_psycopg_asyncio_dialect(self) -> None:
+        # Its driver is "psycopg" too, but its pipeline() must be awaited.
+        conn = FakePipelineConnection()
+
+        with pipelined(_fake_session(PGDialectAsync_psycopg, conn)):
+            conn.events.append("body")
+
+        assert conn.events == ["body"]
+
+    def test_pipelined_writes_are_committed(
+        self, db_session: Session, default_owner_id: UUID
+    ) -> None:
+        repository = RecipeRepository(db_session)
+
+        created = repository.add_recipes(
+            [make_recipe_create(title="A"), make_recipe_create(title="B")],
+            default_owner_id,
+        )
+
+        assert {r.title for r in created} == {"A", "B"}
+        assert repository.get_library_version(default_owner_id) == 2
@@ -0,0 +1,67 @@
+"""Tests for connection pool options and instrumentation."""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from miam.infra.db.pool import InstrumentedQueuePool, pool_stats
+from miam.infra.db.session import AlembicConfig, engine_options
+
+
+class TestPoolStats:
+    def test_counts_checkouts_and_occupancy(self) -> None:
+        engine = create_engine(
+            "sqlite://", poolclass=InstrumentedQueuePool, pool_size=2
+        )
+
+        with engine.connect():
+            busy = pool_stats(engine)
+        idle = pool_stats(engine)
+
+        assert busy["checked_out"] == 1
+        assert idle["checked_out"] == 0
+        assert idle["idle"] == 1
+        assert idle["checkouts"] == 1
+        assert idle["connects"] == 1
+
+    def test_counts_timeouts(self) -> None:
+        engine = create_engine(
+            "sqlite://",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.01,
+        )
+
+        with engine.connect(), pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+        stats = pool_stats(engine)
+        assert stats["timeouts"] == 1
+        assert stats["wait_seconds_max"] >= 0.01
+
+
+class TestEngineOptions:
+    def test_postgres_pool_settings(self) -> None:
+        config = AlembicConfig(db_pool_size=7, db_statement_timeout_ms=5000)
+        url = "postgresql+psycopg2://u:p@db/recipes"
+
+        options = engine_options(config, url)
+
+        assert options["poolclass"] is InstrumentedQueuePool
+        assert options["pool_size"] == 7
+        assert options["pool_pre_ping"] is True
+        assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+    def test_asyncpg_statement_timeout(self) -> None:
+        config = AlembicConfig(db_statement_timeout_ms=5000)
+        url = "postgresql+asyncpg://u:p@db/recipes"
+
+        options = engine_options(config, url, is_async=True)
+
+        assert options["connect_args"] == {
+            "server_settings": {"statement_timeout": "5000"}
+        }
+
+    def test_sqlite_keeps_defaults(self) -> None:
+        assert engine_options(AlembicConfig(), "sqlite:///miam.db") == {}
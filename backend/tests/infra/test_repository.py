@@ -6,14 +6,23 @@ import pytest
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from miam.domain.entities import AuthProvider, Category, Season, SourceType, UserEntity
+from miam.domain.entities import (
+    AuthProvider,
+    Category,
+    NewImage,
+    Season,
+    SourceType,
+    UserEntity,
+)
 from miam.domain.schemas import (
     IngredientCreate,
     RecipeUpdate,
     SourceCreate,
 )
-from miam.infra.db.base import Ingredient, Source
+from miam.infra.cache.memory import InMemoryCache
+from miam.infra.db.base import ImageBlob, Ingredient, Source
 from miam.infra.repositories import RecipeRepository, UserRepository
+from miam.infra.search_cache import SearchResultCache
 from tests.infra.conftest import make_recipe_create
 
 # ---------------------------------------------------------------------------
@@ -331,6 +340,41 @@ class TestSearchRecipes:
         assert result.total == 3
         assert len(result.items) == 1
 
+    def test_keyset_pages_cover_every_recipe_once(
+        self, repository: RecipeRepository, default_owner_id: UUID
+    ) -> None:
+        # A batch shares near-identical timestamps: the id must break ties.
+        repository.add_recipes(
+            [make_recipe_create(title=str(i)) for i in range(5)], default_owner_id
+        )
+        seen: list[UUID] = []
+        after = None
+        while True:
+            page = repository.search_recipes(default_owner_id, limit=2, after=after)
+            assert page.total == 5
+            if not page.items:
+                break
+            seen.extend(r.id for r in page.items)
+            after = page.items[-1].id
+
+        everything = repository.search_recipes(default_owner_id)
+        assert seen == [r.id for r in everything.items]
+        assert len(set(seen)) == 5
+
+    def test_keyset_rejects_a_deleted_cursor(
+        self, repository: RecipeRepository, default_owner_id: UUID
+    ) -> None:
+        first, second = repository.add_recipes(
+            [make_recipe_create(title="A"), make_recipe_create(title="B")],
+            default_owner_id,
+        )
+        repository.delete_recipe(second.id, default_owner_id)
+
+        with pytest.raises(ValueError, match="Unknown pagination cursor"):
+            repository.search_recipes(default_owner_id, limit=2, after=second.id)
+        with pytest.raises(ValueError, match="Unknown pagination cursor"):
+            repository.search_recipes(uuid4(), limit=2, after=first.id)
+
     def test_combined_filters(
         self, repository: RecipeRepository, default_owner_id: UUID
     ) -> None:
@@ -565,6 +609,29 @@ class TestAddImage:
         with pytest.raises(ValueError, match="not found or not accessible"):
             repository.add_image(created.id, other_user, caption="Nope")
 
+    def test_records_file_metadata(
+        self, repository: RecipeRepository, default_owner_id: UUID
+    ) -> None:
+        created = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        img = repository.add_image(
+            created.id, default_owner_id, extension=".png", media_type="image/png"
+        )
+
+        fetched = repository.get_image(img.id, default_owner_id)
+        assert fetched is not None
+        assert (fetched.extension, fetched.media_type) == (".png", "image/png")
+        assert repository.get_image(img.id, uuid4()) is None
+
+    def test_records_placeholder(
+        self, repository: RecipeRepository, default_owner_id: UUID
+    ) -> None:
+        created = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        repository.add_image(created.id, default_owner_id, placeholder="data:,x")
+
+        fetched = repository.get_recipe_by_id(created.id, default_owner_id)
+        assert fetched is not None
+        assert fetched.images[0].placeholder == "data:,x"
+
 
 class TestDeleteImage:
     def test_existing(
@@ -588,6 +655,176 @@ class TestDeleteImage:
         assert repository.delete_image(img.id, other_user) is False
 
 
+# ---------------------------------------------------------------------------
+# Image blobs (content-addressed storage)
+# ---------------------------------------------------------------------------
+
+_HASH = "ab" * 32
+
+
+def _ref_counts(db_session: Session) -> dict[str, int]:
+    rows = db_session.execute(select(ImageBlob.content_hash, ImageBlob.ref_count))
+    return dict(rows.tuples().all())
+
+
+class TestImageBlobs:
+    def test_images_with_the_same_content_share_a_blob(
+        self, repository: RecipeRepository, db_session: Session, default_owner_id: UUID
+    ) -> None:
+        first = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        second = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+
+        img = repository.add_image(first.id, default_owner_id, content_hash=_HASH)
+        repository.add_image(second.id, default_owner_id, content_hash=_HASH)
+
+        assert _ref_counts(db_session) == {_HASH: 2}
+        fetched = repository.get_image(img.id, default_owner_id)
+        assert fetched is not None
+        assert fetched.content_hash == _HASH
+
+    def test_add_images_counts_references_in_one_transaction(
+        self, repository: RecipeRepository, db_session: Session, default_owner_id: UUID
+    ) -> None:
+        first = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        second = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+
+        images = repository.add_images(
+            [
+                NewImage(first.id, extension=".jpg", content_hash=_HASH),
+                # Not visible: skipped, without failing the other images.
+                NewImage(uuid4(), extension=".jpg", content_hash=_HASH),
+                NewImage(second.id, extension=".png", content_hash=_HASH),
+            ],
+            default_owner_id,
+        )
+
+        assert images[1] is None
+        assert images[0] is not None
+        assert images[2] is not None
+        assert images[2].extension == ".png"
+        assert _ref_counts(db_session) == {_HASH: 2}
+        assert repository.get_recipe_version(first.id, default_owner_id) == "2-owner"
+        fetched = repository.get_recipe_by_id(second.id, default_owner_id)
+        assert fetched is not None
+        assert [img.id for img in fetched.images] == [images[2].id]
+
+    def test_deleting_images_releases_references(
+        self, repository: RecipeRepository, db_session: Session, default_owner_id: UUID
+    ) -> None:
+        first = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        second = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        img = repository.add_image(first.id, default_owner_id, content_hash=_HASH)
+        repository.add_image(second.id, default_owner_id, content_hash=_HASH)
+        repository.add_image(second.id, default_owner_id, content_hash=_HASH)
+
+        repository.delete_image(img.id, default_owner_id)
+        assert _ref_counts(db_session) == {_HASH: 2}
+
+        repository.delete_recipe(second.id, default_owner_id)
+        assert _ref_counts(db_session) == {_HASH: 0}
+
+    def test_delete_unreferenced_blobs(
+        self, repository: RecipeRepository, db_session: Session, default_owner_id: UUID
+    ) -> None:
+        created = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        shared = "cd" * 32
+        img = repository.add_image(created.id, default_owner_id, content_hash=_HASH)
+        repository.add_image(created.id, default_owner_id, content_hash=shared)
+        repository.add_image(created.id, default_owner_id, content_hash=shared)
+        repository.delete_image(img.id, default_owner_id)
+        deleted_files: list[str] = []
+
+        deleted = repository.delete_unreferenced_blobs(
+            {_HASH, shared}, deleted_files.append
+        )
+
+        assert deleted == [_HASH]
+        assert deleted_files == [_HASH]
+        assert _ref_counts(db_session) == {shared: 2}
+
+
+# ---------------------------------------------------------------------------
+# Versions (ETag support)
+# ---------------------------------------------------------------------------
+
+
+class TestVersions:
+    def test_new_recipe_version(
+        self, repository: RecipeRepository, default_owner_id: UUID
+    ) -> None:
+        created = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        assert repository.get_recipe_version(created.id, default_owner_id) == "1-owner"
+
+    def test_version_hidden_from_other_user(
+        self, repository: RecipeRepository, default_owner_id: UUID
+    ) -> None:
+        created = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        assert repository.get_recipe_version(created.id, uuid4()) is None
+
+    def test_update_bumps_versions(
+        self, repository: RecipeRepository, default_owner_id: UUID
+    ) -> None:
+        created = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        library_before = repository.get_library_version(default_owner_id)
+
+        repository.update_recipe(
+            created.id,
+            RecipeUpdate(title="New", description="", category=Category.plat),
+            default_owner_id,
+        )
+
+        assert repository.get_recipe_version(created.id, default_owner_id) == "2-owner"
+        assert repository.get_library_version(default_owner_id) == library_before + 1
+
+    def test_image_changes_bump_recipe_version(
+        self, repository: RecipeRepository, default_owner_id: UUID
+    ) -> None:
+        created = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        img = repository.add_image(created.id, default_owner_id)
+        assert repository.get_recipe_version(created.id, default_owner_id) == "2-owner"
+
+        repository.delete_image(img.id, default_owner_id)
+        assert repository.get_recipe_version(created.id, default_owner_id) == "3-owner"
+
+    def test_create_and_delete_bump_library_version(
+        self, repository: RecipeRepository, default_owner_id: UUID
+    ) -> None:
+        initial = repository.get_library_version(default_owner_id)
+        created = repository.add_recipe(make_recipe_create(), owner_id=default_owner_id)
+        assert repository.get_library_version(default_owner_id) == initial + 1
+
+        repository.delete_recipe(created.id, default_owner_id)
+        assert repository.get_library_version(default_owner_id) == initial + 2
+
+
+class TestSearchCache:
+    def test_repeated_search_is_served_from_cache(
+        self, db_session: Session, default_owner_id: UUID
+    ) -> None:
+        cache = SearchResultCache(InMemoryCache())
+        repository = RecipeRepository(db_session, search_cache=cache)
+        repository.add_recipe(make_recipe_create(title="Soup"), default_owner_id)
+
+        first = repository.search_recipes(default_owner_id, title="soup")
+        second = repository.search_recipes(default_owner_id, title="SOUP")
+
+        assert first.total == second.total == 1
+        assert cache.hits == 1
+
+    def test_write_invalidates_cached_results(
+        self, db_session: Session, default_owner_id: UUID
+    ) -> None:
+        cache = SearchResultCache(InMemoryCache())
+        repository = RecipeRepository(db_session, search_cache=cache)
+        repository.add_recipe(make_recipe_create(title="Soup"), default_owner_id)
+        assert repository.search_recipes(default_owner_id).total == 1
+
+        repository.add_recipe(make_recipe_create(title="Cake"), default_owner_id)
+
+        assert repository.search_recipes(default_owner_id).total == 2
+        assert cache.hits == 0
+
+
 # ---------------------------------------------------------------------------
 # User repository
 # ---------------------------------------------------------------------------
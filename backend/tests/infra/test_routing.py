@@ -0,0 +1,129 @@
+"""Tests for read-replica routing."""
+
+from collections.abc import Generator
+from uuid import UUID
+
+import pytest
+from sqlalchemy import Engine, create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from miam.domain.entities import AuthProvider
+from miam.infra.cache.memory import InMemoryCache
+from miam.infra.db.base import Base, User
+from miam.infra.db.routing import (
+    RoutingSession,
+    pin_to_primary,
+    replica_available,
+    replica_reads,
+)
+from miam.infra.repositories import RecipeRepository, UserRepository
+from miam.infra.search_cache import SearchResultCache
+from tests.infra.conftest import make_recipe_create
+
+
+def _engine() -> Engine:
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def engines() -> Generator[tuple[Engine, Engine]]:
+    """A primary and a replica that never replicates: every write is 'lagging'."""
+    primary, replica = _engine(), _engine()
+    yield primary, replica
+    primary.dispose()
+    replica.dispose()
+
+
+@pytest.fixture
+def session(engines: tuple[Engine, Engine]) -> Generator[RoutingSession]:
+    primary, replica = engines
+    with RoutingSession(bind=primary, replica=replica) as session:
+        yield session
+
+
+def _create_user(session: RoutingSession) -> UUID:
+    return (
+        UserRepository(session)
+        .create_user(
+            email="cook@test.local",
+            display_name="Cook",
+            auth_provider=AuthProvider.google,
+            auth_provider_id="cook",
+        )
+        .id
+    )
+
+
+class TestRoutingSession:
+    def test_plain_queries_use_primary(self, session: RoutingSession) -> None:
+        user_id = _create_user(session)
+
+        count = session.execute(text("SELECT count(*) FROM users")).scalar_one()
+
+        assert count == 1
+        assert user_id is not None
+
+    def test_read_only_methods_use_replica(self, session: RoutingSession) -> None:
+        user_id = _create_user(session)
+        session.expunge_all()
+
+        assert UserRepository(session).get_user_by_id(user_id) is None
+
+    def test_pinned_session_reads_primary(self, session: RoutingSession) -> None:
+        user_id = _create_user(session)
+        session.expunge_all()
+        pin_to_primary(session)
+
+        assert not replica_available(session)
+        assert UserRepository(session).get_user_by_id(user_id) is not None
+
+    def test_flushes_inside_replica_block_use_primary(
+        self, session: RoutingSession, engines: tuple[Engine, Engine]
+    ) -> None:
+        with replica_reads(session):
+            session.add(
+                User(
+                    email="cook@test.local",
+                    display_name="Cook",
+                    auth_provider=AuthProvider.google,
+                    auth_provider_id="cook",
+                )
+            )
+            session.flush()
+        session.commit()
+
+        with engines[0].connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM users")).scalar_one() == 1
+
+    def test_without_replica_reads_primary(
+        self, engines: tuple[Engine, Engine]
+    ) -> None:
+        with RoutingSession(bind=engines[0]) as session:
+            user_id = _create_user(session)
+            session.expunge_all()
+
+            assert not replica_available(session)
+            assert UserRepository(session).get_user_by_id(user_id) is not None
+
+
+class TestSearchOnReplica:
+    def test_lagging_replica_is_not_cached(self, session: RoutingSession) -> None:
+        user_id = _create_user(session)
+        repository = RecipeRepository(
+            session, search_cache=SearchResultCache(InMemoryCache())
+        )
+        repository.add_recipe(make_recipe_create(title="Soup"), user_id)
+
+        assert repository.search_recipes(user_id).total == 1
+        assert repository.search_recipes(user_id).total == 1
+
+    def test_uncached_search_reads_replica(self, session: RoutingSession) -> None:
+        user_id = _create_user(session)
+        repository = RecipeRepository(session)
+        repository.add_recipe(make_recipe_create(title="Soup"), user_id)
+
+        assert repository.search_recipes(user_id).total == 0
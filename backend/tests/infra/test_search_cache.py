@@ -0,0 +1,66 @@
+"""Tests for the search result cache."""
+
+from uuid import uuid4
+
+from miam.domain.entities import PaginatedResult, RecipeEntity
+from miam.infra.cache.memory import InMemoryCache
+from miam.infra.search_cache import SearchResultCache
+
+
+def _result(title: str = "Soup", total: int = 1) -> PaginatedResult:
+    recipe = RecipeEntity(
+        id=uuid4(), title=title, description="", category="plat", owner_id=uuid4()
+    )
+    return PaginatedResult(items=[recipe], total=total)
+
+
+class TestSearchResultCache:
+    def test_miss_then_hit(self) -> None:
+        cache = SearchResultCache(InMemoryCache())
+        user_id = uuid4()
+        assert cache.get(user_id, 1, ("soup",)) is None
+
+        stored = _result("Soup")
+        cache.put(user_id, 1, ("soup",), stored)
+        cached = cache.get(user_id, 1, ("soup",))
+
+        assert cached == stored
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_returns_a_copy(self) -> None:
+        cache = SearchResultCache(InMemoryCache())
+        user_id = uuid4()
+        cache.put(user_id, 1, (), _result())
+
+        first = cache.get(user_id, 1, ())
+        assert first is not None
+        first.items.clear()
+
+        second = cache.get(user_id, 1, ())
+        assert second is not None
+        assert len(second.items) == 1
+
+    def test_other_generation_misses(self) -> None:
+        cache = SearchResultCache(InMemoryCache())
+        user_id = uuid4()
+        cache.put(user_id, 1, (), _result())
+        assert cache.get(user_id, 2, ()) is None
+
+    def test_other_filters_miss(self) -> None:
+        cache = SearchResultCache(InMemoryCache())
+        user_id = uuid4()
+        cache.put(user_id, 1, ("soup",), _result())
+        assert cache.get(user_id, 1, ("cake",)) is None
+
+    def test_users_are_isolated(self) -> None:
+        cache = SearchResultCache(InMemoryCache())
+        cache.put(uuid4(), 1, (), _result())
+        assert cache.get(uuid4(), 1, ()) is None
+
+    def test_applies_ttl(self) -> None:
+        backend = InMemoryCache()
+        cache = SearchResultCache(backend, ttl_seconds=0)
+        user_id = uuid4()
+        cache.put(user_id, 1, (), _result())
+        assert cache.get(user_id, 1, ()) is None
@@ -0,0 +1,27 @@
+"""Tests for database session configuration."""
+
+import pytest
+
+from miam.infra.db.session import async_database_url
+
+
+class TestAsyncDatabaseUrl:
+    def test_swaps_postgres_driver(self) -> None:
+        url = "postgresql+psycopg2://user:secret@db:5432/recipes"
+
+        assert (
+            async_database_url(url)
+            == "postgresql+asyncpg://user:secret@db:5432/recipes"
+        )
+
+    def test_keeps_psycopg3_driver(self) -> None:
+        url = "postgresql+psycopg://user:secret@db:5432/recipes"
+
+        assert async_database_url(url) == url
+
+    def test_swaps_sqlite_driver(self) -> None:
+        assert async_database_url("sqlite:///miam.db") == "sqlite+aiosqlite:///miam.db"
+
+    def test_rejects_unknown_dialect(self) -> None:
+        with pytest.raises(ValueError, match="No asyncio driver"):
+            async_database_url("mysql+pymysql://user@db/recipes")
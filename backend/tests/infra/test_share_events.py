@@ -0,0 +1,96 @@
+"""Tests for pending share change notifications."""
+
+import asyncio
+from uuid import UUID, uuid4
+
+from sqlalchemy.orm import Session
+
+from miam.domain.entities import AuthProvider, ShareRole, ShareStatus
+from miam.infra.cache.invalidation import CacheInvalidationBus
+from miam.infra.cache.memory import InMemoryCache
+from miam.infra.repositories import (
+    RecipeRepository,
+    RecipeShareRepository,
+    UserRepository,
+)
+from miam.infra.share_events import ShareEventBroker, pending_shares_key
+from tests.infra.conftest import make_recipe_create
+
+
+async def _notified(broker: ShareEventBroker, user_id: UUID, key: str) -> bool:
+    with broker.subscribe(user_id) as changes:
+        broker.publish_keys([key])
+        try:
+            await asyncio.wait_for(changes.wait(), 1)
+        except TimeoutError:
+            return False
+        return True
+
+
+class TestShareEventBroker:
+    def test_notifies_subscribed_user(self) -> None:
+        broker = ShareEventBroker()
+        user_id = uuid4()
+
+        assert asyncio.run(_notified(broker, user_id, pending_shares_key(user_id)))
+
+    def test_ignores_other_users_and_keys(self) -> None:
+        broker = ShareEventBroker()
+        user_id = uuid4()
+
+        assert not asyncio.run(_notified(broker, user_id, pending_shares_key(uuid4())))
+        assert not asyncio.run(_notified(broker, user_id, f"library:{user_id}"))
+
+    def test_unsubscribes_on_exit(self) -> None:
+        broker = ShareEventBroker()
+        user_id = uuid4()
+
+        asyncio.run(_notified(broker, user_id, pending_shares_key(user_id)))
+
+        assert broker.subscriber_count(user_id) == 0
+
+    def test_notify_from_another_thread(self) -> None:
+        broker = ShareEventBroker()
+        user_id = uuid4()
+
+        async def scenario() -> bool:
+            with broker.subscribe(user_id) as changes:
+                await asyncio.to_thread(broker.notify, user_id)
+                await asyncio.wait_for(changes.wait(), 1)
+                return changes.is_set()
+
+        assert asyncio.run(scenario())
+
+
+class TestShareWritesPublishEvents:
+    def test_share_lifecycle_publishes_pending_key(
+        self, db_session: Session, default_owner_id: UUID
+    ) -> None:
+        published: list[str] = []
+        bus = CacheInvalidationBus(InMemoryCache(), db_session.get_bind().engine)
+        bus.attach(db_session)
+        bus.subscribe(published.extend)
+        guest = UserRepository(db_session).create_user(
+            email="guest@test.local",
+            display_name="Guest",
+            auth_provider=AuthProvider.google,
+            auth_provider_id="guest",
+        )
+        recipe = RecipeRepository(db_session).add_recipe(
+            make_recipe_create(), default_owner_id
+        )
+        shares = RecipeShareRepository(db_session)
+        published.clear()
+
+        share = shares.create_share(
+            recipe.id, default_owner_id, guest.id, ShareRole.reader
+        )
+        assert pending_shares_key(guest.id) in published
+
+        published.clear()
+        shares.update_share_status(share.id, ShareStatus.accepted)
+        assert pending_shares_key(guest.id) in published
+
+        published.clear()
+        shares.delete_share(share.id)
+        assert pending_shares_key(guest.id) not in published
@@ -27,7 +27,7 @@ export function CartRecipeItem({ recipe, servings, onServingsChange, onRemove }:
             title={`${recipe.title} — changer le nombre de personnes`}
           >
             {recipe.image ? (
-              <AuthImage src={recipe.image} alt="" className="w-full h-20 object-cover" />
+              <AuthImage src={recipe.image} variantWidth={320} alt="" className="w-full h-20 object-cover" />
             ) : (
               <img
                 src={getDefaultRecipeImage(recipe.type)}
@@ -51,7 +51,8 @@ export default function RecipeCard({ recipe, onClick, selectionMode, selected, o
   const diff = difficultyLabels[recipe.difficulty];
   const cart = useCart();
   const inCart = cart.has(recipe.id);
-  const fetchedImage = useAuthImage(recipe.image);
+  // Catalog cards stay narrower than the sm breakpoint (640 px).
+  const fetchedImage = useAuthImage(recipe.image, 640);
   const imageSrc = recipe.image ? fetchedImage : getDefaultRecipeImage(recipe.type);
   const isDefault = !recipe.image;
 
@@ -85,6 +86,8 @@ export default function RecipeCard({ recipe, onClick, selectionMode, selected, o
               className={`w-full h-full ${isDefault ? 'object-contain bg-muted p-4' : 'object-cover'}`}
               loading="lazy"
             />
+          ) : recipe.imagePlaceholder ? (
+            <img src={recipe.imagePlaceholder} alt="" aria-hidden className="w-full h-full object-cover blur-md scale-110" />
           ) : (
             <div className="w-full h-full bg-muted animate-pulse" />
           )}
@@ -150,6 +153,8 @@ export default function RecipeCard({ recipe, onClick, selectionMode, selected, o
             className={`w-full h-full transition-transform duration-500 group-hover:scale-105 ${isDefault ? 'object-contain bg-muted p-4' : 'object-cover'}`}
             loading="lazy"
           />
+        ) : recipe.imagePlaceholder ? (
+          <img src={recipe.imagePlaceholder} alt="" aria-hidden className="w-full h-full object-cover blur-md scale-110" />
         ) : (
           <div className="w-full h-full bg-muted animate-pulse" />
         )}
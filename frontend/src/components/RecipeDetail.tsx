@@ -380,6 +380,10 @@ export default function RecipeDetail({ recipe, onBack, onRatingChange, onSave, o
                     className="relative w-full h-full object-contain md:object-cover"
                   />
                 </div>
+              ) : recipe.imagePlaceholder ? (
+                <div className={`${wrapperBase} relative overflow-hidden`}>
+                  <img src={recipe.imagePlaceholder} alt="" aria-hidden className="absolute inset-0 w-full h-full object-cover blur-md scale-110" />
+                </div>
               ) : recipe.image ? (
                 <div className={`${wrapperBase} bg-muted animate-pulse`} />
               ) : (
@@ -2,7 +2,7 @@ import { useState, useRef } from 'react';
 import { Upload, Instagram, ArrowLeft, AlertCircle, Check, X, Image as ImageIcon, ClipboardPaste } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { toast } from '@/hooks/use-toast';
-import { parseInstagram, importRecipesBatch, uploadImageFromUrl, type ParsedInstagramRecipe } from '@/lib/api';
+import { parseInstagram, importRecipesBatch, uploadImagesFromUrls, type ParsedInstagramRecipe } from '@/lib/api';
 
 interface RecipeImportInstagramProps {
   onBack: () => void;
@@ -98,13 +98,13 @@ export default function RecipeImportInstagram({ onBack, onImportDone }: RecipeIm
       const payload = { recipes: recipesToImport.map((p) => p.recipe) };
       const { ids } = await importRecipesBatch(payload);
 
-      // Upload images in parallel (best-effort)
+      // The server downloads the images concurrently (best-effort)
       const imageUploads = recipesToImport
-        .map((p, i) => ({ id: ids[i], url: p.image_url }))
-        .filter((item): item is { id: string; url: string } => item.url !== null);
+        .map((p, i) => ({ recipeId: ids[i], url: p.image_url }))
+        .filter((item): item is { recipeId: string; url: string } => item.url !== null);
 
-      await Promise.allSettled(
-        imageUploads.map(({ id, url }) => uploadImageFromUrl(id, url))
+      await uploadImagesFromUrls(imageUploads).catch((err) =>
+        console.warn('Failed to upload images from URLs:', err)
       );
 
       toast({
@@ -20,6 +20,7 @@ export interface Recipe {
   title: string;
   description: string;
   image?: string;
+  imagePlaceholder?: string; // data URI shown blurred while the image loads
   type: RecipeType;
   season: Season | null;
   tags: string[];
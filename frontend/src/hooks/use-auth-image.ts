@@ -20,18 +20,30 @@ function fetchAuthImage(imageUrl: string): Promise<string> {
  * Fetches an image from the secure /images endpoint with auth headers
  * and returns a blob URL that can be used in <img src>.
  * Results are cached via React Query — same URL won't be re-fetched on remount.
+ *
+ * Signed URLs (from recipe responses) need no authentication and are cached
+ * by the browser, so they are returned as is instead of being fetched.
+ *
+ * With `width`, a WebP copy resized on the server is fetched instead of the
+ * original upload — use it for thumbnails.
  */
-export function useAuthImage(imageUrl: string | undefined): string | undefined {
+export function useAuthImage(imageUrl: string | undefined, width?: number): string | undefined {
   const isApiImage = imageUrl?.startsWith(`${API_BASE}/images/`);
+  const isSigned = isApiImage && imageUrl!.includes('sig=');
+  const separator = imageUrl?.includes('?') ? '&' : '?';
+  const fetchUrl =
+    isApiImage && width ? `${imageUrl}${separator}w=${width}&format=webp` : imageUrl;
 
   const { data } = useQuery({
-    queryKey: ['auth-image', imageUrl],
-    queryFn: () => fetchAuthImage(imageUrl!),
-    enabled: !!imageUrl && isApiImage,
+    queryKey: ['auth-image', fetchUrl],
+    queryFn: () => fetchAuthImage(fetchUrl!),
+    enabled: !!imageUrl && isApiImage && !isSigned,
     staleTime: Infinity,
     gcTime: 30 * 60 * 1000,
   });
 
+  if (isSigned) return fetchUrl;
+
   // Non-API URLs (data URLs, external URLs) pass through directly
   if (imageUrl && !isApiImage) return imageUrl;
 
@@ -42,8 +54,12 @@ export function useAuthImage(imageUrl: string | undefined): string | undefined {
  * Drop-in replacement for <img> that fetches from the secure /images endpoint.
  * Renders nothing while loading, then a normal <img> with the blob URL.
  */
-export function AuthImage({ src, ...props }: React.ImgHTMLAttributes<HTMLImageElement>) {
-  const blobUrl = useAuthImage(src);
+export function AuthImage({
+  src,
+  variantWidth,
+  ...props
+}: React.ImgHTMLAttributes<HTMLImageElement> & { variantWidth?: number }) {
+  const blobUrl = useAuthImage(src, variantWidth);
   if (!blobUrl) return null;
   return React.createElement('img', { ...props, src: blobUrl });
 }
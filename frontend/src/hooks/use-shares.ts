@@ -1,7 +1,9 @@
+import { useEffect } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import {
   fetchPendingShares,
   fetchPendingSharesCount,
+  subscribePendingSharesCount,
   shareRecipe,
   acceptShare,
   acceptAllShares,
@@ -19,10 +21,25 @@ export function usePendingShares() {
 }
 
 export function usePendingSharesCount() {
+  const queryClient = useQueryClient();
+
+  // The server pushes the count whenever it changes: no polling needed.
+  useEffect(
+    () =>
+      subscribePendingSharesCount((count) => {
+        const previous = queryClient.getQueryData<number>(['shares', 'pending', 'count']);
+        queryClient.setQueryData(['shares', 'pending', 'count'], count);
+        if (previous !== undefined && previous !== count) {
+          queryClient.invalidateQueries({ queryKey: ['shares', 'pending'], exact: true });
+        }
+      }),
+    [queryClient],
+  );
+
   return useQuery<number>({
     queryKey: ['shares', 'pending', 'count'],
     queryFn: fetchPendingSharesCount,
-    refetchInterval: 30000, // poll every 30s
+    staleTime: Infinity,
   });
 }
 
@@ -99,6 +99,10 @@ interface BackendImage {
   id: string;
   caption: string | null;
   display_order: number;
+  // Signed URL relative to the API root, usable without authentication
+  url?: string | null;
+  // Tiny JPEG data URI, shown blurred while the image loads
+  placeholder?: string | null;
 }
 
 interface BackendRecipe {
@@ -126,14 +130,14 @@ interface BackendRecipe {
 
 // --- Conversion functions ---
 
-function getImageUrl(imageId: string): string {
-  return `${API_BASE}/images/${imageId}`;
+function getImageUrl(image: BackendImage): string {
+  return image.url ? `${API_BASE}/${image.url}` : `${API_BASE}/images/${image.id}`;
 }
 
 function getImageIdFromUrl(url: string): string | null {
   const prefix = `${API_BASE}/images/`;
   if (url.startsWith(prefix)) {
-    return url.slice(prefix.length);
+    return url.slice(prefix.length).split('?')[0];
   }
   return null;
 }
@@ -148,7 +152,8 @@ function backendToFrontend(b: BackendRecipe): Recipe {
     id: b.id,
     title: b.title,
     description: b.description ?? '',
-    image: b.images.length > 0 ? getImageUrl(b.images[0].id) : undefined,
+    image: b.images.length > 0 ? getImageUrl(b.images[0]) : undefined,
+    imagePlaceholder: b.images[0]?.placeholder ?? undefined,
     type: categoryToFrontend[b.category] ?? 'plat',
     season: b.season ? (seasonToFrontend[b.season] ?? null) : null,
     tags: b.tags,
@@ -336,14 +341,27 @@ export async function parseInstagram(rawText: string): Promise<ParsedInstagramRe
   return data.recipes;
 }
 
-export async function uploadImageFromUrl(recipeId: string, imageUrl: string): Promise<void> {
-  const res = await apiFetch(`${API_BASE}/images/from-url`, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ recipe_id: recipeId, url: imageUrl }),
-  });
-  if (!res.ok) {
-    console.warn(`Failed to upload image from URL for recipe ${recipeId}: ${res.status}`);
+const IMAGE_URL_BATCH_SIZE = 500; // server-side limit per request
+
+/** Attach images downloaded by the server to recipes (best-effort, batched). */
+export async function uploadImagesFromUrls(items: { recipeId: string; url: string }[]): Promise<void> {
+  for (let start = 0; start < items.length; start += IMAGE_URL_BATCH_SIZE) {
+    const batch = items.slice(start, start + IMAGE_URL_BATCH_SIZE);
+    const res = await apiFetch(`${API_BASE}/images/from-url/batch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ items: batch.map(({ recipeId, url }) => ({ recipe_id: recipeId, url })) }),
+    });
+    if (!res.ok) {
+      console.warn(`Failed to upload images from URLs: ${res.status}`);
+      continue;
+    }
+    const data: { results: { recipe_id: string; error: string | null }[] } = await res.json();
+    for (const result of data.results) {
+      if (result.error) {
+        console.warn(`Failed to upload image from URL for recipe ${result.recipe_id}: ${result.error}`);
+      }
+    }
   }
 }
 
@@ -472,6 +490,32 @@ export async function fetchPendingSharesCount(): Promise<number> {
   return data.count;
 }
 
+/**
+ * Subscribe to the pending share count pushed by the server (Server-Sent Events).
+ * All subscribers share one connection, closed when the last one unsubscribes.
+ * EventSource reconnects on its own after network errors.
+ */
+let pendingCountSource: EventSource | null = null;
+const pendingCountListeners = new Set<(count: number) => void>();
+
+export function subscribePendingSharesCount(onCount: (count: number) => void): () => void {
+  pendingCountListeners.add(onCount);
+  if (!pendingCountSource) {
+    pendingCountSource = new EventSource(`${API_BASE}/shares/events`, { withCredentials: true });
+    pendingCountSource.addEventListener('pending_count', (event) => {
+      const { count } = JSON.parse((event as MessageEvent<string>).data);
+      pendingCountListeners.forEach((listener) => listener(count));
+    });
+  }
+  return () => {
+    pendingCountListeners.delete(onCount);
+    if (pendingCountListeners.size === 0 && pendingCountSource) {
+      pendingCountSource.close();
+      pendingCountSource = null;
+    }
+  };
+}
+
 export async function acceptAllShares(): Promise<RecipeShare[]> {
   const res = await apiFetch(`${API_BASE}/shares/accept-all`, { method: 'POST' });
   if (!res.ok) throw new Error(`Failed to accept all shares: ${res.status}`);